@@ -1,11 +1,10 @@
 # Note to coding agents: This file should not be modified without user permission.
-from datetime import datetime, timezone
 import json
 import os
 import re
 from typing import List, Dict, Any, Optional, Union
 from colorama import Fore
-from jinja2 import Template
+from app.assistant.utils.cache import get_compiled_template
 from typing import TYPE_CHECKING
 from app.assistant.ServiceLocator.service_locator import DI
 from app.assistant.utils.time_utils import get_local_time_str
@@ -21,12 +20,13 @@ from app.assistant.utils.pipeline_state import (
     set_pending_tool,
 )
 from app.services.llm_factory import LLMFactory
+from app.services.llm_response_cache import LLMCacheMiss
 
 from app.assistant.rag.rag_utils import (
     query_rag_database
 )
-
-rag_cache = {}
+from app.assistant.rag.rag_cache import CACHE_MISS, get_rag_result_cache
+from app.resource_manager.render_cache import RESOURCE_TEMPLATE_CONTEXT_KEYS, get_rendered_resource_cache
 
 from app.assistant.utils.logging_config import get_logger
 from app.assistant.performance.performance_monitor import performance_monitor
@@ -34,17 +34,6 @@ from app.assistant.performance.performance_monitor import performance_monitor
 logger = get_logger(__name__)
 
 
-def cache_rag_result(query: str, results: str, cache_duration: int = 48 * 3600):
-    expiration_time = datetime.now(timezone.utc).timestamp() + cache_duration
-    rag_cache[query] = {"results": results, "expires": expiration_time}
-
-
-def get_cached_rag_result(query: str):
-    if query in rag_cache and rag_cache[query]["expires"] > datetime.now(timezone.utc).timestamp():
-        return rag_cache[query]["results"]
-    return None
-
-
 class Agent:
     def __init__(self, name, blackboard, agent_registry: "AgentRegistry", tool_registry, llm_params=None,
                  parent=None):
@@ -173,6 +162,9 @@ class Agent:
                 use_json=use_json,
             )
             return result
+        except LLMCacheMiss:
+            # Strict replay: a request without a recorded response must fail the run
+            raise
         except Exception as e:
             logger.error(f"[{self.name}] LLM execution failed: {e}")
             return None
@@ -254,6 +246,8 @@ class Agent:
 
             # Start from base params, then layer per call overrides
             params = dict(self.llm_params)
+            # Attributes the call's latency/token metrics to this agent
+            params["agent_name"] = self.name
 
             if response_format is not None:
                 params["response_format"] = response_format
@@ -306,6 +300,8 @@ class Agent:
 
             return response
 
+        except LLMCacheMiss:
+            raise
         except Exception as e:
             logger.error(f"[{self.name}] LLM call failed: {e}")
 
@@ -473,7 +469,7 @@ class Agent:
             system_context = None
 
         try:
-            template = Template(system_prompt_template)
+            template = get_compiled_template(system_prompt_template)
             rendered_output = template.render(**system_context or {}).replace('\n\n', '\n')
             return rendered_output
 
@@ -501,7 +497,7 @@ class Agent:
             user_context = {}
 
         try:
-            template = Template(user_prompt_template)
+            template = get_compiled_template(user_prompt_template)
             # Pass 1: render with empty entity fields (generate_injections_block ensures placeholders)
             rendered_output = template.render(**user_context or {}).replace('\n\n', '\n')
 
@@ -761,18 +757,12 @@ class Agent:
 
     def _format_entity_field(self, entities: List[str], field_name: str) -> str:
         if not entities: return ""
-        from app.models.base import get_session
-        from app.assistant.entity_management.entity_cards import get_entity_card_by_name, extract_entity_field
-        session = get_session()
+        from app.assistant.entity_management.entity_card_cache import get_entity_card_cache
+        cards = get_entity_card_cache().get_fields(entities, [field_name])
         blocks = []
-        try:
-            for name in entities:
-                card = get_entity_card_by_name(session, name)
-                if card:
-                    val = extract_entity_field(card, field_name)
-                    if val: blocks.append(f"• {name}:\n{val}")
-        finally:
-            session.close()
+        for name, fields in cards.items():
+            val = fields[field_name]
+            if val: blocks.append(f"• {name}:\n{val}")
         return "\n\n".join(blocks)
 
     def _format_entity_multi_field(self, entities: List[str], field_names: List[str]) -> str:
@@ -791,37 +781,23 @@ class Agent:
         if not entities or not field_names:
             return ""
 
-        from app.models.base import get_session
-        from app.assistant.entity_management.entity_cards import get_entity_card_by_name, extract_entity_field
-        session = get_session()
+        from app.assistant.entity_management.entity_card_cache import get_entity_card_cache
+        # One batched lookup (usually a cache hit) for every entity and field
+        cards = get_entity_card_cache().get_fields(entities, field_names)
         blocks = []
-        try:
-            for entity_name in entities:
-                card = get_entity_card_by_name(session, entity_name)
-                if not card:
-                    continue
-
-                # Gather all requested fields for this entity
-                entity_parts = [f"{entity_name}:"]
-                for field_name in field_names:
-                    val = extract_entity_field(card, field_name)
-                    # Debug logging for metadata
-                    if field_name == "metadata":
-                        from app.assistant.utils.logging_config import get_logger
-                        logger = get_logger(__name__)
-                        meta_raw = getattr(card, "card_metadata", None)
-                        logger.debug(
-                            f"Entity {entity_name} metadata extraction: field_name={field_name}, meta_raw={meta_raw}, val={val[:100] if val else 'EMPTY'}")
-                    if val:
-                        # Format field name nicely (e.g., "key_facts" -> "Key Facts")
-                        display_name = field_name.replace("_", " ").title()
-                        entity_parts.append(f"  {display_name}: {val}")
-
-                # Only add if we got at least one field
-                if len(entity_parts) > 1:
-                    blocks.append("\n".join(entity_parts))
-        finally:
-            session.close()
+        for entity_name, fields in cards.items():
+            # Gather all requested fields for this entity
+            entity_parts = [f"{entity_name}:"]
+            for field_name in field_names:
+                val = fields[field_name]
+                if val:
+                    # Format field name nicely (e.g., "key_facts" -> "Key Facts")
+                    display_name = field_name.replace("_", " ").title()
+                    entity_parts.append(f"  {display_name}: {val}")
+
+            # Only add if we got at least one field
+            if len(entity_parts) > 1:
+                blocks.append("\n".join(entity_parts))
 
         return "\n\n".join(blocks)
 
@@ -862,23 +838,19 @@ class Agent:
             return ""
 
         # If value is a Jinja template string, render it on-demand with current data
+        # (memoized until the template or one of its context resources changes)
         if isinstance(value, str) and ('{{' in value or '{%' in value):
             try:
-                from jinja2 import Template
                 # Build context from all resources in global blackboard
                 context = {}
                 if global_bb is not None:
                     # Get all *_data resources for template context
-                    for key in ['resource_user_data', 'resource_assistant_data',
-                                'resource_assistant_personality_data', 
-                                'resource_relationship_config', 'resource_chat_guidelines_data']:
+                    for key in RESOURCE_TEMPLATE_CONTEXT_KEYS:
                         data = global_bb.get_state_value(key, None)
                         if data is not None:
                             context[key] = data
-                
-                template = Template(value)
-                rendered = template.render(**context)
-                return rendered
+
+                return get_rendered_resource_cache().render(resource_id, value, context)
             except Exception as e:
                 logger.error(f"[{self.name}] Error rendering template for '{resource_id}': {e}")
                 return value  # Return raw template as fallback
@@ -993,7 +965,7 @@ class Agent:
                     raw_description = prompts.get("description", "")
 
                     try:
-                        template = Template(raw_description)
+                        template = get_compiled_template(raw_description)
                         rendered_description = template.render(
                             self_name=name,
                             self_short_name=name.split("::")[-1]
@@ -1043,13 +1015,16 @@ class Agent:
     def retrieve_rag_context(self, query, scopes=None):
         """
         Retrieve relevant context using semantic retrieval only.
-        Caches results to avoid redundant computation.
+        Caches results to avoid redundant computation; "no hits" is cached only
+        briefly and a failed search is not cached at all.
         """
         if not query or query == "[MISSING]":
             return None
 
-        cached_results = get_cached_rag_result(query)
-        if cached_results:
+        top_k, threshold = 2, 0.55  # Reduced top_k from 3 to 2, threshold from 0.65 to 0.55
+        rag_result_cache = get_rag_result_cache()
+        cached_results = rag_result_cache.get(query, scopes, top_k, threshold)
+        if cached_results is not CACHE_MISS:
             logger.debug(f"[{self.name}] Using cached RAG results for query: {query}")
             return cached_results
 
@@ -1058,8 +1033,9 @@ class Agent:
 
         retrieved_info = []
         try:
-            semantic_results = query_rag_database(query, scopes=scopes, top_k=2,
-                                                  threshold=0.55)  # Reduced top_k from 3 to 2, threshold from 0.65 to 0.55
+            semantic_results = query_rag_database(
+                query, scopes=scopes, top_k=top_k, threshold=threshold, raise_errors=True
+            )
         except Exception as e:
             logger.error(f"[{self.name}] Error in semantic RAG retrieval: {e}")
             performance_monitor.end_timer(timer_id, {'status': 'error', 'error': str(e)})
@@ -1073,7 +1049,8 @@ class Agent:
                 )
 
         formatted_results = "\n".join(retrieved_info) if retrieved_info else None
-        cache_rag_result(query, formatted_results)
+        ttl_seconds = None if formatted_results else rag_result_cache.negative_ttl_seconds
+        rag_result_cache.put(query, scopes, top_k, threshold, formatted_results, ttl_seconds=ttl_seconds)
 
         # End timing and record success
         performance_monitor.end_timer(timer_id, {
@@ -1,5 +1,5 @@
 import os
-from jinja2 import Template
+from app.assistant.utils.cache import get_compiled_template
 
 from app.assistant.agent_classes.Agent import Agent  # Base Agent class
 from app.assistant.utils.pydantic_classes import Message
@@ -104,7 +104,7 @@ class Blackboard(Agent):
             user_context["agent_input"] = message.agent_input
 
         try:
-            rendered = Template(user_prompt_template) \
+            rendered = get_compiled_template(user_prompt_template) \
                 .render(**user_context) \
                 .replace("\n\n", "\n")
             return rendered
@@ -1,6 +1,7 @@
 # Note to coding agents: This file should not be modified without user permission.
 from datetime import datetime, timezone
 import os
+import threading
 import uuid
 from typing import Any, Dict, List, Optional, Union
 
@@ -20,6 +21,8 @@ logger = get_logger(__name__)
 class EmiAgent(Agent):
     def __init__(self, name, blackboard, agent_registry, tool_registry, llm_params=None, parent=None):
         super().__init__(name, blackboard, agent_registry, tool_registry, llm_params, parent)
+        # (id, text) of a msg_for_user already streamed to the socket for the current turn
+        self._streamed_chat = threading.local()
 
     def _get_first_image_attachment(self, message: Optional[Message]) -> Optional[Dict[str, Any]]:
         """
@@ -207,9 +210,16 @@ class EmiAgent(Agent):
 
             # Build per-call params without mutating self.llm_params.
             params = dict(self.llm_params)
+            params["agent_name"] = self.name
             if response_format is not None:
                 params["response_format"] = response_format
 
+            # Stream the reply: msg_for_user goes to the socket as soon as its field closes,
+            # before the rest of the structured output has been generated.
+            self._streamed_chat.sent = None
+            if self.config.get("stream_chat_reply"):
+                params["on_field"] = self._dispatch_streamed_field
+
             # IMPORTANT: Gemini adapter does not support OpenAI-style multimodal content blocks.
             # For image messages, always route through the OpenAI provider.
             if image_paths:
@@ -233,6 +243,24 @@ class EmiAgent(Agent):
                 except Exception:
                     pass
 
+    def _dispatch_streamed_field(self, name: str, value: Any):
+        if name != "msg_for_user" or not isinstance(value, str) or not value.strip():
+            return
+        if getattr(self._streamed_chat, "sent", None) is not None:
+            # A retried call streamed a different reply; the user keeps the first one
+            return
+        id_str = str(uuid.uuid4())
+        self.publish_chat_to_user(UserMessage(
+            data_type='user_msg',
+            sender=self.name,
+            receiver=None,
+            timestamp=datetime.now(timezone.utc),
+            id=id_str,
+            role='assistant',
+            user_message_data=UserMessageData(chat=value),
+        ))
+        self._streamed_chat.sent = (id_str, value)
+
     def get_user_prompt(self, message: Message = None):
         user_prompt_template = self.config.get("prompts", {}).get("user", "")
         if not user_prompt_template:
@@ -265,6 +293,26 @@ class EmiAgent(Agent):
 
 
     def process_llm_result(self, response: dict):
+        # The reply may already have been streamed to the user (see call_llm). It cannot be
+        # retracted, so it stays the reply of record and is never published a second time.
+        streamed = getattr(self._streamed_chat, "sent", None)
+        self._streamed_chat.sent = None
+        if streamed is not None and not isinstance(response, dict):
+            logger.warning(
+                f"[{self.name}] Structured output failed after the reply was streamed; keeping the streamed reply"
+            )
+            self.blackboard.add_msg(Message(
+                data_type='emi_msg',
+                sender=self.name,
+                receiver=None,
+                content=streamed[1],
+                timestamp=datetime.now(timezone.utc),
+                id=streamed[0],
+                role='assistant',
+                is_chat=True,
+            ))
+            return
+
         think_carefully = response.get("think_carefully")
         msg_for_user = response.get("msg_for_user")
         reason = response.get("reason")
@@ -279,7 +327,12 @@ class EmiAgent(Agent):
                 f"\n\nMSG for Agent: \n{msg_for_agent}, \n\nHave all info: \n{have_all_info}\n\n{information_for_agent}, Call Team: \n{call_team}"
             )
 
-        id_str = str(uuid.uuid4())
+        already_sent = streamed is not None
+        if already_sent and streamed[1] != msg_for_user:
+            logger.warning(f"[{self.name}] Final reply differs from the streamed one; keeping the streamed reply")
+            msg_for_user = streamed[1]
+
+        id_str = streamed[0] if already_sent else str(uuid.uuid4())
         user_msg_bb = Message(
             data_type='emi_msg',
             sender=self.name,
@@ -328,14 +381,16 @@ class EmiAgent(Agent):
             self.blackboard.add_msg(user_msg_bb)
             self.blackboard.add_msg(task_notification_msg)
 
-            self.publish_chat_to_user(user_msg_chat)
+            if not already_sent:
+                self.publish_chat_to_user(user_msg_chat)
             assistant_name = get_assistant_name()
             self.notify_user_of_agent_call(f"{assistant_name} is working on it.")
             self.publish_message_to_tool(agent_msg)
         else:
 
             self.blackboard.add_msg(user_msg_bb)
-            self.publish_chat_to_user(user_msg_chat)
+            if not already_sent:
+                self.publish_chat_to_user(user_msg_chat)
 
         return
 
@@ -389,23 +444,13 @@ class EmiAgent(Agent):
                     logger.info(f"Found entities in user input: {detected_entities}")
                     
                     # Check which entities are already in history to avoid duplicates
-                    existing_entities = set()
-                    for msg in self.blackboard.get_messages():
-                        if "entity_card_injection" in (getattr(msg, "sub_data_type", []) or []):
-                            # Get entity name from message metadata if available
-                            if hasattr(msg, 'metadata') and msg.metadata and 'entity_name' in msg.metadata:
-                                existing_entities.add(msg.metadata['entity_name'])
-                            # Fallback: extract from content (for backward compatibility)
-                            elif msg.content and msg.content.startswith("[Entity Context -"):
-                                try:
-                                    entity_name_start = msg.content.find("[Entity Context - ") + 17
-                                    entity_name_end = msg.content.find("]:", entity_name_start)
-                                    if entity_name_end > entity_name_start:
-                                        existing_entity = msg.content[entity_name_start:entity_name_end]
-                                        existing_entities.add(existing_entity)
-                                except Exception as e:
-                                    logger.debug(f"[{self.name}] Could not parse entity name from message: {e}")
-                    
+                    existing_entities = self.blackboard.get_injected_entities()
+
+                    # Fetch all new entities' cards in one batched lookup
+                    card_contents = injector.get_entity_card_contents(
+                        [e for e in detected_entities if e not in existing_entities]
+                    )
+
                     # Create separate injection messages for each entity (avoiding duplicates)
                     for entity_name in detected_entities:
                         if entity_name in existing_entities:
@@ -413,7 +458,7 @@ class EmiAgent(Agent):
                             continue
                             
                         # Get entity card content
-                        card_content = injector.get_entity_card_content(entity_name)
+                        card_content = card_contents.get(entity_name)
                         if card_content:
                             injection_msg = Message(
                                 data_type="agent_msg",
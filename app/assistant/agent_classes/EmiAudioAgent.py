@@ -105,6 +105,7 @@ class EmiAudioAgent(Agent):
                             image_paths.append(str(part["path"]))
 
             params = dict(self.llm_params)
+            params["agent_name"] = self.name
             if response_format is not None:
                 params["response_format"] = response_format
 
@@ -293,23 +294,13 @@ class EmiAudioAgent(Agent):
                     logger.info(f"Found entities in user input: {detected_entities}")
                     
                     # Check which entities are already in history to avoid duplicates
-                    existing_entities = set()
-                    for msg in self.blackboard.get_messages():
-                        if "entity_card_injection" in (getattr(msg, "sub_data_type", []) or []):
-                            # Get entity name from message metadata if available
-                            if hasattr(msg, 'metadata') and msg.metadata and 'entity_name' in msg.metadata:
-                                existing_entities.add(msg.metadata['entity_name'])
-                            # Fallback: extract from content (for backward compatibility)
-                            elif msg.content and msg.content.startswith("[Entity Context -"):
-                                try:
-                                    entity_name_start = msg.content.find("[Entity Context - ") + 17
-                                    entity_name_end = msg.content.find("]:", entity_name_start)
-                                    if entity_name_end > entity_name_start:
-                                        existing_entity = msg.content[entity_name_start:entity_name_end]
-                                        existing_entities.add(existing_entity)
-                                except Exception as e:
-                                    logger.debug(f"[{self.name}] Could not parse entity name from message: {e}")
-                    
+                    existing_entities = DI.global_blackboard.get_injected_entities()
+
+                    # Fetch all new entities' cards in one batched lookup
+                    card_contents = injector.get_entity_card_contents(
+                        [e for e in detected_entities if e not in existing_entities]
+                    )
+
                     # Create separate injection messages for each entity (avoiding duplicates)
                     for entity_name in detected_entities:
                         if entity_name in existing_entities:
@@ -317,7 +308,7 @@ class EmiAudioAgent(Agent):
                             continue
                             
                         # Get entity card content
-                        card_content = injector.get_entity_card_content(entity_name)
+                        card_content = card_contents.get(entity_name)
                         if card_content:
                             injection_msg = Message(
                                 data_type="agent_msg",
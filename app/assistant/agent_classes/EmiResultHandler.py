@@ -1,7 +1,7 @@
 from datetime import datetime, timezone
 import json
 import uuid
-from jinja2 import Template
+from app.assistant.utils.cache import get_compiled_template
 from app.assistant.ServiceLocator.service_locator import DI
 from app.assistant.lib.blackboard.Blackboard import Blackboard
 from app.assistant.utils.pydantic_classes import Message, UserMessage, UserMessageData
@@ -99,7 +99,7 @@ class EmiResultHandler(Agent):
             user_context["agent_input"] = agent_input
 
         try:
-            template = Template(user_prompt_template)
+            template = get_compiled_template(user_prompt_template)
             rendered_output = template.render(**user_context or {}).replace('\n\n', '\n')
             return rendered_output
         except Exception as e:
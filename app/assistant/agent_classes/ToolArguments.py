@@ -3,7 +3,7 @@ import re
 import importlib
 from typing import List, Dict
 
-from jinja2 import Template
+from app.assistant.utils.cache import get_compiled_template
 
 from app.assistant.agent_classes.Agent import Agent
 from app.assistant.utils.pipeline_state import get_pending_tool, set_pending_tool_arguments
@@ -127,7 +127,7 @@ class ToolArguments(Agent):
             system_context = None
 
         try:
-            template = Template(system_prompt_template)
+            template = get_compiled_template(system_prompt_template)
             rendered_output = template.render(**system_context or {}).replace('\n\n', '\n')
             return rendered_output
 
@@ -158,7 +158,7 @@ class ToolArguments(Agent):
         # Get agent configuration to get agents system prompt
 
         try:
-            template = Template(user_prompt_template)
+            template = get_compiled_template(user_prompt_template)
             rendered_output = template.render(**user_context or {}).replace('\n\n', '\n')
             return rendered_output
 
@@ -22,6 +22,7 @@ from typing import Any, Callable, Dict, Optional
 
 from app.assistant.utils.logging_config import get_logger
 from app.assistant.utils.error_logging import log_critical_error
+from app.services.llm_governor import llm_priority
 
 logger = get_logger(__name__)
 
@@ -158,7 +159,9 @@ class BackgroundTask:
 
     def _execute(self) -> None:
         try:
-            self.func()
+            # LLM calls made by maintenance work queue behind interactive chat
+            with llm_priority("background"):
+                self.func()
             now = datetime.now(timezone.utc)
             with self._lock:
                 self._last_run = now
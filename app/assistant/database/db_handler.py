@@ -1,6 +1,7 @@
 import uuid
+from datetime import datetime, timezone
 from typing import Type, Iterable, List, Dict, Optional, Any
-from sqlalchemy import create_engine, Column, Integer, Text, JSON, TIMESTAMP, func, String, Boolean, Float
+from sqlalchemy import create_engine, Column, Integer, Text, JSON, TIMESTAMP, func, String, Boolean, Float, Index
 from sqlalchemy.sql import select
 from datetime import date
 
@@ -70,6 +71,34 @@ class EventRepository(Base):
     data = Column(JSON, nullable=False)
     data_hash = Column(String, nullable=False)
     created_at = Column(TIMESTAMP(timezone=True), nullable=False, default=func.now())
+    # UTC window extracted from data['start'] / data['end'] so time predicates run in SQL
+    start_utc = Column(TIMESTAMP(timezone=True), nullable=True)
+    end_utc = Column(TIMESTAMP(timezone=True), nullable=True)
+
+    __table_args__ = (
+        Index('ix_event_repository_type_created', 'data_type', 'created_at'),
+        Index('ix_event_repository_type_event_id', 'data_type', 'event_id'),
+        Index('ix_event_repository_type_start_end', 'data_type', 'start_utc', 'end_utc'),
+    )
+
+    @staticmethod
+    def extract_time_window(data) -> tuple:
+        """Return (start_utc, end_utc) parsed from an event payload; naive values are treated as UTC."""
+        if not isinstance(data, dict):
+            return None, None
+
+        def parse(value):
+            if not isinstance(value, str) or not value:
+                return None
+            try:
+                dt = datetime.fromisoformat(value.replace("Z", "+00:00"))
+            except ValueError:
+                return None
+            if dt.tzinfo is None:
+                return dt.replace(tzinfo=timezone.utc)
+            return dt.astimezone(timezone.utc)
+
+        return parse(data.get("start")), parse(data.get("end"))
 
 class EmailCheckState(Base):
     __tablename__ = 'email_check_state'
@@ -0,0 +1,70 @@
+"""
+Migration: Add start_utc/end_utc columns and composite indexes to event_repository.
+
+The columns hold the event window extracted from data['start'] / data['end'] so that
+time-window reads (e.g. calendar events overlapping the next few hours) are filtered
+in SQL instead of deserializing every stored event.
+
+Idempotent: runs on startup from initialize_core_tables, and can also be run by hand.
+The window index is created in the same transaction right after the backfill and marks
+it as done, so later startups never re-scan rows that have no time window.
+Run: python -m app.assistant.database.migrations.add_event_repository_time_window
+"""
+
+from sqlalchemy import inspect, select, text, update
+
+from app.assistant.database.db_handler import EventRepository
+from app.models.base import get_current_engine
+from app.assistant.utils.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+WINDOW_INDEX = "ix_event_repository_type_start_end"
+
+INDEXES = {
+    "ix_event_repository_type_created": "data_type, created_at",
+    "ix_event_repository_type_event_id": "data_type, event_id",
+    # Last: its presence records that the backfill has run
+    WINDOW_INDEX: "data_type, start_utc, end_utc",
+}
+
+
+def migrate(engine=None) -> bool:
+    """Add the columns and indexes if missing and backfill the window for existing rows."""
+    engine = engine or get_current_engine()
+    table = EventRepository.__table__
+
+    inspector = inspect(engine)
+    columns = {c["name"] for c in inspector.get_columns(table.name)}
+    needs_backfill = WINDOW_INDEX not in {ix["name"] for ix in inspector.get_indexes(table.name)}
+    backfilled = 0
+    with engine.begin() as conn:
+        for column in ("start_utc", "end_utc"):
+            if column not in columns:
+                conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column} TIMESTAMP"))
+
+        if needs_backfill:
+            # Rows written before the columns existed; new writes fill them in store_events
+            rows = conn.execute(
+                select(table.c.id, table.c.data).where(table.c.start_utc.is_(None))
+            ).all()
+            for row_id, data in rows:
+                start_utc, end_utc = EventRepository.extract_time_window(data)
+                if start_utc is None and end_utc is None:
+                    continue
+                conn.execute(
+                    update(table).where(table.c.id == row_id).values(start_utc=start_utc, end_utc=end_utc)
+                )
+                backfilled += 1
+
+        for name, cols in INDEXES.items():
+            conn.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {table.name} ({cols})"))
+
+    if backfilled:
+        logger.info(f"Backfilled time window for {backfilled} event_repository rows")
+    return True
+
+
+if __name__ == "__main__":
+    success = migrate()
+    exit(0 if success else 1)
@@ -111,20 +111,11 @@ class HealthInferenceStage(BaseStage):
         """Get todo/tasks from event repository."""
         try:
             from app.assistant.event_repository.event_repository import EventRepositoryManager
-            import json
             
             repo = EventRepositoryManager()
-            tasks_json = repo.search_events(data_type="todo")
-            tasks_list = json.loads(tasks_json) if tasks_json else []
-            
             result = []
-            for task in tasks_list:
+            for task in repo.query_events(data_type="todo"):
                 data = task.get("data", {})
-                if isinstance(data, str):
-                    try:
-                        data = json.loads(data)
-                    except Exception:
-                        continue
                 if isinstance(data, dict):
                     result.append({
                         "title": data.get("title", data.get("name", "")),
@@ -24,35 +24,19 @@ def _parse_utc(value: Optional[str]) -> Optional[datetime]:
         return None
 
 
-def _load_calendar_events() -> List[Dict[str, Any]]:
+def _load_calendar_events(start: datetime, end: datetime) -> List[Dict[str, Any]]:
+    """Calendar events overlapping [start, end); the window is filtered in SQL."""
     try:
         from app.assistant.event_repository.event_repository import EventRepositoryManager
 
         repo = EventRepositoryManager()
-        events_json = repo.search_events(data_type="calendar")
-        events_list = json.loads(events_json) if events_json else []
-
         parsed: List[Dict[str, Any]] = []
-        for event in events_list:
-            data = event.get("data", {})
-            if isinstance(data, str):
-                try:
-                    data = json.loads(data)
-                except Exception:
-                    continue
-
-            start_iso = data.get("start", "")
-            end_iso = data.get("end", "")
-            start = _parse_utc(start_iso)
-            end = _parse_utc(end_iso) if end_iso else None
-
-            if not start:
-                continue
-
+        for event in repo.query_events(data_type="calendar", start=start, end=end):
+            data = event.get("data") or {}
             parsed.append({
                 "summary": data.get("summary", "Untitled"),
-                "start_utc": start,
-                "end_utc": end,
+                "start_utc": event["start_utc"],
+                "end_utc": event["end_utc"],
                 "attendees": data.get("attendees", []) or [],
             })
 
@@ -92,7 +76,7 @@ def get_calendar_events_upcoming_for_daily_context(hours: int = 12) -> List[Dict
     window_end = now + timedelta(hours=hours)
     result: List[Dict[str, Any]] = []
 
-    for event in _load_calendar_events():
+    for event in _load_calendar_events(now, window_end):
         start = event.get("start_utc")
         end = event.get("end_utc")
         if not start:
@@ -112,7 +96,7 @@ def get_calendar_events_completed(hours: int = 4) -> List[Dict[str, Any]]:
     cutoff = now - timedelta(hours=hours)
     result: List[Dict[str, Any]] = []
 
-    for event in _load_calendar_events():
+    for event in _load_calendar_events(cutoff, now):
         end = event.get("end_utc")
         if not end:
             continue
@@ -130,7 +114,7 @@ def get_calendar_events_for_orchestrator(hours: int = 4) -> List[Dict[str, Any]]
     window_end = now + timedelta(hours=hours)
     result: List[Dict[str, Any]] = []
 
-    for event in _load_calendar_events():
+    for event in _load_calendar_events(now, window_end):
         start = event.get("start_utc")
         end = event.get("end_utc")
         if not start:
@@ -150,7 +134,7 @@ def get_calendar_events_for_health_inference(hours: int = 8) -> List[Dict[str, A
     window_end = now + timedelta(hours=hours)
     result: List[Dict[str, Any]] = []
 
-    for event in _load_calendar_events():
+    for event in _load_calendar_events(now, window_end):
         start = event.get("start_utc")
         end = event.get("end_utc")
         if not start or not end:
@@ -0,0 +1,545 @@
+from __future__ import annotations
+
+"""
+In-memory feature matrix for nearest-neighbour song search.
+
+Holds every track of a music source as columnar arrays:
+- sliders: float32 (N, 8) in slider space (0-100), same conversion as db_to_llm_features
+- gate: float64 (N, 2) native energy/valence (NaN when missing), for the SQLite energy/valence gate
+- prob_factor: float32 (N,)
+- track/artist/genre strings (artist and genre dictionary-encoded as int32 codes)
+
+Distance is the same weighted L1 as MusicDataset._distance, computed in NumPy over the
+candidate rows, with argpartition for the top-n. Genre/artist/keyword filters become
+boolean masks (matched once per vocabulary entry, cached per filter set).
+
+The SQLite matrix is cached per (db_path, table) and reloaded when the table changes
+(checked via PRAGMA data_version on a kept-open read connection, then a change counter
+that INSERT/UPDATE/DELETE triggers on the table bump in feature_matrix_versions, so
+writes to other tables in the same file never cost a scan of the track table). Loads go
+through an on-disk snapshot (matrix_snapshot.py) keyed by that counter, so a restart
+memory-maps the matrix instead of re-reading the table.
+"""
+
+import hashlib
+
+import math
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.assistant.utils.logging_config import get_logger
+from app.assistant.dj_manager.feature_scaler import DEFAULT_LOUDNESS_DB_SCALE, DEFAULT_TEMPO_BPM_SCALE
+
+logger = get_logger(__name__)
+
+
+FEATURE_KEYS: Tuple[str, ...] = (
+    "energy",
+    "valence",
+    "loudness",
+    "speechiness",
+    "acousticness",
+    "instrumentalness",
+    "liveness",
+    "tempo",
+)
+
+# Keep identical to MusicDataset._distance
+_WEIGHTS_BY_KEY = {
+    "energy": 2.0,
+    "valence": 2.0,
+    "instrumentalness": 1.5,
+    "speechiness": 1.2,
+    "acousticness": 1.2,
+    "loudness": 1.0,
+    "tempo": 1.0,
+    "liveness": 0.7,
+}
+FEATURE_WEIGHTS = np.array([_WEIGHTS_BY_KEY[k] for k in FEATURE_KEYS], dtype=np.float32)
+
+_MASK_CACHE_MAX = 32
+
+
+def native_to_sliders(native: np.ndarray) -> np.ndarray:
+    """
+    Vectorized db_to_llm_features: native (N, 8) in FEATURE_KEYS order -> sliders (N, 8).
+
+    Missing values (NaN) become the 50.0 midpoint, matching the setdefault in the loaders.
+    """
+    native = np.asarray(native, dtype=np.float64)
+    out = np.empty_like(native)
+    for j, k in enumerate(FEATURE_KEYS):
+        col = native[:, j]
+        if k == "loudness":
+            scale = DEFAULT_LOUDNESS_DB_SCALE
+        elif k == "tempo":
+            scale = DEFAULT_TEMPO_BPM_SCALE
+        else:
+            scale = None
+        if scale is None:
+            s = np.clip(col, 0.0, 1.0) * 100.0
+        elif scale.hi == scale.lo:
+            s = np.zeros_like(col)
+        else:
+            s = np.clip((col - scale.lo) / (scale.hi - scale.lo), 0.0, 1.0) * 100.0
+        out[:, j] = np.where(np.isnan(col), 50.0, np.round(s, 1))
+    return out.astype(np.float32)
+
+
+def target_vector(target_sliders: Dict[str, Any]) -> np.ndarray:
+    """Normalize target sliders to a float32 vector (missing/invalid -> 50)."""
+    vals = []
+    for k in FEATURE_KEYS:
+        try:
+            vals.append(float(target_sliders.get(k, 50)))
+        except Exception:
+            vals.append(50.0)
+    return np.array(vals, dtype=np.float32)
+
+
+def _encode(values: Iterable[str]) -> Tuple[np.ndarray, List[str]]:
+    """Dictionary-encode strings -> (int32 codes, vocabulary in first-seen order)."""
+    index: Dict[str, int] = {}
+    codes = [index.setdefault(v, len(index)) for v in values]
+    return np.array(codes, dtype=np.int32), list(index)
+
+
+def _default_norm(s: Any) -> str:
+    return str(s or "").strip().lower()
+
+
+class StringTable:
+    """
+    Read-only sequence of strings stored as one UTF-8 blob plus offsets.
+
+    Both arrays can be memory-mapped from a snapshot, so a million track names cost
+    no Python objects until a row is actually read.
+    """
+
+    def __init__(self, blob: np.ndarray, offsets: np.ndarray):
+        self.blob = blob
+        self.offsets = offsets
+
+    @classmethod
+    def from_strings(cls, strings: Iterable[str]) -> "StringTable":
+        encoded = [s.encode("utf-8") for s in strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(b) for b in encoded], out=offsets[1:])
+        blob = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+        return cls(blob, offsets)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: int) -> str:
+        return self.blob[self.offsets[i]:self.offsets[i + 1]].tobytes().decode("utf-8")
+
+    def __iter__(self):
+        data = self.blob.tobytes().decode("utf-8") if self.blob.size else ""
+        if data.isascii():
+            # Byte offsets equal character offsets; slice the decoded text directly.
+            bounds = self.offsets.tolist()
+            for lo, hi in zip(bounds, bounds[1:]):
+                yield data[lo:hi]
+        else:
+            for i in range(len(self)):
+                yield self[i]
+
+
+class FeatureMatrix:
+    def __init__(
+        self,
+        *,
+        sliders: np.ndarray,
+        prob_factor: np.ndarray,
+        track_ids: Sequence[str],
+        track_names: Sequence[str],
+        artist_codes: np.ndarray,
+        artist_vocab: List[str],
+        genre_codes: np.ndarray,
+        genre_vocab: List[str],
+        gate: Optional[np.ndarray] = None,
+        text_norm: Callable[[Any], str] = _default_norm,
+    ):
+        # asanyarray keeps np.memmap columns from a snapshot mapped (no copy)
+        self.sliders = np.asanyarray(sliders, dtype=np.float32)
+        self.prob_factor = np.asanyarray(prob_factor, dtype=np.float32)
+        self.gate = None if gate is None else np.asanyarray(gate, dtype=np.float64)
+        self.track_ids = track_ids
+        self.track_names = track_names
+        self.artist_codes = np.asanyarray(artist_codes, dtype=np.int32)
+        self.artist_vocab = list(artist_vocab)
+        self.genre_codes = np.asanyarray(genre_codes, dtype=np.int32)
+        self.genre_vocab = list(genre_vocab)
+        self.text_norm = text_norm
+
+        self._lock = threading.Lock()
+        self._mask_cache: Dict[Tuple[Any, ...], Optional[np.ndarray]] = {}
+        self._artist_norm: Optional[List[str]] = None
+        self._genre_norm: Optional[List[str]] = None
+        self._artist_index: Optional[Dict[str, List[int]]] = None
+        self._artist_groups: Optional[Tuple[np.ndarray, np.ndarray]] = None
+
+    def __len__(self) -> int:
+        return len(self.track_names)
+
+    @classmethod
+    def from_columns(
+        cls,
+        *,
+        native: np.ndarray,
+        prob_factor: Sequence[float],
+        track_ids: Sequence[str],
+        track_names: Sequence[str],
+        artists: Sequence[str],
+        genres: Sequence[str],
+        with_gate: bool = False,
+        text_norm: Callable[[Any], str] = _default_norm,
+    ) -> "FeatureMatrix":
+        """Build from per-row columns; native is (N, 8) in FEATURE_KEYS order, NaN for missing."""
+        native = np.asarray(native, dtype=np.float64).reshape(len(track_names), len(FEATURE_KEYS))
+        artist_codes, artist_vocab = _encode(artists)
+        genre_codes, genre_vocab = _encode(genres)
+        e, v = FEATURE_KEYS.index("energy"), FEATURE_KEYS.index("valence")
+        return cls(
+            sliders=native_to_sliders(native),
+            prob_factor=np.asarray(prob_factor, dtype=np.float64),
+            gate=native[:, [e, v]] if with_gate else None,
+            track_ids=StringTable.from_strings(track_ids),
+            track_names=StringTable.from_strings(track_names),
+            artist_codes=artist_codes,
+            artist_vocab=artist_vocab,
+            genre_codes=genre_codes,
+            genre_vocab=genre_vocab,
+            text_norm=text_norm,
+        )
+
+    @classmethod
+    def from_sqlite(cls, conn: sqlite3.Connection, table: str, *, chunk_size: int = 50000) -> "FeatureMatrix":
+        """
+        Load every row of a music_tracks_spotify-shaped table.
+
+        Mirrors the row handling of the old per-query path: names are stripped, an empty
+        artist becomes "Unknown", rows without a track name are skipped.
+        """
+        cur = conn.execute(
+            f"""
+            SELECT track_id, track_name, artist_name, genre, prob_factor, {", ".join(FEATURE_KEYS)}
+            FROM {table}
+            """
+        )
+        track_ids: List[str] = []
+        names: List[str] = []
+        artists: List[str] = []
+        genres: List[str] = []
+        numeric: List[Tuple[float, ...]] = []
+        nan = math.nan
+        while True:
+            rows = cur.fetchmany(chunk_size)
+            if not rows:
+                break
+            for row in rows:
+                name = str(row[1] or "").strip()
+                if not name:
+                    continue
+                track_ids.append(str(row[0] or "").strip())
+                names.append(name)
+                artists.append(str(row[2] or "").strip() or "Unknown")
+                genres.append(str(row[3] or "").strip())
+                numeric.append(tuple(nan if v is None else v for v in row[4:]))
+
+        values = np.array(numeric, dtype=np.float64).reshape(len(numeric), 1 + len(FEATURE_KEYS))
+        return cls.from_columns(
+            native=values[:, 1:],
+            prob_factor=values[:, 0],
+            track_ids=track_ids,
+            track_names=names,
+            artists=artists,
+            genres=genres,
+            with_gate=True,
+        )
+
+    # --- Search ---
+
+    def nearest(self, target: np.ndarray, n: int, mask: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Return (row indices, distances) of the n closest rows (optionally within mask),
+        ordered by distance then row order.
+        """
+        if mask is None:
+            cand = None
+            x = self.sliders
+        else:
+            cand = np.flatnonzero(mask)
+            x = self.sliders[cand]
+        if len(x) == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        d = np.abs(x - target) @ FEATURE_WEIGHTS
+        k = min(max(1, int(n)), len(d))
+        top = np.argpartition(d, k - 1)[:k] if k < len(d) else np.arange(len(d))
+        top = top[np.lexsort((top, d[top]))]
+        rows = top if cand is None else cand[top]
+        return rows, d[top]
+
+    def gate_mask(self, target: np.ndarray, energy_window: float, valence_window: float) -> np.ndarray:
+        """
+        Native energy/valence window around the target (the old SQL BETWEEN gate).
+        Rows with missing energy/valence never pass, like SQL NULL BETWEEN.
+        """
+        if self.gate is None:
+            return np.ones(len(self), dtype=bool)
+        e, v = FEATURE_KEYS.index("energy"), FEATURE_KEYS.index("valence")
+        ew = max(0.0, float(energy_window))
+        vw = max(0.0, float(valence_window))
+        e_lo = max(0.0, min(1.0, (float(target[e]) - ew) / 100.0))
+        e_hi = max(0.0, min(1.0, (float(target[e]) + ew) / 100.0))
+        v_lo = max(0.0, min(1.0, (float(target[v]) - vw) / 100.0))
+        v_hi = max(0.0, min(1.0, (float(target[v]) + vw) / 100.0))
+        energy = self.gate[:, 0]
+        valence = self.gate[:, 1]
+        return (energy >= e_lo) & (energy <= e_hi) & (valence >= v_lo) & (valence <= v_hi)
+
+    # --- Filters ---
+
+    def filter_mask(self, music_filters: Optional[Dict[str, Any]]) -> Optional[np.ndarray]:
+        """
+        Boolean row mask for optional music_filters (include/exclude genres and artists,
+        include keywords matched against track name or artist). None when no filter applies.
+
+        Substring matching is done once per distinct genre/artist; masks are cached per
+        normalized filter set.
+        """
+        if not isinstance(music_filters, dict) or not music_filters:
+            return None
+        norm = self.text_norm
+
+        def terms(key: str) -> Tuple[str, ...]:
+            return tuple(sorted({norm(x) for x in (music_filters.get(key) or []) if x} - {""}))
+
+        key = tuple(
+            terms(k) for k in ("include_genres", "exclude_genres", "include_artists", "exclude_artists", "include_keywords")
+        )
+        if not any(key):
+            return None
+        with self._lock:
+            if key in self._mask_cache:
+                return self._mask_cache[key]
+
+        inc_genres, exc_genres, inc_artists, exc_artists, inc_kw = key
+        genre_norm, artist_norm = self._norm_vocabs()
+        mask = np.ones(len(self), dtype=bool)
+
+        def vocab_hits(vocab: List[str], needles: Tuple[str, ...]) -> np.ndarray:
+            return np.array([any(t in v for t in needles) for v in vocab], dtype=bool)
+
+        if exc_genres:
+            mask &= ~vocab_hits(genre_norm, exc_genres)[self.genre_codes]
+        if exc_artists:
+            mask &= ~vocab_hits(artist_norm, exc_artists)[self.artist_codes]
+        if inc_genres:
+            mask &= vocab_hits(genre_norm, inc_genres)[self.genre_codes]
+        if inc_artists:
+            mask &= vocab_hits(artist_norm, inc_artists)[self.artist_codes]
+        if inc_kw:
+            kw = vocab_hits(artist_norm, inc_kw)[self.artist_codes]
+            kw |= np.fromiter(
+                (any(t in norm(name) for t in inc_kw) for name in self.track_names), dtype=bool, count=len(self)
+            )
+            mask &= kw
+
+        with self._lock:
+            if len(self._mask_cache) >= _MASK_CACHE_MAX:
+                self._mask_cache.clear()
+            self._mask_cache[key] = mask
+        return mask
+
+    def _norm_vocabs(self) -> Tuple[List[str], List[str]]:
+        if self._genre_norm is None or self._artist_norm is None:
+            self._genre_norm = [self.text_norm(g) for g in self.genre_vocab]
+            self._artist_norm = [self.text_norm(a) for a in self.artist_vocab]
+        return self._genre_norm, self._artist_norm
+
+    # --- Lookups for sparse per-artist/per-track weights ---
+
+    def artist_codes_for(self, key: str) -> List[int]:
+        """Artist codes whose text_norm form equals key (index built once, lazily)."""
+        if self._artist_index is None:
+            index: Dict[str, List[int]] = {}
+            for code, norm_artist in enumerate(self._norm_vocabs()[1]):
+                index.setdefault(norm_artist, []).append(code)
+            self._artist_index = index
+        return self._artist_index.get(key, [])
+
+    def rows_for_artist_code(self, code: int) -> np.ndarray:
+        """Row indices for one artist code (artist-grouped order built once, lazily)."""
+        if self._artist_groups is None:
+            order = np.argsort(self.artist_codes, kind="stable")
+            bounds = np.searchsorted(self.artist_codes[order], np.arange(len(self.artist_vocab) + 1))
+            self._artist_groups = (order, bounds)
+        order, bounds = self._artist_groups
+        return order[bounds[code]:bounds[code + 1]]
+
+
+VERSIONS_TABLE = "feature_matrix_versions"
+_TRIGGER_EVENTS: Tuple[str, ...] = ("insert", "update", "delete")
+
+
+def _trigger_names(table: str) -> List[str]:
+    return [f"{table}_matrix_{event}" for event in _TRIGGER_EVENTS]
+
+
+def install_change_triggers(conn: sqlite3.Connection, table: str) -> None:
+    """
+    Create the change counter for table and the triggers that bump it (idempotent).
+
+    Re-installing (e.g. after the table was dropped and re-imported, which drops its
+    triggers) starts a new epoch, so no matrix or snapshot from before is reused.
+    """
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {VERSIONS_TABLE} "
+            "(table_name TEXT PRIMARY KEY, epoch TEXT NOT NULL, version INTEGER NOT NULL)"
+        )
+        names = _trigger_names(table)
+        present = conn.execute(
+            f"SELECT COUNT(*) FROM sqlite_master WHERE type = 'trigger' AND name IN ({', '.join('?' * len(names))})",
+            names,
+        ).fetchone()[0]
+        if present < len(names):
+            for name, event in zip(names, _TRIGGER_EVENTS):
+                conn.execute(
+                    f"CREATE TRIGGER IF NOT EXISTS {name} AFTER {event.upper()} ON {table} BEGIN "
+                    f"UPDATE {VERSIONS_TABLE} SET version = version + 1 WHERE table_name = '{table}'; END"
+                )
+            conn.execute(
+                f"INSERT OR REPLACE INTO {VERSIONS_TABLE} (table_name, epoch, version) "
+                "VALUES (?, lower(hex(randomblob(8))), 0)",
+                (table,),
+            )
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+
+def _change_token(conn: sqlite3.Connection, table: str) -> Tuple[Any, ...]:
+    """(epoch, version) of table; two indexed lookups, never a scan of the table itself."""
+    names = _trigger_names(table)
+    try:
+        present = conn.execute(
+            f"SELECT COUNT(*) FROM sqlite_master WHERE type = 'trigger' AND name IN ({', '.join('?' * len(names))})",
+            names,
+        ).fetchone()[0]
+        row = conn.execute(
+            f"SELECT epoch, version FROM {VERSIONS_TABLE} WHERE table_name = ?", (table,)
+        ).fetchone() if present == len(names) else None
+    except sqlite3.OperationalError:
+        row = None  # versions table not created yet
+    if row is None:
+        install_change_triggers(conn, table)
+        row = conn.execute(f"SELECT epoch, version FROM {VERSIONS_TABLE} WHERE table_name = ?", (table,)).fetchone()
+    return tuple(row)
+
+
+class _SqliteMatrixEntry:
+    def __init__(self, db_path: Path, table: str):
+        self.db_path = db_path
+        self.table = table
+        self.lock = threading.Lock()
+        self.conn: Optional[sqlite3.Connection] = None
+        self.data_version: Optional[int] = None
+        self.fingerprint: Optional[Tuple[Any, ...]] = None
+        self.matrix: Optional[FeatureMatrix] = None
+
+    def connection(self) -> sqlite3.Connection:
+        if self.conn is None:
+            self.conn = sqlite3.connect(str(self.db_path), timeout=30, check_same_thread=False)
+            self.conn.execute("PRAGMA busy_timeout=30000")
+        return self.conn
+
+    def close(self) -> None:
+        if self.conn is not None:
+            try:
+                self.conn.close()
+            except Exception as e:
+                logger.debug(f"FeatureMatrix: failed to close sqlite connection: {e}", exc_info=True)
+        self.conn = None
+        self.data_version = None
+
+    def snapshot_path(self) -> Path:
+        from app.assistant.dj_manager.matrix_snapshot import snapshot_path_for
+
+        digest = hashlib.sha1(str(self.db_path.resolve()).encode("utf-8")).hexdigest()[:10]
+        return snapshot_path_for(f"{self.db_path.stem}-{self.table}-{digest}")
+
+    def _load(self, conn: sqlite3.Connection, fingerprint: Tuple[Any, ...]) -> FeatureMatrix:
+        from app.assistant.dj_manager.matrix_snapshot import load_snapshot, save_snapshot
+
+        t0 = time.perf_counter()
+        source = {"kind": "sqlite", "table": self.table, "epoch": fingerprint[0], "version": fingerprint[1]}
+        snapshot = self.snapshot_path()
+        matrix = load_snapshot(snapshot, source)
+        if matrix is not None:
+            origin = f"snapshot {snapshot}"
+        else:
+            matrix = FeatureMatrix.from_sqlite(conn, self.table)
+            if save_snapshot(matrix, snapshot, source):
+                # Serve from the mapped files so this process shares pages with the others
+                matrix = load_snapshot(snapshot, source) or matrix
+            origin = f"{self.db_path}.{self.table}"
+        logger.info(
+            "FeatureMatrix: loaded %s track(s) from %s (took %.2fs)",
+            len(matrix),
+            origin,
+            time.perf_counter() - t0,
+        )
+        return matrix
+
+    def get(self) -> FeatureMatrix:
+        with self.lock:
+            conn = self.connection()
+            version = conn.execute("PRAGMA data_version").fetchone()[0]
+            if self.matrix is not None and version == self.data_version:
+                return self.matrix
+
+            fingerprint = _change_token(conn, self.table)
+            if self.matrix is None or fingerprint != self.fingerprint:
+                self.matrix = self._load(conn, fingerprint)
+            self.fingerprint = fingerprint
+            self.data_version = version
+            return self.matrix
+
+
+_sqlite_entries: Dict[Tuple[str, str], _SqliteMatrixEntry] = {}
+_sqlite_entries_lock = threading.Lock()
+
+
+def _sqlite_entry(db_path: Path, table: str) -> _SqliteMatrixEntry:
+    key = (str(Path(db_path).resolve()), table)
+    with _sqlite_entries_lock:
+        entry = _sqlite_entries.get(key)
+        if entry is None:
+            entry = _sqlite_entries[key] = _SqliteMatrixEntry(Path(db_path), table)
+        return entry
+
+
+def get_sqlite_feature_matrix(db_path: Path, table: str = "music_tracks_spotify") -> FeatureMatrix:
+    """Cached feature matrix for a SQLite music table, reloaded when the table changes."""
+    return _sqlite_entry(db_path, table).get()
+
+
+def invalidate_feature_matrix(db_path: Optional[Path] = None) -> None:
+    """Drop cached matrices (all, or those for one database file) and close their connections."""
+    target = str(Path(db_path).resolve()) if db_path is not None else None
+    with _sqlite_entries_lock:
+        for key in [k for k in _sqlite_entries if target is None or k[0] == target]:
+            entry = _sqlite_entries.pop(key)
+            with entry.lock:
+                entry.close()
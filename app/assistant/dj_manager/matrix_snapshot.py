@@ -0,0 +1,203 @@
+from __future__ import annotations
+
+"""
+On-disk snapshots of a FeatureMatrix.
+
+A snapshot is a directory of .npy files (loaded with mmap_mode="r", so several processes
+share the same pages) plus meta.json:
+
+    <name>.snapshot/
+        meta.json            {"version": ..., "source": {...}, "rows": N, "vocab": {...}}
+        sliders.npy          float32 (N, 8)
+        prob_factor.npy      float32 (N,)
+        gate.npy             float64 (N, 2)   (SQLite sources only)
+        artist_codes.npy     int32 (N,)
+        genre_codes.npy      int32 (N,)
+        track_ids.blob.npy / track_ids.offsets.npy       UTF-8 string table
+        track_names.blob.npy / track_names.offsets.npy   UTF-8 string table
+
+The "source" dict identifies what the snapshot was built from (CSV size/mtime/sha256,
+or the SQLite table's change-counter epoch/version). A snapshot whose version or source
+does not match is ignored and rebuilt by the caller.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+import numpy as np
+
+from app.assistant.utils.logging_config import get_logger
+from app.assistant.dj_manager.feature_matrix import FeatureMatrix, StringTable, _default_norm
+
+logger = get_logger(__name__)
+
+# Bump when the layout or the slider conversion changes.
+SNAPSHOT_VERSION = 1
+
+_ARRAYS = ("sliders", "prob_factor", "gate", "artist_codes", "genre_codes")
+_STRING_TABLES = ("track_ids", "track_names")
+
+
+def _repo_root_from_here() -> Path:
+    # app/assistant/dj_manager -> repo root
+    return Path(__file__).resolve().parents[3]
+
+
+def get_snapshot_dir() -> Path:
+    return Path(os.environ.get("EMI_MUSIC_SNAPSHOT_DIR") or (_repo_root_from_here() / "cache" / "music_snapshots"))
+
+
+def snapshot_path_for(name: str) -> Path:
+    safe = "".join(ch if ch.isalnum() or ch in "-_." else "_" for ch in name)
+    return get_snapshot_dir() / f"{safe}.snapshot"
+
+
+def file_sha256(path: Path, chunk_size: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with Path(path).open("rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _read_meta(path: Path) -> Optional[Dict[str, Any]]:
+    try:
+        meta = json.loads((path / "meta.json").read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning(f"Music snapshot {path} has unreadable meta.json: {e}")
+        return None
+    if meta.get("version") != SNAPSHOT_VERSION:
+        logger.info(f"Music snapshot {path} has version {meta.get('version')}, expected {SNAPSHOT_VERSION}; rebuilding")
+        return None
+    return meta
+
+
+def save_snapshot(matrix: FeatureMatrix, path: Path, source: Dict[str, Any]) -> bool:
+    """
+    Write matrix to path (replacing any previous snapshot). Best-effort: returns False
+    and logs on failure, the in-memory matrix stays usable.
+    """
+    path = Path(path)
+    tmp = path.with_name(f"{path.name}.tmp-{os.getpid()}")
+    try:
+        t0 = time.perf_counter()
+        shutil.rmtree(tmp, ignore_errors=True)
+        tmp.mkdir(parents=True)
+        for name in _ARRAYS:
+            arr = getattr(matrix, name)
+            if arr is not None:
+                np.save(tmp / f"{name}.npy", np.ascontiguousarray(arr))
+        for name in _STRING_TABLES:
+            table = getattr(matrix, name)
+            if not isinstance(table, StringTable):
+                table = StringTable.from_strings(table)
+            np.save(tmp / f"{name}.blob.npy", table.blob)
+            np.save(tmp / f"{name}.offsets.npy", table.offsets)
+        meta = {
+            "version": SNAPSHOT_VERSION,
+            "source": source,
+            "rows": len(matrix),
+            "vocab": {"artist": matrix.artist_vocab, "genre": matrix.genre_vocab},
+        }
+        # meta.json last: a directory without it is never treated as a snapshot
+        (tmp / "meta.json").write_text(json.dumps(meta, ensure_ascii=False), encoding="utf-8")
+
+        shutil.rmtree(path, ignore_errors=True)
+        tmp.rename(path)
+        logger.info(f"Wrote music snapshot {path} ({len(matrix)} rows, took {time.perf_counter() - t0:.2f}s)")
+        return True
+    except Exception as e:
+        logger.warning(f"Could not write music snapshot {path}: {e}")
+        shutil.rmtree(tmp, ignore_errors=True)
+        return False
+
+
+def _load(path: Path, meta: Dict[str, Any], text_norm: Callable[[Any], str]) -> Optional[FeatureMatrix]:
+    try:
+        arrays = {}
+        for name in _ARRAYS:
+            f = path / f"{name}.npy"
+            arrays[name] = np.load(f, mmap_mode="r") if f.exists() else None
+        tables = {
+            name: StringTable(
+                np.load(path / f"{name}.blob.npy", mmap_mode="r"),
+                np.load(path / f"{name}.offsets.npy", mmap_mode="r"),
+            )
+            for name in _STRING_TABLES
+        }
+        matrix = FeatureMatrix(
+            sliders=arrays["sliders"],
+            prob_factor=arrays["prob_factor"],
+            gate=arrays["gate"],
+            artist_codes=arrays["artist_codes"],
+            genre_codes=arrays["genre_codes"],
+            artist_vocab=meta["vocab"]["artist"],
+            genre_vocab=meta["vocab"]["genre"],
+            text_norm=text_norm,
+            **tables,
+        )
+    except Exception as e:
+        logger.warning(f"Could not load music snapshot {path}: {e}")
+        return None
+    if len(matrix) != meta.get("rows") or len(matrix.sliders) != len(matrix):
+        logger.warning(f"Music snapshot {path} is inconsistent; rebuilding")
+        return None
+    return matrix
+
+
+def load_snapshot(
+    path: Path,
+    source: Dict[str, Any],
+    *,
+    text_norm: Callable[[Any], str] = _default_norm,
+) -> Optional[FeatureMatrix]:
+    """Memory-map the snapshot at path if it was built from exactly this source."""
+    path = Path(path)
+    meta = _read_meta(path)
+    if meta is None or meta.get("source") != source:
+        return None
+    return _load(path, meta, text_norm)
+
+
+def csv_source(csv_path: Path) -> Dict[str, Any]:
+    st = Path(csv_path).stat()
+    return {"kind": "csv", "size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": file_sha256(csv_path)}
+
+
+def load_csv_snapshot(
+    csv_path: Path,
+    path: Path,
+    *,
+    text_norm: Callable[[Any], str] = _default_norm,
+) -> Optional[FeatureMatrix]:
+    """
+    Snapshot for a CSV, if still fresh.
+
+    Matching size + mtime is trusted without hashing. If only the mtime moved (file
+    touched or copied), the content hash decides, and meta.json is updated so the next
+    start is fast again.
+    """
+    path = Path(path)
+    meta = _read_meta(path)
+    if meta is None:
+        return None
+    recorded = meta.get("source") or {}
+    st = Path(csv_path).stat()
+    if recorded.get("kind") != "csv" or recorded.get("size") != st.st_size:
+        return None
+    if recorded.get("mtime_ns") != st.st_mtime_ns:
+        if recorded.get("sha256") != file_sha256(csv_path):
+            return None
+        meta["source"] = dict(recorded, mtime_ns=st.st_mtime_ns)
+        try:
+            (path / "meta.json").write_text(json.dumps(meta, ensure_ascii=False), encoding="utf-8")
+        except Exception as e:
+            logger.debug(f"Could not refresh music snapshot meta {path}: {e}", exc_info=True)
+    return _load(path, meta, text_norm)
@@ -13,11 +13,20 @@ Provides:
 
 Distance is computed in slider-space (0-100) so all features are comparable.
 
-Note: the SQLite path uses an approximate SQL prefilter (energy/valence window + ORDER BY
-energy/valence closeness), then computes the full weighted slider distance in Python.
+Both paths rank against an in-memory float32 feature matrix (see feature_matrix.py):
+weighted L1 in NumPy + argpartition top-n, with filters as boolean masks. The SQLite
+matrix is loaded once per table and reloaded when the table changes.
+
+Matrices are persisted as memory-mapped snapshots (see matrix_snapshot.py), keyed by the
+CSV's size/mtime/sha256 or the table fingerprint, so startup skips the CSV/table parse.
+
+The SQLite weight tables and genre stats are cached per database (see weight_cache.py)
+and reloaded only after a weight write, so a pick costs the ranking alone.
 """
 
 import csv
+import hashlib
+import math
 import random
 import sqlite3
 import time
@@ -25,11 +34,29 @@ from dataclasses import dataclass
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Tuple
 
+import numpy as np
+
 from app.assistant.utils.logging_config import get_logger
+from app.assistant.dj_manager.feature_matrix import (
+    FEATURE_KEYS,
+    FeatureMatrix,
+    get_sqlite_feature_matrix,
+    target_vector,
+)
 from app.assistant.dj_manager.feature_scaler import (
     DEFAULT_LOUDNESS_DB_SCALE,
     DEFAULT_TEMPO_BPM_SCALE,
-    db_to_llm_features,
+)
+from app.assistant.dj_manager.matrix_snapshot import (
+    csv_source,
+    load_csv_snapshot,
+    save_snapshot,
+    snapshot_path_for,
+)
+from app.assistant.dj_manager.weight_cache import (
+    get_effective_prob_factor,
+    load_genre_counts,
+    load_weights,
 )
 
 logger = get_logger(__name__)
@@ -57,6 +84,8 @@ def _ascii_safe(s: str) -> str:
     import unicodedata
 
     s = s or ""
+    if s.isascii():
+        return s
     # Decompose accents, drop diacritics
     s = unicodedata.normalize("NFKD", s)
     s = "".join(ch for ch in s if not unicodedata.combining(ch))
@@ -64,6 +93,11 @@ def _ascii_safe(s: str) -> str:
     return s.encode("ascii", "ignore").decode("ascii")
 
 
+def _filter_norm(s: Any) -> str:
+    """Normalization used when matching music_filters against CSV songs."""
+    return _ascii_safe(str(s or "")).strip().lower()
+
+
 @dataclass(frozen=True)
 class DatasetSong:
     track_id: str
@@ -79,10 +113,18 @@ class DatasetSong:
 
 
 class MusicDataset:
-    def __init__(self, csv_path: Path = DATASET_PATH):
+    def __init__(self, csv_path: Path = DATASET_PATH, *, snapshot_path: Optional[Path] = None, use_snapshot: bool = True):
         self._csv_path = csv_path
         self._loaded = False
-        self._songs: List[DatasetSong] = []
+        self._matrix: Optional[FeatureMatrix] = None
+        self._use_snapshot = use_snapshot
+        self._snapshot_path = snapshot_path
+
+    def _get_snapshot_path(self) -> Path:
+        if self._snapshot_path is None:
+            digest = hashlib.sha1(str(Path(self._csv_path).resolve()).encode("utf-8")).hexdigest()[:10]
+            self._snapshot_path = snapshot_path_for(f"{Path(self._csv_path).stem}-{digest}")
+        return self._snapshot_path
 
     def _load(self) -> None:
         if self._loaded:
@@ -91,11 +133,31 @@ class MusicDataset:
             raise FileNotFoundError(f"Dataset not found at {self._csv_path}")
 
         t0 = time.perf_counter()
-        songs: List[DatasetSong] = []
+        matrix = None
+        if self._use_snapshot:
+            matrix = load_csv_snapshot(self._csv_path, self._get_snapshot_path(), text_norm=_filter_norm)
+        source = "snapshot"
+        if matrix is None:
+            source = "csv"
+            matrix = self._parse_csv()
+            if self._use_snapshot and save_snapshot(matrix, self._get_snapshot_path(), csv_source(self._csv_path)):
+                matrix = load_csv_snapshot(self._csv_path, self._get_snapshot_path(), text_norm=_filter_norm) or matrix
+
+        self._matrix = matrix
+        self._loaded = True
+        dt = time.perf_counter() - t0
+        logger.info(f"Loaded dataset: {len(matrix)} songs from {self._csv_path} via {source} (took {dt:.1f}s)")
+
+    def _parse_csv(self) -> FeatureMatrix:
+        track_ids: List[str] = []
+        track_names: List[str] = []
+        artists: List[str] = []
+        genres: List[str] = []
+        prob_factors: List[float] = []
+        native: List[List[float]] = []
         with self._csv_path.open("r", encoding="utf-8", errors="replace", newline="") as f:
             reader = csv.DictReader(f)
             for row in reader:
-                track_id = str(row.get("track_id", "")).strip()
                 track_name_raw = str(row.get("track_name", "")).strip()
                 # Support both schemas:
                 # - curated_music_data.csv: artists, track_genre
@@ -106,57 +168,27 @@ class MusicDataset:
                 # Use first listed artist for search query
                 artist_primary = artists_raw.split(";")[0].strip() if artists_raw else ""
 
-                # Convert dataset units -> sliders
-                sliders = db_to_llm_features(
-                    {
-                        "energy": row.get("energy"),
-                        "valence": row.get("valence"),
-                        "loudness": row.get("loudness"),
-                        "speechiness": row.get("speechiness"),
-                        "acousticness": row.get("acousticness"),
-                        "instrumentalness": row.get("instrumentalness"),
-                        "liveness": row.get("liveness"),
-                        "tempo": row.get("tempo"),
-                    }
-                )
+                # Dataset units; converted to sliders for all rows at once (missing -> midpoint)
+                values = [_to_float(row.get(k)) for k in FEATURE_KEYS]
+                native.append([math.nan if v is None else v for v in values])
 
-                # Ensure all expected keys exist (fill missing with midpoint)
-                for k in (
-                    "energy",
-                    "valence",
-                    "loudness",
-                    "speechiness",
-                    "acousticness",
-                    "instrumentalness",
-                    "liveness",
-                    "tempo",
-                ):
-                    sliders.setdefault(k, 50.0)
-
-                track_name = _ascii_safe(track_name_raw)
-                artist = _ascii_safe(artist_primary or "Unknown")
-                genre = _ascii_safe(genre_raw)
-                search_query = _ascii_safe(f"{track_name_raw} by {artist_primary or 'Unknown'}")
+                track_ids.append(str(row.get("track_id", "")).strip())
+                track_names.append(_ascii_safe(track_name_raw))
+                artists.append(_ascii_safe(artist_primary or "Unknown"))
+                genres.append(_ascii_safe(genre_raw))
 
                 pf = _to_float(row.get("prob_factor"))
-                prob_factor = max(0.0, pf) if pf is not None else 1.0
-
-                songs.append(
-                    DatasetSong(
-                        track_id=track_id,
-                        track_name=track_name,
-                        artist=artist,
-                        genre=genre,
-                        sliders=sliders,
-                        search_query=search_query,
-                        prob_factor=prob_factor,
-                    )
-                )
-
-        self._songs = songs
-        self._loaded = True
-        dt = time.perf_counter() - t0
-        logger.info(f"Loaded dataset: {len(self._songs)} songs from {self._csv_path} (took {dt:.1f}s)")
+                prob_factors.append(max(0.0, pf) if pf is not None else 1.0)
+
+        return FeatureMatrix.from_columns(
+            native=np.array(native, dtype=np.float64),
+            prob_factor=prob_factors,
+            track_ids=track_ids,
+            track_names=track_names,
+            artists=artists,
+            genres=genres,
+            text_norm=_filter_norm,
+        )
 
     @staticmethod
     def _distance(target: Dict[str, float], song: DatasetSong) -> float:
@@ -179,30 +211,42 @@ class MusicDataset:
             d += w * abs(tv - sv)
         return d
 
-    def nearest_matches(self, target_sliders: Dict[str, Any], n: int = 100) -> List[DatasetSong]:
-        self._load()
+    @staticmethod
+    def _songs_at(matrix: FeatureMatrix, rows: np.ndarray, prob_factors: np.ndarray) -> List[DatasetSong]:
+        """Materialize DatasetSong objects for the ranked rows only."""
+        sliders = np.round(matrix.sliders[rows].astype(np.float64), 1).tolist()
+        songs: List[DatasetSong] = []
+        for i, slider_values, pf in zip(rows.tolist(), sliders, prob_factors.tolist()):
+            track_name_raw = matrix.track_names[i]
+            artist_name_raw = matrix.artist_vocab[matrix.artist_codes[i]]
+            songs.append(
+                DatasetSong(
+                    track_id=matrix.track_ids[i],
+                    track_name=_ascii_safe(track_name_raw),
+                    artist=_ascii_safe(artist_name_raw) or "Unknown",
+                    genre=_ascii_safe(matrix.genre_vocab[matrix.genre_codes[i]]),
+                    sliders=dict(zip(FEATURE_KEYS, slider_values)),
+                    search_query=_ascii_safe(f"{track_name_raw} by {artist_name_raw}"),
+                    prob_factor=pf,
+                )
+            )
+        return songs
 
-        # Normalize target sliders to floats
-        target: Dict[str, float] = {}
-        for k in (
-            "energy",
-            "valence",
-            "loudness",
-            "speechiness",
-            "acousticness",
-            "instrumentalness",
-            "liveness",
-            "tempo",
-        ):
-            try:
-                target[k] = float(target_sliders.get(k, 50))
-            except Exception:
-                target[k] = 50.0
+    def nearest_matches(
+        self,
+        target_sliders: Dict[str, Any],
+        n: int = 100,
+        *,
+        music_filters: Optional[Dict[str, Any]] = None,
+    ) -> List[DatasetSong]:
+        self._load()
+        if self._matrix is None or not len(self._matrix):
+            return []
 
-        # Simple partial selection via sort (OK for small datasets; for very large datasets
-        # this will be slow, but we are intentionally trying the simple path first).
-        ranked = sorted(self._songs, key=lambda s: self._distance(target, s))
-        return ranked[: max(1, int(n))]
+        # Vectorized weighted L1 over the feature matrix (same weights as _distance)
+        mask = self._matrix.filter_mask(music_filters)
+        rows, _ = self._matrix.nearest(target_vector(target_sliders), max(1, int(n)), mask)
+        return self._songs_at(self._matrix, rows, self._matrix.prob_factor[rows])
 
     def sample_for_prompt(
         self,
@@ -227,7 +271,7 @@ class MusicDataset:
         # without ending up with too few candidates.
         base_pool_n = int(base_pool_size) if base_pool_size is not None else max(match_pool_size * 5, match_pool_size)
         base_pool_n = max(match_pool_size, base_pool_n)
-        base_pool = self.nearest_matches(target_sliders, n=base_pool_n)
+        base_pool = self.nearest_matches(target_sliders, n=base_pool_n, music_filters=music_filters)
         logger.info(
             "Dataset sampling: base_pool=%s match_pool=%s prompt_pick=%s exclude_today=%s exclude_within_h=%s seed=%s target=%s",
             len(base_pool),
@@ -529,23 +573,15 @@ class SqliteMusicDataset(MusicDataset):
         *,
         db_path: Optional[Path] = None,
         table_name: str = "music_tracks_spotify",
-        candidate_limit_min: int = 5000,
-        candidate_limit_factor: int = 20,
         energy_window_slider: float = 5.0,
         valence_window_slider: float = 15.0,
-        prefilter_limit: int = 50000,
-        refine_limit: int = 10000,
     ):
         # __file__ is .../app/assistant/dj_manager/music_dataset.py
         # parents[3] is project root (.../EmiAi_sqlite)
         self._db_path = db_path or (Path(__file__).resolve().parents[3] / "emi.db")
         self._table = table_name
-        self._candidate_limit_min = int(candidate_limit_min)
-        self._candidate_limit_factor = int(candidate_limit_factor)
         self._energy_window_slider = float(energy_window_slider)
         self._valence_window_slider = float(valence_window_slider)
-        self._prefilter_limit = int(prefilter_limit)
-        self._refine_limit = int(refine_limit)
 
     @staticmethod
     def _distance(target: Dict[str, float], song: DatasetSong) -> float:
@@ -568,55 +604,12 @@ class SqliteMusicDataset(MusicDataset):
         return f"{cls._norm_key(title)}|||{cls._norm_key(artist)}"
 
     def _load_weights(self, conn: sqlite3.Connection) -> Dict[str, Dict[str, float]]:
-        """
-        Load per-scope weights from normalized tables.
-
-        Returns:
-          {
-            "track": { "<title>|||<artist>": factor, ... },   # sparse
-            "artist": { "<artist>": factor, ... },           # sparse
-            "genre": { "<genre>": factor, ... },             # small (~82)
-          }
-        """
-        out: Dict[str, Dict[str, float]] = {"track": {}, "artist": {}, "genre": {}}
-
-        try:
-            for genre, factor in conn.execute("SELECT genre, factor FROM music_genre_weights").fetchall():
-                out["genre"][self._norm_key(genre)] = float(factor) if factor is not None else 1.0
-        except Exception as e:
-            logger.debug(f"Could not load music_genre_weights: {e}", exc_info=True)
-        try:
-            for artist, factor in conn.execute("SELECT artist, factor FROM music_artist_weights").fetchall():
-                out["artist"][self._norm_key(artist)] = float(factor) if factor is not None else 1.0
-        except Exception as e:
-            logger.debug(f"Could not load music_artist_weights: {e}", exc_info=True)
-        try:
-            for track_key, factor in conn.execute("SELECT track_key, factor FROM music_track_weights").fetchall():
-                out["track"][self._norm_key(track_key)] = float(factor) if factor is not None else 1.0
-        except Exception as e:
-            logger.debug(f"Could not load music_track_weights: {e}", exc_info=True)
-
-        return out
+        """Load per-scope weights ({"track": ..., "artist": ..., "genre": ...}) from normalized tables."""
+        return load_weights(conn)
 
     def _load_genre_counts(self, conn: sqlite3.Connection) -> Dict[str, int]:
-        """
-        Load per-genre track counts for normalization.
-
-        Expected table:
-          music_genre_stats(genre TEXT PRIMARY KEY, track_count INTEGER, ...)
-        """
-        out: Dict[str, int] = {}
-        try:
-            rows = conn.execute("SELECT genre, track_count FROM music_genre_stats").fetchall()
-            for genre, cnt in rows:
-                key = self._norm_key(genre)
-                try:
-                    out[key] = max(0, int(cnt or 0))
-                except Exception:
-                    out[key] = 0
-        except Exception:
-            return out
-        return out
+        """Load per-genre track counts for normalization (music_genre_stats)."""
+        return load_genre_counts(conn)
 
     def _build_order_by_distance_sql(self) -> str:
         """
@@ -674,247 +667,87 @@ class SqliteMusicDataset(MusicDataset):
             " ) "
         )
 
-    def nearest_matches(self, target_sliders: Dict[str, Any], n: int = 100, *, music_filters: Optional[Dict[str, Any]] = None) -> List[DatasetSong]:
-        # Normalize target sliders to floats
-        target: Dict[str, float] = {}
-        for k in (
-            "energy",
-            "valence",
-            "loudness",
-            "speechiness",
-            "acousticness",
-            "instrumentalness",
-            "liveness",
-            "tempo",
-        ):
-            try:
-                target[k] = float(target_sliders.get(k, 50))
-            except Exception:
-                target[k] = 50.0
-
-        # Candidate limit: ask SQLite for a gated set, then refine in Python.
-        n_int = max(1, int(n))
-        prefilter_limit = max(self._prefilter_limit, n_int * self._candidate_limit_factor)
-        refine_limit = max(self._refine_limit, n_int)
-
-        # Step 1: coarse gate (cheap, indexed): energy + valence window.
-        try:
-            tgt_e = float(target.get("energy", 50.0))
-        except Exception:
-            tgt_e = 50.0
-        try:
-            tgt_v = float(target.get("valence", 50.0))
-        except Exception:
-            tgt_v = 50.0
-
-        # Convert slider delta to native delta for 0..1 columns (linear mapping).
-        ew = max(0.0, float(self._energy_window_slider))
-        energy_lo = max(0.0, min(1.0, (tgt_e - ew) / 100.0))
-        energy_hi = max(0.0, min(1.0, (tgt_e + ew) / 100.0))
-
-        vw = max(0.0, float(self._valence_window_slider))
-        valence_lo = max(0.0, min(1.0, (tgt_v - vw) / 100.0))
-        valence_hi = max(0.0, min(1.0, (tgt_v + vw) / 100.0))
-
-        where = [
-            f"{self._table}.prob_factor > 0",
-            f"{self._table}.energy BETWEEN ? AND ?",
-            f"{self._table}.valence BETWEEN ? AND ?",
-        ]
-        params: List[Any] = [energy_lo, energy_hi, valence_lo, valence_hi]
-
-        # Apply optional music_filters (similar semantics to CSV path).
-        def norm(s: Any) -> str:
-            return str(s or "").strip().lower()
-
-        if isinstance(music_filters, dict) and music_filters:
-            inc_genres = [norm(x) for x in (music_filters.get("include_genres") or []) if x]
-            exc_genres = [norm(x) for x in (music_filters.get("exclude_genres") or []) if x]
-            inc_artists = [norm(x) for x in (music_filters.get("include_artists") or []) if x]
-            exc_artists = [norm(x) for x in (music_filters.get("exclude_artists") or []) if x]
-            inc_kw = [norm(x) for x in (music_filters.get("include_keywords") or []) if x]
-
-            # Exclusions
-            for g in exc_genres:
-                where.append("LOWER(genre) NOT LIKE ?")
-                params.append(f"%{g}%")
-            for a in exc_artists:
-                where.append("LOWER(artist_name) NOT LIKE ?")
-                params.append(f"%{a}%")
-
-            # Inclusions (AND across categories, OR within a category)
-            if inc_genres:
-                where.append("(" + " OR ".join(["LOWER(genre) LIKE ?"] * len(inc_genres)) + ")")
-                params.extend([f"%{g}%" for g in inc_genres])
-            if inc_artists:
-                where.append("(" + " OR ".join(["LOWER(artist_name) LIKE ?"] * len(inc_artists)) + ")")
-                params.extend([f"%{a}%" for a in inc_artists])
-            if inc_kw:
-                where.append(
-                    "("
-                    + " OR ".join(["LOWER(track_name) LIKE ?" for _ in inc_kw] + ["LOWER(artist_name) LIKE ?" for _ in inc_kw])
-                    + ")"
-                )
-                params.extend([f"%{k}%" for k in inc_kw])
-                params.extend([f"%{k}%" for k in inc_kw])
+    def _effective_prob_factor(
+        self,
+        matrix: FeatureMatrix,
+        weights: Dict[str, Dict[str, float]],
+        genre_counts: Dict[str, int],
+    ) -> np.ndarray:
+        """
+        Per-row prob_factor * track/artist/genre weights, normalized by genre size.
 
-        where_sql = " AND ".join(where) if where else "1=1"
+        Normalizing by genre size keeps big genres from dominating probability mass: the
+        total expected weight per genre is ~ genre_factor (up to artist/track effects),
+        rather than proportional to the number of tracks in that genre.
+        """
+        genre_keys = [self._norm_key(g) for g in matrix.genre_vocab]
+        genre_w = np.array([weights.get("genre", {}).get(k, 1.0) for k in genre_keys], dtype=np.float64)
+        genre_n = np.array([max(1, int(genre_counts.get(k, 0) or 0)) for k in genre_keys], dtype=np.float64)
+
+        artist_w = np.ones(len(matrix.artist_vocab), dtype=np.float64)
+        for artist, factor in weights.get("artist", {}).items():
+            artist_w[matrix.artist_codes_for(artist)] = factor
+
+        track_w = np.ones(len(matrix), dtype=np.float64)
+        for track_key, factor in weights.get("track", {}).items():
+            title, sep, artist = track_key.partition("|||")
+            if not sep:
+                continue
+            for code in matrix.artist_codes_for(artist):
+                for i in matrix.rows_for_artist_code(code):
+                    if self._norm_key(matrix.track_names[i]) == title:
+                        track_w[i] = factor
 
-        # Order by just energy+valence closeness (cheap) to keep prefilter relevant.
-        # Full distance is computed in Python in step 2.
-        order_expr = (
-            " ("
-            " 2.0*ABS(COALESCE(energy, 0.5) * 100.0 - ?) "
-            " + 2.0*ABS(COALESCE(valence, 0.5) * 100.0 - ?) "
-            " ) "
+        pf = matrix.prob_factor.astype(np.float64)
+        return (
+            np.maximum(pf, 0.0)
+            * np.maximum(track_w, 0.0)
+            * np.maximum(artist_w, 0.0)[matrix.artist_codes]
+            * (np.maximum(genre_w, 0.0) / genre_n)[matrix.genre_codes]
         )
-        order_params = [target["energy"], target["valence"]]
-
-        sql = f"""
-            SELECT
-                track_id,
-                track_name,
-                artist_name,
-                genre,
-                prob_factor,
-                energy, valence, loudness, speechiness, acousticness, instrumentalness, liveness, tempo
-            FROM {self._table}
-            WHERE {where_sql}
-            ORDER BY {order_expr} ASC
-            LIMIT ?
-        """
 
-        rows: List[Tuple[Any, ...]] = []
-        weights: Dict[str, Dict[str, float]] = {"track": {}, "artist": {}, "genre": {}}
-        genre_counts: Dict[str, int] = {}
+    def nearest_matches(self, target_sliders: Dict[str, Any], n: int = 100, *, music_filters: Optional[Dict[str, Any]] = None) -> List[DatasetSong]:
+        target = target_vector(target_sliders)
+        n_int = max(1, int(n))
+
         t0 = time.perf_counter()
         try:
-            conn = self._connect()
+            matrix = get_sqlite_feature_matrix(self._db_path, self._table)
         except Exception as e:
-            logger.warning(f"SqliteMusicDataset connect failed: {e}")
+            logger.warning(f"SqliteMusicDataset: could not load feature matrix from {self._table}: {e}")
             return []
 
+        # Weights + genre stats (and the per-row factor derived from them) are cached
+        # until a weight write bumps the version or another connection changes the tables.
         try:
-            weights = self._load_weights(conn)
-            genre_counts = self._load_genre_counts(conn)
-            cur = conn.execute(sql, [*params, *order_params, int(prefilter_limit)])
-            rows = cur.fetchall()
-        finally:
-            try:
-                conn.close()
-            except Exception as e:
-                logger.debug(f"SqliteMusicDataset: failed to close sqlite connection: {e}", exc_info=True)
+            effective_pf, positive = get_effective_prob_factor(self._db_path, matrix, self._effective_prob_factor)
+        except Exception as e:
+            logger.warning(f"SqliteMusicDataset: could not load music weights: {e}")
+            return []
+
+        # Step 1: coarse gate: energy + valence window (native units), then optional filters.
+        mask = matrix.gate_mask(target, self._energy_window_slider, self._valence_window_slider)
+        mask &= positive
+        filter_mask = matrix.filter_mask(music_filters)
+        if filter_mask is not None:
+            mask &= filter_mask
+
+        # Step 2: exact weighted slider distance over every gated row, top-n via argpartition.
+        rows, _ = matrix.nearest(target, n_int, mask)
+        songs = self._songs_at(matrix, rows, effective_pf[rows])
 
-        dt = time.perf_counter() - t0
         logger.info(
-            "SqliteMusicDataset: fetched %s gated row(s) in %.2fs (prefilter_limit=%s) from %s",
-            len(rows),
-            dt,
-            prefilter_limit,
+            "SqliteMusicDataset: ranked %s gated of %s row(s) in %.3fs (gate energy=[%.1f±%.1f] valence=[%.1f±%.1f]) from %s",
+            int(mask.sum()),
+            len(matrix),
+            time.perf_counter() - t0,
+            float(target[FEATURE_KEYS.index("energy")]),
+            self._energy_window_slider,
+            float(target[FEATURE_KEYS.index("valence")]),
+            self._valence_window_slider,
             self._table,
         )
-        logger.info(
-            "SqliteMusicDataset: gate energy=[%.1f±%.1f] valence=[%.1f±%.1f] -> native ranges e=[%.3f..%.3f] v=[%.3f..%.3f]",
-            tgt_e,
-            ew,
-            tgt_v,
-            vw,
-            energy_lo,
-            energy_hi,
-            valence_lo,
-            valence_hi,
-        )
-
-        songs: List[DatasetSong] = []
-        for (
-            track_id,
-            track_name_raw,
-            artist_name_raw,
-            genre_raw,
-            prob_factor,
-            energy,
-            valence,
-            loudness,
-            speechiness,
-            acousticness,
-            instrumentalness,
-            liveness,
-            tempo,
-        ) in rows:
-            track_name_raw = str(track_name_raw or "").strip()
-            artist_name_raw = str(artist_name_raw or "").strip()
-            if not track_name_raw:
-                continue
-            if not artist_name_raw:
-                artist_name_raw = "Unknown"
-
-            sliders = db_to_llm_features(
-                {
-                    "energy": energy,
-                    "valence": valence,
-                    "loudness": loudness,
-                    "speechiness": speechiness,
-                    "acousticness": acousticness,
-                    "instrumentalness": instrumentalness,
-                    "liveness": liveness,
-                    "tempo": tempo,
-                }
-            )
-            for k in ("energy", "valence", "loudness", "speechiness", "acousticness", "instrumentalness", "liveness", "tempo"):
-                sliders.setdefault(k, 50.0)
-
-            t = _ascii_safe(track_name_raw)
-            a = _ascii_safe(artist_name_raw)
-            g = _ascii_safe(str(genre_raw or "").strip())
-            q = _ascii_safe(f"{track_name_raw} by {artist_name_raw}")
-
-            pf = _to_float(prob_factor)
-            pf = max(0.0, pf) if pf is not None else 1.0
-
-            # Apply per-scope weights (track/artist/genre)
-            try:
-                w_track = float(weights.get("track", {}).get(self._track_key(track_name_raw, artist_name_raw), 1.0))
-            except Exception:
-                w_track = 1.0
-            try:
-                w_artist = float(weights.get("artist", {}).get(self._norm_key(artist_name_raw), 1.0))
-            except Exception:
-                w_artist = 1.0
-            try:
-                w_genre = float(weights.get("genre", {}).get(self._norm_key(genre_raw), 1.0))
-            except Exception:
-                w_genre = 1.0
-
-            # Normalize by genre size so big genres don't dominate probability mass.
-            # This makes total expected weight per genre ~ genre_factor (up to artist/track effects),
-            # rather than proportional to number of tracks in that genre.
-            try:
-                gkey = self._norm_key(genre_raw)
-                gcount = int(genre_counts.get(gkey, 0) or 0)
-            except Exception:
-                gcount = 0
-
-            denom = float(max(1, gcount))
-            effective_pf = (max(0.0, pf) * max(0.0, w_track) * max(0.0, w_artist) * max(0.0, w_genre)) / denom
-            if effective_pf <= 0.0:
-                continue
-
-            songs.append(
-                DatasetSong(
-                    track_id=str(track_id or "").strip(),
-                    track_name=t,
-                    artist=a or "Unknown",
-                    genre=g,
-                    sliders=sliders,
-                    search_query=q,
-                    prob_factor=effective_pf,
-                )
-            )
-
-        # Step 2: exact distance compute, prune obvious misses, keep the best refine_limit.
-        ranked = sorted(songs, key=lambda s: self._distance(target, s))
-        refined = ranked[:refine_limit]
-        return refined[:n_int]
+        return songs
 
     def sample_for_prompt(self, *args, **kwargs):
         # Use the shared sampling logic (MusicDataset.sample_for_prompt) but with our
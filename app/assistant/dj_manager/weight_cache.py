@@ -0,0 +1,276 @@
+"""
+Music weight cache - in-process copy of the per-scope weight tables and genre stats.
+
+SqliteMusicDataset needs music_genre_weights, music_artist_weights, music_track_weights
+and music_genre_stats on every pick. They are small and change only when the UI nudges
+a weight, so they are loaded once per database file over a kept-open read connection,
+together with the per-row effective prob_factor derived from them for the current
+feature matrix.
+
+Invalidation:
+- a process-wide version counter, bumped by SQLAlchemy session listeners once a commit
+  that inserted/updated/deleted a weight, override or genre-stat row succeeds
+  (registered from app/models/music_weights.py, music_weight_overrides.py and
+  music_genre_stats.py)
+- writes from other processes or raw sqlite3 connections: PRAGMA data_version moves,
+  then a cheap per-table fingerprint (COUNT, MAX(updated_at_utc), TOTAL(factor))
+  decides whether anything we read actually changed
+"""
+
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.assistant.utils.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# Tables whose rows feed the effective prob_factor
+WEIGHT_TABLES = ("music_genre_weights", "music_artist_weights", "music_track_weights", "music_genre_stats")
+
+_PENDING_KEY = "_music_weight_cache_pending"
+
+_version = 0
+_version_lock = threading.Lock()
+
+_registered = False
+_register_lock = threading.Lock()
+
+
+def get_music_weights_version() -> int:
+    return _version
+
+
+def bump_music_weights_version() -> int:
+    """Mark every cached copy of the weight tables stale (in this process)."""
+    global _version
+    with _version_lock:
+        _version += 1
+        return _version
+
+
+def _norm_key(s: Any) -> str:
+    return str(s or "").strip().lower()
+
+
+def load_weights(conn: sqlite3.Connection) -> Dict[str, Dict[str, float]]:
+    """
+    Load per-scope weights from normalized tables.
+
+    Returns:
+      {
+        "track": { "<title>|||<artist>": factor, ... },   # sparse
+        "artist": { "<artist>": factor, ... },           # sparse
+        "genre": { "<genre>": factor, ... },             # small (~82)
+      }
+    """
+    out: Dict[str, Dict[str, float]] = {"track": {}, "artist": {}, "genre": {}}
+    for scope, table, key_col in (
+        ("genre", "music_genre_weights", "genre"),
+        ("artist", "music_artist_weights", "artist"),
+        ("track", "music_track_weights", "track_key"),
+    ):
+        try:
+            for key, factor in conn.execute(f"SELECT {key_col}, factor FROM {table}").fetchall():
+                out[scope][_norm_key(key)] = float(factor) if factor is not None else 1.0
+        except Exception as e:
+            logger.debug(f"Could not load {table}: {e}", exc_info=True)
+    return out
+
+
+def load_genre_counts(conn: sqlite3.Connection) -> Dict[str, int]:
+    """
+    Load per-genre track counts for normalization.
+
+    Expected table:
+      music_genre_stats(genre TEXT PRIMARY KEY, track_count INTEGER, ...)
+    """
+    out: Dict[str, int] = {}
+    try:
+        rows = conn.execute("SELECT genre, track_count FROM music_genre_stats").fetchall()
+    except Exception:
+        return out
+    for genre, cnt in rows:
+        key = _norm_key(genre)
+        try:
+            out[key] = max(0, int(cnt or 0))
+        except Exception:
+            out[key] = 0
+    return out
+
+
+def _fingerprint(conn: sqlite3.Connection) -> Tuple[Any, ...]:
+    parts = []
+    for table in WEIGHT_TABLES:
+        value = "track_count" if table == "music_genre_stats" else "factor"
+        try:
+            parts.append(tuple(conn.execute(
+                f"SELECT COUNT(*), MAX(updated_at_utc), TOTAL({value}) FROM {table}"
+            ).fetchone()))
+        except Exception:
+            parts.append(None)
+    return tuple(parts)
+
+
+class MusicWeights:
+    """One loaded copy of the weight tables; serial changes whenever the content may have."""
+
+    __slots__ = ("serial", "weights", "genre_counts")
+
+    def __init__(self, serial: int, weights: Dict[str, Dict[str, float]], genre_counts: Dict[str, int]):
+        self.serial = serial
+        self.weights = weights
+        self.genre_counts = genre_counts
+
+
+class _WeightEntry:
+    def __init__(self, db_path: Path):
+        self.db_path = db_path
+        self.lock = threading.Lock()
+        self.conn: Optional[sqlite3.Connection] = None
+        self.data_version: Optional[int] = None
+        self.fingerprint: Optional[Tuple[Any, ...]] = None
+        self.version: Optional[int] = None
+        self.current: Optional[MusicWeights] = None
+        self.serial = 0
+        # (matrix, weights serial) -> (effective prob_factor, effective_pf > 0)
+        self.derived_key: Optional[Tuple[Any, int]] = None
+        self.derived: Optional[Tuple[np.ndarray, np.ndarray]] = None
+
+    def connection(self) -> sqlite3.Connection:
+        if self.conn is None:
+            self.conn = sqlite3.connect(str(self.db_path), timeout=30, check_same_thread=False)
+            self.conn.execute("PRAGMA busy_timeout=30000")
+        return self.conn
+
+    def close(self) -> None:
+        if self.conn is not None:
+            try:
+                self.conn.close()
+            except Exception as e:
+                logger.debug(f"MusicWeightCache: failed to close sqlite connection: {e}", exc_info=True)
+        self.conn = None
+        self.data_version = None
+
+    def get(self) -> MusicWeights:
+        with self.lock:
+            return self._get_locked()
+
+    def _get_locked(self) -> MusicWeights:
+        version = get_music_weights_version()
+        conn = self.connection()
+        data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+        if self.current is not None and version == self.version and data_version == self.data_version:
+            return self.current
+
+        fingerprint = _fingerprint(conn)
+        if self.current is None or version != self.version or fingerprint != self.fingerprint:
+            self.serial += 1
+            self.current = MusicWeights(self.serial, load_weights(conn), load_genre_counts(conn))
+            logger.debug(
+                "MusicWeightCache: loaded %s genre / %s artist / %s track weight(s), %s genre stat(s) from %s",
+                len(self.current.weights["genre"]),
+                len(self.current.weights["artist"]),
+                len(self.current.weights["track"]),
+                len(self.current.genre_counts),
+                self.db_path,
+            )
+        self.version = version
+        self.data_version = data_version
+        self.fingerprint = fingerprint
+        return self.current
+
+    def effective_prob_factor(
+        self,
+        matrix: Any,
+        compute: Callable[[Any, Dict[str, Dict[str, float]], Dict[str, int]], np.ndarray],
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        (effective prob_factor, effective prob_factor > 0) for matrix under the current
+        weights; recomputed only when the matrix or the weights change.
+        """
+        with self.lock:
+            current = self._get_locked()
+            if self.derived is None or self.derived_key[0] is not matrix or self.derived_key[1] != current.serial:
+                effective = compute(matrix, current.weights, current.genre_counts)
+                self.derived = (effective, effective > 0.0)
+                self.derived_key = (matrix, current.serial)
+            return self.derived
+
+
+_entries: Dict[str, _WeightEntry] = {}
+_entries_lock = threading.Lock()
+
+
+def _entry(db_path: Path) -> _WeightEntry:
+    key = str(Path(db_path).resolve())
+    with _entries_lock:
+        entry = _entries.get(key)
+        if entry is None:
+            entry = _entries[key] = _WeightEntry(Path(db_path))
+        return entry
+
+
+def get_music_weights(db_path: Path) -> MusicWeights:
+    """Cached weight tables and genre counts for a database file."""
+    return _entry(db_path).get()
+
+
+def get_effective_prob_factor(
+    db_path: Path,
+    matrix: Any,
+    compute: Callable[[Any, Dict[str, Dict[str, float]], Dict[str, int]], np.ndarray],
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Cached compute(matrix, weights, genre_counts) and its > 0 mask."""
+    return _entry(db_path).effective_prob_factor(matrix, compute)
+
+
+def invalidate_weight_cache(db_path: Optional[Path] = None) -> None:
+    """Drop cached weights (all, or those for one database file) and close their connections."""
+    target = str(Path(db_path).resolve()) if db_path is not None else None
+    with _entries_lock:
+        for key in [k for k in _entries if target is None or k == target]:
+            entry = _entries.pop(key)
+            with entry.lock:
+                entry.close()
+
+
+# ----------------------------------------------------------------------
+# Session listeners
+# ----------------------------------------------------------------------
+
+def _is_weight_row(obj) -> bool:
+    return getattr(type(obj), "__tablename__", None) in WEIGHT_TABLES + ("music_weight_overrides",)
+
+
+def _after_flush(session: Session, flush_context) -> None:
+    if any(_is_weight_row(obj) for rows in (session.new, session.dirty, session.deleted) for obj in rows):
+        session.info[_PENDING_KEY] = True
+
+
+def _after_commit(session: Session) -> None:
+    if session.info.pop(_PENDING_KEY, None):
+        bump_music_weights_version()
+
+
+def _after_rollback(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
+
+
+def register_music_weight_cache_sync() -> None:
+    """Attach the session listeners (idempotent)."""
+    global _registered
+    if _registered:
+        return
+    with _register_lock:
+        if _registered:
+            return
+        event.listen(Session, "after_flush", _after_flush)
+        event.listen(Session, "after_commit", _after_commit)
+        event.listen(Session, "after_rollback", _after_rollback)
+        _registered = True
@@ -0,0 +1,214 @@
+"""
+Entity Card Cache - in-process cache of formatted entity cards and per-field extracts
+
+Entries are keyed by entity name and hold every injectable field (plus the full
+formatted card under "all"), so any (entity_name, field) lookup after the first is
+free, and a prompt with many detected entities costs at most one batched query.
+Missing/inactive entities are cached too, so repeated misses do not hit the DB.
+
+Invalidation:
+- SQLAlchemy session listeners drop entities whose EntityCard rows were inserted,
+  updated (other than usage bookkeeping) or deleted, once the commit succeeds
+- the entity card generation run clears the cache when it finishes
+- entries expire after ttl_seconds, which bounds staleness for writes made by
+  other processes (e.g. running kg_rag_pipeline as a script)
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from app.assistant.performance.performance_monitor import performance_monitor
+from app.assistant.utils.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# Every field extract_entity_field understands; "all" is the full prompt-injection card
+ENTITY_FIELDS = (
+    "all", "summary", "key_facts", "relationships", "description",
+    "aliases", "original_aliases", "metadata", "type",
+)
+
+# Columns whose changes do not affect any formatted output
+_BOOKKEEPING_COLUMNS = {"usage_count", "last_used"}
+
+_PENDING_KEY = "_entity_card_cache_pending"
+
+_registered = False
+_register_lock = threading.Lock()
+
+
+class EntityCardCache:
+    def __init__(self, ttl_seconds: float = 600, max_entities: int = 5000):
+        self.ttl_seconds = ttl_seconds
+        self.max_entities = max(1, int(max_entities))
+        # entity_name -> (expires_at, {field: text} or None when there is no active card)
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        # Bumped on every invalidation so a load racing with a write does not cache stale rows
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def _lookup(self, entity_names: List[str], now: float):
+        hits: Dict[str, Optional[Dict[str, str]]] = {}
+        misses: List[str] = []
+        with self._lock:
+            for name in entity_names:
+                entry = self._entries.get(name)
+                if entry is None or entry[0] <= now:
+                    misses.append(name)
+                    continue
+                self._entries.move_to_end(name)
+                hits[name] = entry[1]
+        if hits:
+            performance_monitor.increment_counter("entity_card_cache_hit", len(hits))
+        if misses:
+            performance_monitor.increment_counter("entity_card_cache_miss", len(misses))
+        return hits, misses
+
+    def _load(self, entity_names: List[str]) -> Dict[str, Optional[Dict[str, str]]]:
+        from app.models.base import get_session
+        from app.assistant.entity_management.entity_cards import extract_entity_field, get_entity_cards_by_names
+
+        with self._lock:
+            generation = self._generation
+        session = get_session()
+        try:
+            cards = get_entity_cards_by_names(session, entity_names)
+            loaded = {
+                name: ({field: extract_entity_field(cards[name], field) for field in ENTITY_FIELDS}
+                       if name in cards else None)
+                for name in entity_names
+            }
+        finally:
+            session.close()
+
+        expires = time.time() + self.ttl_seconds
+        with self._lock:
+            if generation != self._generation:
+                return loaded
+            for name, fields in loaded.items():
+                self._entries[name] = (expires, fields)
+                self._entries.move_to_end(name)
+            while len(self._entries) > self.max_entities:
+                self._entries.popitem(last=False)
+        return loaded
+
+    def get_fields(self, entity_names: Iterable[str], field_names: Iterable[str]) -> Dict[str, Dict[str, str]]:
+        """
+        Return {entity_name: {field: text}} for entities that have an active card,
+        in the order given. Unknown fields map to "". Misses are fetched in one query.
+        """
+        names = list(dict.fromkeys(n for n in entity_names if n))
+        fields = list(field_names)
+        if not names:
+            return {}
+
+        found, misses = self._lookup(names, time.time())
+        if misses:
+            try:
+                found.update(self._load(misses))
+            except Exception as e:
+                logger.error(f"Error loading entity cards {misses}: {e}")
+
+        result = {}
+        for name in names:
+            card_fields = found.get(name)
+            if card_fields is not None:
+                result[name] = {field: card_fields.get(field, "") for field in fields}
+        return result
+
+    def get_card(self, entity_name: str) -> str:
+        """Formatted prompt-injection card, or "" if the entity has no active card."""
+        return self.get_fields([entity_name], ["all"]).get(entity_name, {}).get("all", "")
+
+    def invalidate(self, entity_names: Optional[Iterable[str]] = None) -> None:
+        """Drop the given entities, or everything when entity_names is None."""
+        with self._lock:
+            self._generation += 1
+            if entity_names is None:
+                self._entries.clear()
+                return
+            for name in entity_names:
+                self._entries.pop(name, None)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            stats = {"entries": len(self._entries)}
+        stats.update(performance_monitor.get_counters(prefix="entity_card_cache_"))
+        return stats
+
+
+# Global singleton instance
+_entity_card_cache = None
+_entity_card_cache_lock = threading.Lock()
+
+
+def get_entity_card_cache() -> EntityCardCache:
+    """Get the global entity card cache instance."""
+    global _entity_card_cache
+    if _entity_card_cache is None:
+        with _entity_card_cache_lock:
+            if _entity_card_cache is None:
+                _entity_card_cache = EntityCardCache()
+    return _entity_card_cache
+
+
+# ----------------------------------------------------------------------
+# Session listeners
+# ----------------------------------------------------------------------
+
+def _changed_names(obj) -> Set[str]:
+    state = inspect(obj)
+    changed = [attr for attr in state.attrs if attr.history.has_changes()]
+    if all(attr.key in _BOOKKEEPING_COLUMNS for attr in changed):
+        return set()
+    names = {obj.entity_name}
+    # A rename must also drop the entry cached under the old name
+    names.update(state.attrs["entity_name"].history.deleted or ())
+    return names
+
+
+def _after_flush(session: Session, flush_context) -> None:
+    from app.assistant.entity_management.entity_cards import EntityCard
+
+    names: Set[str] = set()
+    for obj in session.new:
+        if isinstance(obj, EntityCard):
+            names.add(obj.entity_name)
+    for obj in session.dirty:
+        if isinstance(obj, EntityCard):
+            names |= _changed_names(obj)
+    for obj in session.deleted:
+        if isinstance(obj, EntityCard):
+            names.add(obj.entity_name)
+    names.discard(None)
+    if names:
+        session.info.setdefault(_PENDING_KEY, set()).update(names)
+
+
+def _after_commit(session: Session) -> None:
+    names = session.info.pop(_PENDING_KEY, None)
+    if names:
+        get_entity_card_cache().invalidate(names)
+
+
+def _after_rollback(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
+
+
+def register_entity_card_cache_sync() -> None:
+    """Attach the session listeners (idempotent)."""
+    global _registered
+    if _registered:
+        return
+    with _register_lock:
+        if _registered:
+            return
+        event.listen(Session, "after_flush", _after_flush)
+        event.listen(Session, "after_commit", _after_commit)
+        event.listen(Session, "after_rollback", _after_rollback)
+        _registered = True
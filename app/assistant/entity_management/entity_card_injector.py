@@ -3,9 +3,8 @@ Entity Card Injection Service
 Handles intelligent injection of entity cards into chat and team calls with duplicate detection
 """
 
-from typing import List, Set, Optional, Tuple
-from app.models.base import get_session
-from app.assistant.entity_management.entity_cards import get_entity_card_for_prompt_injection
+from typing import Dict, Iterable, List, Set, Optional, Tuple
+from app.assistant.entity_management.entity_card_cache import get_entity_card_cache
 from app.assistant.entity_management.entity_catalog import get_entity_catalog
 from app.assistant.ServiceLocator.service_locator import DI
 from app.assistant.utils.logging_config import get_logger
@@ -36,8 +35,6 @@ class EntityCardInjector:
         lowered = text.lower()
         raw_tokens = lowered.split()
 
-        print("JUKKA DEGBUG: ", text)
-
         for raw in raw_tokens:
             token = raw
             # Strip leading punctuation
@@ -72,27 +69,8 @@ class EntityCardInjector:
         if not tokens:
             return []
 
-        found: Set[str] = set()
-
-        # Single word matches
-        for t in tokens:
-            if t in catalog.single_word_index:
-                found.update(catalog.single_word_index[t])
-
-        # Multi word phrase matches
-        n = len(tokens)
-        if catalog.phrase_lengths:
-            for i in range(n):
-                for length in catalog.phrase_lengths:
-                    if i + length > n:
-                        continue
-                    key = tuple(tokens[i : i + length])
-                    entity_map = catalog.multi_word_index.get(length)
-                    if not entity_map:
-                        continue
-                    canonical_names = entity_map.get(key)
-                    if canonical_names:
-                        found.update(canonical_names)
+        # Single pass over the tokens; covers single-word and multi-word names alike
+        found = catalog.match_tokens(tokens)
 
         # Return canonical entity names without duplicates
         result = sorted(found)
@@ -105,13 +83,22 @@ class EntityCardInjector:
         Get entity card content for injection if it exists
         """
         try:
-            session = get_session()
-            card_content = get_entity_card_for_prompt_injection(session, entity_name)
-            session.close()
-            return card_content
+            return get_entity_card_cache().get_card(entity_name)
         except Exception as e:
             logger.error(f"Error getting entity card for '{entity_name}': {e}")
             return None
+
+    def get_entity_card_contents(self, entity_names: Iterable[str]) -> Dict[str, str]:
+        """
+        Get formatted entity cards for several entities (one batched lookup for cache misses).
+        Entities without an active card are omitted.
+        """
+        try:
+            cards = get_entity_card_cache().get_fields(entity_names, ["all"])
+        except Exception as e:
+            logger.error(f"Error getting entity cards for {list(entity_names)}: {e}")
+            return {}
+        return {name: fields["all"] for name, fields in cards.items() if fields["all"]}
     
     def check_if_entity_injected_in_history(self, entity_name: str) -> bool:
         """
@@ -119,25 +106,8 @@ class EntityCardInjector:
         Uses global blackboard to check message history
         """
         try:
-            # Get all messages from global blackboard
-            messages = DI.global_blackboard.get_messages()
-            
-            # Check for entity card injection messages using sub_data_type and metadata
-            for msg in messages:
-                if (
-                    "entity_card_injection" in (getattr(msg, "sub_data_type", []) or [])
-                    and hasattr(msg, 'metadata') and msg.metadata
-                    and 'entity_name' in msg.metadata
-                    and msg.metadata['entity_name'] == entity_name
-                ):
-                    return True
-                
-                # Fallback: check content for entity context format
-                if (msg.content and 
-                    f"[Entity Context - {entity_name}]" in msg.content):
-                    return True
-            
-            return False
+            # The global blackboard indexes injected entity names as messages are added
+            return DI.global_blackboard.has_injected_entity(entity_name)
         except Exception as e:
             logger.error(f"Error checking entity injection history for '{entity_name}': {e}")
             return False
@@ -164,7 +134,10 @@ class EntityCardInjector:
         
         enhanced_text = text
         injected_entities = []
-        
+
+        # Warm the card cache for all detected entities with a single query
+        self.get_entity_card_contents(detected_entities)
+
         for entity_name in detected_entities:
             # Check if we should inject this entity
             should_inject = self.should_inject_entity(entity_name, context_type)
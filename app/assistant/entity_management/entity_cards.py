@@ -158,6 +158,11 @@ class EntityCardIndex(Base):
     )
 
 
+# Keep the in-process entity card cache in sync with card writes
+from app.assistant.entity_management.entity_card_cache import register_entity_card_cache_sync
+register_entity_card_cache_sync()
+
+
 # Database management functions
 def check_entity_cards_db_exists():
     """Check if entity cards tables exist"""
@@ -248,6 +253,20 @@ def get_entity_card_by_name(session, entity_name):
     ).first()
 
 
+def get_entity_cards_by_names(session, entity_names):
+    """
+    Get active entity cards for several names in one query. Returns {entity_name: card}.
+    """
+    names = list(dict.fromkeys(n for n in entity_names if n))
+    if not names:
+        return {}
+    cards = session.query(EntityCard).filter(
+        EntityCard.entity_name.in_(names),
+        EntityCard.is_active == True
+    ).all()
+    return {card.entity_name: card for card in cards}
+
+
 def search_entity_cards(session, search_term, limit=10):
     """
     Search entity cards by name, aliases, or content
@@ -356,6 +375,15 @@ def get_entity_card_for_prompt_injection(session, entity_name):
     Includes original description, summary, key facts, relationships, aliases, and ALL metadata.
     """
     entity_card = get_entity_card_by_name(session, entity_name)
+    if not entity_card:
+        return ""
+    return format_entity_card_for_prompt_injection(entity_card)
+
+
+def format_entity_card_for_prompt_injection(entity_card):
+    """
+    Format an already loaded EntityCard for prompt injection (see get_entity_card_for_prompt_injection).
+    """
     if not entity_card:
         return ""
 
@@ -541,11 +569,7 @@ def extract_entity_field(entity_card, field_name):
     
     elif field_name == "all":
         # Return full card (backward compatibility)
-        session = get_session()
-        try:
-            return get_entity_card_for_prompt_injection(session, entity_card.entity_name)
-        finally:
-            session.close()
+        return format_entity_card_for_prompt_injection(entity_card)
     
     elif field_name == "type":
         return entity_card.entity_type or ""
@@ -1,11 +1,12 @@
 """
 Entity Catalog - Fast in-memory index for entity detection
-Preloads all active entity cards and their aliases for O(1) lookup
+Preloads all active entity cards and their aliases for O(1) lookup, and compiles them
+into a token-level Aho-Corasick automaton so detection is a single pass over the text
 """
 
 import threading
-from collections import defaultdict
-from typing import Dict, Set, Tuple, List
+from collections import defaultdict, deque
+from typing import Dict, Iterable, Set, Tuple, List
 from app.models.base import get_session
 from app.assistant.entity_management.entity_cards import EntityCard
 from app.assistant.utils.logging_config import get_logger
@@ -63,6 +64,81 @@ def _normalize_name_to_tokens(name: str) -> List[str]:
     return tokens
 
 
+class TokenAutomaton:
+    """
+    Aho-Corasick automaton over normalized tokens.
+
+    Patterns are token tuples (single- and multi-word names alike); matching walks the
+    token stream once, so cost is linear in text length regardless of catalog size.
+    Immutable after construction, so readers never need a lock.
+    """
+
+    def __init__(self, patterns: Iterable[Tuple[Tuple[str, ...], Set[str]]]):
+        # state -> {token: next_state}; state 0 is the root
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        # state -> canonical names of every pattern ending here (including via fail links)
+        self._out: List[frozenset] = [frozenset()]
+        self.pattern_count = 0
+
+        own_out: List[Set[str]] = [set()]
+        for tokens, canonical_names in patterns:
+            if not tokens:
+                continue
+            state = 0
+            for token in tokens:
+                nxt = self._goto[state].get(token)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][token] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    own_out.append(set())
+                state = nxt
+            own_out[state].update(canonical_names)
+            self.pattern_count += 1
+
+        # Tokens that appear in no pattern always send the walk back to the root
+        self._alphabet = frozenset(token for edges in self._goto for token in edges)
+
+        # BFS to compute failure links and merge outputs along them
+        self._out = [frozenset()] * len(self._goto)
+        queue = deque()
+        for nxt in self._goto[0].values():
+            self._out[nxt] = frozenset(own_out[nxt])
+            queue.append(nxt)
+        while queue:
+            state = queue.popleft()
+            for token, nxt in self._goto[state].items():
+                fail = self._fail[state]
+                while fail and token not in self._goto[fail]:
+                    fail = self._fail[fail]
+                fail = self._goto[fail].get(token, 0)
+                self._fail[nxt] = fail
+                self._out[nxt] = frozenset(own_out[nxt]) | self._out[fail]
+                queue.append(nxt)
+
+    @property
+    def state_count(self) -> int:
+        return len(self._goto)
+
+    def find(self, tokens: Iterable[str]) -> Set[str]:
+        """Return the canonical names of every pattern occurring as a contiguous token run."""
+        goto, fail, out, alphabet = self._goto, self._fail, self._out, self._alphabet
+        found: Set[str] = set()
+        state = 0
+        for token in tokens:
+            if token not in alphabet:
+                state = 0
+                continue
+            while state and token not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(token, 0)
+            if out[state]:
+                found |= out[state]
+        return found
+
+
 class EntityCatalog:
     """
     Singleton style catalog that preloads active EntityCards and builds indices for fast lookup.
@@ -80,6 +156,7 @@ class EntityCatalog:
         )
         self.phrase_lengths: Set[int] = set()
         self.all_canonical_entities: Set[str] = set()
+        self.automaton = TokenAutomaton([])
         self._loaded = False
         self._load_from_db()
 
@@ -154,11 +231,27 @@ class EntityCatalog:
                     self.phrase_lengths.add(length)
                     multi_word_count += 1
 
+        self._build_automaton()
         self._loaded = True
         logger.info(f"✅ Entity Catalog loaded: {entity_count} entities, {single_word_count} single-word terms, {multi_word_count} multi-word terms")
         logger.info(f"   Phrase lengths: {sorted(self.phrase_lengths) if self.phrase_lengths else 'none'}")
 
 
+    def _build_automaton(self) -> None:
+        """Compile the single- and multi-word indices into one automaton and swap it in."""
+        patterns: List[Tuple[Tuple[str, ...], Set[str]]] = [
+            ((token,), names) for token, names in self.single_word_index.items()
+        ]
+        for phrase_map in self.multi_word_index.values():
+            patterns.extend(phrase_map.items())
+        self.automaton = TokenAutomaton(patterns)
+        logger.info(f"   Entity automaton: {self.automaton.pattern_count} patterns, {self.automaton.state_count} states")
+
+    def match_tokens(self, tokens: Iterable[str]) -> Set[str]:
+        """Canonical entity names whose name or alias appears in the normalized token stream."""
+        return self.automaton.find(tokens)
+
+
 # Convenience function if you prefer a functional style
 def get_entity_catalog() -> EntityCatalog:
     return EntityCatalog.instance()
@@ -1,11 +1,12 @@
 # event_repository.py
 
 
-from datetime import datetime, timezone
+from datetime import datetime, timezone, timedelta
 import time
 
 from pydantic import BaseModel
-from sqlalchemy import func
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.dialects import postgresql, sqlite
 
 from app.assistant.ServiceLocator.service_locator import DI
 from app.assistant.utils.pydantic_classes import Message
@@ -26,6 +27,22 @@ logger = get_logger(__name__)
 MAX_RETRIES = 3
 RETRY_DELAY_SECONDS = 0.5  # Start with 500ms, will exponentially backoff
 
+# Transient data types (everything except calendar) are kept for a sliding window
+TRANSIENT_RETENTION = timedelta(hours=10)
+
+# SQLite caps bound parameters per statement; keep IN (...) lists and multi-row inserts below it
+_BATCH_SIZE = 500
+
+
+def _as_utc(dt):
+    """SQLite drops tzinfo on TIMESTAMP columns; all window columns are stored as UTC."""
+    if dt is None:
+        return None
+    if dt.tzinfo is None:
+        return dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(timezone.utc)
+
+
 class EventRepositoryManager:
     def __init__(self, session_factory=get_session):
         """
@@ -82,18 +99,22 @@ class EventRepositoryManager:
                         # Update the existing event.
                         existing_event.data = event_data
                         existing_event.data_hash = event_hash
+                        existing_event.start_utc, existing_event.end_utc = EventRepository.extract_time_window(event_data)
                         existing_event.created_at = datetime.now(timezone.utc)
                         session.commit()
                         logger.debug("Updated event with id=%s", id)
                         updated = True
                 else:
                     # Insert a new event.
+                    start_utc, end_utc = EventRepository.extract_time_window(event_data)
                     event = EventRepository(
                         id=id,
                         event_id=event_id,
                         data=event_data,
                         data_type=data_type,
-                        data_hash=event_hash
+                        data_hash=event_hash,
+                        start_utc=start_utc,
+                        end_utc=end_utc,
                     )
                     session.add(event)
                     session.commit()
@@ -133,6 +154,158 @@ class EventRepositoryManager:
         logger.error("Failed to store event after %d retries: %s", MAX_RETRIES, last_exception)
         raise last_exception
 
+    def store_events(self, items, data_type: str, prune: bool = True) -> list:
+        """
+        Bulk version of store_event for syncs: upsert a batch of events in one transaction.
+
+        Args:
+            items: Iterable of (id, event_data) or (id, event_data, event_id) tuples.
+            data_type: Data type of every item in the batch.
+            prune: Also remove stale rows of this data_type in the same transaction,
+                   using the same policy as sync_events_with_server.
+
+        Existing (id, data_hash) pairs for the batch are loaded with one query, so only
+        new or changed rows are written. A single repo_update event is published when
+        anything changed.
+
+        Returns:
+            list: Ids that were inserted, updated or deleted.
+        """
+        batch = {}
+        for item in items:
+            id, event_data = item[0], item[1]
+            event_id = item[2] if len(item) > 2 and item[2] is not None else id
+            if isinstance(event_data, BaseModel):
+                event_data = event_data.model_dump()
+            batch[id] = (event_id, event_data, self.compute_data_hash(event_data))
+
+        last_exception = None
+        for attempt in range(MAX_RETRIES):
+            session = self.session_factory()
+            try:
+                existing = self._load_hashes(session, list(batch))
+                now = datetime.now(timezone.utc)
+                rows = []
+                for id, (event_id, event_data, event_hash) in batch.items():
+                    if existing.get(id) == (event_id, event_hash):
+                        continue
+                    start_utc, end_utc = EventRepository.extract_time_window(event_data)
+                    rows.append({
+                        "id": id,
+                        "event_id": event_id,
+                        "data_type": data_type,
+                        "data": event_data,
+                        "data_hash": event_hash,
+                        "created_at": now,
+                        "start_utc": start_utc,
+                        "end_utc": end_utc,
+                    })
+                self._upsert_rows(session, rows)
+
+                deleted_ids = self._prune_stale(session, data_type, set(batch)) if prune else []
+                session.commit()
+
+                self.tracked_events.setdefault(data_type, set()).update(batch)
+                changed_ids = [row["id"] for row in rows] + deleted_ids
+                logger.debug(
+                    "Stored %d '%s' events: %d written, %d deleted",
+                    len(batch), data_type, len(rows), len(deleted_ids)
+                )
+                break
+
+            except OperationalError as e:
+                session.rollback()
+                if "database is locked" in str(e):
+                    last_exception = e
+                    delay = RETRY_DELAY_SECONDS * (2 ** attempt)
+                    logger.warning(
+                        "Database locked on attempt %d/%d storing %d '%s' events. Retrying in %.2fs...",
+                        attempt + 1, MAX_RETRIES, len(batch), data_type, delay
+                    )
+                    time.sleep(delay)
+                    continue
+                logger.error("Error storing events: %s", e)
+                raise
+            except SQLAlchemyError as e:
+                session.rollback()
+                logger.error("Error storing events: %s", e)
+                raise
+            finally:
+                session.close()
+        else:
+            logger.error("Failed to store events after %d retries: %s", MAX_RETRIES, last_exception)
+            raise last_exception
+
+        if changed_ids:
+            self._publish_repo_update(data_type)
+        return changed_ids
+
+    @staticmethod
+    def _load_hashes(session, ids: list) -> dict:
+        """Map id -> (event_id, data_hash) for the ids that already exist."""
+        existing = {}
+        for i in range(0, len(ids), _BATCH_SIZE):
+            result = session.execute(
+                select(EventRepository.id, EventRepository.event_id, EventRepository.data_hash)
+                .where(EventRepository.id.in_(ids[i:i + _BATCH_SIZE]))
+            )
+            existing.update({row.id: (row.event_id, row.data_hash) for row in result})
+        return existing
+
+    @staticmethod
+    def _upsert_rows(session, rows: list) -> None:
+        """INSERT ... ON CONFLICT(id) DO UPDATE for the given rows."""
+        if not rows:
+            return
+        dialect = postgresql if session.get_bind().dialect.name == "postgresql" else sqlite
+        for i in range(0, len(rows), _BATCH_SIZE):
+            stmt = dialect.insert(EventRepository).values(rows[i:i + _BATCH_SIZE])
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[EventRepository.id],
+                set_={
+                    "event_id": stmt.excluded.event_id,
+                    "data_type": stmt.excluded.data_type,
+                    "data": stmt.excluded.data,
+                    "data_hash": stmt.excluded.data_hash,
+                    "created_at": stmt.excluded.created_at,
+                    "start_utc": stmt.excluded.start_utc,
+                    "end_utc": stmt.excluded.end_utc,
+                },
+            )
+            session.execute(stmt)
+
+    @staticmethod
+    def _prune_stale(session, data_type: str, server_ids: set) -> list:
+        """
+        Delete stale rows of a data_type and return their ids.
+
+        Calendar rows are reconciled against the ids the server returned; every other
+        data type is transient and only kept for TRANSIENT_RETENTION.
+        """
+        query = select(EventRepository.id).where(EventRepository.data_type == data_type)
+        if data_type == "calendar":
+            stale_ids = [id for id in session.execute(query).scalars() if id not in server_ids]
+        else:
+            cutoff_time = datetime.now(timezone.utc) - TRANSIENT_RETENTION
+            stale_ids = list(session.execute(query.where(EventRepository.created_at < cutoff_time)).scalars())
+
+        for i in range(0, len(stale_ids), _BATCH_SIZE):
+            session.query(EventRepository).filter(
+                EventRepository.id.in_(stale_ids[i:i + _BATCH_SIZE])
+            ).delete(synchronize_session=False)
+        return stale_ids
+
+    @staticmethod
+    def _publish_repo_update(data_type: str) -> None:
+        repo_msg = Message(
+            sender="repo_sync",
+            receiver=None,
+            data_type="agent_msg",
+            content=data_type,
+        )
+        repo_msg.event_topic = "repo_update"
+        DI.event_hub.publish(repo_msg)
+
     def get_event_by_id(self, event_id: str) -> dict:
         """
         Retrieves an event from the repository by its id.
@@ -155,6 +328,73 @@ class EventRepositoryManager:
         finally:
             session.close()
 
+    def query_events(
+        self,
+        data_type: str = None,
+        start: datetime = None,
+        end: datetime = None,
+        created_since: datetime = None,
+        event_id: str = None,
+        limit: int = None,
+    ) -> list:
+        """
+        Typed read path: filters run in SQL against the indexed columns.
+
+        Args:
+            data_type: Only events of this data type.
+            start, end: Only events overlapping the half-open window [start, end): ranged
+                        events need start_utc < end and end_utc > start; events without an
+                        end are instants and need start <= start_utc < end. Events without
+                        a start never match.
+            created_since: Only events created (or last changed) after this timestamp.
+            event_id: Only rows with this external event_id (all occurrences of a series).
+            limit: Maximum number of rows, ordered by start_utc.
+
+        Returns:
+            list[dict]: Dictionaries with 'id', 'event_id', 'data_type', 'data',
+                        'start_utc', 'end_utc' (UTC-aware datetimes or None) and 'created_at'.
+        """
+        session = self.session_factory()
+        try:
+            query = session.query(EventRepository)
+
+            if data_type:
+                query = query.filter(EventRepository.data_type == data_type)
+            if event_id:
+                query = query.filter(EventRepository.event_id == event_id)
+            if created_since is not None:
+                query = query.filter(EventRepository.created_at > created_since)
+            if start is not None or end is not None:
+                query = query.filter(EventRepository.start_utc.isnot(None))
+            if end is not None:
+                query = query.filter(EventRepository.start_utc < _as_utc(end))
+            if start is not None:
+                window_start = _as_utc(start)
+                query = query.filter(or_(
+                    EventRepository.end_utc > window_start,
+                    and_(EventRepository.end_utc.is_(None), EventRepository.start_utc >= window_start),
+                ))
+            if limit is not None:
+                query = query.order_by(EventRepository.start_utc).limit(limit)
+
+            return [
+                {
+                    "id": event.id,
+                    "event_id": event.event_id,
+                    "data_type": event.data_type,
+                    "data": event.data,
+                    "start_utc": _as_utc(event.start_utc),
+                    "end_utc": _as_utc(event.end_utc),
+                    "created_at": event.created_at,
+                }
+                for event in query.all()
+            ]
+        except SQLAlchemyError as e:
+            logger.error(f"Error querying events: {e}")
+            raise
+        finally:
+            session.close()
+
     def search_events(self, data_type: str = None, keyword: str = None) -> str:
         """
         Searches events by data_type and an optional keyword inside the JSON field.
@@ -261,66 +501,18 @@ class EventRepositoryManager:
         Returns:
             str: JSON string of new events.
         """
-        session = self.session_factory()
-        try:
-            query = session.query(EventRepository).filter(
-                EventRepository.data_type == category,
-                EventRepository.created_at > since_dt  # Use created_at column
-            )
-
-            events = query.all()
-
-            event_dicts = [
-                {"data_type": event.data_type, "data": event.data}
-                for event in events
-            ]
-
-            return json.dumps(event_dicts)
-
-        except SQLAlchemyError as e:
-            logger.error(f"Error fetching new events: {e}")
-            raise
-        finally:
-            session.close()
+        events = self.query_events(data_type=category, created_since=since_dt)
+        return json.dumps([{"data_type": event["data_type"], "data": event["data"]} for event in events])
 
     def sync_events_with_server(self, server_events: list, data_type: str):
-        from datetime import datetime, timezone, timedelta
-
         session = self.session_factory()
 
         try:
-            if data_type == "calendar":
-                # Existing behavior: reconcile against server_ids
-                server_ids = set(server_events)
-
-                db_events = session.query(EventRepository).filter(
-                    EventRepository.data_type == data_type
-                ).all()
-                db_ids = {event.id for event in db_events}
-                missing_ids = db_ids - server_ids
-
-                if missing_ids:
-                    deleted_count = session.query(EventRepository).filter(
-                        EventRepository.id.in_(missing_ids)
-                    ).delete(synchronize_session=False)
-                    session.commit()
-
-                    if deleted_count > 0:
-                        logger.info(f"🗑️ Cleaned up {deleted_count} stale calendar events")
+            deleted_ids = self._prune_stale(session, data_type, set(server_events))
+            session.commit()
 
-            else:
-                # Email and other transient types: sliding time window only.
-                # Ignore server_events; just enforce retention.
-                cutoff_time = datetime.now(timezone.utc) - timedelta(hours=10)
-
-                deleted_count = session.query(EventRepository).filter(
-                    EventRepository.data_type == data_type,
-                    EventRepository.created_at < cutoff_time,
-                    ).delete(synchronize_session=False)
-                session.commit()
-
-                if deleted_count > 0:
-                    logger.info(f"🗑️ Cleaned up {deleted_count} old '{data_type}' events")
+            if deleted_ids:
+                logger.info(f"🗑️ Cleaned up {len(deleted_ids)} stale '{data_type}' events")
 
         except SQLAlchemyError as e:
             session.rollback()
@@ -330,14 +522,7 @@ class EventRepositoryManager:
             session.close()
 
         # Notify system of repo update
-        repo_msg = Message(
-            sender="repo_sync",
-            receiver=None,
-            data_type="agent_msg",
-            content=data_type,
-        )
-        repo_msg.event_topic = "repo_update"
-        DI.event_hub.publish(repo_msg)
+        self._publish_repo_update(data_type)
 
 
 
@@ -1,18 +1,43 @@
 from datetime import datetime, timezone
 from typing import List, Optional, Iterable, Set
+import re
 import threading
+from app.assistant.global_blackboard.message_store import MessageStore
+from app.assistant.utils.logging_config import get_logger
 from app.assistant.utils.pydantic_classes import Message
 
+logger = get_logger(__name__)
+
+# Marker EmiAgent / EntityCardInjector put in front of an injected entity card
+_ENTITY_CONTEXT_RE = re.compile(r"\[Entity Context - (.+?)\]")
+
+
+def _injected_entity_names(msg: Message) -> Set[str]:
+    """Entity names whose card this message carries (by tag+metadata, or by content marker)."""
+    names: Set[str] = set()
+    if "entity_card_injection" in (getattr(msg, "sub_data_type", []) or []):
+        metadata = getattr(msg, "metadata", None)
+        if isinstance(metadata, dict) and metadata.get("entity_name"):
+            names.add(metadata["entity_name"])
+    content = getattr(msg, "content", None)
+    if isinstance(content, str) and "[Entity Context - " in content:
+        names.update(_ENTITY_CONTEXT_RE.findall(content))
+    return names
+
 
 class GlobalBlackBoard():
-    def __init__(self):
+    def __init__(self, max_in_memory: Optional[int] = None, spill_path: Optional[str] = None):
 
         self.socket_io = None
         self.socket_id = None
 
-        self.messages: List[Message] = []
+        # Indexed store; only the newest max_in_memory messages stay in memory, older ones spill to SQLite
+        self.message_store = MessageStore(max_in_memory=max_in_memory, spill_path=spill_path)
         self.messages_lock = threading.RLock()  # Thread safety for messages
 
+        # Entity names whose cards have been injected into the current message history
+        self.injected_entities: Set[str] = set()
+
         self.task = ""
 
         self.system_state_summary = {
@@ -57,27 +82,54 @@ class GlobalBlackBoard():
             elif ServiceLocator.memo_mode:
                 msg.memo_mode = True
                 
-            print("\nAdding a message to the global blackboard:", msg)
-            self.messages.append(msg)
+            logger.debug(f"Adding message to global blackboard: data_type={msg.data_type}, "
+                         f"sender={msg.sender}, receiver={msg.receiver}, id={msg.id}")
+            self.message_store.append(msg)
+            self.injected_entities.update(_injected_entity_names(msg))
+
+    def update_msg(self, msg: Message) -> bool:
+        """
+        Persist in-place edits to a stored message (re-indexes it, or rewrites its spilled copy).
+        Returns False if the message is not on the blackboard.
+        """
+        with self.messages_lock:
+            updated = self.message_store.update(msg)
+            if updated:
+                self.injected_entities.update(_injected_entity_names(msg))
+            return updated
 
     def clear_chat_messages(self):
         with self.messages_lock:
-            new_messages = []
-            for msg in self.messages:
-                if not msg.is_chat:
-                    new_messages.append(msg)
-            self.messages = new_messages
+            self.message_store.remove_chat()
+            self.injected_entities = set()
+            for msg in self.message_store:
+                self.injected_entities.update(_injected_entity_names(msg))
 
     def clear_messages(self):
         """
         Clear all messages from the messages list.
         """
         with self.messages_lock:
-            self.messages = []
+            self.message_store.clear()
+            self.injected_entities = set()
+
+    def has_injected_entity(self, entity_name: str) -> bool:
+        """True if an entity card for entity_name is already in the message history."""
+        with self.messages_lock:
+            return entity_name in self.injected_entities
+
+    def get_injected_entities(self) -> Set[str]:
+        with self.messages_lock:
+            return set(self.injected_entities)
 
     def get_all_messages(self):
+        """All messages, oldest first, including ones spilled out of memory."""
         with self.messages_lock:
-            return self.messages.copy()  # Return copy to prevent external modification
+            return list(self.message_store)
+
+    def message_count(self) -> int:
+        with self.messages_lock:
+            return len(self.message_store)
 
     def get_messages(
             self,
@@ -99,19 +151,12 @@ class GlobalBlackBoard():
         - List[Message]: List of filtered Message objects.
         """
         with self.messages_lock:
-            filtered_messages = []
-            for msg in self.messages:
-                if data_types and msg.data_type not in data_types:
-                    continue
-                if senders and msg.sender not in senders:
-                    continue
-                if receivers and msg.receiver not in receivers:
-                    continue
-                filtered_messages.append(msg)
-            if last_n:
-                return filtered_messages[-last_n:]
-            else:
-                return filtered_messages
+            return self.message_store.query(
+                data_types=data_types,
+                senders=senders,
+                receivers=receivers,
+                last_n=last_n or None,
+            )
 
     def get_messages_str(self, N: int = -1) -> str:
         """
@@ -124,13 +169,10 @@ class GlobalBlackBoard():
         - str: Concatenated string of message contents.
         """
         with self.messages_lock:
-            print("\nGetting messages at global blackboard: ", self.messages)
-            if N > len(self.messages):
-                N = len(self.messages)
             if N > 0:
-                hist_items = self.messages[-N:]
+                hist_items = self.message_store.tail(N)
             else:
-                hist_items = self.messages
+                hist_items = list(self.message_store)
             hist_str = ""
             for item in hist_items:
                 hist_str += " " + item.content if item.content else ""
@@ -147,11 +189,10 @@ class GlobalBlackBoard():
         Returns:
         - List[Message]: List of filtered Message objects.
         """
+        if not hist_types:
+            return []
         with self.messages_lock:
-            hist_grab = [hist for hist in self.messages if hist.data_type in hist_types]
-            if last_n is not None:
-                return hist_grab[-last_n:]
-            return hist_grab
+            return self.message_store.query(data_types=hist_types, last_n=last_n or None)
 
     def get_messages_by_sub_type(self, sub_types: List[str], last_n: Optional[int] = None) -> List[Message]:
         """
@@ -164,15 +205,10 @@ class GlobalBlackBoard():
         Returns:
         - List[Message]: List of filtered Message objects.
         """
+        if not sub_types:
+            return []
         with self.messages_lock:
-            want = set(sub_types or [])
-            hist_grab = [
-                hist for hist in self.messages
-                if want.intersection(set(getattr(hist, "sub_data_type", []) or []))
-            ]
-            if last_n is not None:
-                return hist_grab[-last_n:]
-            return hist_grab
+            return self.message_store.query(sub_types=sub_types, last_n=last_n or None)
 
     def get_recent_chat_since_utc(
         self,
@@ -232,7 +268,8 @@ class GlobalBlackBoard():
         allowed_scopes = {s for s in (include_command_scopes or []) if isinstance(s, str) and s}
 
         with self.messages_lock:
-            msgs = self.messages.copy()
+            # Chat messages newer than the cutoff, straight from the is_chat / timestamp indexes
+            msgs = self.message_store.query(is_chat=True, since=cutoff, sub_types=required_any or None)
 
         selected: List[tuple[datetime, Message]] = []
         for m in msgs:
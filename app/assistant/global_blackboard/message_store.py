@@ -0,0 +1,424 @@
+"""
+Indexed, bounded message store backing GlobalBlackBoard.
+
+- Append is O(1); messages get a monotonically increasing sequence number.
+- Secondary indexes (data_type, sub_data_type tags, sender, receiver, scope_id, is_chat)
+  map a key to the ascending list of sequence numbers carrying it, so filtered tail
+  queries walk only the matching entries, newest first, and stop at `last_n`.
+- Only the newest `max_in_memory` messages stay in memory. Older messages are spilled
+  to a per-process SQLite file (indexed on the same fields plus timestamp) and remain
+  queryable through the same API.
+
+Not thread-safe on its own: GlobalBlackBoard serializes access with messages_lock.
+"""
+
+from __future__ import annotations
+
+import atexit
+import json
+import os
+import sqlite3
+import tempfile
+from bisect import bisect_left
+from collections import OrderedDict
+from datetime import datetime, timezone
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+
+from app.assistant.utils.logging_config import get_logger
+from app.assistant.utils.pydantic_classes import Message, PlanStruct, ToolMessage
+
+logger = get_logger(__name__)
+
+DEFAULT_MAX_IN_MEMORY = 2000
+
+# Fields with a secondary index (sub_data_type is indexed per tag)
+INDEXED_FIELDS = ("data_type", "sub_data_type", "sender", "receiver", "scope_id", "is_chat")
+
+_MESSAGE_CLASSES = {cls.__name__: cls for cls in (Message, ToolMessage, PlanStruct)}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    seq INTEGER PRIMARY KEY,
+    msg_id TEXT,
+    cls TEXT NOT NULL,
+    data_type TEXT,
+    sender TEXT,
+    receiver TEXT,
+    scope_id TEXT,
+    is_chat INTEGER NOT NULL,
+    ts REAL,
+    payload TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS message_tags (seq INTEGER NOT NULL, tag TEXT NOT NULL);
+CREATE INDEX IF NOT EXISTS ix_messages_msg_id ON messages (msg_id);
+CREATE INDEX IF NOT EXISTS ix_messages_data_type ON messages (data_type, seq);
+CREATE INDEX IF NOT EXISTS ix_messages_sender ON messages (sender, seq);
+CREATE INDEX IF NOT EXISTS ix_messages_receiver ON messages (receiver, seq);
+CREATE INDEX IF NOT EXISTS ix_messages_scope_id ON messages (scope_id, seq);
+CREATE INDEX IF NOT EXISTS ix_messages_chat_ts ON messages (is_chat, ts);
+CREATE INDEX IF NOT EXISTS ix_messages_ts ON messages (ts);
+CREATE INDEX IF NOT EXISTS ix_message_tags_tag ON message_tags (tag, seq);
+CREATE INDEX IF NOT EXISTS ix_message_tags_seq ON message_tags (seq);
+"""
+
+
+def _to_utc(ts: Any) -> Optional[datetime]:
+    if not isinstance(ts, datetime):
+        return None
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return ts.astimezone(timezone.utc)
+
+
+def _index_keys(msg: Message) -> Dict[str, set]:
+    return {
+        "data_type": {msg.data_type},
+        "sub_data_type": set(getattr(msg, "sub_data_type", None) or []),
+        "sender": {msg.sender},
+        "receiver": {msg.receiver},
+        "scope_id": {getattr(msg, "scope_id", None)},
+        "is_chat": {bool(getattr(msg, "is_chat", False))},
+    }
+
+
+def _matches(msg: Message, filters: Dict[str, set], since: Optional[datetime]) -> bool:
+    for field, wanted in filters.items():
+        if field == "sub_data_type":
+            if not wanted.intersection(getattr(msg, "sub_data_type", None) or []):
+                return False
+        elif field == "is_chat":
+            if bool(getattr(msg, "is_chat", False)) not in wanted:
+                return False
+        elif getattr(msg, field, None) not in wanted:
+            return False
+    if since is not None:
+        ts = _to_utc(getattr(msg, "timestamp", None))
+        if ts is None or ts <= since:
+            return False
+    return True
+
+
+class MessageStore:
+    """Append-only message log with secondary indexes and an SQLite spill for old messages."""
+
+    def __init__(self, max_in_memory: Optional[int] = None, spill_path: Optional[str] = None):
+        if max_in_memory is None:
+            max_in_memory = int(os.environ.get("EMI_BLACKBOARD_MAX_IN_MEMORY", DEFAULT_MAX_IN_MEMORY))
+        self.max_in_memory = max(1, int(max_in_memory))
+        # Spill in chunks so SQLite writes are amortized over many appends
+        self._spill_chunk = max(1, self.max_in_memory // 10)
+
+        self._spill_path = spill_path
+        self._owns_spill_file = False
+        self._conn: Optional[sqlite3.Connection] = None
+        self._spilled = 0
+
+        self._next_seq = 0
+        self._hot: "OrderedDict[int, Message]" = OrderedDict()
+        self._seq_by_id: Dict[str, int] = {}
+        self._index: Dict[str, Dict[Any, List[int]]] = {field: {} for field in INDEXED_FIELDS}
+        # Index entries pointing at messages that left memory; pruned lazily
+        self._live_entries = 0
+        self._dead_entries = 0
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+
+    def append(self, msg: Message) -> int:
+        seq = self._next_seq
+        self._next_seq += 1
+        self._hot[seq] = msg
+        self._seq_by_id[msg.id] = seq
+        self._add_to_indexes(seq, msg)
+        if len(self._hot) > self.max_in_memory:
+            self._spill(len(self._hot) - self.max_in_memory + self._spill_chunk - 1)
+        return seq
+
+    def update(self, msg: Message) -> bool:
+        """
+        Re-index (or re-persist, if spilled) a message that was edited in place.
+        Returns False if the message is not in the store.
+        """
+        seq = self._seq_by_id.get(msg.id)
+        if seq is not None and seq in self._hot:
+            self._hot[seq] = msg
+            self._add_to_indexes(seq, msg)
+            return True
+        if self._conn is None:
+            return False
+        row = self._conn.execute(
+            "SELECT seq FROM messages WHERE msg_id = ? ORDER BY seq DESC LIMIT 1", (msg.id,)
+        ).fetchone()
+        if row is None:
+            return False
+        with self._conn:
+            self._conn.execute("DELETE FROM messages WHERE seq = ?", (row[0],))
+            self._conn.execute("DELETE FROM message_tags WHERE seq = ?", (row[0],))
+            self._write_rows([(row[0], msg)])
+        return True
+
+    def remove_chat(self) -> None:
+        """Drop every is_chat message, in memory and spilled."""
+        for seq in [s for s, m in self._hot.items() if m.is_chat]:
+            self._forget(seq)
+        if self._conn is not None:
+            with self._conn:
+                self._conn.execute(
+                    "DELETE FROM message_tags WHERE seq IN (SELECT seq FROM messages WHERE is_chat = 1)"
+                )
+                removed = self._conn.execute("DELETE FROM messages WHERE is_chat = 1").rowcount
+            self._spilled -= max(0, removed)
+        self._maybe_compact()
+
+    def clear(self) -> None:
+        self._hot.clear()
+        self._seq_by_id.clear()
+        self._index = {field: {} for field in INDEXED_FIELDS}
+        self._live_entries = self._dead_entries = 0
+        if self._conn is not None:
+            with self._conn:
+                self._conn.execute("DELETE FROM messages")
+                self._conn.execute("DELETE FROM message_tags")
+        self._spilled = 0
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+        if self._owns_spill_file and self._spill_path:
+            try:
+                os.remove(self._spill_path)
+            except OSError:
+                pass
+            self._owns_spill_file = False
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    def __len__(self) -> int:
+        return len(self._hot) + self._spilled
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "in_memory": len(self._hot),
+            "spilled": self._spilled,
+            "index_entries": self._live_entries + self._dead_entries,
+        }
+
+    def __iter__(self) -> Iterator[Message]:
+        """All messages, oldest first (spilled ones are streamed from SQLite)."""
+        if self._conn is not None:
+            for cls, payload in self._conn.execute("SELECT cls, payload FROM messages ORDER BY seq"):
+                yield self._load(cls, payload)
+        yield from list(self._hot.values())
+
+    def query(
+        self,
+        *,
+        data_types: Optional[Iterable[str]] = None,
+        sub_types: Optional[Iterable[str]] = None,
+        senders: Optional[Iterable[str]] = None,
+        receivers: Optional[Iterable[str]] = None,
+        scope_ids: Optional[Iterable[str]] = None,
+        is_chat: Optional[bool] = None,
+        since: Optional[datetime] = None,
+        last_n: Optional[int] = None,
+    ) -> List[Message]:
+        """
+        Messages matching every given filter (any-of within a filter), oldest first.
+
+        since: only messages with timestamp strictly after it.
+        last_n: only the newest n matches; spilled messages are read only when the
+                in-memory window does not already supply them.
+        """
+        filters: Dict[str, set] = {}
+        for field, values in (
+            ("data_type", data_types),
+            ("sub_data_type", sub_types),
+            ("sender", senders),
+            ("receiver", receivers),
+            ("scope_id", scope_ids),
+        ):
+            if values:
+                filters[field] = set(values)
+        if is_chat is not None:
+            filters["is_chat"] = {bool(is_chat)}
+        since = _to_utc(since) if since is not None else None
+        if last_n is not None and last_n <= 0:
+            return []
+
+        newest_first: List[Message] = []
+        for seq in self._candidates(filters):
+            msg = self._hot.get(seq)
+            if msg is None or not _matches(msg, filters, since):
+                continue
+            newest_first.append(msg)
+            if last_n is not None and len(newest_first) >= last_n:
+                break
+
+        if self._spilled and (last_n is None or len(newest_first) < last_n):
+            remaining = None if last_n is None else last_n - len(newest_first)
+            newest_first.extend(self._query_spilled(filters, since, remaining))
+
+        newest_first.reverse()
+        return newest_first
+
+    def tail(self, n: int) -> List[Message]:
+        """The newest n messages, oldest first."""
+        return self.query(last_n=n) if n > 0 else []
+
+    # ------------------------------------------------------------------
+    # In-memory indexes
+    # ------------------------------------------------------------------
+
+    def _add_to_indexes(self, seq: int, msg: Message) -> None:
+        for field, keys in _index_keys(msg).items():
+            index = self._index[field]
+            for key in keys:
+                seqs = index.setdefault(key, [])
+                if seqs and seqs[-1] >= seq:
+                    # Re-index after an in-place edit: keep the list sorted and unique
+                    pos = bisect_left(seqs, seq)
+                    if pos < len(seqs) and seqs[pos] == seq:
+                        continue
+                    seqs.insert(pos, seq)
+                else:
+                    seqs.append(seq)
+                self._live_entries += 1
+
+    def _forget(self, seq: int) -> Optional[Message]:
+        msg = self._hot.pop(seq, None)
+        if msg is None:
+            return None
+        if self._seq_by_id.get(msg.id) == seq:
+            del self._seq_by_id[msg.id]
+        entries = sum(len(keys) for keys in _index_keys(msg).values())
+        self._live_entries -= entries
+        self._dead_entries += entries
+        return msg
+
+    def _maybe_compact(self) -> None:
+        # Amortized O(1): rebuild once stale entries outnumber live ones
+        if self._dead_entries <= max(self._live_entries, 1024):
+            return
+        self._index = {field: {} for field in INDEXED_FIELDS}
+        self._live_entries = self._dead_entries = 0
+        for seq, msg in self._hot.items():
+            self._add_to_indexes(seq, msg)
+
+    def _candidates(self, filters: Dict[str, set]) -> Iterable[int]:
+        """Sequence numbers to check, newest first, from the most selective index."""
+        best: Optional[List[List[int]]] = None
+        best_size = len(self._hot)
+        for field, wanted in filters.items():
+            index = self._index[field]
+            lists = [index[key] for key in wanted if key in index]
+            size = sum(len(seqs) for seqs in lists)
+            if best is None or size < best_size:
+                best, best_size = lists, size
+        if best is None:
+            return reversed(self._hot)
+        if len(best) == 1:
+            return reversed(best[0])
+        return sorted(set().union(*best), reverse=True)
+
+    # ------------------------------------------------------------------
+    # SQLite spill
+    # ------------------------------------------------------------------
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            if not self._spill_path:
+                fd, self._spill_path = tempfile.mkstemp(prefix="emi_blackboard_", suffix=".db")
+                os.close(fd)
+                self._owns_spill_file = True
+                atexit.register(self.close)
+            self._conn = sqlite3.connect(self._spill_path, check_same_thread=False)
+            # Private, per-process scratch file: durability is not needed
+            self._conn.execute("PRAGMA synchronous=OFF")
+            self._conn.executescript(_SCHEMA)
+            logger.info(f"Global blackboard spilling messages older than the newest "
+                        f"{self.max_in_memory} to {self._spill_path}")
+        return self._conn
+
+    def _spill(self, count: int) -> None:
+        rows = []
+        for seq in list(islice(self._hot, count)):
+            msg = self._forget(seq)
+            if msg is not None:
+                rows.append((seq, msg))
+        if not rows:
+            return
+        with self._connection() as conn:
+            self._write_rows(rows, conn)
+        self._spilled += len(rows)
+        self._maybe_compact()
+
+    def _write_rows(self, rows: Sequence[tuple], conn: Optional[sqlite3.Connection] = None) -> None:
+        conn = conn or self._connection()
+        records, tags = [], []
+        for seq, msg in rows:
+            ts = _to_utc(getattr(msg, "timestamp", None))
+            records.append((
+                seq,
+                msg.id,
+                type(msg).__name__,
+                msg.data_type,
+                msg.sender,
+                msg.receiver,
+                getattr(msg, "scope_id", None),
+                1 if getattr(msg, "is_chat", False) else 0,
+                ts.timestamp() if ts else None,
+                msg.model_dump_json(fallback=str),
+            ))
+            tags.extend((seq, tag) for tag in set(getattr(msg, "sub_data_type", None) or []))
+        conn.executemany("INSERT INTO messages VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", records)
+        if tags:
+            conn.executemany("INSERT INTO message_tags VALUES (?, ?)", tags)
+
+    def _query_spilled(self, filters: Dict[str, set], since: Optional[datetime], limit: Optional[int]) -> List[Message]:
+        where, params = [], []
+        for field, wanted in filters.items():
+            values = list(wanted)
+            marks = ", ".join("?" for _ in values)
+            if field == "sub_data_type":
+                where.append(f"seq IN (SELECT seq FROM message_tags WHERE tag IN ({marks}))")
+                params.extend(values)
+            elif field == "is_chat":
+                where.append(f"is_chat IN ({marks})")
+                params.extend(1 if v else 0 for v in values)
+            else:
+                clauses = []
+                non_null = [v for v in values if v is not None]
+                if non_null:
+                    clauses.append(f"{field} IN ({', '.join('?' for _ in non_null)})")
+                    params.extend(non_null)
+                if len(non_null) < len(values):
+                    clauses.append(f"{field} IS NULL")
+                where.append("(" + " OR ".join(clauses) + ")")
+        if since is not None:
+            where.append("ts > ?")
+            params.append(since.timestamp())
+
+        sql = "SELECT cls, payload FROM messages"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY seq DESC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return [self._load(cls, payload) for cls, payload in self._connection().execute(sql, params)]
+
+    @staticmethod
+    def _load(cls_name: str, payload: str) -> Message:
+        cls = _MESSAGE_CLASSES.get(cls_name, Message)
+        try:
+            return cls.model_validate_json(payload)
+        except Exception:
+            # Payloads stringified by the fallback serializer may not validate as the subclass
+            return Message.model_validate(
+                {k: v for k, v in json.loads(payload).items() if k in Message.model_fields}
+            )
@@ -6,6 +6,8 @@ This replaces the embedding columns that were removed from SQLite models.
 
 Collections:
 - node_embeddings: Node label embeddings (keyed by node.id)
+- node_semantic_label_embeddings: Node semantic_label embeddings (keyed by node.id,
+  node_type in metadata, cosine space)
 - edge_embeddings: Edge sentence embeddings (keyed by edge.id)
 - taxonomy_embeddings: Taxonomy label embeddings (keyed by taxonomy.id)
 """
@@ -60,6 +62,12 @@ class ChromaEmbeddingManager:
                 metadata={"description": "Node label embeddings"}
             )
             
+            # Node semantic_label embeddings (cosine space so distance = 1 - cosine)
+            self.semantic_label_collection = self._client.get_or_create_collection(
+                name="node_semantic_label_embeddings",
+                metadata={"description": "Node semantic_label embeddings", "hnsw:space": "cosine"}
+            )
+            
             # Edge embeddings
             self.edge_collection = self._client.get_or_create_collection(
                 name="edge_embeddings",
@@ -74,6 +82,7 @@ class ChromaEmbeddingManager:
             
             logger.info(f"ChromaDB collections initialized:")
             logger.info(f"  - node_embeddings: {self.node_collection.count()} items")
+            logger.info(f"  - node_semantic_label_embeddings: {self.semantic_label_collection.count()} items")
             logger.info(f"  - edge_embeddings: {self.edge_collection.count()} items")
             logger.info(f"  - taxonomy_embeddings: {self.taxonomy_collection.count()} items")
             
@@ -83,13 +92,16 @@ class ChromaEmbeddingManager:
     
     # ==================== NODE EMBEDDINGS ====================
     
-    def store_node_embedding(self, node_id: str, label: str, embedding: List[float]):
+    def store_node_embedding(self, node_id: str, label: str, embedding: List[float], node_type: Optional[str] = None):
         """Store a node's label embedding"""
         try:
+            metadata = {"label": label}
+            if node_type:
+                metadata["node_type"] = node_type
             self.node_collection.upsert(
                 ids=[str(node_id)],
                 embeddings=[embedding],
-                metadatas=[{"label": label}]
+                metadatas=[metadata]
             )
             logger.debug(f"Stored embedding for node {node_id}: {label}")
         except Exception as e:
@@ -104,21 +116,67 @@ class ChromaEmbeddingManager:
                 include=["embeddings"]
             )
             
-            if result['embeddings'] and len(result['embeddings']) > 0:
+            if result['embeddings'] is not None and len(result['embeddings']) > 0:
                 return result['embeddings'][0]
             return None
         except Exception as e:
             logger.debug(f"Node embedding not found for {node_id}: {e}")
             return None
     
+    def get_node_embeddings(self, node_ids: List[str]) -> Dict[str, List[float]]:
+        """Get label embeddings for many nodes in one round-trip (missing ids are omitted)"""
+        if not node_ids:
+            return {}
+        try:
+            result = self.node_collection.get(
+                ids=[str(node_id) for node_id in node_ids],
+                include=["embeddings"]
+            )
+            embeddings = result.get('embeddings')
+            if embeddings is None:
+                return {}
+            return {node_id: list(embedding) for node_id, embedding in zip(result['ids'], embeddings)}
+        except Exception as e:
+            logger.error(f"Error getting node embeddings: {e}")
+            return {}
+    
+    def update_node_metadata(self, node_ids: List[str], labels: List[str], node_types: List[str]):
+        """Refresh label/node_type metadata for nodes already in the collection"""
+        if not node_ids:
+            return
+        try:
+            existing = set(self.node_collection.get(ids=[str(i) for i in node_ids], include=[])['ids'])
+            rows = [
+                (str(node_id), {"label": label, "node_type": node_type or ""})
+                for node_id, label, node_type in zip(node_ids, labels, node_types)
+                if str(node_id) in existing
+            ]
+            if rows:
+                self.node_collection.update(
+                    ids=[node_id for node_id, _ in rows],
+                    metadatas=[metadata for _, metadata in rows]
+                )
+        except Exception as e:
+            logger.error(f"Error updating node metadata: {e}")
+    
+    def is_node_type_indexed(self) -> bool:
+        """True once every node embedding carries node_type metadata (see semantic_label_index)"""
+        return bool((self.node_collection.metadata or {}).get("node_type_indexed"))
+    
+    def mark_node_type_indexed(self):
+        metadata = dict(self.node_collection.metadata or {})
+        metadata["node_type_indexed"] = True
+        self.node_collection.modify(metadata=metadata)
+    
     def search_similar_nodes(
         self, 
         query_embedding: List[float], 
         k: int = 10,
-        threshold: float = 0.0
+        threshold: float = 0.0,
+        node_type: Optional[str] = None
     ) -> List[Tuple[str, float, str]]:
         """
-        Search for similar nodes by embedding
+        Search for similar nodes by embedding, optionally restricted to one node_type
         
         Returns:
             List of (node_id, similarity_score, label)
@@ -127,6 +185,7 @@ class ChromaEmbeddingManager:
             results = self.node_collection.query(
                 query_embeddings=[query_embedding],
                 n_results=k,
+                where={"node_type": node_type} if node_type else None,
                 include=["metadatas", "distances"]
             )
             
@@ -153,11 +212,98 @@ class ChromaEmbeddingManager:
     
     def delete_node_embedding(self, node_id: str):
         """Delete a node's embedding"""
+        self.delete_node_embeddings([node_id])
+    
+    def delete_node_embeddings(self, node_ids: List[str]):
+        """Delete label embeddings for a batch of nodes"""
+        if not node_ids:
+            return
+        try:
+            self.node_collection.delete(ids=[str(node_id) for node_id in node_ids])
+            logger.debug(f"Deleted embeddings for {len(node_ids)} nodes")
+        except Exception as e:
+            logger.error(f"Error deleting node embeddings: {e}")
+    
+    # ==================== NODE SEMANTIC LABEL EMBEDDINGS ====================
+    
+    def store_semantic_label_embeddings(
+        self,
+        node_ids: List[str],
+        semantic_labels: List[str],
+        node_types: List[str],
+        embeddings: List[List[float]]
+    ):
+        """Store (upsert) semantic_label embeddings for a batch of nodes"""
+        if not node_ids:
+            return
+        try:
+            self.semantic_label_collection.upsert(
+                ids=[str(node_id) for node_id in node_ids],
+                embeddings=embeddings,
+                metadatas=[
+                    {"semantic_label": semantic_label, "node_type": node_type or ""}
+                    for semantic_label, node_type in zip(semantic_labels, node_types)
+                ]
+            )
+            logger.debug(f"Stored semantic_label embeddings for {len(node_ids)} nodes")
+        except Exception as e:
+            logger.error(f"Error storing semantic_label embeddings: {e}")
+            raise
+    
+    def store_semantic_label_embedding(self, node_id: str, semantic_label: str, node_type: str, embedding: List[float]):
+        """Store a node's semantic_label embedding"""
+        self.store_semantic_label_embeddings([node_id], [semantic_label], [node_type], [embedding])
+    
+    def search_similar_semantic_labels(
+        self,
+        query_embedding: List[float],
+        k: int = 10,
+        threshold: float = 0.0,
+        node_type: Optional[str] = None
+    ) -> List[Tuple[str, float, str]]:
+        """
+        Search for nodes with a similar semantic_label, optionally restricted to one node_type
+        
+        Returns:
+            List of (node_id, cosine_similarity, semantic_label)
+        """
+        try:
+            if self.semantic_label_collection.count() == 0:
+                return []
+            results = self.semantic_label_collection.query(
+                query_embeddings=[query_embedding],
+                n_results=k,
+                where={"node_type": node_type} if node_type else None,
+                include=["metadatas", "distances"]
+            )
+            
+            if not results['ids'] or len(results['ids']) == 0:
+                return []
+            
+            matches = []
+            for node_id, distance, metadata in zip(
+                results['ids'][0],
+                results['distances'][0],
+                results['metadatas'][0]
+            ):
+                similarity = 1 - distance
+                if similarity >= threshold:
+                    matches.append((node_id, similarity, metadata.get('semantic_label', '')))
+            
+            return matches
+        except Exception as e:
+            logger.error(f"Error searching similar semantic labels: {e}")
+            return []
+    
+    def delete_semantic_label_embeddings(self, node_ids: List[str]):
+        """Delete semantic_label embeddings for a batch of nodes"""
+        if not node_ids:
+            return
         try:
-            self.node_collection.delete(ids=[str(node_id)])
-            logger.debug(f"Deleted embedding for node {node_id}")
+            self.semantic_label_collection.delete(ids=[str(node_id) for node_id in node_ids])
+            logger.debug(f"Deleted semantic_label embeddings for {len(node_ids)} nodes")
         except Exception as e:
-            logger.error(f"Error deleting node embedding: {e}")
+            logger.error(f"Error deleting semantic_label embeddings: {e}")
     
     # ==================== EDGE EMBEDDINGS ====================
     
@@ -312,6 +458,7 @@ class ChromaEmbeddingManager:
         """Delete all embeddings (use with caution!)"""
         logger.warning("Resetting all ChromaDB collections...")
         self._client.delete_collection("node_embeddings")
+        self._client.delete_collection("node_semantic_label_embeddings")
         self._client.delete_collection("edge_embeddings")
         self._client.delete_collection("taxonomy_embeddings")
         self._init_collections()
@@ -321,6 +468,7 @@ class ChromaEmbeddingManager:
         """Get statistics about stored embeddings"""
         return {
             "nodes": self.node_collection.count(),
+            "node_semantic_labels": self.semantic_label_collection.count(),
             "edges": self.edge_collection.count(),
             "taxonomy": self.taxonomy_collection.count()
         }
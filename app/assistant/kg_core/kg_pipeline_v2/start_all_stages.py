@@ -56,6 +56,8 @@ try:
         process = subprocess.Popen(
             [sys.executable, stage_script],
             # stdout and stderr go directly to terminal (not captured)
+            # Stage LLM calls are batch work: let the governor queue them behind chat
+            env={**os.environ, "EMI_LLM_PRIORITY": os.environ.get("EMI_LLM_PRIORITY", "background")},
         )
         
         processes.append((stage_name, process))
@@ -8,7 +8,7 @@ Run this manually after initializing the database:
 from app.models.base import get_session
 from app.assistant.kg_core.knowledge_graph_db import Node, Edge
 from datetime import datetime, timezone
-from sentence_transformers import SentenceTransformer
+from app.assistant.utils.embedding_service import get_embedding_service
 import uuid
 
 
@@ -19,9 +19,9 @@ def seed_core_nodes():
     
     # Create embedding model
     print("Loading embedding model...")
-    embedding_model = SentenceTransformer("all-MiniLM-L6-v2")
+    embedding_service = get_embedding_service()
     def create_embedding(text):
-        return embedding_model.encode(text).tolist()
+        return embedding_service.encode(text)
     
     print("=" * 80)
     print("SEEDING CORE NODES AND RELATIONSHIP")
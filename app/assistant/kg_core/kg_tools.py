@@ -12,11 +12,6 @@ from sqlalchemy import create_engine
 from app.assistant.kg_core.knowledge_graph_utils import KnowledgeGraphUtils
 from collections import deque
 
-from sentence_transformers import SentenceTransformer
-
-# Initialize embedding model (can be shared across instances)
-embedding_model = SentenceTransformer("all-MiniLM-L6-v2")
-
 from typing import Any, Dict, List, Union, Optional
 from app.assistant.kg_core.knowledge_graph_db_sqlite import Node, Edge
 from sqlalchemy.orm import Session
@@ -1336,10 +1331,12 @@ def semantic_find_node_by_text(text: str, session: Session, threshold: float = 0
         else:
             # Do semantic search manually on filtered nodes
             new_embedding = kg_utils.create_embedding(text)
+            label_embeddings = kg_utils.get_label_embeddings(filtered_nodes)
             similarities = []
             for node in filtered_nodes:
-                if node.label_embedding is not None:
-                    sim = kg_utils.cosine_similarity(new_embedding, node.label_embedding)
+                node_embedding = label_embeddings.get(node.id)
+                if node_embedding is not None:
+                    sim = kg_utils.cosine_similarity(new_embedding, node_embedding)
                     if sim >= threshold:
                         similarities.append((node, sim))
             
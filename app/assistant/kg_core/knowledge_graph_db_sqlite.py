@@ -90,7 +90,7 @@ class Node(Base):
             try:
                 kg_utils = KnowledgeGraphUtils(session)
                 embedding = kg_utils.create_embedding(self.label)
-                chroma.store_node_embedding(str(self.id), self.label, embedding)
+                chroma.store_node_embedding(str(self.id), self.label, embedding, node_type=self.node_type)
             finally:
                 session.close()  # Always close the session!
         
@@ -182,6 +182,10 @@ class Edge(Base):
 # Node type constants for compatibility
 NODE_TYPES = ['Entity', 'Event', 'State', 'Goal', 'Concept', 'Property']
 
+# Keep the ChromaDB semantic_label index in sync with node writes/deletes
+from app.assistant.kg_core.semantic_label_index import register_semantic_label_index_sync
+register_semantic_label_index_sync()
+
 
 # --- Database Management Functions ---
 def initialize_knowledge_graph_db():
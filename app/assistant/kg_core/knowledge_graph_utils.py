@@ -12,17 +12,8 @@ from app.assistant.utils.logging_config import get_logger
 logger = get_logger(__name__)
 from app.models.base import get_session
 from app.assistant.utils.pydantic_classes import Message
+from app.assistant.utils.embedding_service import get_embedding_service
 
-# Lazy-load embedding model to avoid heavy imports during test initialization
-_embedding_model = None
-
-def _get_embedding_model():
-    """Lazy-load the sentence transformer model."""
-    global _embedding_model
-    if _embedding_model is None:
-        from sentence_transformers import SentenceTransformer
-        _embedding_model = SentenceTransformer("all-MiniLM-L6-v2")
-    return _embedding_model
 
 class KnowledgeGraphUtils:
     """
@@ -49,7 +40,6 @@ class KnowledgeGraphUtils:
         self._owns_session = session is None  # Only close sessions we create
         self._session_factory = session_factory or get_session
         self.session = session or self._session_factory()
-        self._embedding_model = None
 
     def close_session(self):
         """
@@ -84,14 +74,16 @@ class KnowledgeGraphUtils:
 
     @property
     def embedding_model(self):
-        """Lazy-load embedding model on first access."""
-        if self._embedding_model is None:
-            self._embedding_model = _get_embedding_model()
-        return self._embedding_model
+        """Shared process-wide embedding model (loaded lazily by the embedding service)."""
+        return get_embedding_service().model
 
     def create_embedding(self, text: str) -> List[float]:
         """Create semantic embedding for text."""
-        return self.embedding_model.encode(text).tolist()
+        return get_embedding_service().encode(text)
+
+    def create_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """Create semantic embeddings for many texts in one forward pass."""
+        return get_embedding_service().encode_many(texts)
 
     def cosine_similarity(self, vec1, vec2) -> float:
         """Calculate cosine similarity between two vectors."""
@@ -154,33 +146,34 @@ class KnowledgeGraphUtils:
                               max_results: int = 5) -> List[Tuple[Node, float]]:
         """
         Finds nodes with semantically similar labels, optionally filtered by type.
-        Uses ChromaDB for fast vector similarity search.
+        Uses ChromaDB for fast vector similarity search (type filter applied inside ChromaDB).
         """
         from app.assistant.kg_core.chroma_embedding_manager import get_chroma_manager
+        from app.assistant.kg_core.semantic_label_index import ensure_node_type_metadata
         
         # Generate embedding for query
         query_embedding = self.create_embedding(label)
         
         # Use ChromaDB for fast similarity search
         chroma = get_chroma_manager()
+        if node_type_value:
+            ensure_node_type_metadata(self.session)
         similar_node_ids = chroma.search_similar_nodes(
             query_embedding,
-            k=max_results * 3,  # Get more candidates for filtering
-            threshold=similarity_threshold
+            k=max_results,
+            threshold=similarity_threshold,
+            node_type=node_type_value
         )
         
-        # Fetch actual nodes and filter by type if needed
+        # Fetch actual nodes in one query, keeping ChromaDB's ranking
+        nodes_by_id = {node.id: node for node in self.get_nodes_by_ids([node_id for node_id, _, _ in similar_node_ids])}
         results = []
         for node_id, similarity, _ in similar_node_ids:
-            node = self.session.query(Node).filter(Node.id == node_id).first()
-            if node:
-                # Filter by node type if specified
-                if node_type_value is None or node.node_type == node_type_value:
-                    results.append((node, similarity))
-                    if len(results) >= max_results:
-                        break
+            node = nodes_by_id.get(node_id)
+            if node and (node_type_value is None or node.node_type == node_type_value):
+                results.append((node, similarity))
         
-        return results
+        return results[:max_results]
 
 
     def find_merge_candidates(self, label: str, node_type: str = None, semantic_label: str = None, category: str = None, k: int = 5) -> List[Node]:
@@ -259,28 +252,23 @@ class KnowledgeGraphUtils:
         ranked = self._rank_candidates(list(candidates.values()), label_embedding, semantic_label_embedding, category)
         return ranked[:k]
     
-    def _find_by_semantic_label(self, semantic_label: str, node_type: str = None, threshold: float = 0.75) -> List[Node]:
-        """Find nodes by semantic_label similarity."""
+    def _find_by_semantic_label(self, semantic_label: str, node_type: str = None, threshold: float = 0.75, max_results: int = 20) -> List[Node]:
+        """Find nodes by semantic_label similarity (single ANN query against the ChromaDB semantic_label index)."""
+        from app.assistant.kg_core.chroma_embedding_manager import get_chroma_manager
+        from app.assistant.kg_core.semantic_label_index import ensure_semantic_label_index
+
+        ensure_semantic_label_index(self.session)
         semantic_embedding = self.create_embedding(semantic_label)
-        query = self.session.query(Node)
-        
-        if node_type:
-            query = query.filter(Node.node_type == node_type)
-        
-        # Filter nodes that have a semantic_label
-        query = query.filter(Node.semantic_label.isnot(None))
-        
-        all_nodes = query.all()
-        matches = []
-        
-        for node in all_nodes:
-            if node.semantic_label:
-                node_semantic_embedding = self.create_embedding(node.semantic_label)
-                similarity = self.cosine_similarity(semantic_embedding, node_semantic_embedding)
-                if similarity >= threshold:
-                    matches.append(node)
-        
-        return matches
+        hits = get_chroma_manager().search_similar_semantic_labels(
+            semantic_embedding,
+            k=max_results,
+            threshold=threshold,
+            node_type=node_type
+        )
+        if not hits:
+            return []
+
+        return self.get_nodes_by_ids([node_id for node_id, _, _ in hits])
     
     def _rank_candidates(self, candidates: List[Node], label_embedding, semantic_label_embedding, category: str = None) -> List[Node]:
         """
@@ -295,17 +283,25 @@ class KnowledgeGraphUtils:
         
         scored_candidates = []
         
+        # Batch lookups: one ChromaDB round-trip for label embeddings, one encode pass for semantic labels
+        label_embeddings = self.get_label_embeddings(candidates) if label_embedding is not None else {}
+        semantic_embeddings = {}
+        if semantic_label_embedding is not None:
+            semantic_texts = list(dict.fromkeys(c.semantic_label for c in candidates if c.semantic_label))
+            semantic_embeddings = dict(zip(semantic_texts, self.create_embeddings(semantic_texts)))
+        
         for candidate in candidates:
             score = 0.0
             
             # 1. Label similarity (weight: 40%)
-            if candidate.label_embedding is not None and label_embedding is not None:
-                label_sim = self.cosine_similarity(label_embedding, candidate.label_embedding)
+            candidate_label_embedding = label_embeddings.get(candidate.id)
+            if candidate_label_embedding is not None and label_embedding is not None:
+                label_sim = self.cosine_similarity(label_embedding, candidate_label_embedding)
                 score += label_sim * 0.4
             
             # 2. Semantic_label similarity (weight: 30%)
             if semantic_label_embedding is not None and candidate.semantic_label:
-                candidate_semantic_embedding = self.create_embedding(candidate.semantic_label)
+                candidate_semantic_embedding = semantic_embeddings[candidate.semantic_label]
                 semantic_sim = self.cosine_similarity(semantic_label_embedding, candidate_semantic_embedding)
                 score += semantic_sim * 0.3
             
@@ -335,6 +331,24 @@ class KnowledgeGraphUtils:
         
         return [cand for cand, score in scored_candidates]
 
+    def get_label_embeddings(self, nodes: List[Node]) -> Dict[str, List[float]]:
+        """
+        Label embeddings for many nodes: one ChromaDB get, plus one batched encode/store
+        for any node whose embedding is missing (same fallback as Node.label_embedding).
+        """
+        from app.assistant.kg_core.chroma_embedding_manager import get_chroma_manager
+
+        if not nodes:
+            return {}
+        chroma = get_chroma_manager()
+        embeddings = chroma.get_node_embeddings([node.id for node in nodes])
+        missing = [node for node in nodes if node.id not in embeddings]
+        if missing:
+            for node, embedding in zip(missing, self.create_embeddings([node.label for node in missing])):
+                chroma.store_node_embedding(str(node.id), node.label, embedding, node_type=node.node_type)
+                embeddings[node.id] = embedding
+        return embeddings
+
     def find_similar_nodes(self, label: str, node_type: str) -> List[Tuple[Node, float, str]]:
         """
         Prefers exact match on (label, node_type), falls back to fuzzy matching.
@@ -421,7 +435,7 @@ class KnowledgeGraphUtils:
         from app.assistant.kg_core.chroma_embedding_manager import get_chroma_manager
         chroma = get_chroma_manager()
         label_embedding = self.create_embedding(label)
-        chroma.store_node_embedding(str(node_id), label, label_embedding)
+        chroma.store_node_embedding(str(node_id), label, label_embedding, node_type=node_type)
 
         # Add the new node to the session and commit immediately
         # SQLite single-writer: commit after each write to avoid lock contention
@@ -981,6 +995,17 @@ class KnowledgeGraphUtils:
     # ──────────────────  TYPE HELPERS  ───────────────────────
     # Valid node types: Entity, Event, State, Goal, Concept, Property
 
+    def get_nodes_by_ids(self, node_ids: List[str]) -> List[Node]:
+        """
+        Fetch many nodes with a single IN query. Returns them in the order of node_ids
+        (duplicates and unknown ids are dropped).
+        """
+        node_ids = list(dict.fromkeys(str(node_id) for node_id in node_ids))
+        if not node_ids:
+            return []
+        nodes_by_id = {node.id: node for node in self.session.query(Node).filter(Node.id.in_(node_ids)).all()}
+        return [nodes_by_id[node_id] for node_id in node_ids if node_id in nodes_by_id]
+
     def get_node_by_id(self, node_id: uuid.UUID) -> Optional[Node]:
         """
         Retrieves a single node by its primary key (ID).
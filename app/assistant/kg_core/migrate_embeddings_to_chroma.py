@@ -45,7 +45,7 @@ def migrate_node_embeddings():
                 embedding = kg_utils.create_embedding(node.label)
                 
                 # Store in ChromaDB
-                chroma.store_node_embedding(str(node.id), node.label, embedding)
+                chroma.store_node_embedding(str(node.id), node.label, embedding, node_type=node.node_type)
                 success_count += 1
                 
             except Exception as e:
@@ -60,6 +60,22 @@ def migrate_node_embeddings():
         session.close()
 
 
+def migrate_semantic_label_embeddings():
+    """Generate and store semantic_label embeddings for all nodes that have one"""
+    print("\n" + "="*80)
+    print("MIGRATING NODE SEMANTIC_LABEL EMBEDDINGS TO CHROMADB")
+    print("="*80)
+    
+    from app.assistant.kg_core.semantic_label_index import rebuild_semantic_label_index
+    
+    session = get_session()
+    try:
+        count = rebuild_semantic_label_index(session)
+        print(f"\n✅ Semantic label migration complete: {count} nodes indexed")
+    finally:
+        session.close()
+
+
 def migrate_edge_embeddings():
     """Generate and store embeddings for all edges with sentences"""
     print("\n" + "="*80)
@@ -155,6 +171,7 @@ def main():
     print("="*80)
     print("\nThis script will generate embeddings for all existing:")
     print("  - Nodes (label embeddings)")
+    print("  - Nodes (semantic_label embeddings)")
     print("  - Edges (sentence embeddings)")
     print("  - Taxonomy (label embeddings)")
     print("\nThis may take a while depending on the size of your database.")
@@ -167,6 +184,7 @@ def main():
     try:
         # Migrate all embeddings
         migrate_node_embeddings()
+        migrate_semantic_label_embeddings()
         migrate_edge_embeddings()
         migrate_taxonomy_embeddings()
         
@@ -179,6 +197,7 @@ def main():
         print("="*80)
         print(f"\nChromaDB Statistics:")
         print(f"  - Nodes: {stats['nodes']} embeddings")
+        print(f"  - Node semantic labels: {stats['node_semantic_labels']} embeddings")
         print(f"  - Edges: {stats['edges']} embeddings")
         print(f"  - Taxonomy: {stats['taxonomy']} embeddings")
         print(f"\n✅ All embeddings migrated successfully!")
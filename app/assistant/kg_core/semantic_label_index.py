@@ -0,0 +1,217 @@
+"""
+semantic_label_index.py - keeps the ChromaDB semantic_label collection (and the node_type
+metadata on node_embeddings) in sync with kg_node_metadata.
+
+Every SQLAlchemy session is watched:
+- after_flush records nodes whose semantic_label / label / node_type changed, and deleted nodes
+  (only deleted nodes lose their node_embeddings entry; a cleared label only drops the
+  semantic_label entry)
+- after_commit pushes those changes to ChromaDB (one batched embed + upsert/delete)
+- after_rollback discards them
+
+This covers create_node, update_node, intelligent_merge_nodes, the pipelines that
+assign node.semantic_label directly and the various maintenance deletes, without
+each writer having to remember to touch ChromaDB.
+"""
+
+import threading
+from typing import Any, Dict
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from app.assistant.utils.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+_PENDING_KEY = "_kg_semantic_label_pending"
+
+_registered = False
+_register_lock = threading.Lock()
+
+_backfill_checked = False
+_backfill_lock = threading.Lock()
+
+_node_type_checked = False
+
+
+def _pending(session: Session) -> Dict[str, Any]:
+    state = session.info.get(_PENDING_KEY)
+    if state is None:
+        state = {"upserts": {}, "deletes": set(), "removed": set(), "metadata": {}}
+        session.info[_PENDING_KEY] = state
+    return state
+
+
+def _attr_changed(obj, attr: str) -> bool:
+    return inspect(obj).attrs[attr].history.has_changes()
+
+
+def _after_flush(session: Session, flush_context) -> None:
+    from app.assistant.kg_core.knowledge_graph_db_sqlite import Node
+
+    for obj in session.new:
+        if not isinstance(obj, Node):
+            continue
+        if _PENDING_KEY in session.info:
+            # Deleted and re-created within one transaction
+            session.info[_PENDING_KEY]["removed"].discard(str(obj.id))
+        if obj.semantic_label:
+            state = _pending(session)
+            state["upserts"][str(obj.id)] = (obj.semantic_label, obj.node_type)
+            state["deletes"].discard(str(obj.id))
+
+    for obj in session.dirty:
+        if not isinstance(obj, Node):
+            continue
+        node_id = str(obj.id)
+        type_changed = _attr_changed(obj, "node_type")
+        if type_changed or _attr_changed(obj, "label"):
+            _pending(session)["metadata"][node_id] = (obj.label, obj.node_type)
+        if not (type_changed or _attr_changed(obj, "semantic_label")):
+            continue
+        state = _pending(session)
+        if obj.semantic_label:
+            state["upserts"][node_id] = (obj.semantic_label, obj.node_type)
+            state["deletes"].discard(node_id)
+        else:
+            state["upserts"].pop(node_id, None)
+            state["deletes"].add(node_id)
+
+    for obj in session.deleted:
+        if isinstance(obj, Node):
+            state = _pending(session)
+            state["upserts"].pop(str(obj.id), None)
+            state["metadata"].pop(str(obj.id), None)
+            state["deletes"].add(str(obj.id))
+            state["removed"].add(str(obj.id))
+
+
+def _after_commit(session: Session) -> None:
+    state = session.info.pop(_PENDING_KEY, None)
+    if not state:
+        return
+    upserts, deletes, metadata_updates = state["upserts"], state["deletes"], state["metadata"]
+    removed = state["removed"]
+    if not upserts and not deletes and not removed and not metadata_updates:
+        return
+    try:
+        from app.assistant.kg_core.chroma_embedding_manager import get_chroma_manager
+        from app.assistant.utils.embedding_service import get_embedding_service
+
+        chroma = get_chroma_manager()
+        if deletes:
+            chroma.delete_semantic_label_embeddings(sorted(deletes))
+        if removed:
+            chroma.delete_node_embeddings(sorted(removed))
+        if metadata_updates:
+            node_ids = list(metadata_updates.keys())
+            chroma.update_node_metadata(
+                node_ids,
+                [metadata_updates[i][0] for i in node_ids],
+                [metadata_updates[i][1] for i in node_ids]
+            )
+        if upserts:
+            node_ids = list(upserts.keys())
+            semantic_labels = [upserts[i][0] for i in node_ids]
+            node_types = [upserts[i][1] for i in node_ids]
+            embeddings = get_embedding_service().encode_many(semantic_labels)
+            chroma.store_semantic_label_embeddings(node_ids, semantic_labels, node_types, embeddings)
+    except Exception as e:
+        # The SQL commit already succeeded; the index is repaired on the next change or rebuild.
+        logger.error(
+            f"Failed to sync semantic_label index ({len(upserts)} upserts, {len(deletes)} deletes, "
+            f"{len(removed)} removed nodes): {e}"
+        )
+
+
+def _after_rollback(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
+
+
+def register_semantic_label_index_sync() -> None:
+    """Attach the session listeners (idempotent)."""
+    global _registered
+    if _registered:
+        return
+    with _register_lock:
+        if _registered:
+            return
+        event.listen(Session, "after_flush", _after_flush)
+        event.listen(Session, "after_commit", _after_commit)
+        event.listen(Session, "after_rollback", _after_rollback)
+        _registered = True
+
+
+def rebuild_semantic_label_index(session: Session, batch_size: int = 256) -> int:
+    """Re-embed every node's semantic_label into ChromaDB. Returns the number of nodes indexed."""
+    from app.assistant.kg_core.chroma_embedding_manager import get_chroma_manager
+    from app.assistant.kg_core.knowledge_graph_db_sqlite import Node
+    from app.assistant.utils.embedding_service import get_embedding_service
+
+    chroma = get_chroma_manager()
+    rows = (
+        session.query(Node.id, Node.semantic_label, Node.node_type)
+        .filter(Node.semantic_label.isnot(None))
+        .filter(Node.semantic_label != "")
+        .all()
+    )
+    for start in range(0, len(rows), batch_size):
+        chunk = rows[start:start + batch_size]
+        embeddings = get_embedding_service().encode_many([r.semantic_label for r in chunk])
+        chroma.store_semantic_label_embeddings(
+            [str(r.id) for r in chunk],
+            [r.semantic_label for r in chunk],
+            [r.node_type for r in chunk],
+            embeddings,
+        )
+    logger.info(f"Semantic label index rebuilt: {len(rows)} nodes")
+    return len(rows)
+
+
+def ensure_semantic_label_index(session: Session) -> None:
+    """Backfill the collection once per process if it is empty but nodes carry semantic labels."""
+    global _backfill_checked
+    if _backfill_checked:
+        return
+    with _backfill_lock:
+        if _backfill_checked:
+            return
+        from app.assistant.kg_core.chroma_embedding_manager import get_chroma_manager
+        from app.assistant.kg_core.knowledge_graph_db_sqlite import Node
+
+        if get_chroma_manager().semantic_label_collection.count() == 0:
+            has_labels = session.query(Node.id).filter(Node.semantic_label.isnot(None)).first() is not None
+            if has_labels:
+                logger.info("Semantic label index is empty - backfilling from kg_node_metadata")
+                rebuild_semantic_label_index(session)
+        _backfill_checked = True
+
+
+def ensure_node_type_metadata(session: Session, batch_size: int = 1000) -> None:
+    """
+    Backfill node_type metadata on node_embeddings once, so label searches can filter
+    by type inside ChromaDB. Entries written by older code only carry the label.
+    """
+    global _node_type_checked
+    if _node_type_checked:
+        return
+    with _backfill_lock:
+        if _node_type_checked:
+            return
+        from app.assistant.kg_core.chroma_embedding_manager import get_chroma_manager
+        from app.assistant.kg_core.knowledge_graph_db_sqlite import Node
+
+        chroma = get_chroma_manager()
+        if not chroma.is_node_type_indexed():
+            rows = session.query(Node.id, Node.label, Node.node_type).all()
+            logger.info(f"Backfilling node_type metadata for {len(rows)} node embeddings")
+            for start in range(0, len(rows), batch_size):
+                chunk = rows[start:start + batch_size]
+                chroma.update_node_metadata(
+                    [str(r.id) for r in chunk],
+                    [r.label for r in chunk],
+                    [r.node_type for r in chunk]
+                )
+            chroma.mark_node_type_indexed()
+        _node_type_checked = True
@@ -14,6 +14,7 @@ from app.assistant.entity_management.entity_cards import (
     get_entity_card_stats,
     initialize_entity_cards_db
 )
+from app.assistant.entity_management.entity_card_cache import get_entity_card_cache
 from app.models.maintenance_logs import (
     get_last_maintenance_run_time,
     log_maintenance_run,
@@ -147,6 +148,9 @@ def run_entity_card_pipeline(min_outgoing_edges: int = 0, incremental: bool = Fa
         run_duration_seconds=run_duration
     )
     
+    # Cards were rewritten in bulk; drop every cached card in this process
+    get_entity_card_cache().invalidate()
+
     logger.info(f"Pipeline completed: {processed_count} processed, {error_count} errors, {skipped_count} skipped, {agent_rejected_count} agent rejected")
     logger.info(f"Run duration: {run_duration:.2f} seconds")
     
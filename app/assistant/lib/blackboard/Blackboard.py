@@ -1,5 +1,6 @@
 import json
-from typing import List, Any
+from heapq import merge
+from typing import Dict, List, Any, Optional
 from app.assistant.utils.pydantic_classes import Message, PlanStruct
 from app.assistant.utils.logging_config import get_logger
 logger = get_logger(__name__)
@@ -23,17 +24,51 @@ class Blackboard:
 
         # Messages are a single, global log for the entire task.
         self.messages: List[Message] = []
-        self.messages = []
         self.results = []
         self.tool_results = []
         self.history = []
         self.request_id = None
+        self._reset_message_index()
+
+    # --- Message indexes (positions into self.messages, maintained by add_msg) ---
+
+    def _reset_message_index(self):
+        self._indexed_list: Optional[List[Message]] = None
+        self._indexed_len = 0
+        self._scope_positions: Dict[str, List[int]] = {}
+        self._agent_positions: Dict[str, List[int]] = {}
+        self._shared_positions: List[int] = []  # messages every agent sees
+        self._last_plan_index: Optional[int] = None
+        self._plan_count = 0
+
+    def _index_message(self, i: int, msg: Message):
+        if msg.scope_id:
+            self._scope_positions.setdefault(msg.scope_id, []).append(i)
+        self._agent_positions.setdefault(msg.sender, []).append(i)
+        if msg.receiver != msg.sender:
+            self._agent_positions.setdefault(msg.receiver, []).append(i)
+        if msg.receiver is None or msg.receiver == "Any" and msg.data_type in ["tool_result", "tool_request"]:
+            self._shared_positions.append(i)
+        if "plan" in (getattr(msg, "sub_data_type", []) or []):
+            self._last_plan_index = i
+            self._plan_count += 1
+
+    def _ensure_message_index(self):
+        """Rebuild the indexes if self.messages was replaced or modified outside add_msg."""
+        if self._indexed_list is self.messages and self._indexed_len == len(self.messages):
+            return
+        self._reset_message_index()
+        for i, msg in enumerate(self.messages):
+            self._index_message(i, msg)
+        self._indexed_list = self.messages
+        self._indexed_len = len(self.messages)
 
     def get_messages_for_scope(self, scope_id: str) -> List[Message]:
         """Get all messages that match a specific scope_id."""
         if not scope_id:
             return []
-        return [msg for msg in self.messages if msg.scope_id == scope_id]
+        self._ensure_message_index()
+        return [self.messages[i] for i in self._scope_positions.get(scope_id, [])]
 
     def set_task(self, task):
         """Set the task inside the state dictionary."""
@@ -55,6 +90,7 @@ class Blackboard:
         """Resets the blackboard to its initial state, including scopes and call stack."""
         # Clear message logs
         self.messages = []
+        self._reset_message_index()
         self.results = []
         self.tool_results = []
         self.history = []
@@ -119,14 +155,11 @@ class Blackboard:
         """
         Removes all messages before the most recent 'plan' tag.
         """
-        last_plan_index = None
-        for i in range(len(self.messages) - 1, -1, -1):
-            if "plan" in (getattr(self.messages[i], "sub_data_type", []) or []):
-                last_plan_index = i
-                break
+        self._ensure_message_index()
+        last_plan_index = self._last_plan_index
 
         if last_plan_index is not None:
-            # Remove all messages before the most recent plan
+            # Remove all messages before the most recent plan (indexes rebuild on next read)
             self.messages = self.messages[last_plan_index:]
 
     def get_messages(self, n=None):
@@ -148,11 +181,8 @@ class Blackboard:
         """
         Retrieve all messages after and including the most recent 'plan' tag.
         """
-        last_plan_index = None
-        for i in range(len(self.messages) - 1, -1, -1):
-            if "plan" in (getattr(self.messages[i], "sub_data_type", []) or []):
-                last_plan_index = i
-                break
+        self._ensure_message_index()
+        last_plan_index = self._last_plan_index
 
         # If no plan message is found, return all messages
         if last_plan_index is None:
@@ -165,11 +195,8 @@ class Blackboard:
         """
         Retrieve all messages before the most recent 'plan' tag.
         """
-        last_plan_index = None
-        for i in range(len(self.messages) - 1, -1, -1):
-            if "plan" in (getattr(self.messages[i], "sub_data_type", []) or []):
-                last_plan_index = i
-                break
+        self._ensure_message_index()
+        last_plan_index = self._last_plan_index
 
         # If no plan message is found, return an empty list (nothing to summarize)
         if last_plan_index is None:
@@ -180,6 +207,7 @@ class Blackboard:
 
     def clear_messages(self):
         self.messages = []
+        self._reset_message_index()
 
     def get_state_value(self, key, default=None):
         """Retrieve a value by searching from the top (local) scope down to global."""
@@ -229,16 +257,16 @@ class Blackboard:
         current_scope_id = self.get_current_scope_id()
         if hasattr(msg, 'scope_id') and msg.scope_id is None and current_scope_id:
             msg.scope_id = current_scope_id
+        self._ensure_message_index()
         self.messages.append(msg)
+        self._index_message(len(self.messages) - 1, msg)
+        self._indexed_len = len(self.messages)
 
 
 
     def time_to_summarize(self):
-        plan_counter = 0
-        for i in range(len(self.messages)):
-            if "plan" in (getattr(self.messages[i], "sub_data_type", []) or []):
-                plan_counter += 1
-        return plan_counter >= 2
+        self._ensure_message_index()
+        return self._plan_count >= 2
 
 
 
@@ -307,16 +335,15 @@ class Blackboard:
         2. Are part of this agent's call context
         3. Are global (no owner specified)
         """
+        self._ensure_message_index()
         relevant_messages = []
-        
-        for msg in self.messages:
-            # Include if this agent owns the message
-            if msg.sender == agent_name or msg.receiver == agent_name:
-                relevant_messages.append(msg)
-            # Include global messages (no owner specified) that are tool results
-            elif msg.receiver is None or msg.receiver == "Any" and msg.data_type in ["tool_result", "tool_request"]:
-                relevant_messages.append(msg)
-        
+        last = -1
+        # Owned messages and global (no owner specified) messages, merged in log order
+        for i in merge(self._agent_positions.get(agent_name, []), self._shared_positions):
+            if i != last:
+                relevant_messages.append(self.messages[i])
+                last = i
+
         return relevant_messages
 
 
@@ -455,7 +455,6 @@ class CalendarTool(BaseTool):
             logger.info("No events found in the specified time range.")
             events = []
 
-        server_ids = set()
         result_events = []
 
         for event in events:
@@ -507,20 +506,16 @@ class CalendarTool(BaseTool):
             }
 
             result_events.append(parsed_event)
-            server_ids.add(event_id)
 
         # Batch write to database AFTER all processing is complete
         # This minimizes DB lock time
         if repo_update and result_events:
             logger.debug(f"Batch writing {len(result_events)} calendar events to repo")
-            for parsed_event in result_events:
-                self.repo_manager.store_event(
-                    parsed_event["id"],
-                    event_data=parsed_event,
-                    data_type="calendar",
-                )
-            # Enforce stable 7 day window: repo will match current fetch set
-            self.repo_manager.sync_events_with_server(list(server_ids), "calendar")
+            # One transaction; also enforces the stable 7 day window (repo matches current fetch set)
+            self.repo_manager.store_events(
+                [(parsed_event["id"], parsed_event) for parsed_event in result_events],
+                "calendar",
+            )
 
         # Create human-readable summary
         event_count = len(result_events)
@@ -35,10 +35,10 @@ class EmailUtils:
             end_timestamp: Optional datetime for client-side filtering (inclusive)
 
         For repo_update=True (scheduler):
-          - Store all qualifying emails in EventRepository (data_type='email').
-          - Call sync_events_with_server once with all seen UIDs.
-          - sync_events_with_server will prune email events older than 10 hours
-            that were not seen in this run.
+          - Store all qualifying emails in EventRepository (data_type='email')
+            with a single store_events call.
+          - store_events prunes email events older than 10 hours in the same
+            transaction.
 
         For repo_update=False (agent queries):
           - Do not touch the repo at all. Just return processed_emails.
@@ -224,14 +224,11 @@ class EmailUtils:
         # This ensures DB lock is held for minimal time
         if repo_update and email_ids:
             logger.info(f"📧 Batch writing {len(email_ids)} emails to repository...")
-            for email_data in processed_emails:
-                self.repo_manager.store_event(
-                    email_data["uid"],
-                    event_data=email_data,
-                    data_type="email",
-                )
-            # Single sync call enforces 10 hour policy for emails
-            self.repo_manager.sync_events_with_server(email_ids, "email")
+            # Single transaction; also enforces the 10 hour policy for emails
+            self.repo_manager.store_events(
+                [(email_data["uid"], email_data) for email_data in processed_emails],
+                "email",
+            )
             logger.info(f"📧 Batch write complete")
 
         # Debug summary
@@ -299,7 +299,6 @@ class SchedulerTool(BaseTool):
 
         # PHASE 1: Process all events (no DB writes)
         events_to_store = []
-        event_sync_list = []
         
         for event in fetched_events:
             event_id = event.event_id
@@ -321,19 +320,11 @@ class SchedulerTool(BaseTool):
                     data["occurrence"] = data["event_payload"].get("occurrence")
 
                 events_to_store.append((store_id, data, event_id))
-                event_sync_list.append(store_id)
 
         # PHASE 2: Batch write to database
         if events_to_store:
             logger.debug(f"Batch writing {len(events_to_store)} scheduler events to repo")
-            for store_id, data, event_id in events_to_store:
-                self.repo_manager.store_event(
-                    id=store_id,
-                    event_data=data,
-                    data_type="scheduler",
-                    event_id=event_id
-                )
-            self.repo_manager.sync_events_with_server(event_sync_list, "scheduler")
+            self.repo_manager.store_events(events_to_store, "scheduler")
 
         fetch_events_result = ToolResult(
             result_type="scheduler_events",
@@ -490,7 +481,6 @@ class SchedulerTool(BaseTool):
 
         # PHASE 1: Process all events (no DB writes)
         events_to_store = []
-        event_sync_list = []
         
         for event in fetched_events:
             event_id = event.event_id
@@ -515,19 +505,11 @@ class SchedulerTool(BaseTool):
                 data = event.model_dump()
 
             events_to_store.append((store_id, data, event_id))
-            event_sync_list.append(store_id)
 
         # PHASE 2: Batch write to database
         if events_to_store:
             logger.debug(f"Batch writing {len(events_to_store)} scheduler events to repo")
-            for store_id, data, event_id in events_to_store:
-                self.repo_manager.store_event(
-                    id=store_id,
-                    event_data=data,
-                    data_type="scheduler",
-                    event_id=event_id
-                )
-            self.repo_manager.sync_events_with_server(event_sync_list, "scheduler")
+            self.repo_manager.store_events(events_to_store, "scheduler")
         
         return fetched_events
 
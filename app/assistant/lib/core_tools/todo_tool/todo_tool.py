@@ -248,20 +248,15 @@ class ToDoTool(BaseTool):
                 
                 # PHASE 1: Collect tasks to store (no DB writes yet)
                 tasks_to_store = []
-                server_ids = []
                 for task in tasks:
                     unique_id = task.get("recurringTaskId") or task.get("id") or task.get("task_id")
                     if unique_id:
                         tasks_to_store.append((unique_id, task))
-                    if 'id' in task:
-                        server_ids.append(task['id'])
                 
                 # PHASE 2: Batch write to database
                 if tasks_to_store:
                     logger.debug(f"Batch writing {len(tasks_to_store)} todo tasks to repo")
-                    for unique_id, task in tasks_to_store:
-                        self.repo_manager.store_event(unique_id, event_data=task, data_type="todo_task")
-                    self.repo_manager.sync_events_with_server(server_ids, "todo_task")
+                    self.repo_manager.store_events(tasks_to_store, "todo_task")
                 
                 # Instant ingestion into UnifiedItems (only for active tasks)
                 try:
@@ -1,9 +1,10 @@
 from __future__ import annotations
 
+import itertools
 import json
-import queue
 import subprocess
 import threading
+from collections import deque
 from dataclasses import dataclass
 from typing import Any, Optional
 
@@ -13,20 +14,74 @@ class JsonRpcResponse:
     raw: dict[str, Any]
 
 
+class JsonRpcRequestCancelled(Exception):
+    """Raised to waiters of a request that was cancelled locally."""
+
+
+class PendingRequest:
+    """
+    Handle for one in-flight request. `result()` waits for the response; `cancel()`
+    stops waiting and tells the server (MCP `notifications/cancelled`).
+    """
+
+    def __init__(self, client: "StdioJsonRpcClient", req_id: int, method: str):
+        self.client = client
+        self.id = req_id
+        self.method = method
+        self._done = threading.Event()
+        self._response: Optional[dict[str, Any]] = None
+        self._error: Optional[BaseException] = None
+
+    def _set_response(self, msg: dict[str, Any]) -> None:
+        if not self._done.is_set():
+            self._response = msg
+            self._done.set()
+
+    def _set_error(self, error: BaseException) -> None:
+        if not self._done.is_set():
+            self._error = error
+            self._done.set()
+
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    def result(self, timeout_s: Optional[float] = None) -> JsonRpcResponse:
+        """Wait for the response. On timeout the request is cancelled and TimeoutError raised."""
+        timeout = timeout_s if timeout_s is not None else self.client.timeout_s
+        if not self._done.wait(timeout):
+            self.cancel(reason="timeout")
+            raise TimeoutError(f"Timeout waiting for JSON-RPC response to {self.method} (id={self.id})")
+        if self._error is not None:
+            raise self._error
+        assert self._response is not None
+        return JsonRpcResponse(raw=self._response)
+
+    def cancel(self, reason: str = "cancelled by client") -> None:
+        self.client.cancel(self.id, reason=reason)
+
+
 class StdioJsonRpcClient:
     """
-    Minimal line-delimited JSON-RPC client for MCP stdio servers.
+    Line-delimited JSON-RPC client for MCP stdio servers.
 
     Many MCP servers accept one JSON object per line (stdin/stdout).
+
+    The client is a multiplexer: any number of threads may have requests in flight
+    on one process. Ids are allocated atomically, writes are serialized per line, and a
+    single reader thread routes each response to its waiter. Requests that time out
+    (or are cancelled) are reported to the server with `notifications/cancelled`.
     """
 
-    def __init__(self, proc: subprocess.Popen, *, timeout_s: float = 10.0):
+    def __init__(self, proc: subprocess.Popen, *, timeout_s: float = 10.0, stderr_max_lines: int = 200):
         self.proc = proc
         self.timeout_s = timeout_s
-        self._id = 0
-        self._responses: dict[int, queue.Queue[dict[str, Any]]] = {}
+        self._ids = itertools.count(1)
+        self._pending: dict[int, PendingRequest] = {}
         self._lock = threading.Lock()
-        self._stderr_lines: list[str] = []
+        self._write_lock = threading.Lock()
+        self._closed_error: Optional[BaseException] = None
+        self._stderr_lines: deque[str] = deque(maxlen=stderr_max_lines)
+        self._stderr_count = 0  # total stderr lines ever read (for per-request previews)
 
         self._reader = threading.Thread(target=self._read_stdout_loop, daemon=True)
         self._reader.start()
@@ -35,22 +90,41 @@ class StdioJsonRpcClient:
 
     def _read_stdout_loop(self) -> None:
         assert self.proc.stdout is not None
-        for line in self.proc.stdout:
-            line = line.strip()
-            if not line:
-                continue
-            try:
-                msg = json.loads(line)
-            except Exception:
-                continue
-            if not isinstance(msg, dict):
-                continue
-            msg_id = msg.get("id")
-            if isinstance(msg_id, int):
-                with self._lock:
-                    q = self._responses.get(msg_id)
-                if q is not None:
-                    q.put(msg)
+        try:
+            for line in self.proc.stdout:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    msg = json.loads(line)
+                except Exception:
+                    continue
+                if not isinstance(msg, dict):
+                    continue
+                msg_id = msg.get("id")
+                if isinstance(msg_id, int) and ("result" in msg or "error" in msg):
+                    with self._lock:
+                        pending = self._pending.pop(msg_id, None)
+                    if pending is not None:
+                        pending._set_response(msg)
+        finally:
+            self._fail_pending()
+
+    def _fail_pending(self) -> None:
+        # stdout closed: the process is gone, so nobody waiting will ever get an answer.
+        with self._lock:
+            pending = list(self._pending.values())
+            self._pending.clear()
+            self._closed_error = RuntimeError(
+                f"MCP process closed its output. exit_code={self.proc.poll()}\n"
+                f"stderr:\n{self.stderr_preview()}"
+            )
+        for p in pending:
+            p._set_error(RuntimeError(
+                f"MCP process exited before responding to '{p.method}' (id={p.id}). "
+                f"exit_code={self.proc.poll()}\n"
+                f"stderr:\n{self.stderr_preview()}"
+            ))
 
     def _read_stderr_loop(self) -> None:
         if self.proc.stderr is None:
@@ -62,51 +136,90 @@ class StdioJsonRpcClient:
                 pass
             if line:
                 self._stderr_lines.append(line)
-                if len(self._stderr_lines) > 200:
-                    self._stderr_lines = self._stderr_lines[-200:]
-
-    def stderr_preview(self, max_lines: int = 30) -> str:
-        lines = self._stderr_lines[-max_lines:]
+                self._stderr_count += 1
+
+    def stderr_line_count(self) -> int:
+        return self._stderr_count
+
+    def stderr_preview(self, max_lines: int = 30, *, since: Optional[int] = None) -> str:
+        """Last stderr lines; with `since` (a stderr_line_count() mark) only lines read after it."""
+        lines = list(self._stderr_lines)
+        if since is not None:
+            new = self._stderr_count - since
+            lines = lines[-new:] if 0 < new else []
+        lines = lines[-max_lines:]
         return "\n".join(lines).strip()
 
-    def request(self, method: str, params: Optional[dict[str, Any]] = None) -> JsonRpcResponse:
-        self._id += 1
-        req_id = self._id
-        payload: dict[str, Any] = {"jsonrpc": "2.0", "id": req_id, "method": method}
-        if params is not None:
-            payload["params"] = params
-
-        q: queue.Queue[dict[str, Any]] = queue.Queue(maxsize=1)
+    def in_flight(self) -> int:
         with self._lock:
-            self._responses[req_id] = q
+            return len(self._pending)
 
+    def _write(self, payload: dict[str, Any], method: str) -> None:
         if self.proc.poll() is not None:
             raise RuntimeError(
                 f"MCP process exited before request '{method}'. "
                 f"exit_code={self.proc.returncode}\n"
                 f"stderr:\n{self.stderr_preview()}"
             )
-
         assert self.proc.stdin is not None
+        line = json.dumps(payload, ensure_ascii=True) + "\n"
         try:
-            self.proc.stdin.write(json.dumps(payload, ensure_ascii=True) + "\n")
-            self.proc.stdin.flush()
-        except (BrokenPipeError, OSError) as e:
+            with self._write_lock:
+                self.proc.stdin.write(line)
+                self.proc.stdin.flush()
+        except (BrokenPipeError, OSError, ValueError) as e:
             raise RuntimeError(
                 f"Failed to write request '{method}' to MCP process: {e}. "
                 f"exit_code={self.proc.poll()}\n"
                 f"stderr:\n{self.stderr_preview()}"
             ) from e
 
+    def submit(self, method: str, params: Optional[dict[str, Any]] = None) -> PendingRequest:
+        """Send a request without waiting; returns a handle to wait on or cancel."""
+        with self._lock:
+            if self._closed_error is not None:
+                raise self._closed_error
+            req_id = next(self._ids)
+            pending = PendingRequest(self, req_id, method)
+            self._pending[req_id] = pending
+
+        payload: dict[str, Any] = {"jsonrpc": "2.0", "id": req_id, "method": method}
+        if params is not None:
+            payload["params"] = params
         try:
-            msg = q.get(timeout=self.timeout_s)
-        except Exception as e:
-            raise TimeoutError(f"Timeout waiting for JSON-RPC response to {method} (id={req_id})") from e
-        finally:
+            self._write(payload, method)
+        except Exception:
             with self._lock:
-                self._responses.pop(req_id, None)
+                self._pending.pop(req_id, None)
+            raise
+        return pending
+
+    def request(
+        self,
+        method: str,
+        params: Optional[dict[str, Any]] = None,
+        *,
+        timeout_s: Optional[float] = None,
+    ) -> JsonRpcResponse:
+        return self.submit(method, params).result(timeout_s)
+
+    def notify(self, method: str, params: Optional[dict[str, Any]] = None) -> None:
+        payload: dict[str, Any] = {"jsonrpc": "2.0", "method": method}
+        if params is not None:
+            payload["params"] = params
+        self._write(payload, method)
 
-        return JsonRpcResponse(raw=msg)
+    def cancel(self, req_id: int, reason: str = "cancelled by client") -> None:
+        """Stop waiting for `req_id` and send MCP `notifications/cancelled` (best-effort)."""
+        with self._lock:
+            pending = self._pending.pop(req_id, None)
+        if pending is None:
+            return
+        pending._set_error(JsonRpcRequestCancelled(f"JSON-RPC request {pending.method} (id={req_id}) cancelled: {reason}"))
+        try:
+            self.notify("notifications/cancelled", {"requestId": req_id, "reason": reason})
+        except Exception:
+            pass
 
 
 def normalize_tools_list_response(resp: dict[str, Any]) -> list[dict[str, Any]]:
@@ -0,0 +1,326 @@
+from __future__ import annotations
+
+import atexit
+import json
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Optional
+
+from app.assistant.utils.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+
+@dataclass(frozen=True)
+class StdioPoolConfig:
+    """
+    Per-server pool sizing, read from `policy.stdio_pool` in the server entry.
+
+    max_sessions defaults to `policy.max_concurrent_calls` so the pool never runs more
+    concurrent calls into a server than its policy allows.
+    """
+
+    enabled: bool = True
+    min_sessions: int = 1
+    max_sessions: int = 2
+    max_requests_per_session: int = 1
+    idle_timeout_s: float = 300.0
+    health_check_interval_s: float = 30.0
+    acquire_timeout_s: float = 30.0
+
+    @classmethod
+    def from_server_entry(cls, server_entry: dict[str, Any]) -> "StdioPoolConfig":
+        policy = server_entry.get("policy") or {}
+        pool = policy.get("stdio_pool") or {}
+        max_sessions = int(pool.get("max_sessions", policy.get("max_concurrent_calls", cls.max_sessions)))
+        max_sessions = max(1, max_sessions)
+        return cls(
+            enabled=bool(pool.get("enabled", True)),
+            min_sessions=max(0, min(int(pool.get("min_sessions", cls.min_sessions)), max_sessions)),
+            max_sessions=max_sessions,
+            max_requests_per_session=max(1, int(pool.get("max_requests_per_session", cls.max_requests_per_session))),
+            idle_timeout_s=float(pool.get("idle_timeout_seconds", cls.idle_timeout_s)),
+            health_check_interval_s=float(pool.get("health_check_interval_seconds", cls.health_check_interval_s)),
+            acquire_timeout_s=float(policy.get("call_timeout_seconds", cls.acquire_timeout_s)),
+        )
+
+
+class _PooledSession:
+    def __init__(self, session: Any):
+        # session is a tool_runner._StdioSession (proc + client)
+        self.session = session
+        self.in_flight = 0
+        self.last_used = time.monotonic()
+        self.last_checked = self.last_used
+
+    def is_alive(self) -> bool:
+        return self.session.is_alive()
+
+
+class StdioSessionPool:
+    """
+    Pool of pre-initialized stdio sessions for one stateless MCP server.
+
+    - Sessions are started lazily (plus `min_sessions` kept warm) and reused across calls.
+    - Each session serves at most `max_requests_per_session` concurrent requests.
+    - Sessions idle longer than `health_check_interval_s` are pinged before reuse;
+      dead or unresponsive sessions are replaced.
+    - Sessions idle longer than `idle_timeout_s` are reaped down to `min_sessions`.
+    """
+
+    def __init__(
+        self,
+        server_entry: dict[str, Any],
+        *,
+        config: StdioPoolConfig,
+        start_session: Callable[[dict[str, Any]], Any],
+        stop_session: Callable[[Any], None],
+    ):
+        self.server_entry = server_entry
+        self.server_id = str(server_entry.get("server_id") or "")
+        self.config = config
+        self._start_session = start_session
+        self._stop_session = stop_session
+
+        self._sessions: list[_PooledSession] = []
+        self._starting = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+    # ------------------------------------------------------------------
+    # Acquire / release
+    # ------------------------------------------------------------------
+
+    def _pick_locked(self) -> Optional[_PooledSession]:
+        best = None
+        for ps in self._sessions:
+            if ps.in_flight >= self.config.max_requests_per_session:
+                continue
+            if best is None or ps.in_flight < best.in_flight:
+                best = ps
+        return best
+
+    def _drop_locked(self, ps: _PooledSession) -> None:
+        if ps in self._sessions:
+            self._sessions.remove(ps)
+            threading.Thread(target=self._stop_session, args=(ps.session,), daemon=True).start()
+
+    def _healthy(self, ps: _PooledSession) -> bool:
+        if not ps.is_alive():
+            return False
+        if time.monotonic() - ps.last_checked < self.config.health_check_interval_s:
+            return True
+        try:
+            # Any JSON-RPC reply (even "method not found") proves the server is responsive.
+            ps.session.client.request("ping", {}, timeout_s=min(5.0, self.config.acquire_timeout_s))
+        except Exception as e:
+            logger.warning(f"MCP pool [{self.server_id}]: health check failed, replacing session: {e}")
+            return False
+        ps.last_checked = time.monotonic()
+        return True
+
+    def acquire(self, timeout_s: Optional[float] = None) -> _PooledSession:
+        deadline = time.monotonic() + (timeout_s if timeout_s is not None else self.config.acquire_timeout_s)
+        while True:
+            spawn = False
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise RuntimeError(f"MCP session pool for {self.server_id} is closed")
+                    # Crash replacement: forget sessions whose process has exited
+                    for ps in [p for p in self._sessions if not p.is_alive()]:
+                        logger.warning(f"MCP pool [{self.server_id}]: session process exited; replacing")
+                        self._drop_locked(ps)
+                    ps = self._pick_locked()
+                    if ps is not None:
+                        ps.in_flight += 1
+                        break
+                    if len(self._sessions) + self._starting < self.config.max_sessions:
+                        self._starting += 1
+                        spawn = True
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise TimeoutError(f"Timed out waiting for a free MCP session for {self.server_id}")
+                    self._cond.wait(remaining)
+
+            if spawn:
+                try:
+                    session = self._start_session(self.server_entry)
+                except Exception:
+                    with self._cond:
+                        self._starting -= 1
+                        self._cond.notify()
+                    raise
+                ps = _PooledSession(session)
+                with self._cond:
+                    self._starting -= 1
+                    ps.in_flight = 1
+                    self._sessions.append(ps)
+                return ps
+
+            if self._healthy(ps):
+                return ps
+            with self._cond:
+                ps.in_flight -= 1
+                self._drop_locked(ps)
+                self._cond.notify_all()
+
+    def release(self, ps: _PooledSession, *, discard: bool = False) -> None:
+        with self._cond:
+            ps.in_flight = max(0, ps.in_flight - 1)
+            ps.last_used = time.monotonic()
+            if discard or not ps.is_alive():
+                self._drop_locked(ps)
+            self._cond.notify()
+
+    def request(self, method: str, params: Optional[dict[str, Any]] = None, *,
+                timeout_s: Optional[float] = None) -> tuple[dict[str, Any], str]:
+        """
+        Run one JSON-RPC request on a pooled session.
+        Returns (raw response, stderr the serving session wrote during the request).
+        """
+        ps = self.acquire()
+        discard = False
+        try:
+            client = ps.session.client
+            stderr_mark = client.stderr_line_count()
+            resp = client.request(method, params, timeout_s=timeout_s).raw
+            ps.last_checked = time.monotonic()
+            return resp, client.stderr_preview(since=stderr_mark)
+        except Exception:
+            # A timed out or broken session may still be processing the request; never reuse it.
+            discard = True
+            raise
+        finally:
+            self.release(ps, discard=discard)
+
+    # ------------------------------------------------------------------
+    # Maintenance
+    # ------------------------------------------------------------------
+
+    def maintain(self) -> None:
+        """Reap idle sessions above min_sessions and top the pool back up to min_sessions."""
+        now = time.monotonic()
+        with self._cond:
+            if self._closed:
+                return
+            for ps in [p for p in self._sessions if not p.is_alive()]:
+                self._drop_locked(ps)
+            idle = sorted(
+                (p for p in self._sessions if p.in_flight == 0 and now - p.last_used >= self.config.idle_timeout_s),
+                key=lambda p: p.last_used,
+            )
+            excess = len(self._sessions) - self.config.min_sessions
+            for ps in idle[:max(0, excess)]:
+                logger.debug(f"MCP pool [{self.server_id}]: reaping idle session")
+                self._drop_locked(ps)
+            missing = self.config.min_sessions - len(self._sessions) - self._starting
+            self._starting += max(0, missing)
+
+        for _ in range(max(0, missing)):
+            try:
+                session = self._start_session(self.server_entry)
+            except Exception as e:
+                logger.warning(f"MCP pool [{self.server_id}]: failed to prewarm session: {e}")
+                with self._cond:
+                    self._starting -= 1
+                continue
+            with self._cond:
+                self._starting -= 1
+                if self._closed:
+                    threading.Thread(target=self._stop_session, args=(session,), daemon=True).start()
+                    continue
+                self._sessions.append(_PooledSession(session))
+                self._cond.notify()
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            sessions, self._sessions = self._sessions, []
+            self._cond.notify_all()
+        for ps in sessions:
+            self._stop_session(ps.session)
+
+    def stats(self) -> dict[str, int]:
+        with self._cond:
+            return {
+                "sessions": len(self._sessions),
+                "starting": self._starting,
+                "in_flight": sum(p.in_flight for p in self._sessions),
+            }
+
+
+# ----------------------------------------------------------------------
+# Process-wide pool registry
+# ----------------------------------------------------------------------
+
+_POOLS: dict[str, StdioSessionPool] = {}
+_POOLS_LOCK = threading.Lock()
+_MAINTENANCE_INTERVAL_S = 15.0
+_maintenance_thread: Optional[threading.Thread] = None
+
+
+def _pool_key(server_entry: dict[str, Any]) -> str:
+    # Include launch options and policy so a changed entry (e.g. tests swapping in a fake
+    # server) gets its own pool.
+    return json.dumps(
+        [server_entry.get("server_id"), server_entry.get("launch_options"), server_entry.get("policy")],
+        sort_keys=True,
+        default=str,
+    )
+
+
+def _maintenance_loop() -> None:
+    while True:
+        time.sleep(_MAINTENANCE_INTERVAL_S)
+        with _POOLS_LOCK:
+            pools = list(_POOLS.values())
+        for pool in pools:
+            try:
+                pool.maintain()
+            except Exception as e:
+                logger.debug(f"MCP pool maintenance failed for {pool.server_id}: {e}")
+
+
+def get_stdio_pool(
+    server_entry: dict[str, Any],
+    *,
+    start_session: Callable[[dict[str, Any]], Any],
+    stop_session: Callable[[Any], None],
+) -> StdioSessionPool:
+    """Get (or create) the process-wide pool for a server entry."""
+    global _maintenance_thread
+    key = _pool_key(server_entry)
+    with _POOLS_LOCK:
+        pool = _POOLS.get(key)
+        if pool is None:
+            pool = StdioSessionPool(
+                server_entry,
+                config=StdioPoolConfig.from_server_entry(server_entry),
+                start_session=start_session,
+                stop_session=stop_session,
+            )
+            _POOLS[key] = pool
+            if _maintenance_thread is None:
+                _maintenance_thread = threading.Thread(
+                    target=_maintenance_loop, name="mcp-stdio-pool-maintenance", daemon=True
+                )
+                _maintenance_thread.start()
+    return pool
+
+
+def close_all_stdio_pools() -> None:
+    with _POOLS_LOCK:
+        pools = list(_POOLS.values())
+        _POOLS.clear()
+    for pool in pools:
+        try:
+            pool.close()
+        except Exception:
+            pass
+
+
+# Don't leave pooled server processes behind when the host exits.
+atexit.register(close_all_stdio_pools)
@@ -14,6 +14,7 @@ from pathlib import Path
 from typing import Any, Optional
 
 from app.assistant.lib.mcp.stdio_client import StdioJsonRpcClient
+from app.assistant.lib.mcp.stdio_pool import StdioPoolConfig, get_stdio_pool
 from app.assistant.utils.logging_config import get_logger
 
 logger = get_logger(__name__)
@@ -168,6 +169,10 @@ def _terminate_process(proc: subprocess.Popen) -> None:
             pass
 
 
+def _stop_pooled_session(sess: _StdioSession) -> None:
+    _terminate_process(sess.proc)
+
+
 def _call_resp_text(call_resp: dict[str, Any]) -> str:
     """
     Best-effort extraction of text content from an MCP tools/call response.
@@ -445,7 +450,9 @@ def mcp_stdio_call_tool(
     """
     Run a single MCP `tools/call` over stdio.
 
-    This spawns the server process per call (simple + safe for now).
+    Stateful servers (Playwright) share one long-lived session; stateless servers are
+    served from a per-server pool of warm sessions (see stdio_pool.py) unless the
+    server's policy disables pooling, in which case the process is spawned per call.
     """
     # For stateful servers (e.g., Playwright) reuse a single stdio process so
     # navigate -> screenshot -> snapshot sequences work.
@@ -492,7 +499,26 @@ def mcp_stdio_call_tool(
             _close_stdio_session(sess.server_id)
         return call_resp
 
-    # Default: spawn per call (safe and simple).
+    # Stateless servers: reuse a warm, already-initialized process from the per-server pool.
+    if StdioPoolConfig.from_server_entry(server_entry).enabled:
+        pool = get_stdio_pool(
+            server_entry,
+            start_session=_start_stdio_server_process,
+            stop_session=_stop_pooled_session,
+        )
+        call_resp, stderr_preview = pool.request(
+            "tools/call",
+            {
+                "name": tool_name,
+                "arguments": arguments or {},
+            },
+            timeout_s=timeout_s,
+        )
+        if stderr_preview:
+            call_resp["_emiai_stderr"] = stderr_preview
+        return call_resp
+
+    # Pooling disabled via policy.stdio_pool.enabled: spawn per call.
     sess = _start_stdio_server_process(server_entry)
     try:
         client = sess.client
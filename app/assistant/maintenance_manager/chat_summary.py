@@ -18,7 +18,7 @@ class ChatSummaryRunner:
 
     def run(self):
 
-        if len(self.blackboard.get_all_messages()) == 0:
+        if self.blackboard.message_count() == 0:
             print("No messages to summarize.")
             return
 
@@ -156,6 +156,7 @@ class ChatSummaryRunner:
                 existing_summary_msg.sender = summary_msg.sender
                 existing_summary_msg.timestamp = summary_msg.timestamp
                 existing_summary_msg.metadata = summary_msg.metadata
+                self.blackboard.update_msg(existing_summary_msg)
                 logger.info("Chat summary updated in-place (single summary retained).")
             else:
                 self.blackboard.add_msg(summary_msg)
@@ -169,6 +170,8 @@ class ChatSummaryRunner:
                 meta["summarized"] = True
                 meta["summarized_at_utc"] = now_utc.isoformat()
                 m.metadata = meta
+                # Messages spilled out of memory are copies; write the flag back to the store
+                self.blackboard.update_msg(m)
 
             logger.info(f"Marked {len(new_chunk)} chat message(s) as summarized.")
 
@@ -0,0 +1,179 @@
+"""
+Structured metrics sink for LLM provider calls.
+
+Every provider request (OpenAILLM / GeminiLLM) records one LLMCallRecord: provider,
+model, calling agent, outcome, latency, time to the first streamed field and
+input/output/cached token counts. The sink keeps
+- the most recent records (bounded), for drill-down
+- running aggregates per agent and per model: call and outcome counts, token totals,
+  and log-bucketed histograms of latency, first-field latency and tokens, so
+  p50/p95/p99 cover every call since start-up (to within one bucket, ~5%) in
+  constant memory.
+
+Read it through LLMPerformanceAnalyzer or GET /debug/llm-metrics/data.
+"""
+
+import math
+import threading
+import time
+from collections import defaultdict, deque
+from dataclasses import asdict, dataclass, field
+from typing import Any, Deque, Dict, List, Optional
+
+OUTCOMES = ("success", "error", "timeout", "rate_limited")
+PERCENTILES = (0.50, 0.95, 0.99)
+
+
+@dataclass
+class LLMCallRecord:
+    provider: str
+    model: str
+    agent: str
+    outcome: str
+    latency_ms: float
+    input_tokens: Optional[int] = None
+    output_tokens: Optional[int] = None
+    cached_tokens: Optional[int] = None
+    # Streaming calls: time until the first field of the reply was dispatched
+    first_field_ms: Optional[float] = None
+    error: Optional[str] = None
+    timestamp: float = field(default_factory=time.time)
+
+
+def classify_outcome(error: Optional[str]) -> str:
+    if not error:
+        return "success"
+    text = error.lower()
+    if "timeout" in text or "timed out" in text:
+        return "timeout"
+    if "rate limit" in text or "rate_limit" in text or "429" in text:
+        return "rate_limited"
+    return "error"
+
+
+class Histogram:
+    """Log-bucketed histogram: bucket i holds values in [growth**(i-1), growth**i)."""
+
+    def __init__(self, growth: float = 1.1):
+        self.growth = growth
+        self._log_growth = math.log(growth)
+        self.buckets: Dict[int, int] = defaultdict(int)
+        self.count = 0
+        self.total = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    def add(self, value: float) -> None:
+        value = max(0.0, float(value))
+        index = 0 if value < 1.0 else int(math.log(value) / self._log_growth) + 1
+        self.buckets[index] += 1
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def percentile(self, p: float) -> Optional[float]:
+        if not self.count:
+            return None
+        rank = max(1, math.ceil(p * self.count))
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                # Upper bound of the bucket, clamped to what was actually observed
+                upper = 1.0 if index == 0 else self.growth ** index
+                return round(min(max(upper, self.min), self.max), 2)
+        return round(self.max, 2)
+
+    def summary(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = {"count": self.count}
+        if self.count:
+            out["mean"] = round(self.total / self.count, 2)
+            out["max"] = round(self.max, 2)
+            for p in PERCENTILES:
+                out[f"p{int(p * 100)}"] = self.percentile(p)
+        return out
+
+
+class _Aggregate:
+    def __init__(self):
+        self.calls = 0
+        self.outcomes: Dict[str, int] = defaultdict(int)
+        self.latency_ms = Histogram()
+        self.first_field_ms = Histogram()
+        self.input_tokens = Histogram()
+        self.output_tokens = Histogram()
+        self.total_input_tokens = 0
+        self.total_output_tokens = 0
+        self.total_cached_tokens = 0
+
+    def add(self, record: LLMCallRecord) -> None:
+        self.calls += 1
+        self.outcomes[record.outcome] += 1
+        self.latency_ms.add(record.latency_ms)
+        if record.first_field_ms is not None:
+            self.first_field_ms.add(record.first_field_ms)
+        if record.input_tokens is not None:
+            self.input_tokens.add(record.input_tokens)
+            self.total_input_tokens += record.input_tokens
+        if record.output_tokens is not None:
+            self.output_tokens.add(record.output_tokens)
+            self.total_output_tokens += record.output_tokens
+        if record.cached_tokens is not None:
+            self.total_cached_tokens += record.cached_tokens
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "outcomes": dict(self.outcomes),
+            "latency_ms": self.latency_ms.summary(),
+            "first_field_ms": self.first_field_ms.summary(),
+            "input_tokens": self.input_tokens.summary(),
+            "output_tokens": self.output_tokens.summary(),
+            "total_input_tokens": self.total_input_tokens,
+            "total_output_tokens": self.total_output_tokens,
+            "total_cached_tokens": self.total_cached_tokens,
+            # Wall-clock seconds this key spent waiting on the provider
+            "total_latency_s": round(self.latency_ms.total / 1000.0, 2),
+        }
+
+
+class LLMMetricsSink:
+    def __init__(self, max_records: int = 2000):
+        self.records: Deque[LLMCallRecord] = deque(maxlen=max_records)
+        self._by_agent: Dict[str, _Aggregate] = defaultdict(_Aggregate)
+        self._by_model: Dict[str, _Aggregate] = defaultdict(_Aggregate)
+        self._lock = threading.Lock()
+
+    def record(self, record: LLMCallRecord) -> None:
+        with self._lock:
+            self.records.append(record)
+            self._by_agent[record.agent].add(record)
+            self._by_model[f"{record.provider}/{record.model}"].add(record)
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "calls": sum(a.calls for a in self._by_model.values()),
+                "by_agent": {k: v.summary() for k, v in self._by_agent.items()},
+                "by_model": {k: v.summary() for k, v in self._by_model.items()},
+            }
+
+    def recent(self, limit: int = 50, agent: Optional[str] = None, model: Optional[str] = None) -> List[Dict]:
+        with self._lock:
+            records = list(self.records)
+        picked = [
+            asdict(r) for r in reversed(records)
+            if (agent is None or r.agent == agent) and (model is None or r.model == model)
+        ]
+        return picked[:max(0, int(limit))]
+
+    def reset(self) -> None:
+        with self._lock:
+            self.records.clear()
+            self._by_agent.clear()
+            self._by_model.clear()
+
+
+# Global instance
+llm_metrics = LLMMetricsSink()
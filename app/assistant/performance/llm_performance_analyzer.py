@@ -9,6 +9,7 @@ from typing import Dict, List
 from datetime import datetime
 
 from app.assistant.performance.performance_monitor import performance_monitor
+from app.assistant.performance.llm_metrics import llm_metrics
 from app.assistant.utils.logging_config import get_logger
 
 logger = get_logger(__name__)
@@ -18,6 +19,7 @@ class LLMPerformanceAnalyzer:
     
     def __init__(self):
         self.monitor = performance_monitor
+        self.llm_metrics = llm_metrics
         
     def analyze_llm_performance(self) -> Dict:
         """Analyze LLM-specific performance metrics."""
@@ -42,6 +44,7 @@ class LLMPerformanceAnalyzer:
         analysis = {
             'timestamp': datetime.now().isoformat(),
             'llm_operations': self._analyze_llm_operations(llm_operations),
+            'llm_calls': self.analyze_llm_calls(),
             'agent_performance': self._analyze_agent_performance(agent_operations),
             'rag_performance': self._analyze_rag_performance(rag_operations),
             'slow_llm_calls': self._get_slow_llm_calls(),
@@ -73,6 +76,18 @@ class LLMPerformanceAnalyzer:
         
         return analysis
     
+    def analyze_llm_calls(self, top: int = 10) -> Dict:
+        """Per-agent and per-model latency/token histograms from the LLM metrics sink."""
+        summary = self.llm_metrics.summary()
+        if not summary['calls']:
+            return {'message': 'No LLM calls recorded'}
+
+        by_agent = summary['by_agent']
+        rank = lambda key: sorted(by_agent, key=lambda a: key(by_agent[a]), reverse=True)[:top]
+        summary['top_agents_by_latency'] = rank(lambda a: a['total_latency_s'])
+        summary['top_agents_by_tokens'] = rank(lambda a: a['total_input_tokens'] + a['total_output_tokens'])
+        return summary
+
     def _analyze_agent_performance(self, agent_stats: Dict) -> Dict:
         """Analyze agent performance with focus on LLM usage."""
         if not agent_stats:
@@ -144,6 +159,19 @@ class LLMPerformanceAnalyzer:
                     'expected_improvement': f"Reduce latency by {avg_duration * 0.3:.1f}s"
                 })
         
+        # Check for agents whose LLM calls have a long tail
+        for agent, agg in self.llm_metrics.summary()['by_agent'].items():
+            p95 = agg['latency_ms'].get('p95')
+            if p95 and p95 > 15000:
+                recommendations.append({
+                    'category': 'LLM Performance',
+                    'priority': 'high',
+                    'operation': agent,
+                    'issue': f"Agent '{agent}' LLM calls have a p95 latency of {p95 / 1000:.1f}s over {agg['calls']} calls",
+                    'recommendation': "Check its prompt size (input tokens) and model choice",
+                    'expected_improvement': f"Reduce tail latency by {p95 * 0.3 / 1000:.1f}s"
+                })
+
         # Check for agents with large prompts
         for agent, stat in agent_stats.items():
             avg_duration = stat.get('avg_duration', 0)
@@ -179,6 +207,22 @@ class LLMPerformanceAnalyzer:
                 slowest_op, slowest_stat = llm_ops['slowest_operation']
                 print(f"   Slowest Operation: {slowest_op} ({slowest_stat['avg_duration']:.2f}s)")
         
+        # Per-agent / per-model LLM call histograms
+        llm_calls = analysis['llm_calls']
+        if 'message' not in llm_calls:
+            print(f"\n📊 LLM CALLS BY AGENT ({llm_calls['calls']} calls):")
+            for agent in llm_calls['top_agents_by_latency']:
+                agg = llm_calls['by_agent'][agent]
+                lat = agg['latency_ms']
+                print(f"   {agent}: {agg['calls']} calls, {agg['total_latency_s']:.1f}s total, "
+                      f"p50/p95/p99 {lat.get('p50')}/{lat.get('p95')}/{lat.get('p99')} ms, "
+                      f"tokens in/out {agg['total_input_tokens']}/{agg['total_output_tokens']}")
+            print(f"\n📊 LLM CALLS BY MODEL:")
+            for model, agg in llm_calls['by_model'].items():
+                lat = agg['latency_ms']
+                print(f"   {model}: {agg['calls']} calls, p50/p95/p99 {lat.get('p50')}/{lat.get('p95')}/{lat.get('p99')} ms, "
+                      f"outcomes {agg['outcomes']}")
+
         # Agent Performance
         agent_perf = analysis['agent_performance']
         if 'message' not in agent_perf:
@@ -224,7 +268,7 @@ class LLMPerformanceAnalyzer:
         """Export LLM analysis to JSON file."""
         analysis = self.analyze_llm_performance()
         with open(filepath, 'w') as f:
-            json.dump(analysis, f, indent=2)
+            json.dump(analysis, f, indent=2, default=str)
         logger.info(f"LLM performance analysis exported to {filepath}")
 
 def main():
@@ -1,3 +1,4 @@
+import itertools
 import time
 import threading
 from typing import Dict, List, Optional
@@ -15,11 +16,15 @@ class PerformanceMonitor:
         self.max_history = max_history
         self.metrics = defaultdict(lambda: deque(maxlen=max_history))
         self.active_timers = {}
-        self.lock = threading.Lock()
+        self.counters = defaultdict(int)
+        # Re-entrant: get_all_stats() calls get_operation_stats() while holding it
+        self.lock = threading.RLock()
+        self._timer_seq = itertools.count()
         
     def start_timer(self, operation_name: str, request_id: Optional[str] = None) -> str:
         """Start timing an operation."""
-        timer_id = f"{operation_name}_{request_id or int(time.time() * 1000)}"
+        # The sequence number keeps concurrent timers with the same request_id apart
+        timer_id = f"{operation_name}_{request_id or int(time.time() * 1000)}_{next(self._timer_seq)}"
         with self.lock:
             self.active_timers[timer_id] = {
                 'operation': operation_name,
@@ -53,6 +58,19 @@ class PerformanceMonitor:
             
             return duration
     
+    def increment_counter(self, counter_name: str, amount: int = 1):
+        """Increment a named event counter (cache hits, evictions, ...)."""
+        with self.lock:
+            self.counters[counter_name] += amount
+    
+    def get_counters(self, prefix: Optional[str] = None) -> Dict[str, int]:
+        """Get a snapshot of counters, optionally only those starting with prefix."""
+        with self.lock:
+            return {
+                name: value for name, value in self.counters.items()
+                if prefix is None or name.startswith(prefix)
+            }
+    
     def get_operation_stats(self, operation_name: str) -> Dict:
         """Get statistics for a specific operation."""
         with self.lock:
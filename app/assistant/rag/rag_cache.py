@@ -0,0 +1,177 @@
+# rag_cache.py
+"""
+Bounded, TTL-aware LRU cache for formatted RAG retrieval results.
+
+Entries are keyed by (query, scopes, top_k, threshold), so the same query text
+asked against different scopes never shares a result. Expired entries are
+dropped lazily on lookup and by a periodic sweep; the cache is capped both by
+entry count and by approximate payload bytes. RAGDBHandler invalidates every
+entry touching a scope when it inserts into that scope. Empty results (no hits)
+are kept only for negative_ttl_seconds, so facts added by a path that does not
+invalidate the cache still show up soon.
+
+Counters (rag_cache_hit / _miss / _eviction / _expired / _invalidated) are
+reported through performance_monitor.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Set, Tuple
+
+from app.assistant.performance.performance_monitor import performance_monitor
+
+from app.assistant.utils.logging_config import get_logger
+logger = get_logger(__name__)
+
+CacheKey = Tuple[str, Tuple[str, ...], int, float]
+
+# Returned by get() on a miss when no default is given (cached values may themselves be None)
+CACHE_MISS = object()
+
+
+class RAGResultCache:
+    def __init__(
+        self,
+        ttl_seconds: float = 48 * 3600,
+        negative_ttl_seconds: float = 300,
+        max_entries: int = 2000,
+        max_bytes: int = 16 * 1024 * 1024,
+        sweep_interval_seconds: float = 300,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self.max_entries = max(1, int(max_entries))
+        self.max_bytes = max(1, int(max_bytes))
+        self.sweep_interval_seconds = sweep_interval_seconds
+
+        # key -> (value, expires_at, size_bytes)
+        self._entries: "OrderedDict[CacheKey, Tuple[Any, float, int]]" = OrderedDict()
+        self._keys_by_scope: Dict[str, Set[CacheKey]] = {}
+        self._bytes = 0
+        self._last_sweep = time.monotonic()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(query: str, scopes: Optional[Iterable[str]], top_k: int, threshold: float) -> CacheKey:
+        return (query, tuple(sorted(set(scopes or []))), int(top_k), float(threshold))
+
+    @staticmethod
+    def _size_of(key: CacheKey, value: Any) -> int:
+        size = len(key[0]) + sum(len(s) for s in key[1]) + 64
+        if isinstance(value, str):
+            size += len(value)
+        return size
+
+    # ------------------------------------------------------------------
+    # Internal helpers (caller holds the lock)
+    # ------------------------------------------------------------------
+
+    def _remove(self, key: CacheKey) -> None:
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+        for scope in key[1]:
+            keys = self._keys_by_scope.get(scope)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_scope[scope]
+
+    def _sweep_expired(self, now: float) -> None:
+        expired = [key for key, (_, expires, _) in self._entries.items() if expires <= now]
+        for key in expired:
+            self._remove(key)
+        if expired:
+            performance_monitor.increment_counter("rag_cache_expired", len(expired))
+        self._last_sweep = time.monotonic()
+
+    def _maybe_sweep(self, now: float) -> None:
+        if time.monotonic() - self._last_sweep >= self.sweep_interval_seconds:
+            self._sweep_expired(now)
+
+    def _evict_to_fit(self) -> None:
+        evicted = 0
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            evicted += 1
+        if evicted:
+            performance_monitor.increment_counter("rag_cache_eviction", evicted)
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def get(self, query: str, scopes: Optional[Iterable[str]], top_k: int, threshold: float,
+            default: Any = CACHE_MISS) -> Any:
+        """Return the cached value, or `default` (CACHE_MISS) on miss/expiry."""
+        key = self.make_key(query, scopes, top_k, threshold)
+        now = time.time()
+        with self._lock:
+            self._maybe_sweep(now)
+            entry = self._entries.get(key)
+            if entry is None:
+                performance_monitor.increment_counter("rag_cache_miss")
+                return default
+            value, expires, _ = entry
+            if expires <= now:
+                self._remove(key)
+                performance_monitor.increment_counter("rag_cache_expired")
+                performance_monitor.increment_counter("rag_cache_miss")
+                return default
+            self._entries.move_to_end(key)
+        performance_monitor.increment_counter("rag_cache_hit")
+        return value
+
+    def put(self, query: str, scopes: Optional[Iterable[str]], top_k: int, threshold: float, value: Any,
+            ttl_seconds: Optional[float] = None) -> None:
+        key = self.make_key(query, scopes, top_k, threshold)
+        now = time.time()
+        size = self._size_of(key, value)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, now + (ttl_seconds if ttl_seconds is not None else self.ttl_seconds), size)
+            self._bytes += size
+            for scope in key[1]:
+                self._keys_by_scope.setdefault(scope, set()).add(key)
+            self._evict_to_fit()
+            self._maybe_sweep(now)
+
+    def invalidate_scope(self, scope: str) -> int:
+        """Drop every entry whose scopes include `scope`. Returns the number removed."""
+        with self._lock:
+            keys = list(self._keys_by_scope.get(scope, ()))
+            for key in keys:
+                self._remove(key)
+        if keys:
+            performance_monitor.increment_counter("rag_cache_invalidated", len(keys))
+            logger.debug(f"RAG cache: invalidated {len(keys)} entries for scope '{scope}'")
+        return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_scope.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            stats = {"entries": len(self._entries), "bytes": self._bytes}
+        stats.update(performance_monitor.get_counters(prefix="rag_cache_"))
+        return stats
+
+
+# Global singleton instance
+_rag_result_cache = None
+_rag_result_cache_lock = threading.Lock()
+
+
+def get_rag_result_cache() -> RAGResultCache:
+    """Get the global RAG result cache instance."""
+    global _rag_result_cache
+    if _rag_result_cache is None:
+        with _rag_result_cache_lock:
+            if _rag_result_cache is None:
+                _rag_result_cache = RAGResultCache()
+    return _rag_result_cache
@@ -0,0 +1,219 @@
+# rag_index.py
+"""
+In-memory vector index over RAGDatabase.
+
+Each scope gets a contiguous float32 matrix of L2-normalized embeddings plus
+parallel metadata lists. The matrix is built lazily from the table on first
+query of a scope and appended to by RAGDBHandler.insert_rag_facts, so a query
+is a single matrix product (all query sentences at once) followed by an
+argpartition top-k, independent of Python-level per-row work.
+"""
+
+import threading
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional
+
+import numpy as np
+
+from app.models.base import get_session
+from app.assistant.database.db_handler import RAGDatabase
+
+from app.assistant.utils.logging_config import get_logger
+logger = get_logger(__name__)
+
+
+class RAGIndexRow(NamedTuple):
+    """The fields of a RAGDatabase row the index keeps (no ORM instance, so no lazy loads)."""
+    document: str
+    embedding: List[float]
+    source: Optional[str]
+    timestamp: Any
+    scope: str
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class _ScopeMatrix:
+    """Growable matrix of normalized embeddings for one scope."""
+
+    def __init__(self, dim: int, capacity: int = 1024):
+        self.dim = dim
+        self.size = 0
+        self.vectors = np.zeros((max(capacity, 1), dim), dtype=np.float32)
+        self.documents: List[str] = []
+        self.sources: List[Optional[str]] = []
+        self.timestamps: List[Any] = []
+
+    def append(self, embeddings: np.ndarray, documents, sources, timestamps) -> None:
+        n = embeddings.shape[0]
+        if n == 0:
+            return
+        needed = self.size + n
+        if needed > self.vectors.shape[0]:
+            capacity = max(needed, self.vectors.shape[0] * 2)
+            grown = np.zeros((capacity, self.dim), dtype=np.float32)
+            grown[:self.size] = self.vectors[:self.size]
+            self.vectors = grown
+        self.vectors[self.size:needed] = _normalize_rows(embeddings.astype(np.float32, copy=False))
+        self.size = needed
+        self.documents.extend(documents)
+        self.sources.extend(sources)
+        self.timestamps.extend(timestamps)
+
+    @property
+    def view(self) -> np.ndarray:
+        return self.vectors[:self.size]
+
+
+class RAGIndex:
+    """Per-scope matrix index with lazy build and incremental append."""
+
+    def __init__(self):
+        self._scopes: Dict[str, _ScopeMatrix] = {}
+        self._lock = threading.RLock()
+
+    # ------------------------------------------------------------------
+    # Build / update
+    # ------------------------------------------------------------------
+
+    def _load_scope(self, scope: str) -> Optional[_ScopeMatrix]:
+        session = get_session()
+        try:
+            rows = (
+                session.query(RAGDatabase.document, RAGDatabase.embedding,
+                              RAGDatabase.source, RAGDatabase.timestamp)
+                .filter(RAGDatabase.scope == scope)
+                .all()
+            )
+        finally:
+            session.close()
+
+        rows = [r for r in rows if r.embedding]
+        if not rows:
+            return None
+        embeddings = np.asarray([r.embedding for r in rows], dtype=np.float32)
+        matrix = _ScopeMatrix(embeddings.shape[1], capacity=len(rows))
+        matrix.append(
+            embeddings,
+            [r.document for r in rows],
+            [r.source for r in rows],
+            [r.timestamp for r in rows],
+        )
+        logger.info(f"RAG index built for scope '{scope}': {len(rows)} documents")
+        return matrix
+
+    def _get_scope(self, scope: str) -> Optional[_ScopeMatrix]:
+        with self._lock:
+            if scope not in self._scopes:
+                matrix = self._load_scope(scope)
+                if matrix is None:
+                    return None
+                self._scopes[scope] = matrix
+            return self._scopes[scope]
+
+    def add_entries(self, entries: Iterable[RAGIndexRow]) -> None:
+        """
+        Append freshly inserted rows (RAGIndexRow, or anything with the same
+        attributes). Scopes that were never loaded are skipped; they will read the
+        new rows from the table when first queried.
+        """
+        by_scope: Dict[str, List[RAGDatabase]] = {}
+        for entry in entries:
+            by_scope.setdefault(entry.scope, []).append(entry)
+
+        with self._lock:
+            for scope, rows in by_scope.items():
+                matrix = self._scopes.get(scope)
+                if matrix is None:
+                    continue
+                matrix.append(
+                    np.asarray([r.embedding for r in rows], dtype=np.float32),
+                    [r.document for r in rows],
+                    [r.source for r in rows],
+                    [r.timestamp for r in rows],
+                )
+
+    def invalidate(self, scope: Optional[str] = None) -> None:
+        with self._lock:
+            if scope is None:
+                self._scopes.clear()
+            else:
+                self._scopes.pop(scope, None)
+
+    # ------------------------------------------------------------------
+    # Query
+    # ------------------------------------------------------------------
+
+    def search(self, query_embeddings: np.ndarray, scopes: List[str], top_k: int = 3,
+               threshold: float = 0.0) -> List[Dict[str, Any]]:
+        """
+        Score every document in `scopes` against all query vectors at once.
+
+        A document's score is its best cosine similarity over the query vectors.
+        Returns up to top_k result dicts (document, source, scope, similarity, timestamp),
+        highest similarity first, de-duplicated on (document, source, scope).
+        """
+        queries = np.atleast_2d(np.asarray(query_embeddings, dtype=np.float32))
+        if queries.size == 0 or top_k <= 0:
+            return []
+        queries = _normalize_rows(queries)
+
+        candidates = []
+        for scope in dict.fromkeys(scopes or []):
+            matrix = self._get_scope(scope)
+            if matrix is None or matrix.size == 0:
+                continue
+            with self._lock:
+                vectors = matrix.view
+                size = matrix.size
+                documents, sources, timestamps = matrix.documents, matrix.sources, matrix.timestamps
+
+            scores = (vectors @ queries.T).max(axis=1)
+            # Over-fetch a little so duplicate documents cannot starve the top_k
+            k = min(size, top_k * 2)
+            top = np.argpartition(-scores, k - 1)[:k] if k < size else np.arange(size)
+            for i in top:
+                score = float(scores[i])
+                if score >= threshold:
+                    candidates.append((score, documents[i], sources[i], scope, timestamps[i]))
+
+        candidates.sort(key=lambda c: c[0], reverse=True)
+        results = []
+        seen = set()
+        for score, document, source, scope, timestamp in candidates:
+            key = (document, source, scope)
+            if key in seen:
+                continue
+            seen.add(key)
+            results.append({
+                "document": document,
+                "source": source,
+                "scope": scope,
+                "similarity": score,
+                "timestamp": timestamp,
+            })
+            if len(results) >= top_k:
+                break
+        return results
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {scope: matrix.size for scope, matrix in self._scopes.items()}
+
+
+# Global singleton instance
+_rag_index = None
+_rag_index_lock = threading.Lock()
+
+
+def get_rag_index() -> RAGIndex:
+    """Get the global RAG index instance."""
+    global _rag_index
+    if _rag_index is None:
+        with _rag_index_lock:
+            if _rag_index is None:
+                _rag_index = RAGIndex()
+    return _rag_index
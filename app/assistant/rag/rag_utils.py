@@ -1,15 +1,13 @@
 # rag_utils.py
 import re
 
-from app.models.base import get_session
-from app.assistant.database.db_handler import RAGDatabase
+from app.assistant.utils.embedding_service import get_embedding_service
 
 from app.assistant.utils.logging_config import get_logger
 logger = get_logger(__name__)
 
 # Lazy loading for optional dependencies (not available in alpha)
 _nlp = None
-_embedding_model = None
 _numpy = None
 
 def _get_nlp():
@@ -24,18 +22,6 @@ def _get_nlp():
             raise ImportError("spaCy not installed. RAG features require spaCy.")
     return _nlp
 
-def _get_embedding_model():
-    """Lazy load embedding model"""
-    global _embedding_model
-    if _embedding_model is None:
-        try:
-            from sentence_transformers import SentenceTransformer
-            _embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
-        except ImportError:
-            logger.warning("sentence-transformers not available - RAG features disabled")
-            raise ImportError("sentence-transformers not installed. RAG features require sentence-transformers.")
-    return _embedding_model
-
 def _get_numpy():
     """Lazy load numpy"""
     global _numpy
@@ -58,110 +44,65 @@ def strip_speaker_prefix(text):
             return message.strip()
     return text.strip()
 
-def query_rag_database(query_text, scopes=None, top_k=3, threshold=0.35, chunk_size=1):
+def query_rag_database(query_text, scopes=None, top_k=3, threshold=0.35, chunk_size=1, raise_errors=False):
     """
     Query RAG database with semantic search using chunked processing for better performance.
+    All chunks are scored in one matrix product against the per-scope RAG index.
     Requires spacy and sentence-transformers.
+
+    Returns [] when nothing matches. A failed search is logged and also returns [],
+    unless raise_errors=True, in which case the exception propagates so callers can
+    tell "no hits" from "error" (e.g. to avoid caching the failure).
     """
     # Get lazy-loaded dependencies
     nlp = _get_nlp()
-    embedding_model = _get_embedding_model()
-    np = _get_numpy()
-    
+    embedding_service = get_embedding_service()
+    from app.assistant.rag.rag_index import get_rag_index
+
     doc = nlp(query_text)
     sentences = [sent.text.strip() for sent in doc.sents]
-    merged_results = {}
+    if not scopes or not sentences:
+        return []
 
-    session = get_session()
     try:
-        if not scopes:
-            scopes = []
-
-        results = (
-            session.query(RAGDatabase)
-                .filter(RAGDatabase.scope.in_(scopes))
-                .all()
-        )
+        chunks = [" ".join(sentences[i:i + chunk_size]) for i in range(0, len(sentences), chunk_size)]
+        chunk_embeddings = embedding_service.encode_many(chunks, as_numpy=True)
 
+        results = get_rag_index().search(chunk_embeddings, scopes, top_k=top_k, threshold=threshold)
         if not results:
             logger.info(f"No RAG results found for scopes: {scopes}")
-            return []
-
-        for i in range(0, len(sentences), chunk_size):
-            chunk = " ".join(sentences[i:i + chunk_size])
-            query_embedding = np.array(embedding_model.encode(chunk))
-            query_norm = np.linalg.norm(query_embedding)
-
-            for result in results:
-                stored_embedding = np.array(result.embedding)
-                similarity = np.dot(query_embedding, stored_embedding) / (query_norm * np.linalg.norm(stored_embedding))
-
-                if similarity >= threshold:
-                    key = (result.document, result.source, result.scope)
-                    if key not in merged_results or merged_results[key]["similarity"] < similarity:
-                        merged_results[key] = {
-                            "document": result.document,
-                            "source": result.source,
-                            "scope": result.scope,
-                            "similarity": similarity,
-                            "timestamp": result.timestamp
-                        }
-
-        return sorted(merged_results.values(), key=lambda x: x["similarity"], reverse=True)[:top_k]
+        return results
 
     except Exception as e:
         logger.error(f"[ERROR] Failed during chunked RAG query: {e}")
+        if raise_errors:
+            raise
         return []
-    finally:
-        session.close()
 
 
-def _query_rag_database(query_text, scopes=None, top_k=3, relevance_threshold=0.5):
-    """Query RAG database. Requires sentence-transformers."""
+def _query_rag_database(query_text, scopes=None, top_k=3, relevance_threshold=0.5, raise_errors=False):
+    """Query RAG database. Requires sentence-transformers. See query_rag_database for raise_errors."""
     # Get lazy-loaded dependencies
-    embedding_model = _get_embedding_model()
+    embedding_service = get_embedding_service()
     np = _get_numpy()
-    
-    session = get_session()
-    try:
-        if not scopes:
-            scopes = []
+    from app.assistant.rag.rag_index import get_rag_index
 
-        # ✅ Only fetch entries in scope
-        results = (
-            session.query(RAGDatabase)
-                .filter(RAGDatabase.scope.in_(scopes))
-                .all()
-        )
+    if not scopes:
+        return []
 
+    try:
+        # Embed once
+        query_embedding = np.array(embedding_service.encode(query_text), dtype=np.float32)
+        results = get_rag_index().search(query_embedding, scopes, top_k=top_k, threshold=relevance_threshold)
         if not results:
             logger.info(f"No RAG results found for scopes: {scopes}")
-            return []
-
-        # Embed once
-        query_embedding = np.array(embedding_model.encode(query_text))
-        query_norm = np.linalg.norm(query_embedding)
-
-        similarities = []
-        for result in results:
-            stored_embedding = np.array(result.embedding)
-            similarity = np.dot(query_embedding, stored_embedding) / (query_norm * np.linalg.norm(stored_embedding))
-            if similarity >= relevance_threshold:
-                similarities.append({
-                    "document": result.document,
-                    "source": result.source,
-                    "scope": result.scope,
-                    "similarity": similarity,
-                    "timestamp": result.timestamp
-                })
-
-        return sorted(similarities, key=lambda x: x["similarity"], reverse=True)[:top_k]
+        return results
 
     except Exception as e:
         logger.error(f"[ERROR] Failed to query RAGDatabase: {e}")
+        if raise_errors:
+            raise
         return []
-    finally:
-        session.close()
 
 
 if __name__ == "__main__":
@@ -2,46 +2,77 @@ from datetime import datetime, timezone
 import uuid
 from typing import List, Optional, Any
 from sqlalchemy import select
-from sentence_transformers import SentenceTransformer
 from app.models.base import get_session
 from app.assistant.database.db_handler import RAGDatabase
+from app.assistant.utils.embedding_service import get_embedding_service
+from app.assistant.rag.rag_index import RAGIndexRow, get_rag_index
+from app.assistant.rag.rag_cache import get_rag_result_cache
 
 from app.assistant.utils.logging_config import get_logger
 logger = get_logger(__name__)
 
 class RAGDBHandler:
     def __init__(self, embedding_model: Optional[Any] = None):
-        self.embedding_model = embedding_model or SentenceTransformer("all-MiniLM-L6-v2")
+        # An explicit model is still accepted (tests, tooling); otherwise share the process-wide one.
+        self.embedding_model = embedding_model
+
+    def _encode_many(self, texts: List[str]) -> List[List[float]]:
+        if self.embedding_model is not None:
+            return [v.tolist() for v in self.embedding_model.encode(list(texts))]
+        return get_embedding_service().encode_many(texts)
 
     def insert_rag_facts(self, data_list: List[Any], source_name: str) -> None:
         db_session = get_session()
         new_entries = []
+        # Plain copies for the in-memory index: reading the ORM rows after commit
+        # would reload each one (expire_on_commit), one SELECT per fact.
+        index_rows: List[RAGIndexRow] = []
 
         print("\n\n\nAt insert_rag_facts")
         print("Labeled facts: ",data_list)
         print("source ", source_name)
 
         try:
-            for fact in data_list:
-                embedding = self.embedding_model.encode(fact).tolist()
-                existing = db_session.execute(
-                    select(RAGDatabase).where(RAGDatabase.document == fact)
-                ).scalars().first()
-                if not existing:
-                    new_entries.append(RAGDatabase(
-                        id=str(uuid.uuid4()),
-                        document=fact,
-                        embedding=embedding,
-                        source=source_name,
-                        timestamp=datetime.now(timezone.utc),
-                        processed=False,
-                        scope=source_name,
-                    ))
-            if new_entries:
-                db_session.add_all(new_entries)
-                db_session.commit()
+            # One lookup for the whole batch, then embed only the new facts in one forward pass.
+            unique_facts = list(dict.fromkeys(data_list))
+            existing_docs = set()
+            if unique_facts:
+                existing_docs = set(db_session.execute(
+                    select(RAGDatabase.document).where(RAGDatabase.document.in_(unique_facts))
+                ).scalars().all())
+            new_facts = [fact for fact in unique_facts if fact not in existing_docs]
+            embeddings = self._encode_many(new_facts) if new_facts else []
+
+            for fact, embedding in zip(new_facts, embeddings):
+                timestamp = datetime.now(timezone.utc)
+                new_entries.append(RAGDatabase(
+                    id=str(uuid.uuid4()),
+                    document=fact,
+                    embedding=embedding,
+                    source=source_name,
+                    timestamp=timestamp,
+                    processed=False,
+                    scope=source_name,
+                ))
+                index_rows.append(RAGIndexRow(fact, embedding, source_name, timestamp, source_name))
+            if not new_entries:
+                return
+            db_session.add_all(new_entries)
+            db_session.commit()
         except Exception as e:
             db_session.rollback()
             logger.error(f"[{source_name}] Error inserting RAG facts: {e}")
+            return
         finally:
             db_session.close()
+
+        # Committed: the index and the result cache must follow, whatever happens here.
+        scopes = {row.scope for row in index_rows}
+        try:
+            get_rag_index().add_entries(index_rows)
+        except Exception as e:
+            logger.error(f"[{source_name}] Error appending RAG facts to the index, reloading scopes: {e}")
+            for scope in scopes:
+                get_rag_index().invalidate(scope)
+        for scope in scopes:
+            get_rag_result_cache().invalidate_scope(scope)
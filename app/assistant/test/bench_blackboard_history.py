@@ -0,0 +1,178 @@
+"""
+Benchmark: history assembly time per agent turn over a long MultiAgentManager run.
+
+A MultiAgentManager is driven through --cycles loop iterations with a stub delegator and
+stub worker agents. The delegator runs workers inside short-lived subtask scopes; each
+worker turn assembles history the way Agent does (recent_history via
+get_messages_for_scope, plus the last-plan checks), calls a stub LLM and posts its result,
+so the blackboard grows by a few messages per cycle. "before" patches the Blackboard
+readers with the original linear scans over self.messages, "after" uses the scope and
+last-plan indexes maintained in add_msg.
+
+Run from the repo root:
+    python -m app.assistant.test.bench_blackboard_history [--cycles 3000] [--report-every 500]
+
+Not collected by pytest (file name does not start with test_).
+"""
+
+import argparse
+import contextlib
+import io
+import logging
+import statistics
+import time
+import uuid
+from unittest import mock
+
+from app.assistant.lib.blackboard.Blackboard import Blackboard
+from app.assistant.manager_classes.MultiAgentManager import MultiAgentManager
+from app.assistant.utils.pydantic_classes import Message
+
+WORKERS = ["researcher", "coder", "reviewer"]
+PLAN_EVERY = 200  # cycles between planner messages
+SUBTASK_CYCLES = 20  # cycles per subtask scope
+
+
+# --- Linear-scan readers (the pre-index implementation) ---
+
+def _scan_last_plan(messages):
+    for i in range(len(messages) - 1, -1, -1):
+        if "plan" in (getattr(messages[i], "sub_data_type", []) or []):
+            return i
+    return None
+
+
+def _scan_scope(self, scope_id):
+    if not scope_id:
+        return []
+    return [msg for msg in self.messages if msg.scope_id == scope_id]
+
+
+def _scan_after_plan(self):
+    i = _scan_last_plan(self.messages)
+    return self.messages if i is None else self.messages[i:]
+
+
+def _scan_time_to_summarize(self):
+    return sum("plan" in (getattr(m, "sub_data_type", []) or []) for m in self.messages) >= 2
+
+
+LINEAR_SCANS = {
+    "get_messages_for_scope": _scan_scope,
+    "get_messages_after_last_plan": _scan_after_plan,
+    "time_to_summarize": _scan_time_to_summarize,
+}
+
+
+# --- Stub manager wiring ---
+
+class _StubLLM:
+    def structured_output(self, messages, use_json=False, **params):
+        return {"result": "ok", "what_i_did": f"handled {len(messages)} prompt messages"}
+
+
+class _StubAgent:
+    """Mimics an Agent turn: assemble history, call the LLM, post the result."""
+
+    def __init__(self, name, blackboard, samples):
+        self.name = name
+        self.blackboard = blackboard
+        self.llm_interface = _StubLLM()
+        self.samples = samples
+
+    def action_handler(self, message):
+        bb = self.blackboard
+        start = time.perf_counter()
+        recent = bb.get_messages_for_scope(bb.get_current_scope_id())
+        since_plan = bb.get_messages_after_last_plan()
+        bb.time_to_summarize()
+        self.samples.append((time.perf_counter() - start) * 1000)
+
+        result = self.llm_interface.structured_output([m.content for m in recent[-10:]], plan_messages=len(since_plan))
+        bb.add_msg(Message(data_type="agent_msg", sender=self.name, receiver=self.name, content=result["what_i_did"]))
+        bb.add_msg(Message(data_type="tool_result", sender="tool", receiver=self.name, content="tool output"))
+
+
+class _StubDelegator:
+    def __init__(self, blackboard, max_cycles):
+        self.blackboard = blackboard
+        self.max_cycles = max_cycles
+        self.cycle = 0
+        self.subtask_scope = None
+
+    def action_handler(self, message):
+        bb = self.blackboard
+        self.cycle += 1
+        if self.cycle % SUBTASK_CYCLES == 1:
+            if self.subtask_scope:
+                bb.pop_call_context()
+            self.subtask_scope = f"subtask_{uuid.uuid4()}"
+            bb.push_call_context("delegator", "worker", self.subtask_scope)
+        if self.cycle % PLAN_EVERY == 1:
+            bb.add_msg(Message(data_type="agent_msg", sender="planner", receiver=None,
+                               sub_data_type=["plan"], content=f"plan {self.cycle}"))
+        bb.update_state_value("next_agent", WORKERS[self.cycle % len(WORKERS)])
+        if self.cycle >= self.max_cycles:
+            bb.update_state_value("exit", True)
+
+
+class _StubAgentRegistry:
+    configs = {}
+    control_nodes = {}
+
+    def __init__(self):
+        self.instances = {}
+
+    def get_agent_config(self, name):
+        return None
+
+    def get_agent_instance(self, name):
+        return self.instances.get(name)
+
+
+def _run(cycles: int, report_every: int, indexed: bool) -> dict:
+    registry = _StubAgentRegistry()
+    manager_config = {"tool_pipeline": {}, "agents": [], "control_nodes": [], "max_cycles": cycles + 1}
+    manager = MultiAgentManager("bench_manager", manager_config, tool_registry=None, agent_registry=registry)
+    bb = manager.blackboard
+    bb.push_call_context("bench_manager", "bench_manager", f"root_scope_{uuid.uuid4()}")
+
+    samples = []
+    delegator = _StubDelegator(bb, cycles)
+    registry.instances = {name: _StubAgent(name, bb, samples) for name in WORKERS}
+    registry.instances["delegator"] = delegator
+
+    patches = [] if indexed else [mock.patch.object(Blackboard, name, fn) for name, fn in LINEAR_SCANS.items()]
+    with contextlib.ExitStack() as stack:
+        for p in patches:
+            stack.enter_context(p)
+        stack.enter_context(contextlib.redirect_stdout(io.StringIO()))  # _run_loop prints per cycle
+        start = time.perf_counter()
+        manager._run_loop(cycles + 1, delegator, {})
+        total = time.perf_counter() - start
+
+    buckets = {}
+    for lo in range(0, len(samples), report_every):
+        buckets[lo + report_every] = statistics.median(samples[lo:lo + report_every])
+    return {"buckets": buckets, "total_s": total, "messages": len(bb.messages)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--cycles", type=int, default=3000)
+    parser.add_argument("--report-every", type=int, default=500)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    before = _run(args.cycles, args.report_every, indexed=False)
+    after = _run(args.cycles, args.report_every, indexed=True)
+
+    print(f"{'cycles':>8} {'before ms/turn':>15} {'after ms/turn':>14} {'speedup':>8}")
+    for cycle, b in before["buckets"].items():
+        a = after["buckets"][cycle]
+        print(f"{cycle:>8} {b:>15.3f} {a:>14.3f} {b / a:>7.1f}x")
+    print(f"messages: {after['messages']}  total run: before {before['total_s']:.2f}s, after {after['total_s']:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Benchmark: per-call Agent.construct_prompt time with and without the compiled template cache.
+
+"before" swaps the cache for a plain jinja2.Template (parse + compile on every call),
+"after" uses app.assistant.utils.cache.get_compiled_template. Both run against the
+heaviest agent configs (by prompt size) with an empty blackboard and no tools.
+
+Run from the repo root:
+    python -m app.assistant.test.bench_construct_prompt [--agents 6] [--iterations 200]
+
+Not collected by pytest (file name does not start with test_).
+"""
+
+import argparse
+import statistics
+import time
+from unittest import mock
+
+from jinja2 import Template
+
+from app.assistant.agent_classes.Agent import Agent
+from app.assistant.agent_registry.agent_registry import AgentRegistry
+from app.assistant.lib.blackboard.Blackboard import Blackboard
+from app.assistant.utils.cache import get_compiled_template
+
+# Every call site that used to build jinja2.Template directly
+PATCH_TARGETS = [
+    "app.assistant.agent_classes.Agent.get_compiled_template",
+    "app.assistant.agent_classes.ToolArguments.get_compiled_template",
+    "app.assistant.agent_classes.AskUser.get_compiled_template",
+    "app.assistant.agent_classes.EmiResultHandler.get_compiled_template",
+    "app.assistant.agent_classes.Blackboard.get_compiled_template",
+]
+
+
+class _NoTools:
+    def list_tools(self):
+        return []
+
+    def get_tool_descriptions(self, tools):
+        return ""
+
+    def get_tool_arguments_prompt(self, tools):
+        return ""
+
+
+def _prompt_size(config) -> int:
+    prompts = (config or {}).get("prompts", {}) or {}
+    return len(prompts.get("system", "") or "") + len(prompts.get("user", "") or "")
+
+
+def _time_calls(agent: Agent, iterations: int) -> list:
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        agent.construct_prompt()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def _run(agent: Agent, iterations: int, cached: bool) -> list:
+    if cached:
+        get_compiled_template(agent.config["prompts"]["system"])  # warm the cache
+        return _time_calls(agent, iterations)
+    patches = [mock.patch(target, Template) for target in PATCH_TARGETS]
+    for p in patches:
+        p.start()
+    try:
+        return _time_calls(agent, iterations)
+    finally:
+        for p in patches:
+            p.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--agents", type=int, default=6, help="number of heaviest agents to benchmark")
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    registry = AgentRegistry()
+    registry.load_agents()
+    names = sorted(registry.list_agents(), key=lambda n: -_prompt_size(registry.get_agent_config(n)))
+
+    print(f"{'agent':45} {'prompt chars':>12} {'before ms':>10} {'after ms':>10} {'speedup':>8}")
+    benchmarked = 0
+    for name in names:
+        if benchmarked >= args.agents:
+            break
+        agent = Agent(name, Blackboard(), registry, _NoTools())
+        try:
+            agent.construct_prompt()
+        except BaseException as e:  # agents that need live state (DB rows, DI services) are skipped
+            print(f"{name:45} skipped: {type(e).__name__}: {e}")
+            continue
+
+        before = statistics.median(_run(agent, args.iterations, cached=False))
+        after = statistics.median(_run(agent, args.iterations, cached=True))
+        print(f"{name:45} {_prompt_size(agent.config):>12} {before:>10.3f} {after:>10.3f} {before / after:>7.1f}x")
+        benchmarked += 1
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Microbenchmark: entity detection over long chat histories with a large catalog.
+
+Compares the previous detector (every phrase length probed at every token position)
+against the token-level Aho-Corasick automaton now used by
+EntityCardInjector.detect_entities_in_text. The catalog is built from synthetic
+entity cards in an in-memory SQLite database.
+
+Run from the repo root:
+    python -m app.assistant.test.bench_entity_detection [--entities 10000] [--words 50000]
+
+Not collected by pytest (file name does not start with test_).
+"""
+
+import argparse
+import random
+import time
+from typing import List, Set
+from unittest import mock
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.assistant.entity_management.entity_card_injector import EntityCardInjector
+from app.assistant.entity_management.entity_cards import EntityCard
+from app.assistant.entity_management.entity_catalog import EntityCatalog
+
+WORDS = (
+    "alpha bravo charlie delta echo foxtrot golf hotel india juliet kilo lima mike november oscar "
+    "papa quebec romeo sierra tango uniform victor whiskey xray yankee zulu river stone maple cedar "
+    "harbor summit valley meadow garden bridge castle forest island canyon prairie lantern"
+).split()
+
+
+def _entity_names(count: int, rng: random.Random) -> List[str]:
+    names = set()
+    while len(names) < count:
+        length = rng.choice([1, 1, 2, 2, 2, 3, 3, 4, 5, 6])
+        names.add(" ".join(rng.choice(WORDS).title() for _ in range(length)) + f" {len(names)}")
+    return sorted(names)
+
+
+def _history(words: int, names: List[str], rng: random.Random) -> str:
+    out = []
+    while len(out) < words:
+        if rng.random() < 0.02:
+            out.extend(rng.choice(names).split())
+        else:
+            out.append(rng.choice(WORDS) + rng.choice(["", "", ",", ".", "'s"]))
+    return " ".join(out)
+
+
+def _legacy_detect(catalog: EntityCatalog, tokens: List[str]) -> Set[str]:
+    found: Set[str] = set()
+    for t in tokens:
+        if t in catalog.single_word_index:
+            found.update(catalog.single_word_index[t])
+    n = len(tokens)
+    for i in range(n):
+        for length in catalog.phrase_lengths:
+            if i + length > n:
+                continue
+            canonical_names = catalog.multi_word_index[length].get(tuple(tokens[i:i + length]))
+            if canonical_names:
+                found.update(canonical_names)
+    return found
+
+
+def _best_of(fn, repeats: int) -> float:
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--entities", type=int, default=10000)
+    parser.add_argument("--words", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    names = _entity_names(args.entities, rng)
+
+    engine = create_engine("sqlite:///:memory:")
+    EntityCard.__table__.create(engine)
+    Session = sessionmaker(bind=engine)
+    session = Session()
+    session.add_all(
+        EntityCard(entity_name=name, entity_type="thing", summary="-", aliases=[name.lower()], card_metadata={})
+        for name in names
+    )
+    session.commit()
+    session.close()
+
+    with mock.patch("app.assistant.entity_management.entity_catalog.get_session", Session):
+        start = time.perf_counter()
+        catalog = EntityCatalog()
+        build_ms = (time.perf_counter() - start) * 1000
+
+    print(f"catalog: {len(catalog.all_canonical_entities)} entities, phrase lengths {sorted(catalog.phrase_lengths)}, "
+          f"{catalog.automaton.state_count} automaton states, load+build {build_ms:.0f} ms")
+    print(f"{'words':>8} {'tokenize ms':>12} {'legacy ms':>10} {'automaton ms':>13} {'speedup':>8} {'entities':>9}")
+
+    injector = EntityCardInjector()
+    for words in args.words:
+        text = _history(words, names, rng)
+        tokens = injector._tokenize_text(text)
+        tokenize_ms = _best_of(lambda: injector._tokenize_text(text), args.repeats)
+        legacy_ms = _best_of(lambda: _legacy_detect(catalog, tokens), args.repeats)
+        automaton_ms = _best_of(lambda: catalog.match_tokens(tokens), args.repeats)
+        found = catalog.match_tokens(tokens)
+        assert found == _legacy_detect(catalog, tokens)
+        print(f"{words:>8} {tokenize_ms:>12.2f} {legacy_ms:>10.2f} {automaton_ms:>13.2f} "
+              f"{legacy_ms / automaton_ms:>7.1f}x {len(found):>9}")
+
+
+if __name__ == "__main__":
+    main()
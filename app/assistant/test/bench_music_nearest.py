@@ -0,0 +1,135 @@
+"""
+Benchmark: SqliteMusicDataset.nearest_matches per-pick latency on a large synthetic table.
+
+Builds a temporary music_tracks_spotify table with --tracks random rows. "before" is the
+old path (SQL energy/valence gate ORDER BY closeness LIMIT 50000, then a DatasetSong and
+Python weighted-L1 per row); "after" is the cached feature matrix (NumPy weighted L1 +
+argpartition). The one-time matrix load is reported separately, both from the table and
+from the on-disk snapshot (what a restart pays).
+
+Run from the repo root:
+    python -m app.assistant.test.bench_music_nearest [--tracks 1000000] [--picks 10]
+
+Not collected by pytest (file name does not start with test_).
+"""
+
+import argparse
+import logging
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from sqlalchemy import create_engine
+
+from app.assistant.dj_manager import feature_matrix
+from app.assistant.dj_manager.feature_scaler import db_to_llm_features
+from app.assistant.dj_manager.music_dataset import DatasetSong, MusicDataset, SqliteMusicDataset
+from app.models.music_genre_stats import MusicGenreStats
+from app.models.music_tracks_spotify import SpotifyMusicTrack
+from app.models.music_weights import MusicArtistWeight, MusicGenreWeight, MusicTrackWeight
+
+FEATURES = ("energy", "valence", "loudness", "speechiness", "acousticness", "instrumentalness", "liveness", "tempo")
+GENRES = [f"genre{i}" for i in range(80)]
+
+
+def _build_db(path: Path, tracks: int, seed: int = 0) -> None:
+    engine = create_engine(f"sqlite:///{path}")
+    for model in (SpotifyMusicTrack, MusicGenreStats, MusicGenreWeight, MusicArtistWeight, MusicTrackWeight):
+        model.__table__.create(engine)
+    engine.dispose()
+
+    rng = random.Random(seed)
+    sql = (
+        "INSERT INTO music_tracks_spotify (track_id, track_name, artist_name, genre, prob_factor, "
+        f"{', '.join(FEATURES)}) VALUES ({', '.join('?' * 13)})"
+    )
+    with sqlite3.connect(path) as conn:
+        batch = []
+        for i in range(tracks):
+            batch.append((
+                f"id{i}", f"Song {i}", f"Artist {i % 50000}", GENRES[i % len(GENRES)], 1.0,
+                rng.random(), rng.random(), rng.uniform(-25, 0), rng.random(), rng.random(),
+                rng.random(), rng.random(), rng.uniform(60, 190),
+            ))
+            if len(batch) >= 100000:
+                conn.executemany(sql, batch)
+                batch.clear()
+        conn.executemany(sql, batch)
+        conn.executemany(
+            "INSERT INTO music_genre_stats (genre, track_count, updated_at_utc) VALUES (?, ?, '2025-01-01')",
+            [(g, tracks // len(GENRES)) for g in GENRES],
+        )
+        conn.execute("CREATE INDEX idx_bench_energy_valence ON music_tracks_spotify (energy, valence)")
+
+
+def _legacy_nearest(db_path: Path, target: dict, n: int, prefilter_limit: int = 50000) -> list:
+    e, v = target["energy"], target["valence"]
+    with sqlite3.connect(db_path) as conn:
+        rows = conn.execute(
+            f"""
+            SELECT track_id, track_name, artist_name, genre, prob_factor, {', '.join(FEATURES)}
+            FROM music_tracks_spotify
+            WHERE prob_factor > 0 AND energy BETWEEN ? AND ? AND valence BETWEEN ? AND ?
+            ORDER BY (2.0*ABS(COALESCE(energy, 0.5) * 100.0 - ?) + 2.0*ABS(COALESCE(valence, 0.5) * 100.0 - ?)) ASC
+            LIMIT ?
+            """,
+            [max(0, e - 5) / 100, min(100, e + 5) / 100, max(0, v - 15) / 100, min(100, v + 15) / 100, e, v, prefilter_limit],
+        ).fetchall()
+        genre_counts = dict(conn.execute("SELECT genre, track_count FROM music_genre_stats").fetchall())
+    songs = []
+    for row in rows:
+        sliders = db_to_llm_features(dict(zip(FEATURES, row[5:])))
+        pf = row[4] / max(1, genre_counts.get(row[3], 0))
+        songs.append(DatasetSong(row[0], row[1], row[2], row[3], sliders, f"{row[1]} by {row[2]}", pf))
+    full = {k: float(target.get(k, 50)) for k in FEATURES}
+    return sorted(songs, key=lambda s: MusicDataset._distance(full, s))[:n]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--tracks", type=int, default=1000000)
+    parser.add_argument("--picks", type=int, default=10)
+    parser.add_argument("--n", type=int, default=10000, help="base pool size requested per pick (DJ manager uses 10000)")
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    rng = random.Random(1)
+    targets = [{k: rng.uniform(20, 80) for k in FEATURES} for _ in range(args.picks)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["EMI_MUSIC_SNAPSHOT_DIR"] = str(Path(tmp) / "snapshots")
+        db_path = Path(tmp) / "bench_music.db"
+        t0 = time.perf_counter()
+        _build_db(db_path, args.tracks)
+        print(f"built {args.tracks} track(s) in {time.perf_counter() - t0:.1f}s")
+
+        ds = SqliteMusicDataset(db_path=db_path)
+        t0 = time.perf_counter()
+        ds.nearest_matches(targets[0], n=args.n)
+        print(f"first pick (includes one-time matrix load): {(time.perf_counter() - t0) * 1000:.0f} ms")
+        feature_matrix.invalidate_feature_matrix(db_path)
+        t0 = time.perf_counter()
+        ds.nearest_matches(targets[0], n=args.n)
+        print(f"first pick after restart (matrix mapped from snapshot): {(time.perf_counter() - t0) * 1000:.0f} ms")
+
+        before, after = [], []
+        for target in targets:
+            t0 = time.perf_counter()
+            _legacy_nearest(db_path, target, args.n)
+            before.append((time.perf_counter() - t0) * 1000)
+            t0 = time.perf_counter()
+            ds.nearest_matches(target, n=args.n)
+            after.append((time.perf_counter() - t0) * 1000)
+
+        b, a = statistics.median(before), statistics.median(after)
+        print(f"{'picks':>6} {'before ms':>10} {'after ms':>10} {'speedup':>8}")
+        print(f"{args.picks:>6} {b:>10.1f} {a:>10.1f} {b / a:>7.1f}x")
+        feature_matrix.invalidate_feature_matrix(db_path)
+
+
+if __name__ == "__main__":
+    main()
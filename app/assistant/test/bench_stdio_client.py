@@ -0,0 +1,92 @@
+"""
+Stress benchmark: concurrent JSON-RPC calls over one StdioJsonRpcClient.
+
+Spawns the fake echo MCP server and issues --calls tools/call requests from
+--workers threads sharing a single client, once multiplexed (all requests in
+flight together) and once serialized behind a lock (one request at a time per
+process, as callers had to do before the client was thread-safe). Reports
+p50/p99 latency and throughput for both.
+
+Run from the repo root:
+    python -m app.assistant.test.bench_stdio_client [--calls 500] [--workers 64] [--server-delay 0.01]
+
+Not collected by pytest (file name does not start with test_).
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from app.assistant.lib.mcp.stdio_client import StdioJsonRpcClient
+
+FAKE_SERVER = Path(__file__).resolve().parent / "fake_mcp_servers" / "fake_echo_server.py"
+
+
+def _percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def _run(client, calls, workers, delay, serialize):
+    lock = threading.Lock()
+    errors = []
+
+    def one(n):
+        start = time.perf_counter()
+        try:
+            if serialize:
+                with lock:
+                    resp = client.request("tools/call", {"name": "echo", "arguments": {"n": n, "sleep_s": delay}})
+            else:
+                resp = client.request("tools/call", {"name": "echo", "arguments": {"n": n, "sleep_s": delay}})
+            if resp.raw.get("result") is None:
+                errors.append(resp.raw)
+        except Exception as e:
+            errors.append(e)
+        return (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        latencies = list(pool.map(one, range(calls)))
+    elapsed = time.perf_counter() - start
+    return latencies, elapsed, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--calls", type=int, default=500)
+    parser.add_argument("--workers", type=int, default=64)
+    parser.add_argument("--server-delay", type=float, default=0.01, help="seconds the server sleeps per call")
+    args = parser.parse_args()
+
+    proc = subprocess.Popen(
+        [sys.executable, str(FAKE_SERVER)],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        encoding="utf-8",
+    )
+    try:
+        client = StdioJsonRpcClient(proc, timeout_s=120)
+        client.request("initialize", {})
+
+        print(f"{args.calls} calls, {args.workers} threads, server delay {args.server_delay * 1000:.0f} ms")
+        print(f"{'mode':12} {'p50 ms':>9} {'p99 ms':>9} {'mean ms':>9} {'calls/s':>9} {'errors':>7}")
+        for mode, serialize in (("serialized", True), ("multiplexed", False)):
+            latencies, elapsed, errors = _run(client, args.calls, args.workers, args.server_delay, serialize)
+            print(f"{mode:12} {_percentile(latencies, 50):>9.2f} {_percentile(latencies, 99):>9.2f} "
+                  f"{statistics.mean(latencies):>9.2f} {args.calls / elapsed:>9.0f} {len(errors):>7}")
+    finally:
+        proc.kill()
+        proc.wait()
+
+
+if __name__ == "__main__":
+    main()
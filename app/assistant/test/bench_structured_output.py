@@ -0,0 +1,103 @@
+"""
+Benchmark: OpenAILLM.structured_output request preparation with and without the schema compilation cache.
+
+Every agent_form.py model in the registry is sent through structured_output against a
+stubbed OpenAI client (no network), so the time measured is request preparation plus
+response parsing. "before" compiles the schema on every call (pydantic_to_openai_schema:
+model_json_schema + sanitize_schema + inline_refs), "after" uses prepare_text_format
+(a cache lookup once the registry forms were precompiled).
+
+Run from the repo root:
+    python -m app.assistant.test.bench_structured_output [--rounds 20]
+
+Not collected by pytest (file name does not start with test_).
+"""
+
+import argparse
+import contextlib
+import io
+import logging
+import statistics
+import time
+from types import SimpleNamespace
+from unittest import mock
+
+from app.assistant.agent_registry.agent_registry import AgentRegistry
+from app.services import llm_client
+from app.services.llm_client import OpenAILLM, precompile_text_formats, pydantic_to_openai_schema
+from app.services.llm_governor import get_llm_governor
+
+
+class _StubResponses:
+    def create(self, **kwargs):
+        assert kwargs["text"]["format"]["type"] == "json_schema"
+        return SimpleNamespace(output=[SimpleNamespace(content=[SimpleNamespace(text='{"ok": true}')])])
+
+
+def _stub_llm() -> OpenAILLM:
+    llm = object.__new__(OpenAILLM)
+    llm.client = SimpleNamespace(responses=_StubResponses())
+    return llm
+
+
+def _uncached_prepare(response_format):
+    if isinstance(response_format, dict):
+        return response_format if "format" in response_format else llm_client._wrap_json_schema(response_format)
+    return pydantic_to_openai_schema(response_format)
+
+
+def _forms():
+    registry = AgentRegistry()
+    registry.load_agents()
+    forms = []
+    for cfg in registry.get_all_agents().values():
+        form = cfg.get("structured_output")
+        if form is None or isinstance(form, dict):
+            continue
+        try:
+            pydantic_to_openai_schema(form)
+        except Exception:
+            continue  # forms that cannot produce a schema fail identically either way
+        forms.append(form)
+    return forms
+
+
+def _run(llm, forms, rounds):
+    messages = [{"role": "system", "content": "You are a test."}, {"role": "user", "content": "hi"}]
+    per_call = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(rounds):
+            t0 = time.perf_counter()
+            for form in forms:
+                llm.structured_output(messages, response_format=form, engine="gpt-4.1-mini")
+            per_call.append((time.perf_counter() - t0) * 1e6 / len(forms))
+    return statistics.median(per_call)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        forms = _forms()
+    llm = _stub_llm()
+    # The stub answers instantly; keep the governor's rate limits out of the measurement
+    get_llm_governor().configure_limits("openai", requests_per_minute=1e9, tokens_per_minute=1e12)
+
+    with mock.patch.object(llm_client, "prepare_text_format", _uncached_prepare):
+        before = _run(llm, forms, args.rounds)
+
+    t0 = time.perf_counter()
+    precompile_text_formats(forms)
+    precompile_ms = (time.perf_counter() - t0) * 1000
+    after = _run(llm, forms, args.rounds)
+
+    print(f"{len(forms)} agent form(s); precompiling all took {precompile_ms:.0f} ms")
+    print(f"{'before us/call':>15} {'after us/call':>14} {'speedup':>8}")
+    print(f"{before:>15.1f} {after:>14.1f} {before / after:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
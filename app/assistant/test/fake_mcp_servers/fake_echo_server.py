@@ -0,0 +1,111 @@
+"""
+Fake MCP stdio echo server for tests.
+
+Implements:
+- initialize / ping
+- tools/list
+- tools/call:
+    echo  -> returns {"pid": <server pid>, "arguments": <arguments>} (optional "sleep_s" delay)
+    crash -> exits the process without replying
+    cancelled_ids -> request ids seen in notifications/cancelled
+
+Requests are handled on worker threads so a server can have several calls in flight.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sys
+import threading
+import time
+
+_write_lock = threading.Lock()
+_cancelled_ids = []
+
+
+def _send(obj):
+    with _write_lock:
+        sys.stdout.write(json.dumps(obj, ensure_ascii=True) + "\n")
+        sys.stdout.flush()
+
+
+TOOLS = [
+    {
+        "name": "echo",
+        "description": "Echo the arguments back with the server pid.",
+        "inputSchema": {"type": "object", "properties": {"sleep_s": {"type": "number"}}},
+    },
+    {
+        "name": "cancelled_ids",
+        "description": "List request ids the client cancelled.",
+        "inputSchema": {"type": "object", "properties": {}},
+    },
+    {
+        "name": "crash",
+        "description": "Exit the server process immediately.",
+        "inputSchema": {"type": "object", "properties": {}},
+    },
+]
+
+
+def _handle(req):
+    req_id = req.get("id")
+    method = req.get("method")
+    params = req.get("params") or {}
+
+    if method == "initialize":
+        _send({
+            "jsonrpc": "2.0",
+            "id": req_id,
+            "result": {
+                "protocolVersion": "2025-11-25",
+                "capabilities": {"tools": {"listChanged": False}},
+                "serverInfo": {"name": "fake-echo", "version": "0.0.0"},
+            },
+        })
+    elif method == "ping":
+        _send({"jsonrpc": "2.0", "id": req_id, "result": {}})
+    elif method == "tools/list":
+        _send({"jsonrpc": "2.0", "id": req_id, "result": {"tools": TOOLS}})
+    elif method == "notifications/cancelled":
+        _cancelled_ids.append(params.get("requestId"))
+    elif method == "tools/call":
+        name = params.get("name")
+        arguments = params.get("arguments") or {}
+        if name == "crash":
+            os._exit(1)
+        if name == "cancelled_ids":
+            arguments = {"cancelled_ids": list(_cancelled_ids)}
+        if arguments.get("sleep_s"):
+            time.sleep(float(arguments["sleep_s"]))
+        payload = {"pid": os.getpid(), "arguments": arguments}
+        _send({
+            "jsonrpc": "2.0",
+            "id": req_id,
+            "result": {"content": [{"type": "text", "text": json.dumps(payload)}], "isError": False},
+        })
+    elif req_id is not None:
+        _send({"jsonrpc": "2.0", "id": req_id, "error": {"code": -32601, "message": f"Method not found: {method}"}})
+
+
+def main():
+    for line in sys.stdin:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            req = json.loads(line)
+        except Exception:
+            continue
+        if not isinstance(req, dict):
+            continue
+        if "id" not in req:
+            # Notifications are handled in order so they are visible to later requests
+            _handle(req)
+        else:
+            threading.Thread(target=_handle, args=(req,), daemon=True).start()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+from app.assistant.lib.blackboard.Blackboard import Blackboard
+from app.assistant.utils.pydantic_classes import Message
+
+
+def _msg(i, **kwargs):
+    defaults = dict(
+        data_type=["agent_msg", "tool_result", "tool_request"][i % 3],
+        sender=f"a{i % 3}",
+        receiver=[None, "Any", "a1", "a2"][i % 4],
+        scope_id=f"scope{i % 2}",
+        sub_data_type=["plan"] if i in (7, 19) else [],
+        content=f"m{i}",
+    )
+    defaults.update(kwargs)
+    return Message(**defaults)
+
+
+def _naive_for_agent(messages, agent_name):
+    return [
+        m.content for m in messages
+        if m.sender == agent_name or m.receiver == agent_name
+        or m.receiver is None or m.receiver == "Any" and m.data_type in ["tool_result", "tool_request"]
+    ]
+
+
+def _contents(msgs):
+    return [m.content for m in msgs]
+
+
+def test_indexed_reads_match_linear_scans():
+    bb = Blackboard()
+    msgs = [_msg(i) for i in range(25)]
+    for m in msgs:
+        bb.add_msg(m)
+
+    assert _contents(bb.get_messages_for_scope("scope1")) == [m.content for m in msgs if m.scope_id == "scope1"]
+    assert bb.get_messages_for_scope(None) == []
+    for agent in ("a0", "a1", "a2", "nobody"):
+        assert _contents(bb.get_messages_for_agent(agent)) == _naive_for_agent(msgs, agent)
+    assert _contents(bb.get_messages_after_last_plan()) == _contents(msgs[20:])
+    assert _contents(bb.get_messages_before_last_plan()) == _contents(msgs[:19])
+    assert bb.time_to_summarize()
+
+    bb.remove_messages_before_last_plan()
+    assert _contents(bb.messages) == _contents(msgs[19:])
+    assert _contents(bb.get_messages_for_scope("scope1")) == [m.content for m in msgs[19:] if m.scope_id == "scope1"]
+    bb.add_msg(_msg(30, scope_id="scope1"))
+    assert bb.get_messages_for_scope("scope1")[-1].content == "m30"
+    assert _contents(bb.get_messages_after_last_plan())[0] == "m20"
+
+
+def test_index_follows_current_scope_and_external_mutation():
+    bb = Blackboard()
+    bb.push_call_context("mgr", "agent", "root")
+    bb.add_msg(Message(data_type="agent_msg", sender="agent", content="in root"))
+    assert _contents(bb.get_messages_for_scope("root")) == ["in root"]
+
+    # Code that edits self.messages directly still sees consistent reads
+    bb.messages.append(_msg(7, scope_id="root"))
+    assert _contents(bb.get_messages_for_scope("root")) == ["in root", "m7"]
+    assert _contents(bb.get_messages_before_last_plan()) == ["in root"]
+    bb.messages = bb.messages[:1]
+    assert _contents(bb.get_messages_after_last_plan()) == ["in root"]
+    assert not bb.time_to_summarize()
+
+    bb.clear_messages()
+    assert bb.get_messages_for_scope("root") == []
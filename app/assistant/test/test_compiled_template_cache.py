@@ -0,0 +1,18 @@
+from app.assistant.utils.cache import CompiledTemplateCache
+
+
+def test_sources_are_bounded_by_the_environment_cache_size(tmp_path):
+    cache = CompiledTemplateCache(cache_size=3, bytecode_cache_dir=str(tmp_path))
+
+    for i in range(10):
+        assert cache.get_template(f"prompt {i}: {{{{ x }}}}").render(x="ok") == f"prompt {i}: ok"
+
+    assert len(cache._loader._sources) == 3
+    assert len(cache.environment.cache) <= 3
+    # An evicted prompt is re-registered and recompiled on its next use
+    assert cache.get_template("prompt 0: {{ x }}").render(x="again") == "prompt 0: again"
+
+
+def test_same_source_compiles_once(tmp_path):
+    cache = CompiledTemplateCache(cache_size=3, bytecode_cache_dir=str(tmp_path))
+    assert cache.get_template("Hi {{ name }}") is cache.get_template("Hi {{ name }}")
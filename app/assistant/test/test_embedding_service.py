@@ -0,0 +1,136 @@
+import threading
+
+import numpy as np
+
+from app.assistant.utils.embedding_cache import EmbeddingCache
+from app.assistant.utils.embedding_service import EmbeddingService
+
+
+class _StubModel:
+    """Records every encode() batch; vector = [len(text), 1.0]."""
+
+    def __init__(self):
+        self.batches = []
+        self._lock = threading.Lock()
+
+    def encode(self, texts, **kwargs):
+        with self._lock:
+            self.batches.append(list(texts))
+        return np.array([[float(len(t)), 1.0] for t in texts], dtype=np.float32)
+
+
+def _service(max_wait_ms=50.0, cache=None):
+    cache = cache or EmbeddingCache(persistent=False)
+    svc = EmbeddingService(max_batch_size=16, max_wait_ms=max_wait_ms, cache=cache)
+    svc._model = _StubModel()
+    return svc
+
+
+def test_encode_many_is_single_forward_pass():
+    svc = _service()
+    out = svc.encode_many(["a", "bb", "ccc"])
+    assert out == [[1.0, 1.0], [2.0, 1.0], [3.0, 1.0]]
+    assert svc._model.batches == [["a", "bb", "ccc"]]
+
+
+def test_concurrent_encode_calls_are_coalesced():
+    svc = _service(max_wait_ms=100.0)
+    barrier = threading.Barrier(8)
+    results = {}
+
+    def _worker(i):
+        text = "x" * (i + 1)
+        barrier.wait()
+        results[i] = svc.encode(text)
+
+    threads = [threading.Thread(target=_worker, args=(i,)) for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(timeout=5)
+
+    assert results == {i: [float(i + 1), 1.0] for i in range(8)}
+    # All 8 requests should have been served by far fewer forward passes.
+    assert len(svc._model.batches) < 8
+    assert sum(len(b) for b in svc._model.batches) == 8
+
+
+def test_encode_propagates_model_errors():
+    svc = _service(max_wait_ms=0)
+
+    class _Boom:
+        def encode(self, texts, **kwargs):
+            raise RuntimeError("boom")
+
+    svc._model = _Boom()
+    try:
+        svc.encode("hello")
+    except RuntimeError as e:
+        assert "boom" in str(e)
+    else:
+        raise AssertionError("expected RuntimeError")
+
+
+def test_cache_serves_repeats_without_model_calls():
+    svc = _service(max_wait_ms=0)
+    svc.encode("hello  world")
+    svc.encode_many(["hello world", "new one", "new one"])
+
+    # "hello world" normalizes to the same key; "new one" is encoded once.
+    assert svc._model.batches == [["hello world"], ["new one"]]
+    stats = svc.stats()
+    assert stats["memory_hits"] == 1
+    assert stats["misses"] == 3
+
+
+def test_disk_cache_survives_new_service(tmp_path):
+    db_path = tmp_path / "emb.sqlite3"
+    first = _service(cache=EmbeddingCache(db_path=db_path, persistent=True))
+    first.encode_many(["alpha", "beta"])
+
+    second = _service(cache=EmbeddingCache(db_path=db_path, persistent=True))
+    assert second.encode_many(["alpha", "beta"]) == [[5.0, 1.0], [4.0, 1.0]]
+    assert second._model.batches == []
+    assert second.stats()["disk_hits"] == 2
+
+
+def test_disk_cache_evicts_least_recently_used(tmp_path):
+    cache = EmbeddingCache(db_path=tmp_path / "emb.sqlite3", memory_items=0, max_disk_items=10, persistent=True)
+    cache.put_many("m", [f"t{i}" for i in range(1000)], [[float(i)] for i in range(1000)])
+
+    assert cache.stats()["evictions"] == 991
+    assert cache.get("m", "t0") is None
+    assert cache.get("m", "t999") == [999.0]
+
+
+def test_memory_layer_holds_float32_blobs():
+    svc = _service(max_wait_ms=0)
+    svc.encode_many(["alpha"])
+
+    assert all(isinstance(v, bytes) and len(v) == 8 for v in svc.cache._memory.values())
+    matrix = svc.encode_many(["alpha", "be"], as_numpy=True)
+    assert matrix.dtype == np.float32 and matrix.tolist() == [[5.0, 1.0], [2.0, 1.0]]
+
+
+def test_disk_hits_defer_last_used_updates(tmp_path):
+    import sqlite3
+
+    db_path = tmp_path / "emb.sqlite3"
+    EmbeddingCache(db_path=db_path, persistent=True).put_many("m", ["a", "b"], [[1.0], [2.0]])
+
+    def last_used():
+        with sqlite3.connect(db_path) as conn:
+            return dict(conn.execute("SELECT key, last_used FROM embedding_cache").fetchall())
+
+    before = last_used()
+    cache = EmbeddingCache(db_path=db_path, memory_items=0, persistent=True, touch_flush_items=2)
+    statements = []
+    cache._get_conn().set_trace_callback(statements.append)
+
+    assert cache.get("m", "a") == [1.0] and cache.get("m", "a") == [1.0]
+    assert not [s for s in statements if s.startswith(("UPDATE", "COMMIT"))]
+    assert last_used() == before
+
+    assert cache.get("m", "b") == [2.0]  # second distinct key reaches touch_flush_items
+    after = last_used()
+    assert all(after[key] > before[key] for key in before)
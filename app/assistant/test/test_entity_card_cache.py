@@ -0,0 +1,69 @@
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.assistant.entity_management import entity_card_cache
+from app.assistant.entity_management.entity_card_cache import EntityCardCache
+from app.assistant.entity_management.entity_cards import EntityCard
+
+
+def _setup(monkeypatch):
+    engine = create_engine("sqlite:///:memory:")
+    EntityCard.__table__.create(engine)
+    Session = sessionmaker(bind=engine)
+    opened = []
+
+    def counting_session():
+        opened.append(1)
+        return Session()
+
+    monkeypatch.setattr("app.models.base.get_session", counting_session)
+    cache = EntityCardCache()
+    monkeypatch.setattr(entity_card_cache, "_entity_card_cache", cache)
+    return Session, cache, opened
+
+
+def _card(name, summary, **kwargs):
+    return EntityCard(entity_name=name, entity_type="person", summary=summary, card_metadata={}, **kwargs)
+
+
+def test_batched_load_then_hits(monkeypatch):
+    Session, cache, opened = _setup(monkeypatch)
+    session = Session()
+    session.add_all([_card("Alice", "friend", key_facts=["likes tea"]), _card("Bob", "coworker")])
+    session.commit()
+    session.close()
+
+    fields = cache.get_fields(["Alice", "Nobody", "Bob"], ["summary", "key_facts", "bogus"])
+    assert list(fields) == ["Alice", "Bob"]
+    assert fields["Alice"] == {"summary": "friend", "key_facts": "• likes tea", "bogus": ""}
+    assert cache.get_card("Bob").startswith("ENTITY CARD: Bob")
+    assert cache.get_card("Nobody") == ""
+    assert len(opened) == 1
+
+
+def test_commits_invalidate_changed_cards_only(monkeypatch):
+    Session, cache, opened = _setup(monkeypatch)
+    session = Session()
+    alice = _card("Alice", "friend", usage_count=0)
+    session.add(alice)
+    session.commit()
+
+    assert cache.get_fields(["Alice", "Carol"], ["summary"]) == {"Alice": {"summary": "friend"}}
+
+    alice.usage_count += 1
+    session.commit()
+    cache.get_fields(["Alice"], ["summary"])
+    assert len(opened) == 1
+
+    alice.summary = "best friend"
+    session.add(_card("Carol", "neighbor"))
+    session.commit()
+    assert cache.get_fields(["Alice", "Carol"], ["summary"]) == {
+        "Alice": {"summary": "best friend"},
+        "Carol": {"summary": "neighbor"},
+    }
+
+    alice.is_active = False
+    session.commit()
+    assert cache.get_card("Alice") == ""
+    session.close()
@@ -0,0 +1,59 @@
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.assistant.entity_management.entity_cards import EntityCard
+from app.assistant.entity_management.entity_catalog import EntityCatalog, TokenAutomaton
+
+
+def _catalog_with_cards(monkeypatch, cards):
+    engine = create_engine("sqlite:///:memory:")
+    EntityCard.__table__.create(engine)
+    Session = sessionmaker(bind=engine)
+    session = Session()
+    session.add_all(cards)
+    session.commit()
+    session.close()
+    monkeypatch.setattr("app.assistant.entity_management.entity_catalog.get_session", Session)
+    return EntityCatalog(), Session
+
+
+def _card(name, aliases=None, active=True):
+    return EntityCard(entity_name=name, entity_type="person", summary="-", aliases=aliases or [],
+                      card_metadata={}, is_active=active)
+
+
+def test_automaton_matches_overlapping_and_nested_patterns():
+    automaton = TokenAutomaton([
+        (("new", "york"), {"New York"}),
+        (("new", "york", "city"), {"NYC"}),
+        (("york",), {"York"}),
+        (("a", "b", "a", "c"), {"ABAC"}),
+    ])
+    assert automaton.find("i love new york city".split()) == {"New York", "NYC", "York"}
+    # Failure link from the partial "a b a" must fall back into "a" and still complete "a b a c"
+    assert automaton.find("a b a b a c".split()) == {"ABAC"}
+    assert automaton.find("newyork".split()) == set()
+
+
+def test_detection_uses_catalog_and_follows_reload(monkeypatch):
+    from app.assistant.entity_management.entity_card_injector import EntityCardInjector
+
+    catalog, Session = _catalog_with_cards(monkeypatch, [
+        _card("Jukka", aliases=["JP"]),
+        _card("Cold Stone Creamery", aliases=["Cold Stone"]),
+        _card("Inactive Person", active=False),
+    ])
+    monkeypatch.setattr(
+        "app.assistant.entity_management.entity_card_injector.get_entity_catalog", lambda: catalog
+    )
+    injector = EntityCardInjector()
+
+    text = "Jukka's favorite is cold stone; jp agrees. Inactive Person and Ragged do not count."
+    assert injector.detect_entities_in_text(text) == ["Cold Stone Creamery", "Jukka"]
+
+    session = Session()
+    session.add(_card("Ragged"))
+    session.commit()
+    session.close()
+    catalog.reload_from_db()
+    assert injector.detect_entities_in_text(text) == ["Cold Stone Creamery", "Jukka", "Ragged"]
@@ -0,0 +1,138 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.assistant.database.db_handler import EventRepository
+from app.assistant.event_repository import event_repository as er
+
+
+@pytest.fixture
+def repo(monkeypatch):
+    engine = create_engine("sqlite:///:memory:")
+    EventRepository.__table__.create(engine)
+    published = []
+    monkeypatch.setattr(er.EventRepositoryManager, "_publish_repo_update", staticmethod(published.append))
+    manager = er.EventRepositoryManager(session_factory=sessionmaker(bind=engine))
+    manager.published = published
+    return manager
+
+
+def _rows(repo, data_type):
+    session = repo.session_factory()
+    try:
+        return {e.id: e for e in session.query(EventRepository).filter_by(data_type=data_type)}
+    finally:
+        session.close()
+
+
+def test_store_events_writes_only_changes_and_reconciles_calendar(repo):
+    changed = repo.store_events([("a", {"v": 1}), ("b", {"v": 2}), ("c", {"v": 3})], "calendar")
+    assert sorted(changed) == ["a", "b", "c"]
+    assert repo.published == ["calendar"]
+
+    # Unchanged batch: nothing written, no repo_update
+    assert repo.store_events([("a", {"v": 1}), ("b", {"v": 2}), ("c", {"v": 3})], "calendar") == []
+    assert repo.published == ["calendar"]
+
+    # One update, one insert, and "c" dropped from the server set is deleted
+    changed = repo.store_events([("a", {"v": 1}), ("b", {"v": 20}), ("d", {"v": 4})], "calendar")
+    assert sorted(changed) == ["b", "c", "d"]
+    rows = _rows(repo, "calendar")
+    assert sorted(rows) == ["a", "b", "d"]
+    assert rows["b"].data == {"v": 20}
+    assert rows["b"].data_hash == repo.compute_data_hash({"v": 20})
+    assert repo.published == ["calendar", "calendar"]
+
+
+def test_store_events_prunes_transient_types_by_age(repo):
+    repo.store_events([("old", {"v": 1}, "ext-old")], "email")
+    session = repo.session_factory()
+    session.query(EventRepository).filter_by(id="old").update(
+        {"created_at": datetime.now(timezone.utc) - er.TRANSIENT_RETENTION - timedelta(minutes=1)}
+    )
+    session.commit()
+    session.close()
+
+    changed = repo.store_events([("new", {"v": 2})], "email")
+    assert sorted(changed) == ["new", "old"]
+    rows = _rows(repo, "email")
+    assert list(rows) == ["new"]
+    assert rows["new"].event_id == "new"
+
+
+def test_query_events_filters_time_window_in_sql(repo):
+    repo.store_events([
+        ("past", {"summary": "past", "start": "2025-01-01T08:00:00Z", "end": "2025-01-01T09:00:00Z"}),
+        ("spanning", {"summary": "spanning", "start": "2025-01-01T09:30:00+00:00", "end": "2025-01-01T11:30:00+00:00"}),
+        # Offset timestamps are normalized to UTC (10:30 UTC)
+        ("inside", {"summary": "inside", "start": "2025-01-01T05:30:00-05:00", "end": "2025-01-01T06:00:00-05:00"}),
+        ("no_end", {"summary": "no_end", "start": "2025-01-01T10:45:00Z"}),
+        ("later", {"summary": "later", "start": "2025-01-01T12:00:00Z", "end": "2025-01-01T13:00:00Z"}),
+        ("undated", {"summary": "undated"}),
+    ], "calendar")
+
+    window = (datetime(2025, 1, 1, 10, tzinfo=timezone.utc), datetime(2025, 1, 1, 12, tzinfo=timezone.utc))
+    events = repo.query_events(data_type="calendar", start=window[0], end=window[1], limit=10)
+    assert [e["id"] for e in events] == ["spanning", "inside", "no_end"]
+    assert events[1]["start_utc"] == datetime(2025, 1, 1, 10, 30, tzinfo=timezone.utc)
+    assert events[2]["end_utc"] is None
+
+    assert len(repo.query_events(data_type="calendar")) == 6
+    assert repo.query_events(data_type="email") == []
+
+
+def test_query_events_window_is_half_open(repo):
+    repo.store_events([
+        ("ends_at_start", {"start": "2025-01-01T09:00:00Z", "end": "2025-01-01T10:00:00Z"}),
+        ("instant_at_start", {"start": "2025-01-01T10:00:00Z"}),
+        ("starts_at_end", {"start": "2025-01-01T12:00:00Z", "end": "2025-01-01T13:00:00Z"}),
+        ("instant_before", {"start": "2025-01-01T09:59:00Z"}),
+    ], "calendar")
+
+    events = repo.query_events(
+        data_type="calendar",
+        start=datetime(2025, 1, 1, 10, tzinfo=timezone.utc),
+        end=datetime(2025, 1, 1, 12, tzinfo=timezone.utc),
+    )
+    assert [e["id"] for e in events] == ["instant_at_start"]
+
+
+def test_migration_adds_window_columns_and_backfills():
+    from sqlalchemy import event, inspect, text
+    from app.assistant.database.migrations import add_event_repository_time_window as migration
+
+    engine = create_engine("sqlite:///:memory:")
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE event_repository (id VARCHAR PRIMARY KEY, event_id VARCHAR NOT NULL, "
+            "data_type VARCHAR NOT NULL, data JSON NOT NULL, data_hash VARCHAR NOT NULL, created_at TIMESTAMP NOT NULL)"
+        ))
+        conn.execute(text(
+            "INSERT INTO event_repository VALUES ('a', 'a', 'calendar', "
+            "'{\"start\": \"2025-01-01T10:00:00Z\", \"end\": \"2025-01-01T11:00:00Z\"}', 'h', '2025-01-01 00:00:00')"
+        ))
+
+    assert migration.migrate(engine)
+
+    # Rows without a time window are not re-scanned on later startups
+    with engine.begin() as conn:
+        conn.execute(text(
+            "INSERT INTO event_repository (id, event_id, data_type, data, data_hash, created_at) "
+            "VALUES ('b', 'b', 'todo', '{}', 'h', '2025-01-01 00:00:00')"
+        ))
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    assert migration.migrate(engine)  # idempotent
+    assert not [s for s in statements if "start_utc IS NULL" in s]
+
+    indexes = {ix["name"] for ix in inspect(engine).get_indexes("event_repository")}
+    assert set(migration.INDEXES) <= indexes
+    manager = er.EventRepositoryManager(session_factory=sessionmaker(bind=engine))
+    [event] = manager.query_events(
+        data_type="calendar",
+        start=datetime(2025, 1, 1, 10, 30, tzinfo=timezone.utc),
+        end=datetime(2025, 1, 1, 12, tzinfo=timezone.utc),
+    )
+    assert event["start_utc"] == datetime(2025, 1, 1, 10, tzinfo=timezone.utc)
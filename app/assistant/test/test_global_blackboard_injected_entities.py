@@ -0,0 +1,31 @@
+from app.assistant.global_blackboard.global_blackboard import GlobalBlackBoard
+from app.assistant.utils.pydantic_classes import Message
+
+
+def _injection(entity_name, is_chat=True):
+    return Message(
+        data_type="agent_msg",
+        sub_data_type=["entity_card_injection"],
+        content=f"[Entity Context - {entity_name}]:\nENTITY CARD: {entity_name}",
+        metadata={"entity_name": entity_name},
+        is_chat=is_chat,
+    )
+
+
+def test_injected_entities_follow_add_and_clear():
+    bb = GlobalBlackBoard()
+    bb.add_msg(Message(data_type="user_msg", content="hello Alice", is_chat=True))
+    bb.add_msg(_injection("Alice"))
+    # Legacy messages carry only the content marker
+    bb.add_msg(Message(data_type="agent_msg", content="[Entity Context - Bob]:\ncard", is_chat=True))
+    bb.add_msg(_injection("Carol", is_chat=False))
+
+    assert bb.get_injected_entities() == {"Alice", "Bob", "Carol"}
+    assert bb.has_injected_entity("Alice")
+    assert not bb.has_injected_entity("Dave")
+
+    bb.clear_chat_messages()
+    assert bb.get_injected_entities() == {"Carol"}
+
+    bb.clear_messages()
+    assert bb.get_injected_entities() == set()
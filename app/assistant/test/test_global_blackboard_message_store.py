@@ -0,0 +1,93 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.assistant.global_blackboard.global_blackboard import GlobalBlackBoard
+from app.assistant.global_blackboard.message_store import MessageStore
+from app.assistant.utils.pydantic_classes import Message, ToolMessage
+
+T0 = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+def _msg(i, **kwargs):
+    defaults = dict(
+        data_type=["user_msg", "agent_msg", "tool_result"][i % 3],
+        sub_data_type=["music"] if i % 4 == 0 else [],
+        sender=f"s{i % 5}",
+        receiver=f"r{i % 2}",
+        scope_id=f"scope{i % 3}",
+        is_chat=i % 2 == 0,
+        content=f"m{i}",
+        timestamp=T0 + timedelta(minutes=i),
+    )
+    defaults.update(kwargs)
+    return Message(**defaults)
+
+
+@pytest.fixture
+def store(tmp_path):
+    s = MessageStore(max_in_memory=10, spill_path=str(tmp_path / "spill.db"))
+    yield s
+    s.close()
+
+
+def test_queries_span_memory_and_spill_in_order(store):
+    msgs = [_msg(i) for i in range(57)]
+    for m in msgs:
+        store.append(m)
+
+    assert len(store) == 57
+    assert store.stats()["in_memory"] <= 10
+    assert [m.content for m in store] == [m.content for m in msgs]
+
+    def expect(pred, last_n=None):
+        hits = [m.content for m in msgs if pred(m)]
+        return hits[-last_n:] if last_n else hits
+
+    def got(**kwargs):
+        return [m.content for m in store.query(**kwargs)]
+
+    assert got(data_types=["agent_msg"]) == expect(lambda m: m.data_type == "agent_msg")
+    assert got(sub_types=["music"], last_n=3) == expect(lambda m: "music" in m.sub_data_type, 3)
+    assert got(sub_types=["music"], last_n=8) == expect(lambda m: "music" in m.sub_data_type, 8)
+    assert got(senders=["s1", "s2"], receivers=["r0"]) == expect(
+        lambda m: m.sender in ("s1", "s2") and m.receiver == "r0"
+    )
+    assert got(scope_ids=["scope2"], is_chat=True) == expect(lambda m: m.scope_id == "scope2" and m.is_chat)
+    since = T0 + timedelta(minutes=20)
+    assert got(is_chat=True, since=since) == expect(lambda m: m.is_chat and m.timestamp > since)
+    assert [m.content for m in store.tail(12)] == [m.content for m in msgs[-12:]]
+
+
+def test_update_and_remove_chat_reach_spilled_messages(store):
+    for i in range(30):
+        store.append(_msg(i))
+    store.append(ToolMessage(tool_name="t", data_type="tool_request", content="tool"))
+
+    oldest = store.query(last_n=None)[0]
+    oldest.metadata = {"summarized": True}
+    oldest.data_type = "renamed"
+    assert store.update(oldest)
+    [reloaded] = store.query(data_types=["renamed"])
+    assert reloaded.metadata == {"summarized": True}
+    assert isinstance(store.query(data_types=["tool_request"])[0], ToolMessage)
+
+    store.remove_chat()
+    assert len(store) == 16
+    assert not store.query(is_chat=True)
+
+
+def test_global_blackboard_uses_bounded_store(tmp_path):
+    bb = GlobalBlackBoard(max_in_memory=5, spill_path=str(tmp_path / "bb.db"))
+    for i in range(40):
+        bb.add_msg(_msg(i, sub_data_type=[]))
+
+    assert bb.message_count() == 40
+    assert bb.message_store.stats()["in_memory"] <= 5
+    assert [m.content for m in bb.get_messages(receivers=["r1"], last_n=2)] == ["m37", "m39"]
+    assert [m.content for m in bb.get_messages_by_type(["user_msg"], last_n=2)] == ["m36", "m39"]
+    assert bb.get_messages_by_sub_type([]) == []
+
+    recent = bb.get_recent_chat_since_utc(T0 + timedelta(minutes=33))
+    assert [m.content for m in recent] == ["m34", "m36", "m38"]
+    bb.message_store.close()
@@ -0,0 +1,92 @@
+import threading
+import time
+
+import pytest
+
+from app.services.llm_governor import LLMGovernor, LLMLimits, LLMQueueTimeout, current_priority, llm_priority
+
+
+class RateLimitError(Exception):
+    status_code = 429
+
+
+def _governor(**limits):
+    return LLMGovernor(LLMLimits(**limits), max_backoff_seconds=0.05)
+
+
+def test_interactive_requests_jump_the_background_queue():
+    gov = _governor(max_concurrency=1, interactive_reserve=0.0)
+    holder = gov.acquire("openai", "m")
+    order = []
+
+    def worker(priority):
+        ticket = gov.acquire("openai", "m", priority=priority, timeout=5)
+        order.append(priority)
+        ticket.release()
+
+    threads = [threading.Thread(target=worker, args=("background",))]
+    threads[0].start()
+    time.sleep(0.05)
+    threads.append(threading.Thread(target=worker, args=("interactive",)))
+    threads[1].start()
+    time.sleep(0.05)
+
+    assert gov.stats()["openai/m"]["queue_by_priority"] == {"interactive": 1, "normal": 0, "background": 1}
+    holder.release()
+    for t in threads:
+        t.join(5)
+    assert order == ["interactive", "background"]
+
+
+def test_deadline_and_background_reserve():
+    gov = _governor(max_concurrency=2, interactive_reserve=0.5)
+    first = gov.acquire("openai", "m", priority="background")
+    # The second slot is kept for interactive work
+    with pytest.raises(LLMQueueTimeout, match="timeout"):
+        gov.acquire("openai", "m", priority="background", timeout=0.05)
+    gov.acquire("openai", "m", priority="interactive", timeout=0.05).release()
+    first.release()
+    assert gov.stats()["openai/m"]["queue_timeouts"] == 1
+
+
+def test_rate_limits_halve_concurrency_and_retry():
+    gov = _governor(max_concurrency=8)
+    calls = []
+
+    def flaky():
+        calls.append(time.monotonic())
+        if len(calls) == 1:
+            raise RateLimitError("Rate limit reached for requests")
+        return "ok"
+
+    assert gov.call("openai", "m", flaky) == "ok"
+    stats = gov.stats()["openai/m"]
+    assert len(calls) == 2 and stats["rate_limited"] == 1 and stats["concurrency_limit"] == 4
+    assert calls[1] - calls[0] >= 0.04  # paused before the retry
+
+    with pytest.raises(RuntimeError, match="insufficient_quota"):
+        gov.call("openai", "m", lambda: (_ for _ in ()).throw(RuntimeError("429 insufficient_quota")))
+    with pytest.raises(RateLimitError):
+        gov.call("openai", "m", lambda: (_ for _ in ()).throw(RateLimitError("rate limit")), max_attempts=1)
+
+
+def test_token_bucket_limits_and_usage_refund():
+    gov = _governor(tokens_per_minute=600, max_concurrency=4)  # refills 10 tokens/s
+    gov.call("openai", "m", lambda: {"usage": 100}, estimated_tokens=600, usage_tokens=lambda r: r["usage"])
+    # 500 of the estimate was refunded, so a 400-token request fits immediately
+    gov.acquire("openai", "m", estimated_tokens=400, timeout=0.05).release()
+    with pytest.raises(LLMQueueTimeout):
+        gov.acquire("openai", "m", estimated_tokens=400, timeout=0.05)
+
+
+def test_priority_resolution(monkeypatch):
+    monkeypatch.delenv("EMI_LLM_PRIORITY", raising=False)
+    assert current_priority() == "normal"
+    monkeypatch.setenv("EMI_LLM_PRIORITY", "background")
+    assert current_priority() == "background"
+    with llm_priority("interactive"):
+        assert current_priority() == "interactive"
+        assert current_priority("normal") == "normal"
+    with pytest.raises(ValueError):
+        with llm_priority("urgent"):
+            pass
@@ -0,0 +1,82 @@
+from types import SimpleNamespace
+
+import pytest
+from flask import Flask
+from pydantic import BaseModel
+
+from app.assistant.performance.llm_metrics import Histogram, llm_metrics
+from app.assistant.performance.llm_performance_analyzer import LLMPerformanceAnalyzer
+from app.assistant.performance.performance_monitor import performance_monitor
+from app.routes.debug_llm_metrics import debug_llm_metrics_bp
+from app.services.llm_client import OpenAILLM
+
+
+class Answer(BaseModel):
+    text: str
+
+
+class _StubResponses:
+    def create(self, **kwargs):
+        if kwargs["input"][-1]["content"] == "slow":
+            raise TimeoutError("Request timeout")
+        usage = SimpleNamespace(
+            input_tokens=120, output_tokens=30, total_tokens=150,
+            input_tokens_details=SimpleNamespace(cached_tokens=100),
+        )
+        return SimpleNamespace(output=[SimpleNamespace(content=[SimpleNamespace(text='{"text": "hi"}')])], usage=usage)
+
+
+@pytest.fixture
+def llm():
+    llm_metrics.reset()
+    stub = object.__new__(OpenAILLM)
+    stub.client = SimpleNamespace(responses=_StubResponses())
+    yield stub
+    llm_metrics.reset()
+
+
+def _ask(llm, content, agent):
+    messages = [{"role": "user", "content": content}]
+    return llm.structured_output(messages, response_format=Answer, engine="gpt-test", agent_name=agent)
+
+
+def test_every_provider_call_is_recorded_and_timers_are_closed(llm):
+    assert _ask(llm, "hello", "emi_agent") == {"text": "hi"}
+    assert _ask(llm, "hello", "emi_agent") == {"text": "hi"}
+    assert "timed out" in _ask(llm, "slow", "memory_runner")
+
+    assert not [t for t in performance_monitor.active_timers if t.startswith("llm_structured_output_")]
+    summary = llm_metrics.summary()
+    agent = summary["by_agent"]["emi_agent"]
+    assert agent["calls"] == 2 and agent["outcomes"] == {"success": 2}
+    assert (agent["total_input_tokens"], agent["total_output_tokens"], agent["total_cached_tokens"]) == (240, 60, 200)
+    assert summary["by_agent"]["memory_runner"]["outcomes"] == {"timeout": 1}
+    assert summary["by_model"]["openai/gpt-test"]["latency_ms"]["count"] == 3
+
+    analysis = LLMPerformanceAnalyzer().analyze_llm_calls()
+    assert analysis["top_agents_by_tokens"][0] == "emi_agent"
+
+
+def test_histogram_percentiles_are_within_a_bucket():
+    hist = Histogram()
+    for value in range(1, 1001):
+        hist.add(value)
+    summary = hist.summary()
+    assert summary["count"] == 1000 and summary["max"] == 1000
+    for p, exact in (("p50", 500), ("p95", 950), ("p99", 990)):
+        assert exact <= summary[p] <= exact * 1.1
+
+
+def test_debug_route_filters_recent_calls(llm):
+    _ask(llm, "hello", "emi_agent")
+    _ask(llm, "slow", "memory_runner")
+    app = Flask(__name__)
+    app.register_blueprint(debug_llm_metrics_bp)
+    client = app.test_client()
+
+    data = client.get("/debug/llm-metrics/data?agent=memory_runner").get_json()
+    assert [r["outcome"] for r in data["recent"]] == ["timeout"]
+    assert set(data["calls"]["by_agent"]) == {"emi_agent", "memory_runner"}
+
+    client.post("/debug/llm-metrics/reset")
+    assert client.get("/debug/llm-metrics/data").get_json()["calls"] == {"message": "No LLM calls recorded"}
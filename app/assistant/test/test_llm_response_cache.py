@@ -0,0 +1,74 @@
+import time
+
+import pytest
+from pydantic import BaseModel
+
+from app.services.llm_client import BaseLLMProvider, LLMInterface
+from app.services.llm_response_cache import LLMCacheMiss, LLMResponseCache, llm_cache_mode
+
+
+class Answer(BaseModel):
+    text: str
+
+
+class StubProvider(BaseLLMProvider):
+    def __init__(self):
+        self.calls = []
+
+    def structured_output(self, messages, **params):
+        self.calls.append(messages[-1]["content"])
+        if messages[-1]["content"] == "fail":
+            return "LLM error: boom"
+        return {"text": f"answer to {messages[-1]['content']}", "n": len(self.calls)}
+
+    def structured_output_json(self, messages, **params):
+        return self.structured_output(messages, **params)
+
+
+def _ask(llm, content, **params):
+    params.setdefault("engine", "gpt-test")
+    params.setdefault("temperature", 0)
+    return llm.structured_output([{"role": "user", "content": content}], response_format=Answer, **params)
+
+
+def test_record_mode_serves_repeats_from_disk(tmp_path):
+    provider = StubProvider()
+    llm = LLMInterface(provider)
+    path = tmp_path / "llm.db"
+
+    assert _ask(llm, "q1")["n"] == 1  # mode is off by default
+    with llm_cache_mode("record", path):
+        first = _ask(llm, "q1")
+        assert _ask(llm, "q1") == first
+        assert _ask(llm, "q1", temperature=1) != first
+        assert _ask(llm, "fail") == "LLM error: boom"
+        assert _ask(llm, "fail") == "LLM error: boom"  # failures are not recorded
+    assert provider.calls == ["q1", "q1", "q1", "fail", "fail"]
+
+    # A new process (fresh cache object) replays the recording without the provider
+    offline = LLMInterface(StubProvider())
+    with llm_cache_mode("replay", path):
+        assert _ask(offline, "q1") == first
+        with pytest.raises(LLMCacheMiss):
+            _ask(offline, "never recorded")
+        with pytest.raises(LLMCacheMiss):
+            _ask(offline, "q1", engine="other-model")
+    assert offline.llm_provider.calls == []
+
+
+def test_ttl_and_lru_caps(tmp_path):
+    cache = LLMResponseCache(tmp_path / "llm.db", ttl_seconds=60, max_entries=2, enforce_every=1)
+    cache.put("a", {"v": 1})
+    cache.put("b", {"v": 2})
+    time.sleep(0.01)
+    assert cache.get("a") == {"v": 1}  # a is now more recently used than b
+    cache.put("c", {"v": 3})
+
+    assert cache.get("b") is None
+    assert cache.get("a") == {"v": 1} and cache.get("c") == {"v": 3}
+    assert cache.stats()["entries"] == 2
+
+    cache.ttl_seconds = 0
+    assert cache.get("a") is None
+    assert cache.get("a", ignore_ttl=True) == {"v": 1}
+    cache.close()
@@ -0,0 +1,54 @@
+import json
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+from app.assistant.lib.mcp.stdio_client import StdioJsonRpcClient
+
+FAKE_SERVER = Path(__file__).resolve().parent / "fake_mcp_servers" / "fake_echo_server.py"
+
+
+@pytest.fixture
+def client():
+    proc = subprocess.Popen(
+        [sys.executable, str(FAKE_SERVER)],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        encoding="utf-8",
+    )
+    yield StdioJsonRpcClient(proc, timeout_s=10)
+    proc.kill()
+    proc.wait()
+
+
+def _call(client, name, timeout_s=None, **arguments):
+    resp = client.request("tools/call", {"name": name, "arguments": arguments}, timeout_s=timeout_s).raw
+    return json.loads(resp["result"]["content"][0]["text"])["arguments"]
+
+
+def test_concurrent_requests_are_routed_to_their_callers(client):
+    with ThreadPoolExecutor(max_workers=32) as pool:
+        results = list(pool.map(lambda n: _call(client, "echo", n=n, sleep_s=0.01), range(200)))
+    assert [r["n"] for r in results] == list(range(200))
+    assert client.in_flight() == 0
+
+
+def test_timeout_cancels_request_on_server(client):
+    pending = client.submit("tools/call", {"name": "echo", "arguments": {"sleep_s": 2}})
+    with pytest.raises(TimeoutError):
+        pending.result(timeout_s=0.2)
+    assert client.in_flight() == 0
+    assert pending.id in _call(client, "cancelled_ids")["cancelled_ids"]
+
+
+def test_process_exit_fails_waiters_immediately(client):
+    start = time.monotonic()
+    with pytest.raises(RuntimeError):
+        client.request("tools/call", {"name": "crash", "arguments": {}}, timeout_s=10)
+    assert time.monotonic() - start < 5
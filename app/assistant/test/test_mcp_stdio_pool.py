@@ -0,0 +1,81 @@
+import json
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+from app.assistant.lib.mcp import stdio_pool
+from app.assistant.lib.mcp.tool_runner import mcp_stdio_call_tool
+
+FAKE_SERVER = Path(__file__).resolve().parent / "fake_mcp_servers" / "fake_echo_server.py"
+
+
+def _entry(**pool):
+    return {
+        "server_id": "local/fake-echo",
+        "launch_options": [
+            {"id": "fake", "transport": "stdio", "command": sys.executable, "args": [str(FAKE_SERVER)]},
+        ],
+        "policy": {"max_concurrent_calls": 2, "call_timeout_seconds": 10, "stdio_pool": pool},
+    }
+
+
+def _echo(entry, **arguments):
+    resp = mcp_stdio_call_tool(server_entry=entry, tool_name="echo", arguments=arguments, timeout_s=10)
+    return json.loads(resp["result"]["content"][0]["text"])
+
+
+def _pool(entry):
+    return stdio_pool._POOLS[stdio_pool._pool_key(entry)]
+
+
+@pytest.fixture(autouse=True)
+def _close_pools():
+    yield
+    stdio_pool.close_all_stdio_pools()
+
+
+def test_calls_reuse_warm_session_and_replace_crashed_one():
+    entry = _entry()
+    first = _echo(entry, n=1)
+    second = _echo(entry, n=2)
+    assert first["pid"] == second["pid"]
+    assert second["arguments"] == {"n": 2}
+    assert _pool(entry).stats()["sessions"] == 1
+
+    with pytest.raises(Exception):
+        mcp_stdio_call_tool(server_entry=entry, tool_name="crash", arguments={}, timeout_s=2)
+    assert _echo(entry)["pid"] != first["pid"]
+
+
+def test_concurrent_calls_respect_max_sessions():
+    entry = _entry(max_sessions=2)
+    results = []
+
+    def call():
+        results.append(_echo(entry, sleep_s=0.3)["pid"])
+
+    threads = [threading.Thread(target=call) for _ in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(results) == 5
+    assert len(set(results)) <= 2
+    assert _pool(entry).stats()["in_flight"] == 0
+
+
+def test_idle_sessions_are_reaped_down_to_min_sessions():
+    entry = _entry(min_sessions=0, idle_timeout_seconds=0)
+    _echo(entry)
+    pool = _pool(entry)
+    assert pool.stats()["sessions"] == 1
+    pool.maintain()
+    assert pool.stats()["sessions"] == 0
+
+    warm = _entry(min_sessions=1, idle_timeout_seconds=0)
+    _echo(warm)
+    _pool(warm).maintain()
+    assert _pool(warm).stats()["sessions"] == 1
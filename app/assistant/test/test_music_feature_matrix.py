@@ -0,0 +1,279 @@
+import os
+import random
+import sqlite3
+
+import numpy as np
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app.assistant.dj_manager import feature_matrix, matrix_snapshot, weight_cache
+from app.assistant.dj_manager.feature_scaler import db_to_llm_features
+from app.assistant.dj_manager.music_dataset import DatasetSong, MusicDataset, SqliteMusicDataset
+from app.models.music_genre_stats import MusicGenreStats
+from app.models.music_tracks_spotify import SpotifyMusicTrack
+from app.models.music_weights import MusicArtistWeight, MusicGenreWeight, MusicTrackWeight
+
+FEATURES = ("energy", "valence", "loudness", "speechiness", "acousticness", "instrumentalness", "liveness", "tempo")
+GENRES = ["rock", "jazz", "pop", "alt-rock"]
+TARGET = {"energy": 55, "valence": 40, "loudness": 60, "tempo": 45, "acousticness": 30}
+
+
+@pytest.fixture(autouse=True)
+def snapshot_dir(tmp_path, monkeypatch):
+    path = tmp_path / "snapshots"
+    monkeypatch.setenv("EMI_MUSIC_SNAPSHOT_DIR", str(path))
+    return path
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = tmp_path / "music.db"
+    engine = create_engine(f"sqlite:///{path}")
+    for model in (SpotifyMusicTrack, MusicGenreStats, MusicGenreWeight, MusicArtistWeight, MusicTrackWeight):
+        model.__table__.create(engine)
+    engine.dispose()
+
+    rng = random.Random(7)
+    rows = []
+    for i in range(2000):
+        rows.append((
+            f"id{i}", f"Song {i}", f"Artist {i % 50}", GENRES[i % len(GENRES)], 1.0 + (i % 3),
+            rng.random(), rng.random(), rng.uniform(-25, 0), rng.random(), rng.random(),
+            rng.random(), rng.random(), rng.uniform(60, 190),
+        ))
+    with sqlite3.connect(path) as conn:
+        conn.executemany(
+            "INSERT INTO music_tracks_spotify (track_id, track_name, artist_name, genre, prob_factor, "
+            f"{', '.join(FEATURES)}) VALUES ({', '.join('?' * 13)})",
+            rows,
+        )
+        conn.executemany(
+            "INSERT INTO music_genre_stats (genre, track_count, updated_at_utc) VALUES (?, 500, '2025-01-01')",
+            [(g,) for g in GENRES],
+        )
+        conn.execute("INSERT INTO music_genre_weights VALUES ('pop', 0.0, '2025-01-01')")
+        conn.execute("INSERT INTO music_artist_weights VALUES ('artist 3', 3.0, '2025-01-01')")
+    yield path
+    feature_matrix.invalidate_feature_matrix(path)
+    weight_cache.invalidate_weight_cache(path)
+
+
+def _reference(db_path, target, n, genre_weights, artist_weights, banned=(), include_artist=None):
+    """The old per-row path: SQL gate, then DatasetSong + Python _distance for every row."""
+    with sqlite3.connect(db_path) as conn:
+        rows = conn.execute(
+            f"SELECT track_id, track_name, artist_name, genre, prob_factor, {', '.join(FEATURES)} "
+            "FROM music_tracks_spotify WHERE prob_factor > 0 AND energy BETWEEN ? AND ? AND valence BETWEEN ? AND ?",
+            [(target["energy"] - 5) / 100, (target["energy"] + 5) / 100, (target["valence"] - 15) / 100, (target["valence"] + 15) / 100],
+        ).fetchall()
+    songs = []
+    for row in rows:
+        if row[1] in banned or (include_artist and include_artist not in row[2].lower()):
+            continue
+        pf = row[4] * genre_weights.get(row[3], 1.0) * artist_weights.get(row[2].lower(), 1.0) / 500
+        if pf <= 0:
+            continue
+        sliders = db_to_llm_features(dict(zip(FEATURES, row[5:])))
+        songs.append(DatasetSong(row[0], row[1], row[2], row[3], sliders, f"{row[1]} by {row[2]}", pf))
+    full_target = {k: float(target.get(k, 50)) for k in FEATURES}
+    return sorted(songs, key=lambda s: MusicDataset._distance(full_target, s))[:n]
+
+
+def _distances(songs, target):
+    full_target = {k: float(target.get(k, 50)) for k in FEATURES}
+    return [round(MusicDataset._distance(full_target, s), 2) for s in songs]
+
+
+def test_sqlite_matrix_matches_per_row_ranking(db_path):
+    ds = SqliteMusicDataset(db_path=db_path)
+    got = ds.nearest_matches(TARGET, n=25)
+    want = _reference(db_path, TARGET, 25, {"pop": 0.0}, {"artist 3": 3.0})
+
+    assert len(got) == 25
+    assert _distances(got, TARGET) == pytest.approx(_distances(want, TARGET), abs=0.05)
+    assert not any(s.genre == "pop" for s in got)
+    by_id = {s.track_id: s for s in want}
+    for s in got:
+        if s.track_id in by_id:
+            assert s.prob_factor == pytest.approx(by_id[s.track_id].prob_factor)
+            assert s.sliders == by_id[s.track_id].sliders
+
+
+def test_sqlite_filters_track_weights_and_table_refresh(db_path):
+    ds = SqliteMusicDataset(db_path=db_path)
+    first = ds.nearest_matches(TARGET, n=5)
+    banned = first[0].track_name
+    with sqlite3.connect(db_path) as conn:
+        conn.execute(
+            "INSERT INTO music_track_weights VALUES (?, ?, ?, 0.0, '2025-01-01')",
+            (f"{banned.lower()}|||{first[0].artist.lower()}", banned, first[0].artist),
+        )
+    assert banned not in [s.track_name for s in ds.nearest_matches(TARGET, n=5)]
+
+    filtered = ds.nearest_matches(TARGET, n=10, music_filters={"include_artists": ["Artist 1"]})
+    want = _reference(db_path, TARGET, 10, {"pop": 0.0}, {"artist 3": 3.0}, banned={banned}, include_artist="artist 1")
+    assert filtered and all(s.artist.startswith("Artist 1") for s in filtered)
+    assert _distances(filtered, TARGET) == pytest.approx(_distances(want, TARGET), abs=0.05)
+
+    # A new exact match written by another connection is picked up on the next call
+    exact = {"energy": 0.55, "valence": 0.40, "loudness": -9.85, "tempo": 121.3, "acousticness": 0.30,
+             "speechiness": 0.5, "instrumentalness": 0.5, "liveness": 0.5}
+    with sqlite3.connect(db_path) as conn:
+        conn.execute(
+            "INSERT INTO music_tracks_spotify (track_id, track_name, artist_name, genre, prob_factor, "
+            f"{', '.join(exact)}) VALUES ('new', 'Brand New', 'Someone', 'jazz', 1.0, {', '.join('?' * len(exact))})",
+            list(exact.values()),
+        )
+    assert ds.nearest_matches(TARGET, n=1)[0].track_id == "new"
+
+
+def test_sqlite_matrix_sees_in_place_updates_and_restarts(db_path):
+    matrix = feature_matrix.get_sqlite_feature_matrix(db_path)
+    row = list(matrix.track_ids).index("id5")
+    assert matrix.prob_factor[row] == pytest.approx(3.0)
+
+    # UPDATEs keep COUNT(*) and MAX(id) but must still reload
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("UPDATE music_tracks_spotify SET prob_factor = 0.5, energy = 0.99 WHERE track_id = 'id5'")
+    matrix = feature_matrix.get_sqlite_feature_matrix(db_path)
+    assert matrix.prob_factor[row] == pytest.approx(0.5)
+    assert matrix.gate[row, 0] == pytest.approx(0.99)
+
+    # A restart against a changed table rebuilds instead of mapping the stale snapshot
+    feature_matrix.invalidate_feature_matrix(db_path)
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("UPDATE music_tracks_spotify SET genre = 'folk' WHERE track_id = 'id5'")
+    matrix = feature_matrix.get_sqlite_feature_matrix(db_path)
+    assert matrix.genre_vocab[matrix.genre_codes[row]] == "folk"
+    assert matrix.prob_factor[row] == pytest.approx(0.5)
+
+    # Writes made while the change triggers were gone (e.g. a re-import) start a new epoch
+    with sqlite3.connect(db_path) as conn:
+        for name in feature_matrix._trigger_names("music_tracks_spotify"):
+            conn.execute(f"DROP TRIGGER {name}")
+        conn.execute("UPDATE music_tracks_spotify SET prob_factor = 2.5 WHERE track_id = 'id5'")
+    matrix = feature_matrix.get_sqlite_feature_matrix(db_path)
+    assert matrix.prob_factor[row] == pytest.approx(2.5)
+
+
+def test_unrelated_writes_do_not_scan_the_track_table(db_path):
+    feature_matrix.get_sqlite_feature_matrix(db_path)
+    entry = feature_matrix._sqlite_entry(db_path, "music_tracks_spotify")
+    statements = []
+    entry.conn.set_trace_callback(statements.append)
+
+    # Another connection writes to a different table in the same file: data_version moves
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("INSERT INTO music_genre_stats (genre, track_count, updated_at_utc) VALUES ('ska', 1, '2025-01-01')")
+    feature_matrix.get_sqlite_feature_matrix(db_path)
+
+    assert statements and not [s for s in statements if "FROM music_tracks_spotify" in s]
+
+
+def test_sqlite_weights_are_cached_until_a_weight_write(db_path, monkeypatch):
+    ds = SqliteMusicDataset(db_path=db_path)
+    loads = []
+    real_load = weight_cache.load_weights
+    monkeypatch.setattr(weight_cache, "load_weights", lambda conn: loads.append(1) or real_load(conn))
+
+    before = ds.nearest_matches(TARGET, n=20)
+    assert any(s.genre == "jazz" for s in before)
+    # Other tables changing moves data_version but not the weight fingerprint
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("CREATE TABLE unrelated (x INTEGER)")
+    for _ in range(3):
+        assert ds.nearest_matches(TARGET, n=20) == before
+    assert len(loads) == 1
+
+    # An ORM commit bumps the version; a rolled-back one does not
+    version = weight_cache.get_music_weights_version()
+    engine = create_engine(f"sqlite:///{db_path}")
+    with Session(engine) as session:
+        session.add(MusicGenreWeight(genre="rock", factor=0.0))
+        session.flush()
+        session.rollback()
+        assert weight_cache.get_music_weights_version() == version
+        session.add(MusicGenreWeight(genre="jazz", factor=0.0))
+        session.commit()
+    engine.dispose()
+    assert weight_cache.get_music_weights_version() == version + 1
+
+    after = ds.nearest_matches(TARGET, n=20)
+    assert len(loads) == 2
+    assert after and not any(s.genre in ("jazz", "pop") for s in after)
+
+
+def _write_csv(csv_path, rows=300, seed=3):
+    rng = random.Random(seed)
+    lines = ["track_id,track_name,artists,track_genre," + ",".join(FEATURES)]
+    for i in range(rows):
+        feats = [rng.random() for _ in range(8)]
+        feats[2] = rng.uniform(-25, 0)
+        feats[7] = rng.uniform(60, 190)
+        lines.append(f"t{i},Song {i},Band {i % 7};Guest,{GENRES[i % 4]}," + ",".join(map(str, feats)))
+    csv_path.write_text("\n".join(lines), encoding="utf-8")
+
+
+def test_csv_dataset_ranks_with_matrix(tmp_path):
+    csv_path = tmp_path / "songs.csv"
+    _write_csv(csv_path)
+
+    ds = MusicDataset(csv_path, use_snapshot=False)
+    got = ds.nearest_matches(TARGET, n=20)
+    m = ds._matrix
+    everything = ds._songs_at(m, np.arange(len(m)), m.prob_factor)
+    full_target = {k: float(TARGET.get(k, 50)) for k in FEATURES}
+    want = sorted(everything, key=lambda s: MusicDataset._distance(full_target, s))[:20]
+    assert _distances(got, TARGET) == pytest.approx(_distances(want, TARGET), abs=0.05)
+    assert got[0].search_query == f"{got[0].track_name} by {got[0].artist}"
+
+    jazz = ds.nearest_matches(TARGET, n=20, music_filters={"include_genres": ["JAZZ"], "exclude_artists": ["band 1"]})
+    assert jazz and all(s.genre == "jazz" and s.artist != "Band 1" for s in jazz)
+
+
+def test_csv_snapshot_is_reused_until_the_csv_changes(tmp_path, snapshot_dir):
+    csv_path = tmp_path / "songs.csv"
+    _write_csv(csv_path)
+    parsed = MusicDataset(csv_path, use_snapshot=False).nearest_matches(TARGET, n=15)
+
+    first = MusicDataset(csv_path)
+    assert first.nearest_matches(TARGET, n=15) == parsed
+    assert list(snapshot_dir.glob("*.snapshot/meta.json"))
+
+    # A fresh instance maps the snapshot instead of parsing the CSV
+    second = MusicDataset(csv_path)
+    second._parse_csv = lambda: pytest.fail("CSV was re-parsed")
+    assert second.nearest_matches(TARGET, n=15) == parsed
+    assert isinstance(second._matrix.sliders, np.memmap)
+
+    # Touching the file keeps the snapshot (same hash); new content rebuilds it
+    st = csv_path.stat()
+    os.utime(csv_path, ns=(st.st_atime_ns, st.st_mtime_ns + 10_000_000_000))
+    touched = MusicDataset(csv_path)
+    touched._parse_csv = lambda: pytest.fail("CSV was re-parsed")
+    touched._load()
+
+    _write_csv(csv_path, rows=50, seed=9)
+    changed = MusicDataset(csv_path)
+    changed._load()
+    assert len(changed._matrix) == 50
+
+
+def test_sqlite_matrix_restores_from_snapshot(db_path, monkeypatch):
+    ds = SqliteMusicDataset(db_path=db_path)
+    before = ds.nearest_matches(TARGET, n=10, music_filters={"exclude_genres": ["rock"]})
+    feature_matrix.invalidate_feature_matrix(db_path)
+
+    monkeypatch.setattr(
+        feature_matrix.FeatureMatrix, "from_sqlite", classmethod(lambda cls, *a, **k: pytest.fail("table re-read"))
+    )
+    after = ds.nearest_matches(TARGET, n=10, music_filters={"exclude_genres": ["rock"]})
+    assert after == before
+    assert isinstance(feature_matrix.get_sqlite_feature_matrix(db_path).prob_factor, np.memmap)
+
+    # Versioned: a layout bump invalidates old snapshots
+    monkeypatch.setattr(matrix_snapshot, "SNAPSHOT_VERSION", matrix_snapshot.SNAPSHOT_VERSION + 1)
+    feature_matrix.invalidate_feature_matrix(db_path)
+    with pytest.raises(pytest.fail.Exception):
+        feature_matrix.get_sqlite_feature_matrix(db_path)
@@ -0,0 +1,115 @@
+from datetime import datetime, timezone
+
+import numpy as np
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app.assistant.database.db_handler import RAGDatabase
+from app.assistant.rag.rag_index import RAGIndex
+
+
+def _row(doc_id, document, embedding, scope="chat"):
+    return RAGDatabase(
+        id=doc_id,
+        document=document,
+        embedding=embedding,
+        source=scope,
+        scope=scope,
+        timestamp=datetime(2026, 1, 1, tzinfo=timezone.utc),
+        processed=False,
+    )
+
+
+def _index_with_rows(monkeypatch, rows):
+    engine = create_engine("sqlite:///:memory:")
+    RAGDatabase.__table__.create(engine)
+    Session = sessionmaker(bind=engine)
+    session = Session()
+    session.add_all(rows)
+    session.commit()
+    session.close()
+    monkeypatch.setattr("app.assistant.rag.rag_index.get_session", Session)
+    return RAGIndex()
+
+
+def test_search_ranks_by_best_sentence_and_filters_scope(monkeypatch):
+    index = _index_with_rows(monkeypatch, [
+        _row("1", "likes tea", [1.0, 0.0, 0.0]),
+        _row("2", "works at acme", [0.0, 1.0, 0.0]),
+        _row("3", "has a cat", [0.0, 0.0, 5.0]),
+        _row("4", "slack only", [1.0, 0.0, 0.0], scope="slack"),
+    ])
+
+    queries = np.array([[0.0, 2.0, 0.0], [0.9, 0.0, 0.1]], dtype=np.float32)
+    results = index.search(queries, ["chat"], top_k=2, threshold=0.5)
+
+    assert [r["document"] for r in results] == ["works at acme", "likes tea"]
+    assert results[0]["similarity"] == 1.0
+    assert all(r["scope"] == "chat" for r in results)
+
+
+def test_threshold_and_incremental_append(monkeypatch):
+    index = _index_with_rows(monkeypatch, [_row("1", "likes tea", [1.0, 0.0])])
+    query = np.array([0.0, 1.0], dtype=np.float32)
+
+    assert index.search(query, ["chat"], top_k=3, threshold=0.5) == []
+
+    index.add_entries([_row("2", "likes coffee", [0.0, 3.0])])
+    results = index.search(query, ["chat"], top_k=3, threshold=0.5)
+    assert [r["document"] for r in results] == ["likes coffee"]
+    assert index.stats() == {"chat": 2}
+
+
+def test_add_entries_skips_unloaded_scopes(monkeypatch):
+    index = _index_with_rows(monkeypatch, [])
+    index.add_entries([_row("1", "x", [1.0, 0.0], scope="never_queried")])
+    assert index.stats() == {}
+
+
+class _StubEmbedder:
+    def encode(self, texts):
+        return [np.array([float(len(t)), 1.0]) for t in texts]
+
+
+def _handler_session(monkeypatch):
+    from app.assistant.rag_pipeline import rag_db_handler
+
+    engine = create_engine("sqlite:///:memory:")
+    RAGDatabase.__table__.create(engine)
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    monkeypatch.setattr(rag_db_handler, "get_session", sessionmaker(bind=engine))
+    return rag_db_handler, statements
+
+
+def test_insert_batch_does_not_reload_rows_after_commit(monkeypatch):
+    rag_db_handler, statements = _handler_session(monkeypatch)
+    index = RAGIndex()
+    added = []
+    monkeypatch.setattr(index, "add_entries", lambda rows: added.extend(rows))
+    monkeypatch.setattr(rag_db_handler, "get_rag_index", lambda: index)
+
+    rag_db_handler.RAGDBHandler(_StubEmbedder()).insert_rag_facts([f"fact {i}" for i in range(50)], "chat")
+
+    assert sum(s.lstrip().upper().startswith("SELECT") for s in statements) == 1
+    assert [row.document for row in added] == [f"fact {i}" for i in range(50)]
+    assert {row.scope for row in added} == {"chat"}
+
+
+def test_index_failure_after_commit_still_invalidates_cache(monkeypatch):
+    from app.assistant.rag.rag_cache import RAGResultCache
+
+    rag_db_handler, _ = _handler_session(monkeypatch)
+    cache = RAGResultCache()
+    cache.put("tea?", ["chat"], 3, 0.5, ["stale"])
+    index = RAGIndex()
+    index.add_entries = lambda rows: (_ for _ in ()).throw(RuntimeError("index broke"))
+    monkeypatch.setattr(rag_db_handler, "get_rag_index", lambda: index)
+    monkeypatch.setattr(rag_db_handler, "get_rag_result_cache", lambda: cache)
+
+    rag_db_handler.RAGDBHandler(_StubEmbedder()).insert_rag_facts(["likes tea"], "chat")
+
+    assert cache.get("tea?", ["chat"], 3, 0.5, default=None) is None
+    session = rag_db_handler.get_session()
+    assert session.query(RAGDatabase).count() == 1
+    session.close()
@@ -0,0 +1,83 @@
+import time
+
+import app.assistant.agent_classes.Agent as agent_module
+from app.assistant.agent_classes.Agent import Agent
+from app.assistant.rag.rag_cache import CACHE_MISS, RAGResultCache
+
+
+def test_key_includes_scopes_and_params():
+    cache = RAGResultCache()
+    cache.put("where do I work", ["chat"], 2, 0.55, "chat result")
+
+    assert cache.get("where do I work", ["chat"], 2, 0.55) == "chat result"
+    assert cache.get("where do I work", ["slack"], 2, 0.55) is CACHE_MISS
+    assert cache.get("where do I work", ["chat"], 3, 0.55) is CACHE_MISS
+
+
+def test_none_results_are_cached():
+    cache = RAGResultCache()
+    cache.put("q", ["chat"], 2, 0.55, None)
+    assert cache.get("q", ["chat"], 2, 0.55) is None
+
+
+def test_expired_entries_are_dropped():
+    cache = RAGResultCache(sweep_interval_seconds=0)
+    cache.put("q", ["chat"], 2, 0.55, "old", ttl_seconds=0.01)
+    cache.put("other", ["chat"], 2, 0.55, "fresh")
+    time.sleep(0.02)
+
+    assert cache.get("q", ["chat"], 2, 0.55) is CACHE_MISS
+    assert cache.stats()["entries"] == 1
+
+
+def test_lru_eviction_by_count_and_bytes():
+    cache = RAGResultCache(max_entries=2)
+    cache.put("a", ["chat"], 2, 0.5, "A")
+    cache.put("b", ["chat"], 2, 0.5, "B")
+    cache.get("a", ["chat"], 2, 0.5)
+    cache.put("c", ["chat"], 2, 0.5, "C")
+    assert cache.get("b", ["chat"], 2, 0.5) is CACHE_MISS
+    assert cache.get("a", ["chat"], 2, 0.5) == "A"
+
+    small = RAGResultCache(max_bytes=300)
+    small.put("a", ["chat"], 2, 0.5, "x" * 200)
+    small.put("b", ["chat"], 2, 0.5, "y" * 200)
+    assert small.stats()["entries"] == 1
+    assert small.get("b", ["chat"], 2, 0.5) == "y" * 200
+
+
+def test_invalidate_scope_only_drops_matching_entries():
+    cache = RAGResultCache()
+    cache.put("q", ["chat", "slack"], 2, 0.5, "both")
+    cache.put("q", ["email"], 2, 0.5, "email")
+
+    assert cache.invalidate_scope("slack") == 1
+    assert cache.get("q", ["chat", "slack"], 2, 0.5) is CACHE_MISS
+    assert cache.get("q", ["email"], 2, 0.5) == "email"
+
+
+def test_agent_caches_misses_briefly_and_errors_not_at_all(monkeypatch):
+    cache = RAGResultCache(negative_ttl_seconds=0.01)
+    monkeypatch.setattr(agent_module, "get_rag_result_cache", lambda: cache)
+    agent = object.__new__(Agent)
+    agent.name = "test_agent"
+
+    def failing_search(*args, **kwargs):
+        assert kwargs["raise_errors"] is True
+        raise RuntimeError("index unavailable")
+
+    monkeypatch.setattr(agent_module, "query_rag_database", failing_search)
+    assert agent.retrieve_rag_context("q", ["chat"]) is None
+    assert cache.stats()["entries"] == 0
+
+    monkeypatch.setattr(agent_module, "query_rag_database", lambda *a, **kw: [])
+    assert agent.retrieve_rag_context("q", ["chat"]) is None
+    assert cache.get("q", ["chat"], 2, 0.55) is None
+    time.sleep(0.02)
+    assert cache.get("q", ["chat"], 2, 0.55) is CACHE_MISS
+
+    hit = {"document": "I work at Acme", "source": "chat", "similarity": 0.9}
+    monkeypatch.setattr(agent_module, "query_rag_database", lambda *a, **kw: [hit])
+    assert "I work at Acme" in agent.retrieve_rag_context("q", ["chat"])
+    time.sleep(0.02)
+    assert "I work at Acme" in cache.get("q", ["chat"], 2, 0.55)
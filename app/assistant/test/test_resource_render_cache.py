@@ -0,0 +1,71 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from app.assistant.ServiceLocator.service_locator import DI
+from app.assistant.agent_classes.Agent import Agent
+from app.assistant.global_blackboard.global_blackboard import GlobalBlackBoard
+from app.assistant.memory import tag_router
+from app.resource_manager import render_cache
+from app.resource_manager.render_cache import RenderedResourceCache
+from app.resource_manager.resource_manager import ResourceManager
+
+
+@pytest.fixture
+def resources(tmp_path, monkeypatch):
+    monkeypatch.setattr(DI, "global_blackboard", GlobalBlackBoard(), raising=False)
+    monkeypatch.setattr(render_cache, "_rendered_resource_cache", RenderedResourceCache())
+    monkeypatch.setattr(tag_router, "_router", None)
+    renders = []
+    real = render_cache.get_compiled_template
+    monkeypatch.setattr(render_cache, "get_compiled_template", lambda src: renders.append(src) or real(src))
+
+    res_dir = tmp_path / "resources"
+    res_dir.mkdir()
+    (res_dir / "resource_user_data.json").write_text(json.dumps({"name": "Ada"}), encoding="utf-8")
+    (res_dir / "resource_greeting.md").write_text("Hello {{ resource_user_data.name }}", encoding="utf-8")
+    manager = ResourceManager(base_dir=tmp_path)
+    manager.load_all_from_directory("resources")
+    agent = SimpleNamespace(name="test_agent", blackboard=GlobalBlackBoard())
+    return manager, agent, renders, res_dir
+
+
+def _resolve(agent, resource_id):
+    return Agent._resolve_resource(agent, resource_id)
+
+
+def test_rendered_resource_is_reused_until_a_dependency_changes(resources):
+    manager, agent, renders, res_dir = resources
+
+    assert _resolve(agent, "resource_greeting") == "Hello Ada"
+    assert _resolve(agent, "resource_greeting") == "Hello Ada"
+    assert len(renders) == 1
+
+    # Context resource mutated in place and written back through the manager
+    data = DI.global_blackboard.get_state_value("resource_user_data")
+    data["name"] = "Grace"
+    manager.update_resource("resource_user_data", data, persist=False)
+    assert _resolve(agent, "resource_greeting") == "Hello Grace"
+    assert len(renders) == 2
+
+    # Replaced directly on the blackboard (bypassing the manager)
+    DI.global_blackboard.update_state_value("resource_user_data", {"name": "Linus"})
+    assert _resolve(agent, "resource_greeting") == "Hello Linus"
+    assert len(renders) == 3
+
+    # Template edited on disk and refreshed
+    (res_dir / "resource_greeting.md").write_text("Hi {{ resource_user_data.name }}!", encoding="utf-8")
+    manager.refresh_resource("resource_greeting")
+    assert _resolve(agent, "resource_greeting") == "Hi Linus!"
+    assert _resolve(agent, "resource_greeting") == "Hi Linus!"
+    assert len(renders) == 4
+
+
+def test_unrelated_updates_keep_the_cached_render(resources):
+    manager, agent, renders, _ = resources
+
+    _resolve(agent, "resource_greeting")
+    manager.update_resource("resource_afk_statistics_output", {"idle": 3}, persist=False)
+    _resolve(agent, "resource_greeting")
+    assert len(renders) == 1
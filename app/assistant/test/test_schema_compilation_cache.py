@@ -0,0 +1,52 @@
+import copy
+from typing import List, Optional
+
+from pydantic import BaseModel
+
+from app.services.llm_client import SchemaCompilationCache, pydantic_to_openai_schema
+
+
+class Link(BaseModel):
+    url: str
+    title: Optional[str] = None
+
+
+class Form(BaseModel):
+    answer: str
+    links: List[Link] = []
+
+
+RAW_SCHEMA = {
+    "type": "object",
+    "properties": {"item": {"$ref": "#/$defs/Item"}},
+    "$defs": {"Item": {"type": "object", "properties": {"name": {"type": "string", "default": "x"}}}},
+}
+
+
+def test_models_compile_once_and_match_uncached_output():
+    cache = SchemaCompilationCache()
+    first = cache.prepare(Form)
+
+    assert first == pydantic_to_openai_schema(Form)
+    assert cache.prepare(Form) is first
+    assert cache.for_model(Form, name="Other")["format"]["name"] == "Other"
+    schema = first["format"]["schema"]
+    assert schema["properties"]["links"]["items"]["additionalProperties"] is False
+
+
+def test_json_schemas_are_keyed_by_content_and_not_mutated():
+    cache = SchemaCompilationCache(max_dict_entries=1)
+    original = copy.deepcopy(RAW_SCHEMA)
+    compiled = cache.prepare(RAW_SCHEMA)
+
+    assert RAW_SCHEMA == original
+    item = compiled["format"]["schema"]["properties"]["item"]
+    assert item["additionalProperties"] is False and "default" not in item["properties"]["name"]
+    assert cache.prepare(copy.deepcopy(RAW_SCHEMA)) is compiled
+
+    prepared = {"format": {"type": "json_schema", "name": "X", "schema": {}, "strict": True}}
+    assert cache.prepare(prepared) is prepared
+
+    # Bounded: a second schema evicts the first
+    cache.prepare({"type": "object", "properties": {}})
+    assert cache.prepare(RAW_SCHEMA) is not compiled
@@ -0,0 +1,98 @@
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.assistant.kg_core.knowledge_graph_db_sqlite import Edge, Node
+
+
+class _StubChroma:
+    def __init__(self):
+        self.index = {}
+        self.deleted_label_ids = []
+
+    def store_semantic_label_embeddings(self, node_ids, semantic_labels, node_types, embeddings):
+        for node_id, label, node_type in zip(node_ids, semantic_labels, node_types):
+            self.index[node_id] = (label, node_type)
+
+    def delete_semantic_label_embeddings(self, node_ids):
+        for node_id in node_ids:
+            self.index.pop(node_id, None)
+
+    def delete_node_embeddings(self, node_ids):
+        self.deleted_label_ids.extend(node_ids)
+
+    def update_node_metadata(self, node_ids, labels, node_types):
+        self.metadata_updates = dict(zip(node_ids, zip(labels, node_types)))
+
+
+class _StubEmbeddingService:
+    def encode_many(self, texts):
+        return [[float(len(t))] for t in texts]
+
+
+def _session(monkeypatch):
+    chroma = _StubChroma()
+    monkeypatch.setattr(
+        "app.assistant.kg_core.chroma_embedding_manager.get_chroma_manager", lambda: chroma
+    )
+    monkeypatch.setattr(
+        "app.assistant.utils.embedding_service.get_embedding_service", lambda: _StubEmbeddingService()
+    )
+    engine = create_engine("sqlite:///:memory:")
+    Node.__table__.create(engine)
+    Edge.__table__.create(engine)
+    return sessionmaker(bind=engine)(), chroma
+
+
+def test_index_follows_create_update_delete(monkeypatch):
+    session, chroma = _session(monkeypatch)
+
+    node = Node(id="n1", label="Bob", node_type="Entity", attributes={}, semantic_label="friend from work")
+    session.add(node)
+    session.add(Node(id="n2", label="Run", node_type="Event", attributes={}))
+    session.commit()
+    assert chroma.index == {"n1": ("friend from work", "Entity")}
+
+    node.semantic_label = "coworker"
+    session.commit()
+    assert chroma.index == {"n1": ("coworker", "Entity")}
+
+    node.description = "unrelated change"
+    session.commit()
+    assert chroma.index == {"n1": ("coworker", "Entity")}
+
+    node.node_type = "Concept"
+    session.commit()
+    assert chroma.index == {"n1": ("coworker", "Concept")}
+    assert chroma.metadata_updates == {"n1": ("Bob", "Concept")}
+
+    session.delete(node)
+    session.commit()
+    assert chroma.index == {}
+    assert chroma.deleted_label_ids == ["n1"]
+
+
+def test_rollback_discards_pending_changes(monkeypatch):
+    session, chroma = _session(monkeypatch)
+
+    session.add(Node(id="n1", label="Bob", node_type="Entity", attributes={}, semantic_label="friend"))
+    session.flush()
+    session.rollback()
+    session.commit()
+    assert chroma.index == {}
+
+
+def test_type_or_label_change_keeps_node_embedding(monkeypatch):
+    session, chroma = _session(monkeypatch)
+
+    plain = Node(id="n1", label="Run", node_type="Event", attributes={})
+    labelled = Node(id="n2", label="Bob", node_type="Entity", attributes={}, semantic_label="friend")
+    session.add_all([plain, labelled])
+    session.commit()
+
+    plain.node_type = "Activity"
+    labelled.semantic_label = None
+    session.commit()
+
+    assert chroma.index == {}
+    assert chroma.deleted_label_ids == []
+    assert chroma.metadata_updates == {"n1": ("Run", "Activity")}
@@ -0,0 +1,198 @@
+import json
+import threading
+from types import SimpleNamespace
+
+from pydantic import BaseModel
+
+from app.assistant.agent_classes.EmiAgent import EmiAgent
+from app.assistant.performance.llm_metrics import llm_metrics
+from app.services.json_stream import IncrementalJSONParser
+from app.services.llm_client import GeminiLLM, OpenAILLM
+
+
+class Reply(BaseModel):
+    think_carefully: str
+    msg_for_user: str
+    call_team: bool
+
+
+REPLY = {"think_carefully": "They said hi, {say} \"hi\" back.", "msg_for_user": "Hi there!", "call_team": False}
+
+
+def _chunks(text, size=5):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+class _FakeOpenAIStream:
+    """Responses API with stream=True: output_text deltas, then response.completed."""
+
+    def __init__(self, text):
+        self.text = text
+        self.emitted = []
+
+    def create(self, **kwargs):
+        assert kwargs["stream"] is True
+        for piece in _chunks(self.text):
+            self.emitted.append(piece)
+            yield SimpleNamespace(type="response.output_text.delta", delta=piece)
+        usage = SimpleNamespace(input_tokens=50, output_tokens=20, total_tokens=70, input_tokens_details=None)
+        yield SimpleNamespace(type="response.completed", response=SimpleNamespace(usage=usage))
+
+
+def _openai(text):
+    llm = object.__new__(OpenAILLM)
+    llm.client = SimpleNamespace(responses=_FakeOpenAIStream(text))
+    return llm
+
+
+def _ask(llm, on_field, **params):
+    return llm.structured_output(
+        [{"role": "user", "content": "hi"}], response_format=Reply, engine="gpt-test", on_field=on_field, **params
+    )
+
+
+def test_incremental_parser_matches_full_parse_for_any_chunking():
+    doc = {**REPLY, "n": -1.5e3, "tags": [{"a": "]"}, []], "none": None}
+    text = "```json\n" + json.dumps(doc) + "\n```"
+    for size in (1, 2, 3, 7, len(text)):
+        parser = IncrementalJSONParser()
+        fields = [f for piece in _chunks(text, size) for f in parser.feed(piece)]
+        assert fields == list(doc.items()) and parser.done
+
+
+def test_openai_streams_fields_as_they_close():
+    llm = _openai(json.dumps(REPLY))
+    seen = []
+    llm_metrics.reset()
+
+    result = _ask(llm, lambda name, value: seen.append((name, value, len(llm.client.responses.emitted))))
+
+    assert result == REPLY
+    assert [(n, v) for n, v, _ in seen] == list(REPLY.items())
+    total_chunks = len(llm.client.responses.emitted)
+    # msg_for_user was dispatched well before the stream finished
+    assert seen[1][2] < total_chunks
+    record = llm_metrics.recent(limit=1)[0]
+    assert record["first_field_ms"] is not None and record["output_tokens"] == 20
+    llm_metrics.reset()
+
+
+def test_streamed_reply_is_still_validated():
+    seen = []
+    result = _ask(_openai(json.dumps({"msg_for_user": "partial"})), lambda n, v: seen.append(n))
+    assert seen == ["msg_for_user"]
+    assert isinstance(result, str) and result.startswith("LLM error")
+
+
+class _RateLimitError(Exception):
+    status_code = 429
+
+
+class _FlakyOpenAIStream:
+    """First attempt breaks off mid-field with a 429; the retry streams the whole reply."""
+
+    def __init__(self):
+        self.attempts = 0
+
+    def create(self, **kwargs):
+        self.attempts += 1
+        attempt = self.attempts
+        if attempt == 1:
+            yield SimpleNamespace(type="response.output_text.delta", delta='{"think_carefully": "a", "msg_for_user": "Hi')
+            raise _RateLimitError("Rate limit reached. Please try again in 10ms.")
+        for piece in _chunks(json.dumps({**REPLY, "think_carefully": "a"})):
+            yield SimpleNamespace(type="response.output_text.delta", delta=piece)
+
+
+def test_retry_after_mid_stream_rate_limit_starts_clean():
+    llm = object.__new__(OpenAILLM)
+    llm.client = SimpleNamespace(responses=_FlakyOpenAIStream())
+    seen = []
+
+    result = _ask(llm, lambda name, value: seen.append((name, value)))
+
+    assert llm.client.responses.attempts == 2
+    assert result == {**REPLY, "think_carefully": "a"}
+    # think_carefully closed before the 429 and is not sent again; msg_for_user only once, intact
+    assert seen == [("think_carefully", "a"), ("msg_for_user", "Hi there!"), ("call_team", False)]
+
+
+def test_gemini_streams_fields_as_they_close():
+    llm = object.__new__(GeminiLLM)
+    llm.engine, llm.temperature = "gemini-test", 0.1
+    llm.types = SimpleNamespace(GenerateContentConfig=lambda **kw: kw)
+    text = json.dumps(REPLY)
+    llm.client = SimpleNamespace(models=SimpleNamespace(
+        generate_content_stream=lambda **kw: (SimpleNamespace(text=piece) for piece in _chunks(text)),
+    ))
+    seen = []
+    result = llm.structured_output([{"role": "user", "content": "hi"}], response_format=Reply,
+                                   on_field=lambda n, v: seen.append(n))
+    assert result == REPLY and seen == list(REPLY)
+
+
+class _StreamingInterface:
+    def structured_output(self, messages, use_json=False, **params):
+        for name, value in REPLY.items():
+            if "on_field" in params:
+                params["on_field"](name, value)
+        return dict(REPLY)
+
+
+def _streaming_agent(interface):
+    agent = object.__new__(EmiAgent)
+    agent.name = "emi_agent"
+    agent.config = {"stream_chat_reply": True}
+    agent.llm_params = {}
+    agent.llm_interface = interface
+    agent._streamed_chat = threading.local()
+    published, stored = [], []
+    agent.blackboard = SimpleNamespace(add_msg=stored.append)
+    agent.publish_chat_to_user = published.append
+    return agent, published, stored
+
+
+def test_emi_agent_publishes_streamed_reply_once():
+    agent, published, stored = _streaming_agent(_StreamingInterface())
+
+    response = agent.call_llm([{"role": "user", "content": "hi"}], response_format=Reply)
+    assert [m.user_message_data.chat for m in published] == ["Hi there!"]
+    agent.process_llm_result(response)
+
+    assert len(published) == 1
+    assert stored[-1].content == "Hi there!" and stored[-1].id == published[0].id
+
+    # Without an early dispatch (e.g. a cached reply) the result is published as before
+    agent.config = {}
+    agent.process_llm_result(agent.call_llm([{"role": "user", "content": "hi"}], response_format=Reply))
+    assert len(published) == 2
+
+
+class _FailsAfterDispatchInterface:
+    """Streams msg_for_user, then the final parse/validation fails (or a retry says something else)."""
+
+    def __init__(self, final):
+        self.final = final
+
+    def structured_output(self, messages, use_json=False, **params):
+        params["on_field"]("msg_for_user", "Hi there!")
+        if isinstance(self.final, dict):
+            params["on_field"]("msg_for_user", self.final["msg_for_user"])  # governor retry
+        return self.final
+
+
+def test_streamed_reply_is_not_followed_by_a_second_message():
+    failure = "LLM error: 1 validation error for Reply"
+    agent, published, stored = _streaming_agent(_FailsAfterDispatchInterface(failure))
+    agent.process_llm_result(agent.call_llm([{"role": "user", "content": "hi"}], response_format=Reply))
+
+    assert [m.user_message_data.chat for m in published] == ["Hi there!"]
+    assert [(m.content, m.id) for m in stored] == [("Hi there!", published[0].id)]
+
+    # A retry that produced a different reply: the user keeps (and the history records) the streamed one
+    retried = {**REPLY, "msg_for_user": "Hello again!"}
+    agent, published, stored = _streaming_agent(_FailsAfterDispatchInterface(retried))
+    agent.process_llm_result(agent.call_llm([{"role": "user", "content": "hi"}], response_format=Reply))
+
+    assert [m.user_message_data.chat for m in published] == ["Hi there!"]
+    assert stored[-1].content == "Hi there!" and stored[-1].id == published[0].id
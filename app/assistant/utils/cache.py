@@ -1,9 +1,13 @@
 # cache.py
 
+import hashlib
 import threading
 
+from collections import OrderedDict
 from typing import Optional, Type, Dict
 
+from jinja2 import BaseLoader, Environment, FileSystemBytecodeCache, Template, TemplateNotFound
+
 from app.assistant.utils.logging_config import get_logger
 logger = get_logger(__name__)
 
@@ -44,3 +48,74 @@ class TemplateCache:
                 logger.debug(f"Template '{template_path}' is already cached. Overwriting.")
             self._cache[template_path] = template_content
             logger.debug(f"Template '{template_path}' cached successfully.")
+
+class _SourceHashLoader(BaseLoader):
+    """
+    Jinja loader whose template names are sha256 hashes of the template source.
+    Lets inline prompt strings go through Environment.get_template (and thus the
+    environment's compiled-template LRU and bytecode cache).
+
+    Sources are kept in an LRU of max_size entries (the environment's cache_size),
+    so one-off prompts do not pile up for the life of the process.
+    """
+    def __init__(self, max_size: int = 2000):
+        self.max_size = max(1, int(max_size))
+        self._sources: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def register(self, source: str) -> str:
+        name = hashlib.sha256(source.encode("utf-8")).hexdigest()
+        with self._lock:
+            if name in self._sources:
+                self._sources.move_to_end(name)
+            else:
+                self._sources[name] = source
+                while len(self._sources) > self.max_size:
+                    self._sources.popitem(last=False)
+        return name
+
+    def get_source(self, environment, template):
+        with self._lock:
+            source = self._sources.get(template)
+        if source is None:
+            raise TemplateNotFound(template)
+        # Content-addressed: a given name can never go stale
+        return source, None, lambda: True
+
+
+class CompiledTemplateCache:
+    """
+    Process-wide cache of compiled Jinja templates, keyed by source hash.
+
+    Uses one Environment (same defaults as jinja2.Template) with an in-memory LRU
+    of compiled templates and an on-disk bytecode cache, so a prompt is parsed and
+    compiled once per process (and compiled to Python once per machine).
+    """
+    def __init__(self, cache_size: int = 2000, bytecode_cache_dir: Optional[str] = None):
+        self._loader = _SourceHashLoader(max_size=cache_size)
+        try:
+            bytecode_cache = FileSystemBytecodeCache(directory=bytecode_cache_dir)
+        except Exception as e:
+            logger.warning(f"Jinja bytecode cache disabled: {e}")
+            bytecode_cache = None
+        self.environment = Environment(
+            loader=self._loader,
+            cache_size=cache_size,
+            auto_reload=False,
+            bytecode_cache=bytecode_cache,
+        )
+
+    def get_template(self, source: str) -> Template:
+        try:
+            return self.environment.get_template(self._loader.register(source))
+        except TemplateNotFound:
+            # Evicted by other threads between register() and the load; compile uncached
+            return self.environment.from_string(source)
+
+
+compiled_template_cache = CompiledTemplateCache()
+
+
+def get_compiled_template(source: str) -> Template:
+    """Drop-in replacement for jinja2.Template(source) that compiles each distinct source once."""
+    return compiled_template_cache.get_template(source)
@@ -0,0 +1,297 @@
+# embedding_cache.py
+"""
+Persistent, content-addressed cache for sentence embeddings.
+
+Vectors are keyed by sha256(model name + normalized text) and stored as float32
+blobs in a small SQLite file, with an in-memory LRU of the same blobs in front of
+it (~1.5 KB per 384-d vector instead of ~12 KB as a list of Python floats); they
+are only unpacked at the API boundary. Disk hits refresh last_used in batches
+(flushed every touch_flush_items hits, touch_flush_seconds, or with the next write)
+rather than with one commit per lookup. The cache is used transparently by
+EmbeddingService, so every KG / RAG call site benefits without changes.
+
+Environment:
+    EMI_EMBEDDING_CACHE=0            disable the on-disk layer
+    EMI_EMBEDDING_CACHE_PATH=<file>  override the SQLite location
+"""
+
+import atexit
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from array import array
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+from app.assistant.utils.logging_config import get_logger
+from app.assistant.utils.path_utils import get_repo_root
+
+logger = get_logger(__name__)
+
+
+def normalize_text(text: str) -> str:
+    """Canonical form used for cache keys (and for encoding): NFC, trimmed, single spaces."""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def embedding_cache_key(model_name: str, normalized_text: str) -> str:
+    return hashlib.sha256(f"{model_name}\x00{normalized_text}".encode("utf-8")).hexdigest()
+
+
+def _default_cache_path() -> Path:
+    env_path = os.getenv("EMI_EMBEDDING_CACHE_PATH")
+    if env_path:
+        return Path(env_path).expanduser().resolve()
+    return get_repo_root() / "cache" / "embedding_cache.sqlite3"
+
+
+class EmbeddingCache:
+    """
+    Two-level (memory LRU + SQLite) embedding cache with hit/miss counters.
+    """
+
+    def __init__(
+        self,
+        db_path: Optional[Path] = None,
+        memory_items: int = 20_000,
+        max_disk_items: int = 1_000_000,
+        persistent: Optional[bool] = None,
+        touch_flush_items: int = 256,
+        touch_flush_seconds: float = 30.0,
+    ):
+        self.memory_items = max(0, int(memory_items))
+        self.max_disk_items = max(1, int(max_disk_items))
+        if persistent is None:
+            persistent = os.getenv("EMI_EMBEDDING_CACHE", "1").strip().lower() not in ("0", "false", "no", "off")
+        self.persistent = persistent
+        self.db_path = Path(db_path) if db_path else _default_cache_path()
+
+        self._lock = threading.RLock()
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._writes_since_trim = 0
+
+        # key -> last_used of disk hits not yet written back
+        self.touch_flush_items = max(1, int(touch_flush_items))
+        self.touch_flush_seconds = touch_flush_seconds
+        self._touched: Dict[str, float] = {}
+        self._last_touch_flush = time.monotonic()
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    # ------------------------------------------------------------------
+    # SQLite
+    # ------------------------------------------------------------------
+
+    def _get_conn(self) -> Optional[sqlite3.Connection]:
+        if not self.persistent:
+            return None
+        if self._conn is None:
+            try:
+                self.db_path.parent.mkdir(parents=True, exist_ok=True)
+                conn = sqlite3.connect(str(self.db_path), timeout=30, check_same_thread=False)
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA synchronous=NORMAL")
+                conn.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS embedding_cache (
+                        key TEXT PRIMARY KEY,
+                        model TEXT NOT NULL,
+                        dim INTEGER NOT NULL,
+                        vector BLOB NOT NULL,
+                        last_used REAL NOT NULL
+                    )
+                    """
+                )
+                conn.execute("CREATE INDEX IF NOT EXISTS ix_embedding_cache_last_used ON embedding_cache(last_used)")
+                conn.commit()
+                self._conn = conn
+                # Deferred last_used updates are written back on a clean exit
+                atexit.register(self.flush)
+            except Exception as e:
+                logger.warning(f"Embedding cache disabled (cannot open {self.db_path}): {e}")
+                self.persistent = False
+                return None
+        return self._conn
+
+    @staticmethod
+    def _to_blob(vector: Sequence[float]) -> bytes:
+        if getattr(vector, "dtype", None) is not None:  # numpy array: no per-element copy
+            return vector.astype("float32", copy=False).tobytes()
+        return array("f", vector).tobytes()
+
+    @staticmethod
+    def from_blob(blob: bytes) -> List[float]:
+        values = array("f")
+        values.frombytes(blob)
+        return values.tolist()
+
+    def _flush_touched(self, conn: sqlite3.Connection) -> None:
+        """Write back the deferred last_used updates of disk hits (caller holds the lock)."""
+        self._last_touch_flush = time.monotonic()
+        if not self._touched:
+            return
+        touched, self._touched = self._touched, {}
+        try:
+            conn.executemany(
+                "UPDATE embedding_cache SET last_used = ? WHERE key = ?",
+                [(used, key) for key, used in touched.items()],
+            )
+            conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Embedding cache last_used update failed: {e}")
+
+    def _maybe_flush_touched(self, conn: sqlite3.Connection) -> None:
+        if (
+            len(self._touched) >= self.touch_flush_items
+            or time.monotonic() - self._last_touch_flush >= self.touch_flush_seconds
+        ):
+            self._flush_touched(conn)
+
+    # ------------------------------------------------------------------
+    # Memory LRU
+    # ------------------------------------------------------------------
+
+    def _remember(self, key: str, blob: bytes) -> None:
+        if self.memory_items <= 0:
+            return
+        self._memory[key] = blob
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def get_many(self, model_name: str, normalized_texts: Sequence[str]) -> List[Optional[List[float]]]:
+        """Look up vectors for already-normalized texts; None marks a miss."""
+        blobs = self.get_many_raw(model_name, normalized_texts)
+        return [None if blob is None else self.from_blob(blob) for blob in blobs]
+
+    def get_many_raw(self, model_name: str, normalized_texts: Sequence[str]) -> List[Optional[bytes]]:
+        """Like get_many, but returns the stored float32 blobs (e.g. for numpy.frombuffer)."""
+        keys = [embedding_cache_key(model_name, t) for t in normalized_texts]
+        results: List[Optional[bytes]] = [None] * len(keys)
+        to_fetch: Dict[str, List[int]] = {}
+
+        with self._lock:
+            for i, key in enumerate(keys):
+                blob = self._memory.get(key)
+                if blob is not None:
+                    self._memory.move_to_end(key)
+                    results[i] = blob
+                    self.memory_hits += 1
+                else:
+                    to_fetch.setdefault(key, []).append(i)
+
+            conn = self._get_conn() if to_fetch else None
+            if conn is not None:
+                fetched = {}
+                pending = list(to_fetch.keys())
+                # Stay well below SQLite's bound-parameter limit
+                for start in range(0, len(pending), 500):
+                    chunk = pending[start:start + 500]
+                    placeholders = ",".join("?" * len(chunk))
+                    rows = conn.execute(
+                        f"SELECT key, vector FROM embedding_cache WHERE key IN ({placeholders})", chunk
+                    ).fetchall()
+                    for key, blob in rows:
+                        fetched[key] = bytes(blob)
+                if fetched:
+                    now = time.time()
+                    self._touched.update((key, now) for key in fetched)
+                    self._maybe_flush_touched(conn)
+                for key, blob in fetched.items():
+                    self._remember(key, blob)
+                    for i in to_fetch.pop(key):
+                        results[i] = blob
+                        self.disk_hits += 1
+
+            self.misses += sum(len(idx) for idx in to_fetch.values())
+        return results
+
+    def get(self, model_name: str, normalized_text: str) -> Optional[List[float]]:
+        return self.get_many(model_name, [normalized_text])[0]
+
+    def put_many(self, model_name: str, normalized_texts: Sequence[str], vectors: Sequence[Sequence[float]]) -> None:
+        rows = []
+        now = time.time()
+        with self._lock:
+            for text, vec in zip(normalized_texts, vectors):
+                key = embedding_cache_key(model_name, text)
+                blob = self._to_blob(vec)
+                self._remember(key, blob)
+                rows.append((key, model_name, len(blob) // 4, blob, now))
+
+            conn = self._get_conn()
+            if conn is None or not rows:
+                return
+            self._flush_touched(conn)
+            try:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO embedding_cache (key, model, dim, vector, last_used) VALUES (?, ?, ?, ?, ?)",
+                    rows,
+                )
+                conn.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"Embedding cache write failed: {e}")
+                return
+            self._writes_since_trim += len(rows)
+            if self._writes_since_trim >= 1000:
+                self._writes_since_trim = 0
+                self._trim(conn)
+
+    def put(self, model_name: str, normalized_text: str, vector: Sequence[float]) -> None:
+        self.put_many(model_name, [normalized_text], [vector])
+
+    def _trim(self, conn: sqlite3.Connection) -> None:
+        """Evict least-recently-used rows once the table exceeds max_disk_items (down to 90%)."""
+        self._flush_touched(conn)
+        count = conn.execute("SELECT COUNT(*) FROM embedding_cache").fetchone()[0]
+        if count <= self.max_disk_items:
+            return
+        excess = count - int(self.max_disk_items * 0.9)
+        conn.execute(
+            "DELETE FROM embedding_cache WHERE key IN "
+            "(SELECT key FROM embedding_cache ORDER BY last_used ASC LIMIT ?)",
+            (excess,),
+        )
+        conn.commit()
+        self.evictions += excess
+        logger.info(f"Embedding cache evicted {excess} entries")
+
+    def flush(self) -> None:
+        """Write back pending last_used updates now (e.g. before shutdown)."""
+        with self._lock:
+            conn = self._get_conn() if self._touched else None
+            if conn is not None:
+                self._flush_touched(conn)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            self._touched.clear()
+            conn = self._get_conn()
+            if conn is not None:
+                conn.execute("DELETE FROM embedding_cache")
+                conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "memory_items": len(self._memory),
+                "hit_rate": round((self.memory_hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+            }
@@ -0,0 +1,196 @@
+# embedding_service.py
+"""
+Process-wide sentence embedding service.
+
+All KG and RAG code paths share a single SentenceTransformer instance through
+get_embedding_service(). Single-text requests coming from different threads are
+coalesced into micro-batches (bounded by max_batch_size / max_wait_ms) so the
+model runs one forward pass per batch instead of one per string. Callers that
+already hold a list of texts should use encode_many() directly.
+
+Every request goes through EmbeddingCache first, so repeated strings (node
+labels, RAG query sentences) never reach the model twice.
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, List, Optional, Sequence
+
+from app.assistant.utils.embedding_cache import EmbeddingCache, normalize_text
+from app.assistant.utils.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+
+
+class EmbeddingService:
+    """
+    Owns one embedding model and serves encode requests for the whole process.
+    """
+
+    def __init__(
+        self,
+        model_name: str = DEFAULT_EMBEDDING_MODEL,
+        max_batch_size: int = 64,
+        max_wait_ms: float = 2.0,
+        cache: Optional[EmbeddingCache] = None,
+    ):
+        self.model_name = model_name
+        self.cache = cache if cache is not None else EmbeddingCache()
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait_s = max(0.0, float(max_wait_ms)) / 1000.0
+
+        self._model = None
+        self._model_lock = threading.Lock()
+
+        self._queue: "queue.Queue[tuple[str, Future]]" = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+        self._worker_lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Model
+    # ------------------------------------------------------------------
+
+    @property
+    def model(self):
+        """Lazy-load the sentence transformer model (once per process)."""
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    try:
+                        from sentence_transformers import SentenceTransformer
+                    except ImportError:
+                        logger.warning("sentence-transformers not available - embedding features disabled")
+                        raise ImportError(
+                            "sentence-transformers not installed. Embedding features require sentence-transformers."
+                        )
+                    logger.info(f"Loading embedding model '{self.model_name}'")
+                    self._model = SentenceTransformer(self.model_name)
+        return self._model
+
+    def _encode_batch(self, texts: Sequence[str]):
+        """Run one forward pass for a list of texts. Returns a 2-D numpy array."""
+        return self.model.encode(
+            list(texts),
+            batch_size=self.max_batch_size,
+            convert_to_numpy=True,
+            show_progress_bar=False,
+        )
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def encode(self, text: str) -> List[float]:
+        """
+        Embed a single text.
+
+        Cached vectors are returned immediately. Otherwise the request is
+        queued and may be batched together with concurrent requests from other
+        threads; the caller blocks until its vector is ready.
+        """
+        text = normalize_text(text)
+        cached = self.cache.get(self.model_name, text)
+        if cached is not None:
+            return cached
+        self._ensure_worker()
+        future: Future = Future()
+        self._queue.put((text, future))
+        vector = future.result()
+        self.cache.put(self.model_name, text, vector)
+        return vector
+
+    def encode_many(self, texts: Sequence[str], as_numpy: bool = False) -> Any:
+        """
+        Embed a list of texts; cache misses are encoded in a single forward pass.
+
+        Returns a list of float lists (or a 2-D numpy array when as_numpy=True).
+        """
+        texts = [normalize_text(t) for t in texts]
+        blobs = self.cache.get_many_raw(self.model_name, texts)
+
+        missing = list(dict.fromkeys(t for t, b in zip(texts, blobs) if b is None))
+        encoded = {}
+        if missing:
+            batch = self._encode_batch(missing)
+            self.cache.put_many(self.model_name, missing, batch)
+            encoded = dict(zip(missing, batch))
+
+        if as_numpy:
+            import numpy as np
+            if not texts:
+                return np.zeros((0, 0), dtype=np.float32)
+            return np.stack([
+                np.frombuffer(b, dtype=np.float32) if b is not None else encoded[t] for t, b in zip(texts, blobs)
+            ]).astype(np.float32, copy=False)
+        return [
+            EmbeddingCache.from_blob(b) if b is not None else encoded[t].tolist() for t, b in zip(texts, blobs)
+        ]
+
+    def stats(self):
+        """Embedding cache hit/miss counters."""
+        return self.cache.stats()
+
+    # ------------------------------------------------------------------
+    # Micro-batching worker
+    # ------------------------------------------------------------------
+
+    def _ensure_worker(self) -> None:
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._worker_lock:
+            if self._worker is not None and self._worker.is_alive():
+                return
+            self._worker = threading.Thread(
+                target=self._run_worker, name="EmbeddingServiceWorker", daemon=True
+            )
+            self._worker.start()
+
+    def _collect_batch(self) -> List[tuple]:
+        """Block for the first request, then gather more for up to max_wait_s."""
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait_s
+
+        while len(batch) < self.max_batch_size:
+            try:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    batch.append(self._queue.get_nowait())
+                else:
+                    batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run_worker(self) -> None:
+        while True:
+            batch = self._collect_batch()
+            pending = [(text, fut) for text, fut in batch if fut.set_running_or_notify_cancel()]
+            if not pending:
+                continue
+            try:
+                vectors = self._encode_batch([text for text, _ in pending])
+            except BaseException as e:  # propagate to every waiting caller
+                for _, fut in pending:
+                    fut.set_exception(e)
+                continue
+            for (_, fut), vec in zip(pending, vectors):
+                fut.set_result(vec.tolist())
+
+
+# Global singleton instance
+_embedding_service = None
+_embedding_service_lock = threading.Lock()
+
+
+def get_embedding_service() -> EmbeddingService:
+    """Get the global embedding service instance."""
+    global _embedding_service
+    if _embedding_service is None:
+        with _embedding_service_lock:
+            if _embedding_service is None:
+                _embedding_service = EmbeddingService()
+    return _embedding_service
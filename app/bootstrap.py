@@ -49,6 +49,12 @@ def initialize_services(app):
     DI.tool_registry.load_mcp_servers()
     DI.tool_registry.load_mcp_tool_cache(enabled_only=True)
     DI.agent_registry.load_agents()
+    # Compile every agent's structured output schema now, so LLM calls only do a cache lookup
+    from app.services.llm_client import precompile_text_formats
+    compiled = precompile_text_formats(
+        cfg.get("structured_output") for cfg in DI.agent_registry.get_all_agents().values()
+    )
+    logger.info(f"✅ Precompiled {compiled} structured output schema(s)")
     ServiceLocator.register('agent_factory', AgentFactory(agent_registry=DI.agent_registry, tool_registry=DI.tool_registry))
     base_path = Path(__file__).resolve().parents[0] / "assistant" / "multi_agents"
     manager_registry = ManagerRegistry(base_path)
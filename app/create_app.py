@@ -86,6 +86,7 @@ def create_app(config_class="config.DevelopmentConfig"):
         debug_status_bp,
         debug_orchestrator_bp,
         debug_logging_bp,
+        debug_llm_metrics_bp,
         ticket_api_bp
     )
     
@@ -123,6 +124,7 @@ def create_app(config_class="config.DevelopmentConfig"):
     app.register_blueprint(debug_status_bp)
     app.register_blueprint(debug_orchestrator_bp)
     app.register_blueprint(debug_logging_bp)
+    app.register_blueprint(debug_llm_metrics_bp)
     from app.routes.agent_prompt_debug import agent_prompt_debug_bp
     app.register_blueprint(agent_prompt_debug_bp)
     app.register_blueprint(ticket_api_bp)
@@ -38,6 +38,10 @@ def initialize_core_tables():
     # Create all core tables (idempotent - only creates if missing)
     engine = get_current_engine()
     Base.metadata.create_all(engine, checkfirst=True)
+
+    # create_all does not alter existing tables; bring event_repository up to date
+    from app.assistant.database.migrations.add_event_repository_time_window import migrate
+    migrate(engine)
     logger.info("✅ Core tables initialized (9 tables)")
 
 
@@ -22,5 +22,14 @@ class MusicGenreStats(db.Model):
     genre = Column(String(128), primary_key=True)
 
     track_count = Column(Integer, nullable=False, default=0)
-    updated_at_utc = Column(DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
+    updated_at_utc = Column(
+        DateTime,
+        nullable=False,
+        default=lambda: datetime.now(timezone.utc),
+        onupdate=lambda: datetime.now(timezone.utc),
+    )
 
+
+# Committed writes bump the music weight cache version (see dj_manager/weight_cache.py)
+from app.assistant.dj_manager.weight_cache import register_music_weight_cache_sync
+register_music_weight_cache_sync()
@@ -27,7 +27,12 @@ class MusicWeightOverride(db.Model):
     # multiplier applied to the base prob_factor (>= 0)
     factor = Column(Float, nullable=False, default=1.0)
 
-    updated_at_utc = Column(DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
+    updated_at_utc = Column(
+        DateTime,
+        nullable=False,
+        default=lambda: datetime.now(timezone.utc),
+        onupdate=lambda: datetime.now(timezone.utc),
+    )
 
     __table_args__ = (
         PrimaryKeyConstraint("scope", "key", name="pk_music_weight_overrides"),
@@ -35,3 +40,7 @@ class MusicWeightOverride(db.Model):
         Index("idx_music_weight_overrides_updated", "updated_at_utc"),
     )
 
+
+# Committed writes bump the music weight cache version (see dj_manager/weight_cache.py)
+from app.assistant.dj_manager.weight_cache import register_music_weight_cache_sync
+register_music_weight_cache_sync()
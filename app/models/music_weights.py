@@ -22,7 +22,12 @@ class MusicGenreWeight(db.Model):
 
     genre = Column(String(128), primary_key=True)  # normalized lowercase genre
     factor = Column(Float, nullable=False, default=1.0)
-    updated_at_utc = Column(DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
+    updated_at_utc = Column(
+        DateTime,
+        nullable=False,
+        default=lambda: datetime.now(timezone.utc),
+        onupdate=lambda: datetime.now(timezone.utc),
+    )
 
     __table_args__ = (Index("idx_music_genre_weights_updated", "updated_at_utc"),)
 
@@ -32,7 +37,12 @@ class MusicArtistWeight(db.Model):
 
     artist = Column(String(500), primary_key=True)  # normalized lowercase artist
     factor = Column(Float, nullable=False, default=1.0)
-    updated_at_utc = Column(DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
+    updated_at_utc = Column(
+        DateTime,
+        nullable=False,
+        default=lambda: datetime.now(timezone.utc),
+        onupdate=lambda: datetime.now(timezone.utc),
+    )
 
     __table_args__ = (Index("idx_music_artist_weights_updated", "updated_at_utc"),)
 
@@ -48,7 +58,16 @@ class MusicTrackWeight(db.Model):
     artist = Column(String(500), nullable=True)
 
     factor = Column(Float, nullable=False, default=1.0)
-    updated_at_utc = Column(DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
+    updated_at_utc = Column(
+        DateTime,
+        nullable=False,
+        default=lambda: datetime.now(timezone.utc),
+        onupdate=lambda: datetime.now(timezone.utc),
+    )
 
     __table_args__ = (Index("idx_music_track_weights_updated", "updated_at_utc"),)
 
+
+# Committed writes bump the music weight cache version (see dj_manager/weight_cache.py)
+from app.assistant.dj_manager.weight_cache import register_music_weight_cache_sync
+register_music_weight_cache_sync()
@@ -0,0 +1,98 @@
+"""
+Rendered resource cache - memoized output of Jinja resource templates.
+
+Template resources (e.g. resources/*.md) are stored raw on the global blackboard and
+rendered at injection time against the resource_*_data JSON resources. The output
+only changes when the template or one of those resources does, so it is cached per
+resource id and reused while:
+- the template source is unchanged and every context value is the same object it was
+  rendered with (a value replaced by any writer misses)
+- the version counters of the template and of every context resource are unchanged;
+  ResourceManager bumps them on load/update/refresh, which also covers a value that
+  was mutated in place and written back through update_resource
+
+Counters (resource_render_hit / _miss) are reported through performance_monitor.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from app.assistant.performance.performance_monitor import performance_monitor
+from app.assistant.utils.cache import get_compiled_template
+
+from app.assistant.utils.logging_config import get_logger
+logger = get_logger(__name__)
+
+# JSON resources exposed to resource templates at injection time
+RESOURCE_TEMPLATE_CONTEXT_KEYS = (
+    "resource_user_data",
+    "resource_assistant_data",
+    "resource_assistant_personality_data",
+    "resource_relationship_config",
+    "resource_chat_guidelines_data",
+)
+
+
+class RenderedResourceCache:
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max(1, int(max_entries))
+        self._versions: Dict[str, int] = {}
+        # resource_id -> (template source, ((key, value), ...), versions, rendered)
+        self._entries: "OrderedDict[str, Tuple[str, Tuple[Tuple[str, Any], ...], Tuple[int, ...], str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def version(self, resource_id: str) -> int:
+        with self._lock:
+            return self._versions.get(resource_id, 0)
+
+    def invalidate(self, resource_id: str) -> None:
+        """Mark resource_id changed: its own render and every render that used it miss."""
+        with self._lock:
+            self._versions[resource_id] = self._versions.get(resource_id, 0) + 1
+            self._entries.pop(resource_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def render(self, resource_id: str, template_source: str, context: Dict[str, Any]) -> str:
+        """Render template_source with context, reusing the previous output when nothing changed."""
+        items = tuple(context.items())
+        with self._lock:
+            # Read before rendering: a bump racing with the render leaves a stale key, never stale text
+            versions = tuple(self._versions.get(key, 0) for key in (resource_id, *context))
+            entry = self._entries.get(resource_id)
+            if (
+                entry is not None
+                and entry[2] == versions
+                and entry[0] == template_source
+                and len(entry[1]) == len(items)
+                and all(k1 == k2 and v1 is v2 for (k1, v1), (k2, v2) in zip(entry[1], items))
+            ):
+                self._entries.move_to_end(resource_id)
+                performance_monitor.increment_counter("resource_render_hit")
+                return entry[3]
+
+        performance_monitor.increment_counter("resource_render_miss")
+        rendered = get_compiled_template(template_source).render(**context)
+        with self._lock:
+            self._entries[resource_id] = (template_source, items, versions, rendered)
+            self._entries.move_to_end(resource_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return rendered
+
+
+_rendered_resource_cache: Optional[RenderedResourceCache] = None
+_rendered_resource_cache_lock = threading.Lock()
+
+
+def get_rendered_resource_cache() -> RenderedResourceCache:
+    """Get the global rendered resource cache instance."""
+    global _rendered_resource_cache
+    if _rendered_resource_cache is None:
+        with _rendered_resource_cache_lock:
+            if _rendered_resource_cache is None:
+                _rendered_resource_cache = RenderedResourceCache()
+    return _rendered_resource_cache
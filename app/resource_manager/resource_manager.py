@@ -4,6 +4,7 @@ from typing import Dict, Any, Optional
 from jinja2 import Template
 
 from app.assistant.ServiceLocator.service_locator import DI
+from app.resource_manager.render_cache import get_rendered_resource_cache
 from app.assistant.utils.logging_config import get_logger
 
 logger = get_logger(__name__)
@@ -16,6 +17,7 @@ class ResourceManager:
     - Load on startup from config.
     - Read through global_blackboard for agents.
     - Optional persistent updates from agents (learned preferences).
+    - Every (re)load or update invalidates rendered templates that depend on the resource.
     """
 
     def __init__(self, base_dir: Optional[Path] = None):
@@ -45,6 +47,7 @@ class ResourceManager:
         for resource_id, rel_path in shared.items():
             path = (self.base_dir / rel_path).resolve()
             self._resource_files[resource_id] = path
+            get_rendered_resource_cache().invalidate(resource_id)
 
             try:
                 if not path.exists():
@@ -142,6 +145,7 @@ class ResourceManager:
             try:
                 content = self._read_file(file_path)
                 DI.global_blackboard.update_state_value(resource_id, content)
+                get_rendered_resource_cache().invalidate(resource_id)
                 self._resource_files[resource_id] = file_path
                 loaded_count += 1
                 
@@ -173,6 +177,7 @@ class ResourceManager:
                 
                 # Store raw template - will be rendered on-demand at injection time
                 DI.global_blackboard.update_state_value(resource_id, raw_content)
+                get_rendered_resource_cache().invalidate(resource_id)
                 self._resource_files[resource_id] = file_path
                 loaded_count += 1
                 logger.info(f"✅ Loaded template resource '{resource_id}' from {file_path.name} (will render on-demand)")
@@ -218,6 +223,7 @@ class ResourceManager:
             raise RuntimeError("Global blackboard not initialized.")
 
         DI.global_blackboard.update_state_value(resource_id, value)
+        get_rendered_resource_cache().invalidate(resource_id)
 
         path = self._resource_files.get(resource_id)
         if persist and path is not None:
@@ -250,5 +256,6 @@ class ResourceManager:
         try:
             content = self._read_file(path)
             DI.global_blackboard.update_state_value(resource_id, content)
+            get_rendered_resource_cache().invalidate(resource_id)
         except Exception as e:
             logger.error(f"Failed to refresh resource '{resource_id}' from {path}: {e}")
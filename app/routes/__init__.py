@@ -16,6 +16,7 @@ from .health_check import health_check_bp
 from .debug_status import debug_status_bp
 from .debug_orchestrator import debug_orchestrator_bp
 from .debug_logging import debug_logging_bp
+from .debug_llm_metrics import debug_llm_metrics_bp
 from .ticket_api import ticket_api_bp
 
 # KG/Taxonomy/Graph Visualizer routes - only import if dependencies available (disabled in alpha)
@@ -0,0 +1,37 @@
+"""
+Debug LLM Metrics Route - Per-agent / per-model LLM latency and token usage.
+
+Provides:
+- /debug/llm-metrics/data (JSON: histograms by agent and model, governor queues,
+  most recent calls; filter the recent calls with ?agent=, ?model=, ?limit=)
+- /debug/llm-metrics/reset (POST clear the recorded calls)
+"""
+
+from flask import Blueprint, jsonify, request
+
+from app.assistant.performance.llm_metrics import llm_metrics
+from app.assistant.performance.llm_performance_analyzer import LLMPerformanceAnalyzer
+from app.services.llm_governor import get_llm_governor
+
+
+debug_llm_metrics_bp = Blueprint("debug_llm_metrics", __name__)
+
+
+@debug_llm_metrics_bp.route("/debug/llm-metrics/data")
+def llm_metrics_data():
+    limit = request.args.get("limit", default=50, type=int)
+    return jsonify({
+        "calls": LLMPerformanceAnalyzer().analyze_llm_calls(),
+        "governor": get_llm_governor().stats(),
+        "recent": llm_metrics.recent(
+            limit=limit,
+            agent=request.args.get("agent") or None,
+            model=request.args.get("model") or None,
+        ),
+    })
+
+
+@debug_llm_metrics_bp.route("/debug/llm-metrics/reset", methods=["POST"])
+def reset_llm_metrics():
+    llm_metrics.reset()
+    return jsonify({"success": True})
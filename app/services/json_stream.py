@@ -0,0 +1,127 @@
+"""
+Incremental parser for a streamed JSON object.
+
+Structured-output models stream their reply as JSON text in schema field order.
+IncrementalJSONParser.feed() takes those chunks as they arrive and returns each
+top-level field of the root object as soon as its value is closed, e.g.
+
+    parser = IncrementalJSONParser()
+    parser.feed('{"think": "...", "msg_for_user": "Hel')   # -> []
+    parser.feed('lo!", "call_team": fal')                  # -> [("think", ...), ("msg_for_user", "Hello!")]
+    parser.feed('se}')                                     # -> [("call_team", False)]
+
+Each field is decoded with json.loads once it is complete, so values are exactly what
+the full parse returns. Text before the root "{" (code fences, chatter) is skipped.
+The parser only tracks nesting, strings and escapes, so it costs O(1) per character.
+The caller still parses the full text at the end (the parser is not a validator).
+"""
+
+import json
+from typing import Any, List, Optional, Tuple
+
+_SCALAR_END = frozenset(",}] \t\r\n")
+
+
+class IncrementalJSONParser:
+    def __init__(self):
+        self._pos = 0  # index into the joined text
+        self._text = ""
+        self._started = False
+        self._done = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._key: Optional[str] = None
+        self._key_start: Optional[int] = None
+        self._value_start: Optional[int] = None
+        self._expect_key = True
+        self.fields: List[Tuple[str, Any]] = []
+
+    @property
+    def done(self) -> bool:
+        """True once the root object has been closed."""
+        return self._done
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        """Consume chunk; return the (key, value) pairs completed by it, in order."""
+        if not chunk or self._done:
+            return []
+        self._text += chunk
+        completed: List[Tuple[str, Any]] = []
+        text = self._text
+        i = self._pos
+        while i < len(text) and not self._done:
+            c = text[i]
+            if not self._started:
+                if c == "{":
+                    self._started = True
+                    self._depth = 1
+                i += 1
+                continue
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        if self._key_start is not None:
+                            self._key = json.loads(text[self._key_start:i + 1])
+                            self._key_start = None
+                        elif self._value_start is not None:
+                            self._emit(text[self._value_start:i + 1], completed)
+                i += 1
+                continue
+
+            if self._depth == 1 and self._value_start is not None and c in _SCALAR_END:
+                # End of a bare number / true / false / null at the top level
+                self._emit(text[self._value_start:i], completed)
+
+            if c == '"':
+                self._in_string = True
+                if self._depth == 1:
+                    if self._expect_key:
+                        self._key_start = i
+                    elif self._value_start is None:
+                        self._value_start = i
+            elif c in "{[":
+                if self._depth == 1 and self._value_start is None and not self._expect_key:
+                    self._value_start = i
+                self._depth += 1
+            elif c in "}]":
+                self._depth -= 1
+                if self._depth == 1 and self._value_start is not None:
+                    self._emit(text[self._value_start:i + 1], completed)
+                elif self._depth == 0:
+                    self._done = True
+            elif self._depth == 1:
+                if c == ":":
+                    self._expect_key = False
+                elif c == ",":
+                    self._expect_key = True
+                elif not c.isspace() and self._value_start is None and not self._expect_key:
+                    self._value_start = i
+            i += 1
+
+        # Keep only the unfinished tail (from the oldest open token) to bound memory
+        keep = min(x for x in (self._key_start, self._value_start, i) if x is not None)
+        self._text = text[keep:]
+        for attr in ("_key_start", "_value_start"):
+            if getattr(self, attr) is not None:
+                setattr(self, attr, getattr(self, attr) - keep)
+        self._pos = i - keep
+        self.fields.extend(completed)
+        return completed
+
+    def _emit(self, raw: str, completed: List[Tuple[str, Any]]) -> None:
+        self._value_start = None
+        if self._key is None:
+            return
+        try:
+            value = json.loads(raw)
+        except ValueError:
+            return  # malformed field; the final full parse reports it
+        completed.append((self._key, value))
+        self._key = None
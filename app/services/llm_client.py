@@ -11,9 +11,14 @@ from openai import OpenAI
 import os
 import threading
 import sys
+import time
 
 from app.assistant.utils.logging_config import get_logger
 from app.assistant.performance.performance_monitor import performance_monitor
+from app.assistant.performance.llm_metrics import LLMCallRecord, classify_outcome, llm_metrics
+from app.services.llm_response_cache import cached_call
+from app.services.llm_governor import estimate_tokens, get_llm_governor
+from app.services.json_stream import IncrementalJSONParser
 logger = get_logger(__name__)
 
 
@@ -251,6 +256,169 @@ def _handle_fatal_quota_error(error_msg: str, context: str = ""):
     # Use os._exit() instead of sys.exit() - works in threads and bypasses exception handlers
     os._exit(1)
 
+
+def _governed_call(provider: str, model: str, messages, send_params: Dict[str, Any], timeout, fn, usage_tokens):
+    """
+    Run one provider request through the process-wide LLM governor (rate limits,
+    priority queueing, 429 back-off). The request timeout doubles as the queue deadline.
+    """
+    return get_llm_governor().call(
+        provider,
+        str(model),
+        fn,
+        priority=send_params.get('priority'),
+        estimated_tokens=estimate_tokens(messages),
+        timeout=timeout,
+        usage_tokens=usage_tokens,
+    )
+
+
+def _token_count(value) -> Any:
+    return value if isinstance(value, int) else None
+
+
+def _llm_usage(response) -> Dict[str, Any]:
+    """Input/output/cached/total token counts from an OpenAI Responses or Gemini response."""
+    usage = getattr(response, 'usage', None)
+    if usage is not None:
+        details = getattr(usage, 'input_tokens_details', None)
+        return {
+            'input_tokens': _token_count(getattr(usage, 'input_tokens', None)),
+            'output_tokens': _token_count(getattr(usage, 'output_tokens', None)),
+            'cached_tokens': _token_count(getattr(details, 'cached_tokens', None)),
+            'total_tokens': _token_count(getattr(usage, 'total_tokens', None)),
+        }
+    meta = getattr(response, 'usage_metadata', None)
+    if meta is not None:
+        return {
+            'input_tokens': _token_count(getattr(meta, 'prompt_token_count', None)),
+            'output_tokens': _token_count(getattr(meta, 'candidates_token_count', None)),
+            'cached_tokens': _token_count(getattr(meta, 'cached_content_token_count', None)),
+            'total_tokens': _token_count(getattr(meta, 'total_token_count', None)),
+        }
+    return {}
+
+
+def _usage_total_tokens(response) -> Any:
+    return _llm_usage(response).get('total_tokens')
+
+
+def _finish_llm_call(timer_id: str, provider: str, model, send_params: Dict[str, Any], messages,
+                     response=None, error: str = None, **details):
+    """
+    Close the call's performance timer and record it in the LLM metrics sink
+    (latency, token usage, model, calling agent, outcome). Called exactly once per
+    provider call, on success and on error.
+    """
+    usage = _llm_usage(response) if response is not None else {}
+    agent = send_params.get('agent_name') or 'unknown'
+    data = {
+        'status': 'error' if error else 'success',
+        'model': model,
+        'agent': agent,
+        'message_count': len(messages),
+        **details,
+        **usage,
+    }
+    if error:
+        data['error'] = error
+    duration = performance_monitor.end_timer(timer_id, data)
+    llm_metrics.record(LLMCallRecord(
+        provider=provider,
+        model=str(model),
+        agent=agent,
+        outcome=classify_outcome(error),
+        latency_ms=(duration or 0.0) * 1000.0,
+        input_tokens=usage.get('input_tokens'),
+        output_tokens=usage.get('output_tokens'),
+        cached_tokens=usage.get('cached_tokens'),
+        first_field_ms=details.get('first_field_ms'),
+        error=error,
+    ))
+    if usage:
+        logger.info(
+            f"Token usage ({provider}/{model}, agent {agent}) - Input: {usage.get('input_tokens')}, "
+            f"Output: {usage.get('output_tokens')}, Cached: {usage.get('cached_tokens')}, Total: {usage.get('total_tokens')}"
+        )
+
+
+class _StreamedFields:
+    """
+    Collects streamed output text and hands each top-level field of the JSON reply to
+    on_field(name, value) as soon as it closes (see IncrementalJSONParser).
+
+    restart() begins each provider attempt (the governor retries rate-limited calls) with
+    a clean buffer and parser, so text from a stream cut off mid-way never mixes with the
+    retry. A field the retry repeats with the same value is not dispatched twice.
+    """
+
+    def __init__(self, on_field):
+        self.on_field = on_field
+        self.started = time.perf_counter()
+        self.first_field_ms = None
+        self.dispatched: Dict[str, Any] = {}
+        self.restart()
+
+    def restart(self) -> "_StreamedFields":
+        self.parser = IncrementalJSONParser()
+        self.chunks: List[str] = []
+        return self
+
+    def __call__(self, delta: str) -> None:
+        if not delta:
+            return
+        self.chunks.append(delta)
+        for name, value in self.parser.feed(delta):
+            if self.first_field_ms is None:
+                self.first_field_ms = round((time.perf_counter() - self.started) * 1000.0, 1)
+            if name in self.dispatched and self.dispatched[name] == value:
+                continue
+            self.dispatched[name] = value
+            try:
+                self.on_field(name, value)
+            except Exception as e:
+                # A broken consumer must not cost us the reply itself
+                logger.warning(f"Streamed field handler failed for '{name}': {e}", exc_info=True)
+
+    @property
+    def text(self) -> str:
+        return "".join(self.chunks)
+
+
+def _consume_openai_stream(stream, on_text):
+    """Feed a Responses API event stream's output text deltas to on_text; return the final response."""
+    final = None
+    for event in stream:
+        event_type = getattr(event, 'type', None)
+        if event_type == 'response.output_text.delta':
+            on_text(getattr(event, 'delta', ''))
+        elif event_type == 'response.completed':
+            final = getattr(event, 'response', None)
+        elif event_type in ('response.failed', 'error'):
+            error = getattr(getattr(event, 'response', None), 'error', None) or getattr(event, 'message', None)
+            raise RuntimeError(f"OpenAI stream failed: {error}")
+    return final
+
+
+def _consume_gemini_stream(stream, on_text):
+    """Feed a generate_content_stream's chunk texts to on_text; return the last chunk (carries usage_metadata)."""
+    last = None
+    for chunk in stream:
+        on_text(getattr(chunk, 'text', None) or '')
+        last = chunk
+    return last
+
+
+def _validate_streamed(result, response_format):
+    """
+    Fields of a streamed reply were dispatched before the whole object existed, so
+    check the complete object against the Pydantic response model before returning it.
+    """
+    if isinstance(response_format, type) and issubclass(response_format, BaseModel):
+        response_format.model_validate(result)
+    return result
+
+
 # print("\nthe key is: ", os.environ.get('OPENAI_API_KEY'))  # Should return your API key
 
 # Removed: Time checking moved to maintenance manager for surgical control
@@ -325,42 +493,17 @@ class OpenAILLM(BaseLLMProvider):
 
         # Start timing the LLM call
         timer_id = performance_monitor.start_timer('llm_structured_output', f"{model}_{len(messages)}")
-        
+        response = None
+
         try:
             # Use explicit JSON Schema structured outputs so we can sanitize schemas
             # for OpenAI requirements (e.g., root additionalProperties=false).
             #
             # `responses.parse(text_format=<PydanticModel>)` relies on auto-generated schemas,
             # which can fail OpenAI validation for dynamically generated models.
-            from pydantic import BaseModel as _BaseModel  # local import for clarity
-
-            if isinstance(response_format, type) and issubclass(response_format, _BaseModel):
-                text_cfg = pydantic_to_openai_schema(response_format)
-            elif isinstance(response_format, dict):
-                # Allow either:
-                # - already-prepared Responses API text config: {"format": {...}}
-                # - a raw JSON Schema object: {"type":"object", ...}
-                if "format" in response_format:
-                    text_cfg = response_format
-                else:
-                    # Treat as raw JSON Schema and wrap for Responses API.
-                    schema = dict(response_format)
-                    try:
-                        sanitize_schema(schema)
-                        schema = inline_refs(schema)
-                        sanitize_schema(schema)
-                    except Exception:
-                        pass
-                    text_cfg = {
-                        "format": {
-                            "type": "json_schema",
-                            "name": "EmiStructuredOutput",
-                            "schema": schema,
-                            "strict": True,
-                        }
-                    }
-            else:
-                raise ValueError(f"Invalid response format: {type(response_format)}")
+            #
+            # Compiled once per model class / schema (see SchemaCompilationCache).
+            text_cfg = prepare_text_format(response_format)
 
             is_gpt5_family = isinstance(model, str) and model.startswith("gpt-5")
             kwargs: dict[str, Any] = {
@@ -380,14 +523,27 @@ class OpenAILLM(BaseLLMProvider):
             if is_gpt5_family:
                 kwargs.pop("temperature", None)
 
-            response = self.client.responses.create(**kwargs)
+            # Streaming mode: send_params['on_field'](name, value) gets each top-level
+            # field of the reply as soon as it closes (e.g. the user-visible message).
+            on_field = send_params.get('on_field')
+            streamed = _StreamedFields(on_field) if callable(on_field) else None
+            if streamed is not None:
+                kwargs["stream"] = True
+                create = lambda: _consume_openai_stream(self.client.responses.create(**kwargs), streamed.restart())
+            else:
+                create = lambda: self.client.responses.create(**kwargs)
+
+            response = _governed_call("openai", model, messages, send_params, timeout, create, _usage_total_tokens)
 
             # Extract and parse the JSON text content.
             raw_text = None
-            try:
-                raw_text = response.output[0].content[0].text  # type: ignore[attr-defined]
-            except Exception:
-                raw_text = getattr(response, "output_text", None)
+            if streamed is not None:
+                raw_text = streamed.text
+            else:
+                try:
+                    raw_text = response.output[0].content[0].text  # type: ignore[attr-defined]
+                except Exception:
+                    raw_text = getattr(response, "output_text", None)
 
             if not isinstance(raw_text, str) or not raw_text.strip():
                 raise ValueError("OpenAI response contained no parsable text output")
@@ -395,18 +551,18 @@ class OpenAILLM(BaseLLMProvider):
             result = _parse_first_json_object(raw_text)
             if not isinstance(result, dict):
                 raise ValueError("Structured output must be a JSON object")
+            if streamed is not None:
+                _validate_streamed(result, response_format)
+
+            _finish_llm_call(timer_id, "openai", model, send_params, messages, response=response,
+                             temperature=temperature, timeout=timeout,
+                             first_field_ms=streamed.first_field_ms if streamed else None)
             return result
 
         except Exception as e:
             # End timing and record error
-            performance_monitor.end_timer(timer_id, {
-                'status': 'error',
-                'model': model,
-                'message_count': len(messages),
-                'temperature': temperature,
-                'timeout': timeout,
-                'error': str(e)
-            })
+            _finish_llm_call(timer_id, "openai", model, send_params, messages, response=response,
+                             error=str(e), temperature=temperature, timeout=timeout)
             
             logger.error(f"Error processing input function_query: {e}")
             error_str = str(e).lower()
@@ -437,9 +593,8 @@ class OpenAILLM(BaseLLMProvider):
 
         # Allow passing a Pydantic model here too.
         try:
-            from pydantic import BaseModel as _BaseModel  # type: ignore
-            if isinstance(json_schema, type) and issubclass(json_schema, _BaseModel):
-                json_schema = pydantic_to_openai_schema(json_schema)
+            if isinstance(json_schema, type) and issubclass(json_schema, BaseModel):
+                json_schema = prepare_text_format(json_schema)
         except Exception:
             pass
 
@@ -453,28 +608,13 @@ class OpenAILLM(BaseLLMProvider):
 
         # Start timing the LLM call
         timer_id = performance_monitor.start_timer('llm_structured_output_json', f"{model}_{len(messages)}")
+        response = None
 
         try:
             # Accept either raw JSON schema or already-wrapped {"format": {...}}.
-            text_cfg: dict[str, Any]
-            if isinstance(json_schema, dict) and "format" in json_schema:
-                text_cfg = json_schema
-            else:
-                schema = dict(json_schema) if isinstance(json_schema, dict) else {"type": "object"}
-                try:
-                    sanitize_schema(schema)
-                    schema = inline_refs(schema)
-                    sanitize_schema(schema)
-                except Exception:
-                    pass
-                text_cfg = {
-                    "format": {
-                        "type": "json_schema",
-                        "name": "EmiStructuredOutput",
-                        "schema": schema,
-                        "strict": True,
-                    }
-                }
+            text_cfg: dict[str, Any] = prepare_text_format(
+                json_schema if isinstance(json_schema, dict) else {"type": "object"}
+            )
 
             kwargs = {
                 "model": model,
@@ -492,7 +632,10 @@ class OpenAILLM(BaseLLMProvider):
             if is_gpt5_family:
                 kwargs.pop("temperature", None)
 
-            response = self.client.responses.create(**kwargs)
+            response = _governed_call(
+                "openai", model, messages, send_params, timeout,
+                lambda: self.client.responses.create(**kwargs), _usage_total_tokens,
+            )
             print("\n\n\n=====DEBUG============")
             print(response)
             print("\n=====DEBUG============\n\n\n")
@@ -501,47 +644,16 @@ class OpenAILLM(BaseLLMProvider):
             print("Output of OPENAI LLM: ", event)
             print("\n\n\n")
 
-            # Extract detailed token usage information from responses API
-            usage = getattr(response, 'usage', None)
-            if usage:
-                prompt_tokens = getattr(usage, 'prompt_tokens', 0)
-                completion_tokens = getattr(usage, 'completion_tokens', 0)
-                cached_tokens = getattr(usage, 'cached_tokens', 0)
-                total_tokens = getattr(usage, 'total_tokens', 0)
-                
-                # Log detailed token usage
-                logger.info(f"Token usage (JSON) - Input: {prompt_tokens}, Output: {completion_tokens}, Cached: {cached_tokens}, Total: {total_tokens}")
-                print(f"💰 Token usage (JSON) - Input: {prompt_tokens}, Output: {completion_tokens}, Cached: {cached_tokens}, Total: {total_tokens}")
-            else:
-                prompt_tokens = completion_tokens = cached_tokens = total_tokens = None
-                logger.warning("No token usage information available in JSON response")
-                print("⚠️ No token usage information available (JSON)")
-
-            # End timing and record success
-            performance_monitor.end_timer(timer_id, {
-                'status': 'success',
-                'model': model,
-                'message_count': len(messages),
-                'temperature': temperature,
-                'timeout': timeout,
-                'total_tokens': total_tokens,
-                'prompt_tokens': prompt_tokens,
-                'completion_tokens': completion_tokens,
-                'cached_tokens': cached_tokens
-            })
+            # End timing and record success (token usage comes from response.usage)
+            _finish_llm_call(timer_id, "openai", model, send_params, messages, response=response,
+                             temperature=temperature, timeout=timeout)
 
             return event
 
         except Exception as e:
             # End timing and record error
-            performance_monitor.end_timer(timer_id, {
-                'status': 'error',
-                'model': model,
-                'message_count': len(messages),
-                'temperature': temperature,
-                'timeout': timeout,
-                'error': str(e)
-            })
+            _finish_llm_call(timer_id, "openai", model, send_params, messages, response=response,
+                             error=str(e), temperature=temperature, timeout=timeout)
             
             logger.error(f"Error processing input function_query: {e}")
             error_str = str(e).lower()
@@ -631,7 +743,8 @@ class GeminiLLM(BaseLLMProvider):
         print(f"🔍 Using Gemini model: {model_name} (temp: {temperature})")
         
         timer_id = performance_monitor.start_timer('llm_structured_output_gemini', f"{model_name}_{len(messages)}")
-        
+        response = None
+
         try:
             system_instruction, content = self._convert_messages_to_contents(messages)
             
@@ -642,26 +755,40 @@ class GeminiLLM(BaseLLMProvider):
                 full_prompt = content
             
             # New API accepts Pydantic models directly!
-            response = self.client.models.generate_content(
-                model=model_name,
-                contents=full_prompt,
-                config=self.types.GenerateContentConfig(
-                    response_mime_type='application/json',
-                    response_schema=response_format,  # Pass Pydantic model directly
-                    temperature=temperature,
-                )
+            config = self.types.GenerateContentConfig(
+                response_mime_type='application/json',
+                response_schema=response_format,  # Pass Pydantic model directly
+                temperature=temperature,
             )
+            # Streaming mode, same contract as OpenAILLM.structured_output (send_params['on_field'])
+            on_field = send_params.get('on_field')
+            streamed = _StreamedFields(on_field) if callable(on_field) else None
+            if streamed is not None:
+                generate = lambda: _consume_gemini_stream(
+                    self.client.models.generate_content_stream(model=model_name, contents=full_prompt, config=config),
+                    streamed.restart(),
+                )
+            else:
+                generate = lambda: self.client.models.generate_content(model=model_name, contents=full_prompt, config=config)
+
+            response = _governed_call("gemini", model_name, messages, send_params, timeout, generate, _usage_total_tokens)
             
             # New API has .text attribute for JSON string
             import json as json_lib
-            result_dict = json_lib.loads(response.text)
+            if streamed is not None:
+                result_dict = _validate_streamed(json_lib.loads(streamed.text), response_format)
+            else:
+                result_dict = json_lib.loads(response.text)
             
-            performance_monitor.end_timer(timer_id, {'status': 'success', 'model': model_name})
+            _finish_llm_call(timer_id, "gemini", model_name, send_params, messages, response=response,
+                             temperature=temperature, timeout=timeout,
+                             first_field_ms=streamed.first_field_ms if streamed else None)
             logger.info(f"✅ Gemini response received successfully")
             return result_dict
 
         except Exception as e:
-            performance_monitor.end_timer(timer_id, {'status': 'error', 'model': model_name, 'error': str(e)})
+            _finish_llm_call(timer_id, "gemini", model_name, send_params, messages, response=response,
+                             error=str(e), temperature=temperature, timeout=timeout)
             logger.error(f"Gemini LLM error: {e}", exc_info=True)
             
             # Return a dict to match expected structure
@@ -680,21 +807,38 @@ class LLMInterface:
     def __init__(self, llm_provider: BaseLLMProvider):
         self.llm_provider = llm_provider
 
+    def _provider_name(self, params) -> str:
+        return str(params.get("llm_provider") or type(self.llm_provider).__name__)
+
+    def _cached(self, message, use_json, params, call):
+        # Opt-in record/replay response cache (off unless EMI_LLM_CACHE / llm_cache_mode is set)
+        return cached_call(
+            self._provider_name(params),
+            message,
+            params,
+            use_json,
+            lambda: schema_compilation_cache.digest(params.get("response_format")),
+            call,
+        )
+
     def structured_output(self, message, use_json=False, **params):
         if not use_json:
-            response = self.llm_provider.structured_output(message, **params)
+            call = lambda: self.llm_provider.structured_output(message, **params)
         else:
-            response = self.llm_provider.structured_output_json(message, **params)
-        return response
-    def structured_output_json(self, message, **params):
+            call = lambda: self.llm_provider.structured_output_json(message, **params)
+        return self._cached(message, use_json, params, call)
 
-        response = self.llm_provider.structured_output_json(message, **params)
-        return response
+    def structured_output_json(self, message, **params):
+        return self._cached(message, True, params, lambda: self.llm_provider.structured_output_json(message, **params))
 
 
 
 from pydantic import BaseModel
+import copy
+import hashlib
 import json
+import weakref
+from collections import OrderedDict
 
 def sanitize_schema(schema_part: dict):
     """
@@ -822,6 +966,133 @@ def pydantic_to_openai_schema(model: type[BaseModel], name: str | None = None, s
         }
     }
 
+def _wrap_json_schema(schema: dict) -> dict:
+    """Sanitize + inline a raw JSON Schema (on a copy) and wrap it as a Responses API text config."""
+    schema = copy.deepcopy(schema)
+    try:
+        sanitize_schema(schema)
+        schema = inline_refs(schema)
+        sanitize_schema(schema)
+    except Exception:
+        pass
+    return {
+        "format": {
+            "type": "json_schema",
+            "name": "EmiStructuredOutput",
+            "schema": schema,
+            "strict": True,
+        }
+    }
+
+
+class SchemaCompilationCache:
+    """
+    Prepared Responses API `text` configs, compiled once per response format.
+
+    Pydantic models are keyed by the class itself (weakly, so dynamically created
+    models can be collected); raw JSON Schema dicts by a sha256 of their canonical
+    JSON. Returned configs are shared between requests and must not be mutated.
+    """
+
+    def __init__(self, max_dict_entries: int = 512):
+        self.max_dict_entries = max(1, int(max_dict_entries))
+        self._models: "weakref.WeakKeyDictionary[type, Dict[Any, dict]]" = weakref.WeakKeyDictionary()
+        self._model_digests: "weakref.WeakKeyDictionary[type, str]" = weakref.WeakKeyDictionary()
+        self._dicts: "OrderedDict[str, dict]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def schema_key(schema: dict) -> str:
+        canonical = json.dumps(schema, sort_keys=True, separators=(",", ":"), default=str)
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def for_model(self, model: type[BaseModel], name: str | None = None, strict: bool = True) -> dict:
+        key = (name, strict)
+        with self._lock:
+            compiled = self._models.get(model, {}).get(key)
+        if compiled is not None:
+            performance_monitor.increment_counter("schema_cache_hit")
+            return compiled
+        performance_monitor.increment_counter("schema_cache_miss")
+        compiled = pydantic_to_openai_schema(model, name=name, strict=strict)
+        with self._lock:
+            self._models.setdefault(model, {})[key] = compiled
+        return compiled
+
+    def for_json_schema(self, schema: dict) -> dict:
+        key = self.schema_key(schema)
+        with self._lock:
+            compiled = self._dicts.get(key)
+            if compiled is not None:
+                self._dicts.move_to_end(key)
+        if compiled is not None:
+            performance_monitor.increment_counter("schema_cache_hit")
+            return compiled
+        performance_monitor.increment_counter("schema_cache_miss")
+        compiled = _wrap_json_schema(schema)
+        with self._lock:
+            self._dicts[key] = compiled
+            while len(self._dicts) > self.max_dict_entries:
+                self._dicts.popitem(last=False)
+        return compiled
+
+    def digest(self, response_format: Any) -> str:
+        """Stable hash of the compiled schema (for cache keys); str/None formats hash as themselves."""
+        if isinstance(response_format, type) and issubclass(response_format, BaseModel):
+            with self._lock:
+                digest = self._model_digests.get(response_format)
+            if digest is None:
+                digest = self.schema_key(self.for_model(response_format))
+                with self._lock:
+                    self._model_digests[response_format] = digest
+            return digest
+        if isinstance(response_format, dict):
+            return self.schema_key(response_format)
+        return self.schema_key({"format": response_format})
+
+    def prepare(self, response_format: Any) -> dict:
+        """
+        Text config for a response format:
+        - Pydantic model class -> compiled JSON schema
+        - already-prepared {"format": {...}} -> returned as-is
+        - raw JSON Schema dict -> sanitized, inlined and wrapped
+        """
+        if isinstance(response_format, type) and issubclass(response_format, BaseModel):
+            return self.for_model(response_format)
+        if isinstance(response_format, dict):
+            if "format" in response_format:
+                return response_format
+            return self.for_json_schema(response_format)
+        raise ValueError(f"Invalid response format: {type(response_format)}")
+
+    def clear(self) -> None:
+        with self._lock:
+            self._models = weakref.WeakKeyDictionary()
+            self._model_digests = weakref.WeakKeyDictionary()
+            self._dicts.clear()
+
+
+schema_compilation_cache = SchemaCompilationCache()
+
+
+def prepare_text_format(response_format: Any) -> dict:
+    """Cached Responses API `text` config for a Pydantic model or JSON Schema dict."""
+    return schema_compilation_cache.prepare(response_format)
+
+
+def precompile_text_formats(response_formats) -> int:
+    """Compile every Pydantic model / JSON Schema dict in response_formats ahead of use; returns the count."""
+    compiled = 0
+    for response_format in response_formats:
+        if response_format is None or isinstance(response_format, str):
+            continue
+        try:
+            prepare_text_format(response_format)
+            compiled += 1
+        except Exception as e:
+            logger.warning(f"Could not precompile structured output schema {response_format!r}: {e}")
+    return compiled
+
 if __name__ == "__main__":
     class AgentForm(BaseModel):
         final_answer_content: str
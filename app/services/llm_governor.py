@@ -0,0 +1,380 @@
+"""
+Process-wide admission control for LLM calls.
+
+Every provider request goes through LLMGovernor.call(), which keeps one lane per
+(provider, model) with:
+- token buckets for requests/minute and tokens/minute (tokens are estimated up front
+  and corrected from the response's usage afterwards)
+- an AIMD concurrency limit: +1/limit per success, halved on a rate-limit (429) error,
+  which also pauses the lane for Retry-After (or an exponential back-off) before the
+  request is retried
+- a priority queue with deadlines. Waiters are admitted by class (interactive, normal,
+  background), then arrival; background requests may not use the last
+  `interactive_reserve` share of concurrency or bucket capacity, so chat stays fast
+  while a pipeline saturates the quota. A waiter whose deadline passes gets
+  LLMQueueTimeout (the providers report it like a request timeout).
+
+Priority for a call: an explicit `priority` send param (e.g. llm_params in an agent's
+config.yaml), else the innermost `with llm_priority(...)` on the calling thread, else
+EMI_LLM_PRIORITY, else "normal". Default limits come from EMI_LLM_RPM / EMI_LLM_TPM /
+EMI_LLM_MAX_CONCURRENCY; configure_limits() overrides them per provider/model.
+
+Limits are per process: separate processes (e.g. the KG v2 stages) each get their own.
+
+Metrics: stats() (queue depth, in flight, current limit, wait percentiles per lane) and
+the llm_governor_admitted / _rate_limited / _queue_timeout counters in
+performance_monitor.
+"""
+
+import contextlib
+import heapq
+import itertools
+import math
+import os
+import re
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Tuple
+
+from app.assistant.performance.performance_monitor import performance_monitor
+from app.assistant.utils.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+PRIORITIES = {"interactive": 0, "normal": 1, "background": 2}
+DEFAULT_PRIORITY = "normal"
+
+_local = threading.local()
+
+
+class LLMQueueTimeout(TimeoutError):
+    """The request waited past its deadline without being admitted."""
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+@dataclass
+class LLMLimits:
+    requests_per_minute: float = 500.0
+    tokens_per_minute: float = 400_000.0
+    max_concurrency: int = 16
+    # Share of concurrency / bucket capacity that background requests leave free
+    interactive_reserve: float = 0.2
+
+    @classmethod
+    def from_env(cls) -> "LLMLimits":
+        return cls(
+            requests_per_minute=_env_float("EMI_LLM_RPM", cls.requests_per_minute),
+            tokens_per_minute=_env_float("EMI_LLM_TPM", cls.tokens_per_minute),
+            max_concurrency=max(1, int(_env_float("EMI_LLM_MAX_CONCURRENCY", cls.max_concurrency))),
+        )
+
+
+@contextlib.contextmanager
+def llm_priority(priority: str) -> Iterator[None]:
+    """Run LLM calls made on this thread inside the block at the given priority class."""
+    if priority not in PRIORITIES:
+        raise ValueError(f"Unknown LLM priority {priority!r}; expected one of {tuple(PRIORITIES)}")
+    stack: List[str] = getattr(_local, "priorities", None) or []
+    stack.append(priority)
+    _local.priorities = stack
+    try:
+        yield
+    finally:
+        stack.pop()
+
+
+def current_priority(explicit: Optional[str] = None) -> str:
+    for candidate in (
+        explicit,
+        (getattr(_local, "priorities", None) or [None])[-1],
+        os.environ.get("EMI_LLM_PRIORITY"),
+    ):
+        if candidate in PRIORITIES:
+            return candidate
+    return DEFAULT_PRIORITY
+
+
+def is_rate_limit_error(error: BaseException) -> bool:
+    text = str(error).lower()
+    if "quota" in text:
+        # insufficient_quota is also a 429 but is fatal, not transient
+        return False
+    status = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    return status == 429 or "rate limit" in text or "rate_limit" in text or "resource_exhausted" in text
+
+
+def retry_after_seconds(error: BaseException) -> Optional[float]:
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    try:
+        value = headers.get("retry-after") if headers is not None else None
+        if value is not None:
+            return max(0.0, float(value))
+    except (TypeError, ValueError):
+        pass
+    m = re.search(r"(?:try again|retry) in (\d+(?:\.\d+)?)\s*(ms|s)", str(error).lower())
+    if m:
+        return float(m.group(1)) / (1000.0 if m.group(2) == "ms" else 1.0)
+    return None
+
+
+def estimate_tokens(messages: Any, output_allowance: int = 1024) -> int:
+    """Rough prompt size (~4 characters per token) plus an allowance for the reply."""
+    chars = 0
+    for msg in messages or []:
+        content = msg.get("content") if isinstance(msg, dict) else msg
+        if isinstance(content, str):
+            chars += len(content)
+        elif isinstance(content, list):
+            for part in content:
+                if isinstance(part, dict):
+                    chars += len(str(part.get("text") or "")) + (1000 if "image" in str(part.get("type")) else 0)
+                else:
+                    chars += len(str(part))
+    return chars // 4 + output_allowance
+
+
+class _TokenBucket:
+    def __init__(self, per_minute: float):
+        self.capacity = max(1.0, float(per_minute))
+        self.rate = self.capacity / 60.0
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def ready(self, cost: float, keep: float) -> bool:
+        # A request bigger than the whole bucket is admitted once the bucket is full
+        return self.level - min(cost, self.capacity) >= keep
+
+    def seconds_until(self, cost: float, keep: float) -> float:
+        missing = min(cost, self.capacity) + keep - self.level
+        return max(0.0, missing / self.rate)
+
+
+class _Lane:
+    def __init__(self, key: Tuple[str, str], limits: LLMLimits):
+        self.key = key
+        self.limits = limits
+        self.requests = _TokenBucket(limits.requests_per_minute)
+        self.tokens = _TokenBucket(limits.tokens_per_minute)
+        self.limit = float(limits.max_concurrency)
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self.consecutive_429 = 0
+        self.waiters: List[Tuple[int, int, object]] = []
+        self.admitted = 0
+        self.rate_limited = 0
+        self.timeouts = 0
+        self.waits_ms: Deque[float] = deque(maxlen=1000)
+
+    def _reserve(self, priority: int) -> float:
+        return self.limits.interactive_reserve if priority >= PRIORITIES["background"] else 0.0
+
+    def blocked_for(self, priority: int, cost: float, now: float) -> Optional[float]:
+        """None if a request can start now, else seconds to wait (0 = until a slot frees)."""
+        if now < self.paused_until:
+            return self.paused_until - now
+        reserve = self._reserve(priority)
+        slots = max(1, int(self.limit))
+        if self.in_flight >= max(1, math.floor(slots * (1.0 - reserve))):
+            return 0.0
+        self.requests.refill(now)
+        self.tokens.refill(now)
+        keep_req, keep_tok = self.requests.capacity * reserve, self.tokens.capacity * reserve
+        if self.requests.ready(1, keep_req) and self.tokens.ready(cost, keep_tok):
+            return None
+        return max(self.requests.seconds_until(1, keep_req), self.tokens.seconds_until(cost, keep_tok), 0.001)
+
+
+class LLMTicket:
+    """An admitted request; release() exactly once when the provider call finishes."""
+
+    def __init__(self, governor: "LLMGovernor", lane: _Lane, tokens: int, waited: float):
+        self.governor = governor
+        self.lane = lane
+        self.tokens = tokens
+        self.waited = waited
+
+    def release(self, *, tokens_used: Optional[int] = None, rate_limited: bool = False,
+                retry_after: Optional[float] = None) -> None:
+        self.governor._release(self, tokens_used, rate_limited, retry_after)
+
+
+class LLMGovernor:
+    def __init__(self, default_limits: Optional[LLMLimits] = None, max_backoff_seconds: float = 30.0):
+        self.default_limits = default_limits or LLMLimits.from_env()
+        self.max_backoff_seconds = max_backoff_seconds
+        self._limits: Dict[Tuple[str, str], LLMLimits] = {}
+        self._lanes: Dict[Tuple[str, str], _Lane] = {}
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+
+    def configure_limits(self, provider: str, model: str = "*", limits: Optional[LLMLimits] = None, **overrides) -> None:
+        """Set limits for provider/model ("*" = every model of the provider); existing lanes are rebuilt."""
+        base = limits or self._limits.get((provider, model)) or self.default_limits
+        new = LLMLimits(**{**base.__dict__, **overrides})
+        with self._cond:
+            self._limits[(provider, model)] = new
+            for key in [k for k in self._lanes if k[0] == provider and (model == "*" or k[1] == model)]:
+                if self._lanes[key].in_flight == 0 and not self._lanes[key].waiters:
+                    del self._lanes[key]
+
+    def _lane(self, provider: str, model: str) -> _Lane:
+        key = (provider, model)
+        lane = self._lanes.get(key)
+        if lane is None:
+            limits = self._limits.get(key) or self._limits.get((provider, "*")) or self.default_limits
+            lane = self._lanes[key] = _Lane(key, limits)
+        return lane
+
+    def acquire(self, provider: str, model: str, *, priority: Optional[str] = None,
+                estimated_tokens: int = 0, timeout: Optional[float] = None) -> LLMTicket:
+        prio = PRIORITIES[current_priority(priority)]
+        cost = max(0, int(estimated_tokens))
+        start = time.monotonic()
+        deadline = start + timeout if timeout is not None else None
+        with self._cond:
+            lane = self._lane(provider, model)
+            entry = (prio, next(self._seq), object())
+            heapq.heappush(lane.waiters, entry)
+            while True:
+                now = time.monotonic()
+                wait = None if lane.waiters[0] is not entry else lane.blocked_for(prio, cost, now)
+                if lane.waiters[0] is entry and wait is None:
+                    heapq.heappop(lane.waiters)
+                    lane.in_flight += 1
+                    lane.requests.level -= 1
+                    lane.tokens.level -= cost
+                    lane.admitted += 1
+                    waited = now - start
+                    lane.waits_ms.append(waited * 1000.0)
+                    # The next waiter may fit too (e.g. spare slots)
+                    self._cond.notify_all()
+                    break
+                if deadline is not None and now >= deadline:
+                    lane.waiters.remove(entry)
+                    heapq.heapify(lane.waiters)
+                    lane.timeouts += 1
+                    self._cond.notify_all()
+                    performance_monitor.increment_counter("llm_governor_queue_timeout")
+                    raise LLMQueueTimeout(
+                        f"LLM governor queue timeout: {provider}/{model} not admitted within {now - start:.1f}s"
+                    )
+                # Not at the head or waiting for a slot: sleep until notified (bounded)
+                sleep = wait if wait else 1.0
+                if deadline is not None:
+                    sleep = min(sleep, deadline - now)
+                self._cond.wait(max(0.001, sleep))
+        performance_monitor.increment_counter("llm_governor_admitted")
+        return LLMTicket(self, lane, cost, waited)
+
+    def _release(self, ticket: LLMTicket, tokens_used: Optional[int], rate_limited: bool,
+                 retry_after: Optional[float]) -> None:
+        lane = ticket.lane
+        with self._cond:
+            lane.in_flight = max(0, lane.in_flight - 1)
+            if tokens_used is not None:
+                lane.tokens.level = min(lane.tokens.capacity, lane.tokens.level + ticket.tokens - int(tokens_used))
+            if rate_limited:
+                lane.rate_limited += 1
+                lane.consecutive_429 += 1
+                lane.limit = max(1.0, lane.limit / 2.0)
+                backoff = retry_after if retry_after is not None else min(
+                    self.max_backoff_seconds, 0.5 * (2 ** (lane.consecutive_429 - 1))
+                )
+                lane.paused_until = max(lane.paused_until, time.monotonic() + backoff)
+                performance_monitor.increment_counter("llm_governor_rate_limited")
+                logger.warning(
+                    f"LLM governor: rate limited on {lane.key[0]}/{lane.key[1]}; "
+                    f"concurrency limit -> {int(lane.limit)}, pausing {backoff:.1f}s"
+                )
+            else:
+                lane.consecutive_429 = 0
+                lane.limit = min(float(lane.limits.max_concurrency), lane.limit + 1.0 / lane.limit)
+            self._cond.notify_all()
+
+    def call(
+        self,
+        provider: str,
+        model: str,
+        fn: Callable[[], Any],
+        *,
+        priority: Optional[str] = None,
+        estimated_tokens: int = 0,
+        timeout: Optional[float] = None,
+        usage_tokens: Optional[Callable[[Any], Optional[int]]] = None,
+        max_attempts: int = 3,
+    ) -> Any:
+        """
+        Run fn() once admitted. Rate-limit errors back the lane off and are retried (up to
+        max_attempts, within timeout); anything else is re-raised unchanged.
+        """
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        attempt = 0
+        while True:
+            attempt += 1
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            ticket = self.acquire(provider, model, priority=priority, estimated_tokens=estimated_tokens, timeout=remaining)
+            try:
+                result = fn()
+            except Exception as e:
+                limited = is_rate_limit_error(e)
+                ticket.release(rate_limited=limited, retry_after=retry_after_seconds(e) if limited else None)
+                if limited and attempt < max_attempts:
+                    logger.info(f"LLM governor: retrying {provider}/{model} after rate limit (attempt {attempt + 1})")
+                    continue
+                raise
+            used = None
+            if usage_tokens is not None:
+                try:
+                    used = usage_tokens(result)
+                except Exception:
+                    used = None
+            ticket.release(tokens_used=used)
+            return result
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._cond:
+            out = {}
+            for (provider, model), lane in self._lanes.items():
+                waits = sorted(lane.waits_ms)
+                pct = lambda p: round(waits[min(len(waits) - 1, int(p * len(waits)))], 2) if waits else None
+                out[f"{provider}/{model}"] = {
+                    "queue_depth": len(lane.waiters),
+                    "queue_by_priority": {
+                        name: sum(1 for w in lane.waiters if w[0] == level) for name, level in PRIORITIES.items()
+                    },
+                    "in_flight": lane.in_flight,
+                    "concurrency_limit": int(lane.limit),
+                    "admitted": lane.admitted,
+                    "rate_limited": lane.rate_limited,
+                    "queue_timeouts": lane.timeouts,
+                    "wait_ms_p50": pct(0.50),
+                    "wait_ms_p95": pct(0.95),
+                    "wait_ms_max": round(waits[-1], 2) if waits else None,
+                }
+            return out
+
+
+_llm_governor: Optional[LLMGovernor] = None
+_llm_governor_lock = threading.Lock()
+
+
+def get_llm_governor() -> LLMGovernor:
+    """Get the global LLM governor instance."""
+    global _llm_governor
+    if _llm_governor is None:
+        with _llm_governor_lock:
+            if _llm_governor is None:
+                _llm_governor = LLMGovernor()
+    return _llm_governor
@@ -0,0 +1,301 @@
+"""
+Deterministic, content-addressed cache of LLM structured-output responses.
+
+Opt-in, per process (EMI_LLM_CACHE=record|replay) or for a block of code
+(`with llm_cache_mode("replay"): ...`):
+- off     (default) every call goes to the provider
+- record  read-through: hits are served from the cache, misses call the provider and
+          successful (dict) results are stored
+- replay  strict: hits only, a miss raises LLMCacheMiss instead of calling the provider,
+          so a pipeline can be re-run or benchmarked offline from recorded responses.
+          Replay never writes and ignores the TTL.
+
+Key: sha256 over provider, engine/model, temperature, use_json, the messages as
+canonical JSON and the compiled schema hash (SchemaCompilationCache.digest). Image
+blocks are keyed by their reference (path/URL/base64 text), not by file content.
+
+Storage: one SQLite file (EMI_LLM_CACHE_PATH, default cache/llm_responses.db) shared by
+all processes, with a TTL and entry/byte caps enforced least-recently-used on write.
+
+Counters (llm_cache_hit / _miss / _store / _evicted) are reported through
+performance_monitor.
+"""
+
+import contextlib
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from app.assistant.performance.performance_monitor import performance_monitor
+from app.assistant.utils.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+MODES = ("off", "record", "replay")
+
+# Bump when the key derivation changes so old entries stop matching
+KEY_VERSION = 1
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS llm_responses (
+    key TEXT PRIMARY KEY,
+    provider TEXT,
+    model TEXT,
+    response TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_llm_responses_last_used ON llm_responses (last_used);
+"""
+
+
+class LLMCacheMiss(RuntimeError):
+    """Raised in replay mode when a request has no recorded response."""
+
+
+def _repo_root_from_here() -> Path:
+    # app/services/llm_response_cache.py -> repo root
+    return Path(__file__).resolve().parents[2]
+
+
+def default_cache_path() -> Path:
+    return Path(os.environ.get("EMI_LLM_CACHE_PATH") or (_repo_root_from_here() / "cache" / "llm_responses.db"))
+
+
+def make_key(
+    provider: str,
+    messages: List[Dict[str, Any]],
+    params: Dict[str, Any],
+    use_json: bool,
+    schema_digest: str,
+) -> str:
+    payload = {
+        "v": KEY_VERSION,
+        "provider": provider,
+        "engine": params.get("engine"),
+        "model": params.get("model"),
+        "temperature": params.get("temperature"),
+        "use_json": bool(use_json),
+        "messages": messages,
+        "schema": schema_digest,
+    }
+    canonical = json.dumps(payload, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def _cacheable(result: Any) -> bool:
+    # Providers report failures as strings ("LLM error: ...") or {"error": True, ...}
+    return isinstance(result, dict) and result.get("error") is not True
+
+
+class LLMResponseCache:
+    def __init__(
+        self,
+        path: Optional[Path] = None,
+        ttl_seconds: float = 30 * 24 * 3600,
+        max_entries: int = 50000,
+        max_bytes: int = 512 * 1024 * 1024,
+        enforce_every: int = 50,
+    ):
+        self.path = Path(path) if path is not None else default_cache_path()
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max(1, int(max_entries))
+        self.max_bytes = max(1, int(max_bytes))
+        self.enforce_every = max(1, int(enforce_every))
+        self._conn: Optional[sqlite3.Connection] = None
+        self._puts_since_enforce = 0
+        self._lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA busy_timeout=30000")
+            self._conn.executescript(_SCHEMA)
+        return self._conn
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                try:
+                    self._conn.close()
+                except Exception as e:
+                    logger.debug(f"LLMResponseCache: failed to close {self.path}: {e}", exc_info=True)
+            self._conn = None
+
+    def get(self, key: str, *, ignore_ttl: bool = False, touch: bool = True) -> Optional[dict]:
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute("SELECT response, created_at FROM llm_responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if not ignore_ttl and row[1] + self.ttl_seconds <= now:
+                return None
+            if touch:
+                with conn:
+                    conn.execute("UPDATE llm_responses SET last_used = ? WHERE key = ?", (now, key))
+        return json.loads(row[0])
+
+    def put(self, key: str, value: dict, *, provider: str = "", model: str = "") -> None:
+        response = json.dumps(value, ensure_ascii=False)
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO llm_responses (key, provider, model, response, size, created_at, last_used) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (key, provider, model, response, len(response), now, now),
+                )
+            self._puts_since_enforce += 1
+            if self._puts_since_enforce >= self.enforce_every:
+                self._enforce_limits(conn, now)
+
+    def _enforce_limits(self, conn: sqlite3.Connection, now: float) -> None:
+        self._puts_since_enforce = 0
+        evicted = 0
+        with conn:
+            evicted += conn.execute(
+                "DELETE FROM llm_responses WHERE created_at <= ?", (now - self.ttl_seconds,)
+            ).rowcount
+            count, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_responses").fetchone()
+            if count > self.max_entries or total > self.max_bytes:
+                # Walk least-recently-used first until both caps hold
+                drop, over_count, over_bytes = [], count - self.max_entries, total - self.max_bytes
+                for key, size in conn.execute("SELECT key, size FROM llm_responses ORDER BY last_used"):
+                    if over_count <= 0 and over_bytes <= 0:
+                        break
+                    drop.append((key,))
+                    over_count -= 1
+                    over_bytes -= size
+                conn.executemany("DELETE FROM llm_responses WHERE key = ?", drop)
+                evicted += len(drop)
+        if evicted:
+            performance_monitor.increment_counter("llm_cache_evicted", evicted)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            count, total = self._connection().execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_responses"
+            ).fetchone()
+        return {"path": str(self.path), "entries": count, "bytes": total}
+
+    def clear(self) -> None:
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute("DELETE FROM llm_responses")
+
+
+# ----------------------------------------------------------------------
+# Mode + process-wide instance
+# ----------------------------------------------------------------------
+
+_mode_override: Optional[str] = None
+_cache: Optional[LLMResponseCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_llm_cache_mode() -> str:
+    mode = _mode_override or os.environ.get("EMI_LLM_CACHE", "off").strip().lower() or "off"
+    if mode not in MODES:
+        logger.warning(f"Unknown EMI_LLM_CACHE mode {mode!r}; caching disabled")
+        return "off"
+    return mode
+
+
+def get_llm_response_cache() -> LLMResponseCache:
+    """Get the global LLM response cache instance (opened lazily on first use)."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = LLMResponseCache()
+    return _cache
+
+
+def set_llm_response_cache(cache: Optional[LLMResponseCache]) -> None:
+    """Replace the global cache (e.g. to point replay at a recorded fixture file)."""
+    global _cache
+    with _cache_lock:
+        _cache = cache
+
+
+@contextlib.contextmanager
+def llm_cache_mode(mode: str, path: Optional[Path] = None) -> Iterator[LLMResponseCache]:
+    """
+    Use mode (and optionally the cache file at path) for every LLM call made while the
+    block runs, from any thread; restores the previous mode and cache on exit.
+    """
+    global _mode_override, _cache
+    if mode not in MODES:
+        raise ValueError(f"Unknown LLM cache mode {mode!r}; expected one of {MODES}")
+    with _cache_lock:
+        previous_mode, previous_cache = _mode_override, _cache
+        _mode_override = mode
+        if path is not None:
+            _cache = LLMResponseCache(path)
+    try:
+        yield get_llm_response_cache()
+    finally:
+        with _cache_lock:
+            if path is not None and _cache is not None and _cache is not previous_cache:
+                _cache.close()
+            _mode_override, _cache = previous_mode, previous_cache
+
+
+def cached_call(
+    provider: str,
+    messages: List[Dict[str, Any]],
+    params: Dict[str, Any],
+    use_json: bool,
+    schema_digest: Callable[[], str],
+    call: Callable[[], Any],
+) -> Any:
+    """Run call() through the response cache according to the current mode."""
+    mode = get_llm_cache_mode()
+    if mode == "off":
+        return call()
+
+    cache = get_llm_response_cache()
+    try:
+        key = make_key(provider, messages, params, use_json, schema_digest())
+    except Exception as e:
+        if mode == "replay":
+            raise LLMCacheMiss(f"Could not derive a cache key for this request: {e}") from e
+        logger.warning(f"LLM response cache: could not derive key, calling provider: {e}")
+        return call()
+
+    replay = mode == "replay"
+    try:
+        hit = cache.get(key, ignore_ttl=replay, touch=not replay)
+    except Exception as e:
+        if replay:
+            raise
+        logger.warning(f"LLM response cache read failed ({cache.path}): {e}")
+        hit = None
+    if hit is not None:
+        performance_monitor.increment_counter("llm_cache_hit")
+        return hit
+
+    performance_monitor.increment_counter("llm_cache_miss")
+    model = str(params.get("engine") or params.get("model") or "")
+    if replay:
+        raise LLMCacheMiss(f"No recorded response for {provider}/{model} request {key[:12]} in {cache.path}")
+
+    result = call()
+    if _cacheable(result):
+        try:
+            cache.put(key, result, provider=provider, model=model)
+            performance_monitor.increment_counter("llm_cache_store")
+        except Exception as e:
+            logger.warning(f"LLM response cache write failed ({cache.path}): {e}")
+    return result
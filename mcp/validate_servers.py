@@ -27,6 +27,17 @@ SCHEMA_PATH = REPO_ROOT / "mcp" / "schemas" / "mcp_server_entry.schema.json"
 
 
 if BaseModel is not None:
+    class StdioPoolModel(BaseModel):
+        model_config = ConfigDict(extra="forbid")
+
+        enabled: Optional[bool] = None
+        min_sessions: Optional[int] = Field(default=None, ge=0, le=100)
+        max_sessions: Optional[int] = Field(default=None, ge=1, le=1000)
+        max_requests_per_session: Optional[int] = Field(default=None, ge=1, le=1000)
+        idle_timeout_seconds: Optional[float] = Field(default=None, ge=0)
+        health_check_interval_seconds: Optional[float] = Field(default=None, ge=0)
+
+
     class PolicyModel(BaseModel):
         model_config = ConfigDict(extra="forbid")
 
@@ -36,6 +47,7 @@ if BaseModel is not None:
         max_result_bytes: int = Field(ge=1024, le=50_000_000)
         rate_limit_per_minute: Optional[int] = Field(default=None, ge=1)
         allow_network_access: Optional[bool] = None
+        stdio_pool: Optional[StdioPoolModel] = None
 
 
     class LaunchOptionModel(BaseModel):